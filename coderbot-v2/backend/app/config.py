@@ -18,6 +18,64 @@ class Settings(BaseSettings):
     # Configurações de administrador do PocketBase (para gerenciamento de prompts)
     pocketbase_admin_email: str = Field("", env="POCKETBASE_ADMIN_EMAIL")
     pocketbase_admin_password: str = Field("", env="POCKETBASE_ADMIN_PASSWORD")
+
+    # Pool HTTP compartilhado com o PocketBase (timeouts em segundos)
+    pocketbase_timeout_seconds: float = Field(10.0, env="POCKETBASE_TIMEOUT_SECONDS")
+    pocketbase_connect_timeout_seconds: float = Field(5.0, env="POCKETBASE_CONNECT_TIMEOUT_SECONDS")
+    pocketbase_max_connections: int = Field(100, env="POCKETBASE_MAX_CONNECTIONS")
+    pocketbase_max_keepalive_connections: int = Field(20, env="POCKETBASE_MAX_KEEPALIVE_CONNECTIONS")
+    # Antecedência com que o token de admin é renovado em segundo plano
+    pocketbase_token_refresh_margin_seconds: float = Field(300.0, env="POCKETBASE_TOKEN_REFRESH_MARGIN_SECONDS")
+    # Operações por requisição /api/batch (limite batch.maxRequests do servidor) e concorrência do fallback
+    pocketbase_batch_max_requests: int = Field(50, env="POCKETBASE_BATCH_MAX_REQUESTS")
+    pocketbase_bulk_concurrency: int = Field(8, env="POCKETBASE_BULK_CONCURRENCY")
+
+    # Cache das checagens professor/membro por turma (respostas negativas expiram antes)
+    membership_cache_ttl_seconds: float = Field(30.0, env="MEMBERSHIP_CACHE_TTL_SECONDS")
+    membership_cache_negative_ttl_seconds: float = Field(5.0, env="MEMBERSHIP_CACHE_NEGATIVE_TTL_SECONDS")
+
+    # Entrega push de notificações (SSE) e assinatura do realtime do PocketBase
+    notifications_realtime_enabled: bool = Field(True, env="NOTIFICATIONS_REALTIME_ENABLED")
+    notifications_sse_heartbeat_seconds: float = Field(15.0, env="NOTIFICATIONS_SSE_HEARTBEAT_SECONDS")
+    # Recontagem periódica dos contadores de não lidas em memória (0 desabilita)
+    unread_counter_reconcile_seconds: float = Field(300.0, env="UNREAD_COUNTER_RECONCILE_SECONDS")
+
+    # Chaves de API por turma em cache e clientes do SDK reutilizados por credencial
+    class_api_key_cache_ttl_seconds: float = Field(300.0, env="CLASS_API_KEY_CACHE_TTL_SECONDS")
+    provider_client_pool_max_entries: int = Field(64, env="PROVIDER_CLIENT_POOL_MAX_ENTRIES")
+
+    # Snapshot das métricas da plataforma (renovação em segundo plano; 0 renova na leitura)
+    platform_analytics_refresh_seconds: float = Field(300.0, env="PLATFORM_ANALYTICS_REFRESH_SECONDS")
+    platform_analytics_active_window_days: int = Field(30, env="PLATFORM_ANALYTICS_ACTIVE_WINDOW_DAYS")
+
+    # Execução de código via Piston: cliente keep-alive compartilhado e catálogo de runtimes com TTL
+    piston_url: str = Field("https://emkc.org/api/v2/piston", env="PISTON_URL")
+    piston_timeout_seconds: float = Field(30.0, env="PISTON_TIMEOUT_SECONDS")
+    piston_runtimes_ttl_seconds: float = Field(3600.0, env="PISTON_RUNTIMES_TTL_SECONDS")
+    # /piston/executar-lote: casos simultâneos por lote e limite de casos
+    piston_batch_concurrency: int = Field(4, env="PISTON_BATCH_CONCURRENCY")
+    piston_batch_max_cases: int = Field(50, env="PISTON_BATCH_MAX_CASES")
+    # Cache por conteúdo (linguagem, versão, código, stdin) das execuções que terminaram normalmente
+    execution_cache_enabled: bool = Field(True, env="EXECUTION_CACHE_ENABLED")
+    execution_cache_max_entries: int = Field(1024, env="EXECUTION_CACHE_MAX_ENTRIES")
+    execution_cache_max_bytes: int = Field(16 * 1024 * 1024, env="EXECUTION_CACHE_MAX_BYTES")
+    # Backend de execução: "piston" (remoto) ou "local" (Python/JavaScript em subprocessos; demais no Piston)
+    code_executor: str = Field("piston", env="CODE_EXECUTOR")
+    # Executor local: interpretadores (Python vazio = o do servidor), workers prontos por linguagem e execuções simultâneas
+    local_executor_python: str = Field("", env="LOCAL_EXECUTOR_PYTHON")
+    local_executor_node: str = Field("node", env="LOCAL_EXECUTOR_NODE")
+    local_executor_pool_size: int = Field(2, env="LOCAL_EXECUTOR_POOL_SIZE")
+    local_executor_concurrency: int = Field(4, env="LOCAL_EXECUTOR_CONCURRENCY")
+    # Limites por execução local: relógio, CPU, memória, arquivos gravados, processos do usuário e saída
+    local_executor_timeout_seconds: float = Field(5.0, env="LOCAL_EXECUTOR_TIMEOUT_SECONDS")
+    local_executor_cpu_seconds: int = Field(3, env="LOCAL_EXECUTOR_CPU_SECONDS")
+    local_executor_memory_mb: int = Field(256, env="LOCAL_EXECUTOR_MEMORY_MB")
+    local_executor_file_size_kb: int = Field(1024, env="LOCAL_EXECUTOR_FILE_SIZE_KB")
+    local_executor_max_processes: int = Field(512, env="LOCAL_EXECUTOR_MAX_PROCESSES")
+    local_executor_max_output_kb: int = Field(64, env="LOCAL_EXECUTOR_MAX_OUTPUT_KB")
+    # Faixa de uids (um por worker) e gid sem privilégios dos workers locais; o servidor precisa rodar como root
+    local_executor_uid_base: int = Field(61000, env="LOCAL_EXECUTOR_UID_BASE")
+    local_executor_gid: int = Field(61000, env="LOCAL_EXECUTOR_GID")
     
     # Configurações de Providers de IA
     open_ai_api_key: str = Field("", env="OPEN_AI_API_KEY")
@@ -32,6 +90,28 @@ class Settings(BaseSettings):
     ollama_default_model: str = Field("llama3.1", env="OLLAMA_DEFAULT_MODEL")
     ollama_timeout_seconds: float = Field(120.0, env="OLLAMA_TIMEOUT_SECONDS")
 
+    # Embeddings do RAG ("openai" usa a API remota; "local" usa modelo scikit-learn em CPU)
+    embedding_backend: str = Field("openai", env="EMBEDDING_BACKEND")
+    local_embedding_model_path: str = Field("models/local_embeddings.joblib", env="LOCAL_EMBEDDING_MODEL_PATH")
+    # Máximo de textos por chamada `embed` na ingestão (limite de payload da API)
+    embedding_batch_size: int = Field(64, env="EMBEDDING_BATCH_SIZE")
+
+    # Classificador local on-topic/off-topic (TF-IDF de caracteres + modelo linear)
+    topic_classifier_enabled: bool = Field(True, env="TOPIC_CLASSIFIER_ENABLED")
+    topic_classifier_path: str = Field("models/topic_classifier.joblib", env="TOPIC_CLASSIFIER_PATH")
+    topic_classifier_threshold: float = Field(0.5, env="TOPIC_CLASSIFIER_THRESHOLD")
+    # Confiança off-topic (1 - score) a partir da qual o classificador veta a query
+    topic_classifier_veto_confidence: float = Field(0.9, env="TOPIC_CLASSIFIER_VETO_CONFIDENCE")
+
+    # Recálculo periódico do quality_score dos exemplos (0 desabilita)
+    quality_score_refresh_interval_seconds: float = Field(3600.0, env="QUALITY_SCORE_REFRESH_INTERVAL_SECONDS")
+    quality_score_epsilon: float = Field(0.005, env="QUALITY_SCORE_EPSILON")
+    # Sincronização incremental do índice de exemplos com escritas de outros workers (0 desabilita)
+    example_index_sync_interval_seconds: float = Field(60.0, env="EXAMPLE_INDEX_SYNC_INTERVAL_SECONDS")
+
+    # Similaridade (Jaccard estimada) a partir da qual um exemplo gerado é considerado duplicata
+    example_dedup_threshold: float = Field(0.85, env="EXAMPLE_DEDUP_THRESHOLD")
+
     # Outros
     rapidapi_key: str = Field("", env="RAPIDAPI_KEY")
 
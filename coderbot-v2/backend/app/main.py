@@ -1,4 +1,4 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Header, HTTPException, status
 from app.routers import piston_router, exercises_router  # Importa os roteadores
 from app.config import settings  # Importa para garantir que a config seja lida na inicialização
 from supabase import create_client, Client
@@ -11,6 +11,13 @@ from app.routers.agno_router import router as agno_router
 from app.routers.classes_router import router as classes_router
 from app.routers.format_router import router as format_router
 from app.routers.notifications_router import router as notifications_router
+from app.services.examples_rag_service import close_examples_rag_service, get_examples_rag_service
+from app.services.pocketbase_service import get_pocketbase_client
+from app.services.notification_hub import get_notification_hub
+from app.services.code_executor import close_code_executors, start_code_executors
+from app.services.topic_classifier import get_topic_classifier
+from typing import Optional
+import asyncio
 import logging
 
 # Configuração de logging
@@ -66,11 +73,43 @@ async def startup_event():
     logger.info("Sistemas de aprendizagem adaptativa inicializados")
     logger.info("Engine de analytics com ML ativado")
     logger.info("PocketBase integration configurado")
+    # Login de admin do PocketBase em segundo plano: não atrasa o startup nem a primeira requisição
+    asyncio.create_task(get_pocketbase_client().ensure_authenticated())
+    # Notificações escritas por outros workers chegam pelo realtime do PocketBase
+    if settings.notifications_realtime_enabled:
+        get_notification_hub().start_realtime(get_pocketbase_client())
+    get_pocketbase_client().unread_counters.start()
+    get_pocketbase_client().platform_analytics.start()
+    # Catálogo de runtimes do Piston (e pool de workers locais, se CODE_EXECUTOR=local) antes do primeiro "Executar"
+    start_code_executors()
+
+    # Classificador local on-topic: carregado uma vez, antes da primeira requisição
+    if get_topic_classifier() is not None:
+        logger.info("Classificador de tópicos carregado")
+    
+    # Recálculo periódico do quality_score dos exemplos contextuais
+    examples_rag = get_examples_rag_service(get_pocketbase_client())
+    examples_rag.quality_job.start()
+    # Exemplos salvos/votados por outros workers entram no índice em memória deste processo
+    examples_rag.start_index_sync()
+    # Pré-aquece o top-k de exemplos com os tópicos das missões ativas (em segundo plano)
+    asyncio.create_task(examples_rag.prewarm_top_examples())
     
     # Aqui pode-se inicializar serviços compartilhados, como PromptLoader e RAGService,
     # para que fiquem disponíveis aos endpoints relevantes.
 
 
+# Evento de shutdown: grava o que ficou pendente em memória e fecha o pool HTTP do PocketBase
+@app.on_event("shutdown")
+async def shutdown_event():
+    await close_examples_rag_service()
+    await get_notification_hub().stop_realtime()
+    await get_pocketbase_client().unread_counters.stop()
+    await get_pocketbase_client().platform_analytics.stop()
+    await close_code_executors()
+    await get_pocketbase_client().close()
+
+
 
 # Incluir os roteadores na aplicação (seguindo princípios SOLID e modularização)
 # app.include_router(deepseek_router.router)
@@ -112,3 +151,10 @@ async def health_check():
         "version": "2.0.0"
     }
 
+# Métricas gerais da plataforma: snapshot em memória renovado em segundo plano
+@app.get("/analytics/platform", tags=["Analytics"])
+async def platform_analytics(x_user_role: Optional[str] = Header(default=None)):
+    if x_user_role != "admin":
+        raise HTTPException(status.HTTP_403_FORBIDDEN, detail="Only admin allowed")
+    return await get_pocketbase_client().get_platform_analytics()
+
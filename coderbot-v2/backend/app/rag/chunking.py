@@ -0,0 +1,105 @@
+"""
+Divisão de documentos longos (katas) em chunks sobrepostos.
+
+Cada chunk guarda os offsets de caractere no documento original, o que
+permite juntar chunks adjacentes recuperados sem duplicar o trecho de
+sobreposição e sem perder a formatação (código, quebras de linha).
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, List
+
+# Aproximação de tokens: sequências sem espaço (palavras, operadores, trechos de código)
+_TOKEN_PATTERN = re.compile(r"\S+")
+
+
+@dataclass(slots=True)
+class TextChunk:
+    index: int
+    text: str
+    start: int
+    end: int
+    token_count: int
+
+
+def chunk_text(text: str, max_tokens: int = 200, overlap: int = 40) -> List[TextChunk]:
+    """
+    Divide o texto em janelas de até `max_tokens` tokens com `overlap` tokens repetidos.
+
+    Args:
+        text: Documento completo
+        max_tokens: Tamanho máximo de cada chunk (em tokens aproximados)
+        overlap: Quantos tokens do fim de um chunk se repetem no início do próximo
+
+    Returns:
+        Lista de chunks em ordem; `text[start:end]` reproduz cada chunk
+    """
+    if max_tokens <= 0:
+        raise ValueError("max_tokens deve ser positivo")
+    if not 0 <= overlap < max_tokens:
+        raise ValueError("overlap deve estar entre 0 e max_tokens - 1")
+
+    spans = [m.span() for m in _TOKEN_PATTERN.finditer(text or "")]
+    if not spans:
+        return []
+
+    chunks: List[TextChunk] = []
+    step = max_tokens - overlap
+    first = 0
+    while True:
+        last = min(first + max_tokens, len(spans))
+        start, end = spans[first][0], spans[last - 1][1]
+        chunks.append(TextChunk(len(chunks), text[start:end], start, end, last - first))
+        if last == len(spans):
+            break
+        first += step
+    return chunks
+
+
+def merge_adjacent_chunks(chunks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Junta chunks do mesmo documento que são vizinhos ou se sobrepõem.
+
+    Cada chunk precisa de `parent`, `chunk_index`, `start`, `end` e `content`.
+    O grupo resultante mantém o maior `score` dos chunks que o compõem.
+
+    Returns:
+        Lista de grupos com `parent`, `content`, `start`, `end`,
+        `chunk_indexes` e `score`, na ordem de melhor score
+    """
+    by_parent: Dict[str, List[Dict[str, Any]]] = {}
+    for chunk in chunks:
+        by_parent.setdefault(chunk["parent"], []).append(chunk)
+
+    merged: List[Dict[str, Any]] = []
+    for parent, items in by_parent.items():
+        items.sort(key=lambda c: c["chunk_index"])
+        group = None
+        for chunk in items:
+            adjacent = group is not None and (
+                chunk["chunk_index"] == group["chunk_indexes"][-1] + 1
+                or chunk["start"] <= group["end"]
+            )
+            if adjacent:
+                if chunk["end"] > group["end"]:
+                    skip = max(0, group["end"] - chunk["start"])
+                    separator = "" if chunk["start"] <= group["end"] else "\n"
+                    group["content"] += separator + chunk["content"][skip:]
+                    group["end"] = chunk["end"]
+                group["chunk_indexes"].append(chunk["chunk_index"])
+                group["score"] = max(group["score"], chunk.get("score", 0.0))
+                continue
+            group = {
+                "parent": parent,
+                "title": chunk.get("title"),
+                "content": chunk["content"],
+                "start": chunk["start"],
+                "end": chunk["end"],
+                "chunk_indexes": [chunk["chunk_index"]],
+                "score": chunk.get("score", 0.0),
+            }
+            merged.append(group)
+
+    merged.sort(key=lambda g: g["score"], reverse=True)
+    return merged
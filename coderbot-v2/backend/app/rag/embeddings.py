@@ -0,0 +1,186 @@
+"""
+Backends de embedding para o RAG.
+
+Define uma interface única (`EmbeddingBackend`) com duas implementações:
+- `OpenAIEmbeddingBackend`: API remota `/embeddings` (comportamento original)
+- `LocalEmbeddingBackend`: modelo scikit-learn em CPU (hashing de n-gramas
+  de caracteres + TF-IDF + SVD), treinado no corpus de katas e salvo em disco
+
+Ambas codificam em lote: uma chamada `embed(textos)` devolve uma matriz
+(n_textos, dimensão) com linhas normalizadas.
+"""
+
+import logging
+import os
+from typing import List, Optional, Protocol
+
+import httpx
+import numpy as np
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingBackend(Protocol):
+    """Interface para geradores de embeddings usados pelo RAG."""
+
+    name: str
+
+    async def embed(self, texts: List[str]) -> np.ndarray:
+        """Gera embeddings para uma lista de textos (uma linha por texto)."""
+        ...
+
+
+class OpenAIEmbeddingBackend:
+    """Embeddings via API compatível com OpenAI (`POST /embeddings`)."""
+
+    def __init__(
+        self,
+        model: str = "text-embedding-ada-002",
+        base_url: Optional[str] = None,
+        api_key: Optional[str] = None,
+        timeout: float = 30.0,
+    ):
+        self.model = model
+        self.name = model
+        self.http_client = httpx.AsyncClient(
+            base_url=base_url or settings.openai_api_url or "https://api.openai.com/v1",
+            headers={"Authorization": f"Bearer {api_key or settings.open_ai_api_key}"},
+            timeout=timeout,
+        )
+
+    async def embed(self, texts: List[str]) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        resp = await self.http_client.post(
+            "/embeddings",
+            json={"model": self.model, "input": texts},
+        )
+        resp.raise_for_status()
+        data = sorted(resp.json()["data"], key=lambda item: item.get("index", 0))
+        return np.asarray([item["embedding"] for item in data], dtype=np.float32)
+
+    async def aclose(self):
+        await self.http_client.aclose()
+
+
+def _char_hashing_vectorizer(n_features: int):
+    from sklearn.feature_extraction.text import HashingVectorizer
+
+    return HashingVectorizer(
+        analyzer="char_wb",
+        ngram_range=(2, 4),
+        n_features=n_features,
+        alternate_sign=False,
+        norm=None,
+        lowercase=True,
+    )
+
+
+class LocalEmbeddingBackend:
+    """
+    Embeddings locais em CPU com scikit-learn.
+
+    Pipeline: HashingVectorizer (n-gramas de caracteres) -> TF-IDF -> SVD -> L2.
+    Sem modelo treinado, usa um hashing pequeno (`fallback_dim` posições)
+    normalizado: ainda funciona offline, com menos semântica, sem gerar vetores
+    densos com as 2**18 posições do espaço de treino.
+    """
+
+    def __init__(self, model_path: Optional[str] = None, n_features: int = 2 ** 18, fallback_dim: int = 512):
+        self.model_path = model_path
+        self.vectorizer = _char_hashing_vectorizer(n_features)
+        self.fallback_vectorizer = _char_hashing_vectorizer(fallback_dim)
+        self.tfidf = None
+        self.svd = None
+        self.name = f"local-hashing-{fallback_dim}"
+
+        if model_path and os.path.exists(model_path):
+            self.load(model_path)
+
+    @property
+    def is_fitted(self) -> bool:
+        return self.svd is not None
+
+    @property
+    def dimension(self) -> int:
+        return int(self.svd.n_components) if self.svd is not None else int(self.fallback_vectorizer.n_features)
+
+    def fit(self, corpus: List[str], n_components: int = 256) -> "LocalEmbeddingBackend":
+        """Treina TF-IDF + SVD sobre o corpus (ex.: conteúdo de todas as katas)."""
+        from sklearn.decomposition import TruncatedSVD
+        from sklearn.feature_extraction.text import TfidfTransformer
+
+        corpus = [text for text in corpus if text and text.strip()]
+        if len(corpus) < 2:
+            raise ValueError("Corpus muito pequeno para treinar o modelo local de embeddings")
+
+        counts = self.vectorizer.transform(corpus)
+        self.tfidf = TfidfTransformer(sublinear_tf=True).fit(counts)
+        components = max(1, min(n_components, len(corpus) - 1))
+        self.svd = TruncatedSVD(n_components=components, random_state=42).fit(self.tfidf.transform(counts))
+        self.name = f"local-svd-{components}"
+        logger.info(f"Modelo local de embeddings treinado: {len(corpus)} documentos, dim={components}")
+        return self
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """Codificação síncrona e vetorizada (usada também pelo índice de exemplos)."""
+        if not texts:
+            return np.zeros((0, self.dimension), dtype=np.float32)
+        texts = [text or "" for text in texts]
+        if self.is_fitted:
+            dense = self.svd.transform(self.tfidf.transform(self.vectorizer.transform(texts)))
+        else:
+            dense = self.fallback_vectorizer.transform(texts).toarray()
+        dense = np.asarray(dense, dtype=np.float32)
+        norms = np.linalg.norm(dense, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return dense / norms
+
+    async def embed(self, texts: List[str]) -> np.ndarray:
+        return self.encode(texts)
+
+    def save(self, path: Optional[str] = None) -> str:
+        import joblib
+
+        path = path or self.model_path
+        if not path:
+            raise ValueError("Caminho do modelo local de embeddings não informado")
+        if not self.is_fitted:
+            raise ValueError("Modelo local de embeddings ainda não foi treinado")
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        joblib.dump({"tfidf": self.tfidf, "svd": self.svd, "name": self.name}, path)
+        return path
+
+    def load(self, path: str) -> "LocalEmbeddingBackend":
+        import joblib
+
+        state = joblib.load(path)
+        self.tfidf = state["tfidf"]
+        self.svd = state["svd"]
+        self.name = state.get("name", "local-svd")
+        logger.info(f"Modelo local de embeddings carregado de {path} ({self.name})")
+        return self
+
+
+_embedding_backend_instance: Optional[EmbeddingBackend] = None
+
+
+def get_embedding_backend() -> EmbeddingBackend:
+    """
+    Factory (singleton) do backend configurado em `EMBEDDING_BACKEND`.
+
+    Valores: "openai" (padrão) ou "local".
+    """
+    global _embedding_backend_instance
+
+    if _embedding_backend_instance is None:
+        backend = (settings.embedding_backend or "openai").lower()
+        if backend == "local":
+            _embedding_backend_instance = LocalEmbeddingBackend(settings.local_embedding_model_path)
+        else:
+            _embedding_backend_instance = OpenAIEmbeddingBackend()
+        logger.info(f"Backend de embeddings: {_embedding_backend_instance.name}")
+
+    return _embedding_backend_instance
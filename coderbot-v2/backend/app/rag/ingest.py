@@ -1,55 +1,104 @@
-import httpx
+from typing import List
+import numpy as np
 from pocketbase import PocketBase
 from app.config import settings
+from app.rag.chunking import chunk_text
+from app.rag.embeddings import get_embedding_backend
 
-async def ingest_kata_pb(kata: dict):
-    """
-    Ingesta um kata no PocketBase, incluindo o embedding via OpenAI.
-    Espera um dict com:
-      - title: str
-      - content: str
-      - difficulty: str
-      - tests: Optional[list]
-    """
-    # 1) Gera embedding via OpenAI
-    async with httpx.AsyncClient(
-        base_url="https://api.openai.com/v1",
-        headers={"Authorization": f"Bearer {settings.open_ai_api_key}"},
-        timeout=30.0
-    ) as client:
-        resp = await client.post(
-            "/embeddings",
-            json={
-                "model": "text-embedding-ada-002",
-                "input": kata["content"]
-            }
-        )
-        resp.raise_for_status()
-        data = resp.json()
-        vector = data["data"][0]["embedding"]
-
-    # 2) Autentica com usuário comum no PocketBase
+# Tamanho dos chunks indexados em `kata_chunks` (tokens aproximados)
+CHUNK_MAX_TOKENS = 200
+CHUNK_OVERLAP = 40
+
+
+def _get_pb() -> PocketBase:
+    # Autentica com usuário comum no PocketBase
     pb = PocketBase(settings.pocketbase_url)
     pb.collection("users").auth_with_password(
         settings.pocketbase_user_email,
         settings.pocketbase_user_password
     )
+    return pb
 
-    # 3) Monta payload
+
+def _build_payload(kata: dict, vector: List[float], embedding_model: str) -> dict:
     payload = {
         "title": kata["title"],
         "content": kata["content"],
         "difficulty": kata["difficulty"],
         "embedding": vector,
+        "embedding_model": embedding_model,
         "correct_code": kata.get("correct_code", ""),
         "test_code": kata.get("test_code", ""),
-        }
+    }
 
-    
-    
     if "tests" in kata:
         payload["tests"] = kata["tests"]
+    return payload
+
+
+async def _embed_in_batches(backend, texts: List[str], batch_size: int) -> np.ndarray:
+    # Chamadas `embed` limitadas a `batch_size` textos (um lote grande estoura o limite da API)
+    batch_size = max(1, batch_size)
+    batches = [
+        await backend.embed(texts[start:start + batch_size])
+        for start in range(0, len(texts), batch_size)
+    ]
+    return np.vstack(batches)
+
+
+async def ingest_kata_pb(kata: dict):
+    """
+    Ingesta um kata no PocketBase, incluindo o embedding do backend configurado
+    (OpenAI ou modelo local, ver `EMBEDDING_BACKEND`).
+    Espera um dict com:
+      - title: str
+      - content: str
+      - difficulty: str
+      - tests: Optional[list]
+    """
+    records = await ingest_katas_pb([kata])
+    return records[0]
+
+
+async def ingest_katas_pb(katas: List[dict]):
+    """
+    Ingesta vários katas gerando os embeddings em lotes de `EMBEDDING_BATCH_SIZE` textos.
+    Além do registro em `kata_docs`, cada kata é dividido em chunks sobrepostos
+    salvos em `kata_chunks` (um embedding por chunk, com referência ao pai).
+    Retorna os registros criados na mesma ordem de `katas`.
+    """
+    if not katas:
+        return []
+
+    # 1) Divide em chunks e gera embeddings (documentos + chunks) em lote
+    chunks_per_kata = [
+        chunk_text(kata["content"], max_tokens=CHUNK_MAX_TOKENS, overlap=CHUNK_OVERLAP)
+        for kata in katas
+    ]
+    texts = [kata["content"] for kata in katas]
+    texts += [chunk.text for chunks in chunks_per_kata for chunk in chunks]
+
+    backend = get_embedding_backend()
+    vectors = await _embed_in_batches(backend, texts, settings.embedding_batch_size)
+    doc_vectors, chunk_vectors = vectors[:len(katas)], iter(vectors[len(katas):])
 
-    # 4) Cria registro na coleção `kata_docs`
-    record = pb.collection("kata_docs").create(payload)
-    return record
+    # 2) Cria registros em `kata_docs` e `kata_chunks`
+    pb = _get_pb()
+    records = []
+    for kata, vector, chunks in zip(katas, doc_vectors, chunks_per_kata):
+        payload = _build_payload(kata, vector.tolist(), backend.name)
+        record = pb.collection("kata_docs").create(payload)
+        for chunk in chunks:
+            pb.collection("kata_chunks").create({
+                "parent": record.id,
+                "title": kata["title"],
+                "chunk_index": chunk.index,
+                "content": chunk.text,
+                "start": chunk.start,
+                "end": chunk.end,
+                "token_count": chunk.token_count,
+                "embedding": next(chunk_vectors).tolist(),
+                "embedding_model": backend.name,
+            })
+        records.append(record)
+    return records
@@ -10,10 +10,9 @@ Este router expõe endpoints para:
 Seguindo padrão da indústria: router simplificado que delega lógica de negócio para services.
 """
 
-from fastapi import APIRouter, Depends, Query, HTTPException, status
+from fastapi import APIRouter, Depends, Header, Query, HTTPException, status
 import logging
 import time
-import re
 from typing import Optional, Dict, Any, List
 from pydantic import BaseModel, Field
 
@@ -34,45 +33,6 @@ router = APIRouter(
 
 logger = logging.getLogger(__name__)
 
-_GIBBERISH_VOWEL_PATTERN = re.compile(r"[aeiouáéíóúàãõâêôü]", re.IGNORECASE)
-
-
-def _is_gibberish_query(text: str) -> bool:
-    """
-    Heurística leve para identificar texto sem sentido (gibberish).
-    Busca por baixa presença de vogais, tokens repetidos e ausência de palavras significativas.
-    """
-    if not text:
-        return True
-
-    normalized = re.sub(r"[^a-zA-Z0-9áéíóúàãõâêôüç\s]", " ", text.lower())
-    tokens = [token for token in normalized.split() if token]
-
-    if not tokens:
-        return True
-
-    alphabetic_tokens = [t for t in tokens if re.search(r"[a-záéíóúàãõâêôüç]", t)]
-    if not alphabetic_tokens:
-        return True
-
-    vowel_tokens = sum(1 for token in alphabetic_tokens if _GIBBERISH_VOWEL_PATTERN.search(token))
-    repeated_tokens = sum(
-        1
-        for token in alphabetic_tokens
-        if len(token) > 3 and len(set(token)) <= 2
-    )
-
-    vowel_ratio = vowel_tokens / max(len(alphabetic_tokens), 1)
-    repeated_ratio = repeated_tokens / max(len(alphabetic_tokens), 1)
-    unique_ratio = len(set(alphabetic_tokens)) / max(len(alphabetic_tokens), 1)
-
-    return (
-        vowel_ratio < 0.3
-        or repeated_ratio > 0.4
-        or unique_ratio < 0.2
-        or len(alphabetic_tokens) <= 1
-    )
-
 # --- Modelos Pydantic para validação e documentação ---
 
 class UserContext(BaseModel):
@@ -271,7 +231,10 @@ async def ask_question(
         pb_client = get_pocketbase_client()
         examples_rag = get_examples_rag_service(pb_client)
 
-        if _is_gibberish_query(request.user_query):
+        # Uma única passada sobre a query: gibberish, keywords, off-topic e tópicos
+        query_analysis = examples_rag.query_gate.analyze(request.user_query)
+
+        if query_analysis.is_gibberish:
             logger.info("Query rejeitada por gibberish/sem sentido: %s", request.user_query[:50])
             return AgnoResponse(
                 response=(
@@ -290,7 +253,8 @@ async def ask_question(
         # VALIDAÇÃO ANTI-GIBBERISH
         validation = examples_rag.validate_educational_query(
             user_query=request.user_query,
-            mission_context=request.mission_context
+            mission_context=request.mission_context,
+            analysis=query_analysis
         )
         
         if not validation["is_valid"]:
@@ -313,15 +277,10 @@ async def ask_question(
             f"Confidence: {validation.get('confidence', 0.0):.2f}"
         )
 
-        query_lower = request.user_query.lower()
-        programming_keywords = getattr(examples_rag, "programming_keywords", [])
-        has_programming_keyword = any(
-            re.search(rf"\b{re.escape(keyword.lower())}\b", query_lower)
-            for keyword in programming_keywords
+        has_programming_keyword = (
+            query_analysis.has_programming_keyword
+            or validation.get("classifier_on_topic", False)
         )
-        keyword_matches = validation.get("keyword_matches")
-        if keyword_matches is not None:
-            has_programming_keyword = has_programming_keyword or keyword_matches > 0
 
         if not has_programming_keyword:
             logger.info("Query rejeitada por não ser relacionada à programação: %s", request.user_query[:50])
@@ -480,7 +439,8 @@ class ExampleFeedbackRequest(BaseModel):
 @router.post("/examples/{example_id}/feedback")
 async def submit_example_feedback(
     example_id: str,
-    feedback: ExampleFeedbackRequest
+    feedback: ExampleFeedbackRequest,
+    x_user_id: Optional[str] = Header(default=None)
 ):
     """
     Registra feedback de um aluno sobre um exemplo.
@@ -488,6 +448,7 @@ async def submit_example_feedback(
     Args:
         example_id: ID do exemplo no PocketBase
         feedback: Dados do feedback (vote, tipo, comentário)
+        x_user_id: Aluno que vota (header X-User-Id; sem ele, "anonymous")
     
     Returns:
         Dict com informações do feedback atualizado
@@ -496,9 +457,8 @@ async def submit_example_feedback(
         pb_client = get_pocketbase_client()
         examples_rag = get_examples_rag_service(pb_client)
         
-        # Obter user_id do usuário autenticado
         # TODO: Implementar autenticação adequada
-        user_id = pb_client.auth_store.model.id if pb_client.auth_store.is_valid else "anonymous"
+        user_id = x_user_id or "anonymous"
         
         result = await examples_rag.update_feedback_score(
             example_id=example_id,
@@ -513,6 +473,8 @@ async def submit_example_feedback(
             "data": result
         }
         
+    except LookupError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
     except Exception as e:
         logger.error(f"Erro ao processar feedback: {e}")
         raise HTTPException(
@@ -521,6 +483,44 @@ async def submit_example_feedback(
         )
 
 
+@router.get("/examples/{example_id}/feedback")
+async def list_example_feedback(
+    example_id: str,
+    cursor: Optional[str] = Query(None, description="next_cursor da página anterior"),
+    limit: int = Query(20, ge=1, le=100, description="Feedbacks por página")
+):
+    """
+    Lista feedbacks de um exemplo (mais recentes primeiro) com paginação por cursor.
+    
+    Args:
+        example_id: ID do exemplo
+        cursor: Cursor opaco retornado na página anterior
+        limit: Itens por página
+    
+    Returns:
+        Dict com `items` e `next_cursor` (None na última página)
+    """
+    try:
+        pb_client = get_pocketbase_client()
+        examples_rag = get_examples_rag_service(pb_client)
+        
+        page = await examples_rag.list_example_feedback(example_id, cursor=cursor, limit=limit)
+        
+        return {
+            "status": "success",
+            "data": page
+        }
+        
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        logger.error(f"Erro ao listar feedbacks: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Erro ao listar feedbacks: {str(e)}"
+        )
+
+
 @router.get("/examples/{example_id}")
 async def get_example_details(example_id: str):
     """
@@ -530,7 +530,8 @@ async def get_example_details(example_id: str):
         example_id: ID do exemplo
     
     Returns:
-        Dict com dados do exemplo + feedbacks
+        Dict com dados do exemplo + contadores por tipo de feedback +
+        primeira página de feedbacks (demais via `/examples/{id}/feedback`)
     """
     try:
         pb_client = get_pocketbase_client()
@@ -553,23 +554,34 @@ async def get_example_details(example_id: str):
 
 @router.get("/examples")
 async def search_examples(
-    query: str = Query(description="Query de busca"),
+    query: Optional[str] = Query(default=None, description="Query de busca"),
     mission_id: Optional[str] = Query(default=None, description="ID da missão"),
     top_k: int = Query(default=3, description="Número de resultados"),
-    min_quality_score: float = Query(default=0.6, description="Score mínimo de qualidade")
+    min_quality_score: float = Query(default=0.6, description="Score mínimo de qualidade"),
+    language: Optional[str] = Query(default=None, description="Filtra por linguagem")
 ):
     """
-    Busca exemplos relevantes (preparado para RAG futuro).
+    Busca exemplos relevantes (índice híbrido BM25 + vetorial).
+    
+    Sem `query`, devolve o painel da missão: top-k por tópicos da missão,
+    servido do cache materializado em memória.
     
     Args:
-        query: Query de busca
+        query: Query de busca (opcional se houver mission_id)
         mission_id: ID da missão (opcional)
         top_k: Número de resultados
         min_quality_score: Score mínimo
+        language: Linguagem dos exemplos (opcional)
     
     Returns:
         Lista de exemplos relevantes
     """
+    if not query and not mission_id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Informe query ou mission_id"
+        )
+    
     try:
         pb_client = get_pocketbase_client()
         examples_rag = get_examples_rag_service(pb_client)
@@ -578,22 +590,36 @@ async def search_examples(
         mission_context = None
         if mission_id:
             try:
-                mission = await pb_client.collection('class_missions').get_one(mission_id)
-                mission_context = {
-                    "id": mission.id,
-                    "title": mission.title,
-                    "topics": mission.topics if hasattr(mission, 'topics') else [],
-                    "difficulty": mission.difficulty if hasattr(mission, 'difficulty') else None
-                }
+                mission = await pb_client._get_record(
+                    'class_missions', mission_id, fields='id,title,topics,metadata,difficulty'
+                )
+                if mission is None:
+                    logger.warning(f"Missão não encontrada: {mission_id}")
+                else:
+                    mission_context = {
+                        "id": mission["id"],
+                        "title": mission.get("title"),
+                        "topics": ExamplesRAGService.mission_topics(mission),
+                        "difficulty": mission.get("difficulty")
+                    }
             except Exception as e:
                 logger.warning(f"Missão não encontrada: {mission_id} | {e}")
         
-        examples = await examples_rag.search_relevant_examples(
-            user_query=query,
-            mission_context=mission_context,
-            top_k=top_k,
-            min_quality_score=min_quality_score
-        )
+        if query:
+            examples = await examples_rag.search_relevant_examples(
+                user_query=query,
+                mission_context=mission_context,
+                top_k=top_k,
+                min_quality_score=min_quality_score,
+                language=language
+            )
+        else:
+            examples = await examples_rag.get_top_examples(
+                (mission_context or {}).get("topics") or [],
+                min_quality_score=min_quality_score,
+                language=language,
+                top_k=top_k
+            )
         
         return {
             "status": "success",
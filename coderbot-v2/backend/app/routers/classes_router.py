@@ -1,6 +1,8 @@
+import json
 from fastapi import APIRouter, HTTPException, status, Header
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
-from typing import Optional, Dict, Any, List
+from typing import AsyncIterator, Optional, Dict, Any, List
 from app.services.pocketbase_service import pb_service
 
 router = APIRouter(
@@ -9,6 +11,20 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
+# Field projections: only what the frontend renders is read from PocketBase
+CLASS_FIELDS = "id,title,name,description,code,archived,teacher,createdBy,created,updated"
+TEACHING_CLASS_FIELDS = "title,name,description,code,archived,created"
+MY_CLASS_FIELDS = (
+    "id,class,role,created,"
+    "expand.class.id,expand.class.title,expand.class.name,expand.class.description,expand.class.code,expand.class.archived"
+)
+MEMBER_FIELDS = (
+    "id,class,user,role,created,"
+    "expand.user.id,expand.user.collectionId,expand.user.collectionName,"
+    "expand.user.name,expand.user.username,expand.user.email,expand.user.avatar"
+)
+EVENT_FIELDS = "id,class,type,title,description,starts_at,ends_at,visibility,is_online,meeting_url,created"
+
 # --------- Models ---------
 
 class CreateClassRequest(BaseModel):
@@ -21,6 +37,10 @@ class UpdateClassRequest(BaseModel):
     description: Optional[str] = None
     archived: Optional[bool] = None
 
+class AddMembersRequest(BaseModel):
+    user_ids: List[str] = Field(min_length=1)
+    role: str = "student"
+
 class InviteCreateRequest(BaseModel):
     class_id: str
     email: Optional[str] = None
@@ -63,12 +83,23 @@ def ensure_teacher_or_admin(user_id: Optional[str], role: Optional[str]):
     if role not in ("teacher", "admin"):
         raise HTTPException(status.HTTP_403_FORBIDDEN, detail="Only teacher/admin allowed")
 
+def stream_items(items: AsyncIterator[Dict[str, Any]]) -> StreamingResponse:
+    """Streams {"items": [...]} page by page instead of materializing large rosters."""
+    async def body() -> AsyncIterator[bytes]:
+        yield b'{"items":['
+        first = True
+        async for item in items:
+            yield (b"" if first else b",") + json.dumps(item, default=str).encode()
+            first = False
+        yield b"]}"
+    return StreamingResponse(body(), media_type="application/json")
+
 # --------- Routes ---------
 
 @router.post("/", status_code=201)
 async def create_class(req: CreateClassRequest, x_user_id: Optional[str] = Header(default=None), x_user_role: Optional[str] = Header(default=None)):
     ensure_teacher_or_admin(x_user_id, x_user_role)
-    created = pb_service.create_class(teacher_user_id=x_user_id, title=req.title, description=req.description, code=req.code)
+    created = await pb_service.create_class(teacher_user_id=x_user_id, title=req.title, description=req.description, code=req.code)
     if not created:
         raise HTTPException(status.HTTP_400_BAD_REQUEST, detail="Could not create class")
     return created
@@ -76,9 +107,9 @@ async def create_class(req: CreateClassRequest, x_user_id: Optional[str] = Heade
 @router.put("/{class_id}")
 async def update_class(class_id: str, req: UpdateClassRequest, x_user_id: Optional[str] = Header(default=None), x_user_role: Optional[str] = Header(default=None)):
     ensure_teacher_or_admin(x_user_id, x_user_role)
-    if not pb_service.is_user_class_teacher(class_id, x_user_id) and x_user_role != "admin":
+    if not await pb_service.is_user_class_teacher(class_id, x_user_id) and x_user_role != "admin":
         raise HTTPException(status.HTTP_403_FORBIDDEN, detail="Only class teacher/admin can update class")
-    ok = pb_service.update_class(class_id, {k: v for k, v in req.dict().items() if v is not None})
+    ok = await pb_service.update_class(class_id, {k: v for k, v in req.dict().items() if v is not None})
     if not ok:
         raise HTTPException(status.HTTP_400_BAD_REQUEST, detail="Could not update class")
     return {"ok": True}
@@ -86,9 +117,9 @@ async def update_class(class_id: str, req: UpdateClassRequest, x_user_id: Option
 @router.delete("/{class_id}", status_code=204)
 async def delete_class(class_id: str, x_user_id: Optional[str] = Header(default=None), x_user_role: Optional[str] = Header(default=None)):
     ensure_teacher_or_admin(x_user_id, x_user_role)
-    if not pb_service.is_user_class_teacher(class_id, x_user_id) and x_user_role != "admin":
+    if not await pb_service.is_user_class_teacher(class_id, x_user_id) and x_user_role != "admin":
         raise HTTPException(status.HTTP_403_FORBIDDEN, detail="Only class teacher/admin can delete class")
-    ok = pb_service.delete_class(class_id)
+    ok = await pb_service.delete_class(class_id)
     if not ok:
         raise HTTPException(status.HTTP_400_BAD_REQUEST, detail="Could not delete class")
     return {"ok": True}
@@ -96,38 +127,44 @@ async def delete_class(class_id: str, x_user_id: Optional[str] = Header(default=
 @router.get("/teaching")
 async def list_my_teaching_classes(x_user_id: Optional[str] = Header(default=None), x_user_role: Optional[str] = Header(default=None)):
     ensure_teacher_or_admin(x_user_id, x_user_role)
-    items = pb_service.list_classes_for_teacher(x_user_id)
+    items = await pb_service.list_classes_for_teacher(x_user_id, fields=TEACHING_CLASS_FIELDS)
     return {"items": items}
 
 @router.get("/mine")
 async def list_my_classes(x_user_id: Optional[str] = Header(default=None)):
     if not x_user_id:
         raise HTTPException(status.HTTP_401_UNAUTHORIZED, detail="Missing X-User-Id header")
-    memberships = pb_service.list_classes_for_user(x_user_id)
+    memberships = await pb_service.list_classes_for_user(x_user_id, fields=MY_CLASS_FIELDS)
     return {"items": memberships}
 
+@router.get("/membership-cache/stats")
+async def membership_cache_stats(x_user_role: Optional[str] = Header(default=None)):
+    if x_user_role != "admin":
+        raise HTTPException(status.HTTP_403_FORBIDDEN, detail="Only admin allowed")
+    return pb_service.membership_cache.stats()
+
 @router.get("/{class_id}")
 async def get_class_details(class_id: str, x_user_id: Optional[str] = Header(default=None), x_user_role: Optional[str] = Header(default=None)):
-    c = pb_service.get_class(class_id)
+    c = await pb_service.get_class(class_id, fields=CLASS_FIELDS)
     if not c:
         raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Class not found")
-    if not (x_user_role == "admin" or pb_service.is_user_class_teacher(class_id, x_user_id) or pb_service.is_user_class_member(class_id, x_user_id)):
+    if not (x_user_role == "admin" or await pb_service.is_user_class_teacher(class_id, x_user_id) or await pb_service.is_user_class_member(class_id, x_user_id)):
         raise HTTPException(status.HTTP_403_FORBIDDEN, detail="Forbidden")
     return c
 
 # Members
 @router.get("/{class_id}/members")
 async def list_members(class_id: str, x_user_id: Optional[str] = Header(default=None), x_user_role: Optional[str] = Header(default=None)):
-    if not (x_user_role == "admin" or pb_service.is_user_class_teacher(class_id, x_user_id) or pb_service.is_user_class_member(class_id, x_user_id)):
+    if not (x_user_role == "admin" or await pb_service.is_user_class_teacher(class_id, x_user_id) or await pb_service.is_user_class_member(class_id, x_user_id)):
         raise HTTPException(status.HTTP_403_FORBIDDEN, detail="Forbidden")
-    return {"items": pb_service.list_members(class_id)}
+    return stream_items(pb_service.iter_members(class_id, fields=MEMBER_FIELDS))
 
 @router.post("/{class_id}/members", status_code=201)
 async def add_member(class_id: str, user_id: str, role: str = "student", x_user_id: Optional[str] = Header(default=None), x_user_role: Optional[str] = Header(default=None)):
     ensure_teacher_or_admin(x_user_id, x_user_role)
-    if not pb_service.is_user_class_teacher(class_id, x_user_id) and x_user_role != "admin":
+    if not await pb_service.is_user_class_teacher(class_id, x_user_id) and x_user_role != "admin":
         raise HTTPException(status.HTTP_403_FORBIDDEN, detail="Only class teacher/admin can add members")
-    ok = pb_service.add_member(class_id, user_id, role)
+    ok = await pb_service.add_member(class_id, user_id, role)
     if not ok:
         raise HTTPException(status.HTTP_400_BAD_REQUEST, detail="Could not add member")
     return {"ok": True}
@@ -135,20 +172,28 @@ async def add_member(class_id: str, user_id: str, role: str = "student", x_user_
 @router.delete("/{class_id}/members/{member_user_id}", status_code=204)
 async def remove_member(class_id: str, member_user_id: str, x_user_id: Optional[str] = Header(default=None), x_user_role: Optional[str] = Header(default=None)):
     ensure_teacher_or_admin(x_user_id, x_user_role)
-    if not pb_service.is_user_class_teacher(class_id, x_user_id) and x_user_role != "admin":
+    if not await pb_service.is_user_class_teacher(class_id, x_user_id) and x_user_role != "admin":
         raise HTTPException(status.HTTP_403_FORBIDDEN, detail="Only class teacher/admin can remove members")
-    ok = pb_service.remove_member(class_id, member_user_id)
+    ok = await pb_service.remove_member(class_id, member_user_id)
     if not ok:
         raise HTTPException(status.HTTP_400_BAD_REQUEST, detail="Could not remove member")
     return {"ok": True}
 
+@router.post("/{class_id}/members/bulk", status_code=201)
+async def add_members(class_id: str, req: AddMembersRequest, x_user_id: Optional[str] = Header(default=None), x_user_role: Optional[str] = Header(default=None)):
+    ensure_teacher_or_admin(x_user_id, x_user_role)
+    if not await pb_service.is_user_class_teacher(class_id, x_user_id) and x_user_role != "admin":
+        raise HTTPException(status.HTTP_403_FORBIDDEN, detail="Only class teacher/admin can add members")
+    added = await pb_service.add_members(class_id, req.user_ids, req.role)
+    return {"added": [u for u, ok in added.items() if ok], "failed": [u for u, ok in added.items() if not ok]}
+
 # Invites
 @router.post("/invites", status_code=201)
 async def create_invite(req: InviteCreateRequest, x_user_id: Optional[str] = Header(default=None), x_user_role: Optional[str] = Header(default=None)):
     ensure_teacher_or_admin(x_user_id, x_user_role)
-    if not pb_service.is_user_class_teacher(req.class_id, x_user_id) and x_user_role != "admin":
+    if not await pb_service.is_user_class_teacher(req.class_id, x_user_id) and x_user_role != "admin":
         raise HTTPException(status.HTTP_403_FORBIDDEN, detail="Only class teacher/admin can invite")
-    inv = pb_service.create_invite(req.class_id, invited_by=x_user_id, email=req.email, user_id=req.user_id, ttl_hours=req.ttl_hours)
+    inv = await pb_service.create_invite(req.class_id, invited_by=x_user_id, email=req.email, user_id=req.user_id, ttl_hours=req.ttl_hours)
     if not inv:
         raise HTTPException(status.HTTP_400_BAD_REQUEST, detail="Could not create invite")
     return inv
@@ -157,7 +202,7 @@ async def create_invite(req: InviteCreateRequest, x_user_id: Optional[str] = Hea
 async def accept_invite(req: InviteAcceptRequest, x_user_id: Optional[str] = Header(default=None)):
     if not x_user_id:
         raise HTTPException(status.HTTP_401_UNAUTHORIZED, detail="Missing X-User-Id header")
-    ok = pb_service.accept_invite(req.token, x_user_id)
+    ok = await pb_service.accept_invite(req.token, x_user_id)
     if not ok:
         raise HTTPException(status.HTTP_400_BAD_REQUEST, detail="Invalid or expired token")
     return {"ok": True}
@@ -165,16 +210,16 @@ async def accept_invite(req: InviteAcceptRequest, x_user_id: Optional[str] = Hea
 # Events
 @router.get("/{class_id}/events")
 async def list_events(class_id: str, since: Optional[str] = None, until: Optional[str] = None, x_user_id: Optional[str] = Header(default=None), x_user_role: Optional[str] = Header(default=None)):
-    if not (x_user_role == "admin" or pb_service.is_user_class_teacher(class_id, x_user_id) or pb_service.is_user_class_member(class_id, x_user_id)):
+    if not (x_user_role == "admin" or await pb_service.is_user_class_teacher(class_id, x_user_id) or await pb_service.is_user_class_member(class_id, x_user_id)):
         raise HTTPException(status.HTTP_403_FORBIDDEN, detail="Forbidden")
-    return {"items": pb_service.list_events(class_id, since, until)}
+    return stream_items(pb_service.iter_events(class_id, since, until, fields=EVENT_FIELDS))
 
 @router.post("/{class_id}/events", status_code=201)
 async def create_event(class_id: str, req: EventCreateRequest, x_user_id: Optional[str] = Header(default=None), x_user_role: Optional[str] = Header(default=None)):
     ensure_teacher_or_admin(x_user_id, x_user_role)
-    if not pb_service.is_user_class_teacher(class_id, x_user_id) and x_user_role != "admin":
+    if not await pb_service.is_user_class_teacher(class_id, x_user_id) and x_user_role != "admin":
         raise HTTPException(status.HTTP_403_FORBIDDEN, detail="Only class teacher/admin can create events")
-    ev = pb_service.create_event(
+    ev = await pb_service.create_event(
         class_id,
         req.type,
         req.title,
@@ -192,9 +237,9 @@ async def create_event(class_id: str, req: EventCreateRequest, x_user_id: Option
 @router.put("/{class_id}/events/{event_id}")
 async def update_event(class_id: str, event_id: str, req: EventUpdateRequest, x_user_id: Optional[str] = Header(default=None), x_user_role: Optional[str] = Header(default=None)):
     ensure_teacher_or_admin(x_user_id, x_user_role)
-    if not pb_service.is_user_class_teacher(class_id, x_user_id) and x_user_role != "admin":
+    if not await pb_service.is_user_class_teacher(class_id, x_user_id) and x_user_role != "admin":
         raise HTTPException(status.HTTP_403_FORBIDDEN, detail="Only class teacher/admin can update events")
-    ok = pb_service.update_event(event_id, {k: v for k, v in req.dict().items() if v is not None})
+    ok = await pb_service.update_event(event_id, {k: v for k, v in req.dict().items() if v is not None})
     if not ok:
         raise HTTPException(status.HTTP_400_BAD_REQUEST, detail="Could not update event")
     return {"ok": True}
@@ -202,9 +247,9 @@ async def update_event(class_id: str, event_id: str, req: EventUpdateRequest, x_
 @router.delete("/{class_id}/events/{event_id}", status_code=204)
 async def delete_event(class_id: str, event_id: str, x_user_id: Optional[str] = Header(default=None), x_user_role: Optional[str] = Header(default=None)):
     ensure_teacher_or_admin(x_user_id, x_user_role)
-    if not pb_service.is_user_class_teacher(class_id, x_user_id) and x_user_role != "admin":
+    if not await pb_service.is_user_class_teacher(class_id, x_user_id) and x_user_role != "admin":
         raise HTTPException(status.HTTP_403_FORBIDDEN, detail="Only class teacher/admin can delete events")
-    ok = pb_service.delete_event(event_id)
+    ok = await pb_service.delete_event(event_id)
     if not ok:
         raise HTTPException(status.HTTP_400_BAD_REQUEST, detail="Could not delete event")
     return {"ok": True}
@@ -213,9 +258,9 @@ async def delete_event(class_id: str, event_id: str, x_user_id: Optional[str] =
 @router.post("/{class_id}/api-keys", status_code=201)
 async def set_class_api_key(class_id: str, req: ClassApiKeySetRequest, x_user_id: Optional[str] = Header(default=None), x_user_role: Optional[str] = Header(default=None)):
     ensure_teacher_or_admin(x_user_id, x_user_role)
-    if not pb_service.is_user_class_teacher(class_id, x_user_id) and x_user_role != "admin":
+    if not await pb_service.is_user_class_teacher(class_id, x_user_id) and x_user_role != "admin":
         raise HTTPException(status.HTTP_403_FORBIDDEN, detail="Only class teacher/admin can set API keys")
-    ok = pb_service.set_class_api_key(class_id, req.provider, req.api_key, created_by=x_user_id, active=req.active)
+    ok = await pb_service.set_class_api_key(class_id, req.provider, req.api_key, created_by=x_user_id, active=req.active)
     if not ok:
         raise HTTPException(status.HTTP_400_BAD_REQUEST, detail="Could not set API key")
     return {"ok": True}
@@ -223,9 +268,9 @@ async def set_class_api_key(class_id: str, req: ClassApiKeySetRequest, x_user_id
 @router.get("/{class_id}/api-keys/{provider}")
 async def has_class_api_key(class_id: str, provider: str, x_user_id: Optional[str] = Header(default=None), x_user_role: Optional[str] = Header(default=None)):
     # Only teacher/admin can see masked presence
-    if not (x_user_role in ("teacher", "admin") and (pb_service.is_user_class_teacher(class_id, x_user_id) or x_user_role == "admin")):
+    if not (x_user_role in ("teacher", "admin") and (await pb_service.is_user_class_teacher(class_id, x_user_id) or x_user_role == "admin")):
         raise HTTPException(status.HTTP_403_FORBIDDEN, detail="Forbidden")
-    key = pb_service.get_class_api_key(class_id, provider)
+    key = await pb_service.get_class_api_key(class_id, provider)
     if not key:
         return {"hasKey": False}
     masked = f"****{key[-4:]}" if len(key) >= 4 else "****"
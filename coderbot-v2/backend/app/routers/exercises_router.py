@@ -2,7 +2,7 @@ import os
 import json
 from fastapi import APIRouter, HTTPException, status, Depends
 from app.config import settings
-from app.rag.ingest import ingest_kata_pb
+from app.rag.ingest import ingest_katas_pb
 from pocketbase import PocketBase
 
 router = APIRouter(prefix="/admin/katas", tags=["Katas"])
@@ -20,24 +20,24 @@ async def get_pb():
 async def import_all_katas(pb=Depends(get_pb)):
     """
     Lê todos os JSONs em project/katas e injeta no PocketBase usando
-    sua função ingest_kata_pb.
+    ingest_katas_pb (embeddings gerados em uma única chamada em lote).
     """
     KATAS_DIR = "../project/katas"
 
     if not os.path.isdir(KATAS_DIR):
         raise HTTPException(status_code=404, detail="Diretório de katas não existe.")
     
-    imported = []
+    katas = []
     for fname in os.listdir(KATAS_DIR):
         if not fname.endswith(".json"):
             continue
 
         path = os.path.join(KATAS_DIR, fname)
         with open(path, encoding="utf-8") as f:
-            kata = json.load(f)
+            katas.append(json.load(f))
 
-        # injeta no PB
-        rec = await ingest_kata_pb(kata)
-        imported.append({"title": kata["title"], "id": rec.id})
+    # injeta no PB
+    records = await ingest_katas_pb(katas)
+    imported = [{"title": kata["title"], "id": rec.id} for kata, rec in zip(katas, records)]
     
     return {"imported": imported}
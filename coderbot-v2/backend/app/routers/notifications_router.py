@@ -1,6 +1,11 @@
-from fastapi import APIRouter, HTTPException, status, Header
+import asyncio
+import json
+from fastapi import APIRouter, HTTPException, status, Header, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
-from typing import Optional, Dict, Any, List
+from typing import AsyncIterator, Optional, Dict, Any, List
+from app.config import settings
+from app.services.notification_hub import get_notification_hub
 from app.services.pocketbase_service import pb_service
 
 router = APIRouter(
@@ -9,6 +14,10 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
+# Field projections (NOTIFICATION_FIELDS mirrors NotificationResponse)
+NOTIFICATION_FIELDS = "id,recipient,sender,title,content,type,read,metadata,created,updated"
+NOTIFICATION_ACCESS_FIELDS = "id,recipient,read"
+
 # --------- Models ---------
 
 class CreateNotificationRequest(BaseModel):
@@ -19,6 +28,14 @@ class CreateNotificationRequest(BaseModel):
     type: str = Field(pattern="^(mention|forum_reply|class_invite|system|achievement)$")
     metadata: Optional[Dict[str, Any]] = None
 
+class ClassBroadcastRequest(BaseModel):
+    class_ids: List[str] = Field(min_length=1)
+    title: str
+    content: str
+    type: str = Field(default="system", pattern="^(mention|forum_reply|class_invite|system|achievement)$")
+    metadata: Optional[Dict[str, Any]] = None
+    include_teachers: bool = False
+
 class UpdateNotificationRequest(BaseModel):
     read: Optional[bool] = None
 
@@ -46,6 +63,9 @@ def ensure_admin_or_self(x_user_id: Optional[str], recipient_id: str, x_user_rol
     if x_user_role != "admin" and x_user_id != recipient_id:
         raise HTTPException(status.HTTP_403_FORBIDDEN, detail="Can only access own notifications")
 
+def sse_event(event: str, data: Dict[str, Any]) -> bytes:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n".encode()
+
 # --------- Routes ---------
 
 @router.get("/", response_model=List[NotificationResponse])
@@ -58,11 +78,12 @@ async def list_notifications(
     ensure_authenticated(x_user_id)
 
     try:
-        notifications = pb_service.list_notifications_for_user(
+        notifications = await pb_service.list_notifications_for_user(
             user_id=x_user_id,
             limit=limit,
             offset=offset,
-            unread_only=unread_only
+            unread_only=unread_only,
+            fields=NOTIFICATION_FIELDS
         )
         return notifications
     except Exception as e:
@@ -73,11 +94,45 @@ async def get_unread_count(x_user_id: Optional[str] = Header(default=None)):
     ensure_authenticated(x_user_id)
 
     try:
-        count = pb_service.get_unread_notifications_count(user_id=x_user_id)
+        count = await pb_service.get_unread_notifications_count(user_id=x_user_id)
         return {"count": count}
     except Exception as e:
         raise HTTPException(status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
+@router.get("/stream")
+async def stream_notifications(
+    request: Request,
+    user_id: Optional[str] = None,
+    x_user_id: Optional[str] = Header(default=None)
+):
+    """
+    Server-Sent Events with the user's notification deltas (replaces unread-count polling).
+
+    EventSource cannot send custom headers, so the user may also come as `?user_id=`.
+    The first event ("ready") carries the current unread count.
+    """
+    user = x_user_id or user_id
+    ensure_authenticated(user)
+    # Subscribe before reading the count so nothing published in between is lost
+    subscription = get_notification_hub().subscribe(user)
+
+    async def events() -> AsyncIterator[bytes]:
+        async with subscription:
+            count = await pb_service.get_unread_notifications_count(user_id=user)
+            yield sse_event("ready", {"unread_count": count})
+            while not await request.is_disconnected():
+                event = await subscription.get(timeout=settings.notifications_sse_heartbeat_seconds)
+                if event is None:
+                    yield b": ping\n\n"
+                else:
+                    yield sse_event(event["type"], event)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 @router.get("/{notification_id}", response_model=NotificationResponse)
 async def get_notification(
     notification_id: str,
@@ -87,7 +142,7 @@ async def get_notification(
     ensure_authenticated(x_user_id)
 
     try:
-        notification = pb_service.get_notification(notification_id)
+        notification = await pb_service.get_notification(notification_id, fields=NOTIFICATION_FIELDS)
         if not notification:
             raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Notification not found")
 
@@ -112,7 +167,7 @@ async def create_notification(
         raise HTTPException(status.HTTP_403_FORBIDDEN, detail="Can only create notifications as yourself")
 
     try:
-        notification = pb_service.create_notification(
+        notification = await pb_service.create_notification(
             recipient_id=req.recipient_id,
             sender_id=req.sender_id,
             title=req.title,
@@ -124,6 +179,44 @@ async def create_notification(
     except Exception as e:
         raise HTTPException(status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
+@router.post("/broadcast", status_code=201)
+async def broadcast_to_classes(
+    req: ClassBroadcastRequest,
+    x_user_id: Optional[str] = Header(default=None),
+    x_user_role: Optional[str] = Header(default=None)
+):
+    ensure_authenticated(x_user_id)
+    if x_user_role not in ("teacher", "admin"):
+        raise HTTPException(status.HTTP_403_FORBIDDEN, detail="Only teacher/admin allowed")
+
+    class_ids = list(dict.fromkeys(req.class_ids))
+    if x_user_role != "admin":
+        allowed = await asyncio.gather(*(pb_service.is_user_class_teacher(cid, x_user_id) for cid in class_ids))
+        denied = [cid for cid, ok in zip(class_ids, allowed) if not ok]
+        if denied:
+            raise HTTPException(status.HTTP_403_FORBIDDEN, detail=f"Not a teacher of: {', '.join(denied)}")
+
+    try:
+        summaries = await asyncio.gather(*(
+            pb_service.broadcast_class_notification(
+                class_id=cid,
+                sender_id=x_user_id,
+                title=req.title,
+                content=req.content,
+                type=req.type,
+                metadata=req.metadata,
+                include_teachers=req.include_teachers
+            )
+            for cid in class_ids
+        ))
+        return {
+            "classes": summaries,
+            "total_created": sum(s["created"] for s in summaries),
+            "total_failed": sum(s["failed"] for s in summaries)
+        }
+    except Exception as e:
+        raise HTTPException(status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
 @router.patch("/{notification_id}", response_model=NotificationResponse)
 async def update_notification(
     notification_id: str,
@@ -134,15 +227,16 @@ async def update_notification(
     ensure_authenticated(x_user_id)
 
     try:
-        notification = pb_service.get_notification(notification_id)
+        notification = await pb_service.get_notification(notification_id, fields=NOTIFICATION_FIELDS)
         if not notification:
             raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Notification not found")
 
         ensure_admin_or_self(x_user_id, notification.get("recipient"), x_user_role)
 
-        updated_notification = pb_service.update_notification(
+        updated_notification = await pb_service.update_notification(
             notification_id=notification_id,
-            read=req.read
+            read=req.read,
+            previous=notification
         )
         return updated_notification
     except HTTPException:
@@ -159,13 +253,13 @@ async def mark_as_read(
     ensure_authenticated(x_user_id)
 
     try:
-        notification = pb_service.get_notification(notification_id)
+        notification = await pb_service.get_notification(notification_id, fields=NOTIFICATION_ACCESS_FIELDS)
         if not notification:
             raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Notification not found")
 
         ensure_admin_or_self(x_user_id, notification.get("recipient"), x_user_role)
 
-        updated_notification = pb_service.mark_notification_as_read(notification_id)
+        updated_notification = await pb_service.mark_notification_as_read(notification_id, previous=notification)
         return updated_notification
     except HTTPException:
         raise
@@ -181,13 +275,17 @@ async def delete_notification(
     ensure_authenticated(x_user_id)
 
     try:
-        notification = pb_service.get_notification(notification_id)
+        notification = await pb_service.get_notification(notification_id, fields=NOTIFICATION_ACCESS_FIELDS)
         if not notification:
             raise HTTPException(status.HTTP_404_NOT_FOUND, detail="Notification not found")
 
         ensure_admin_or_self(x_user_id, notification.get("recipient"), x_user_role)
 
-        pb_service.delete_notification(notification_id)
+        await pb_service.delete_notification(
+            notification_id,
+            recipient_id=notification.get("recipient"),
+            was_read=bool(notification.get("read"))
+        )
         return {"ok": True}
     except HTTPException:
         raise
@@ -199,7 +297,7 @@ async def mark_all_as_read(x_user_id: Optional[str] = Header(default=None)):
     ensure_authenticated(x_user_id)
 
     try:
-        count = pb_service.mark_all_notifications_as_read(user_id=x_user_id)
+        count = await pb_service.mark_all_notifications_as_read(user_id=x_user_id)
         return {"marked_count": count}
     except Exception as e:
         raise HTTPException(status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
@@ -1,9 +1,12 @@
 from fastapi import APIRouter, HTTPException, status
-from pydantic import BaseModel
-import httpx
-import os
+from pydantic import BaseModel, Field
+from typing import List, Optional, Tuple
+import asyncio
 import logging
-from packaging.version import Version as SemVer
+import time
+from app.config import settings
+from app.services.execution_cache import get_execution_cache, make_key
+from app.services.code_executor import ExecutorError, get_code_executor
 
 router = APIRouter(prefix="/piston", tags=["Execução de Código"])
 logger = logging.getLogger(__name__)
@@ -29,153 +32,193 @@ LANGUAGE_TO_PISTON = {
     "kotlin": "kotlin",
 }
 
-PISTON_URL = os.getenv("PISTON_URL", "https://emkc.org/api/v2/piston")
-
 class ExecRequest(BaseModel):
     language: str  # "javascript", "python", ...
     code: str
     stdin: str | None = ""
+    use_cache: bool = True  # False força uma nova execução
+
+class TestCase(BaseModel):
+    stdin: str | None = ""
+    expected_output: str | None = None  # None: só exige término normal
+    name: str | None = None
 
-async def execute_with_piston(language_name: str, source_code: str, stdin: str) -> dict:
-    """Execute code using Piston API"""
+class BatchExecRequest(BaseModel):
+    language: str
+    code: str
+    cases: List[TestCase] = Field(min_length=1)
+    use_cache: bool = True
+
+# Linguagens com etapa de compilação no Piston: o primeiro caso sonda a compilação
+COMPILED_LANGUAGES = {"typescript", "java", "c", "cpp", "c#", "go", "rust", "kotlin"}
+
+def resolve_piston_language(language_name: str) -> str:
     piston_lang = LANGUAGE_TO_PISTON.get(language_name)
     if not piston_lang:
         raise HTTPException(
             status.HTTP_400_BAD_REQUEST,
             detail=f"Linguagem não suportada: {language_name}"
         )
+    return piston_lang
 
-    runtimes_url = f"{PISTON_URL}/runtimes"
-    execute_url = f"{PISTON_URL}/execute"
-
-    async with httpx.AsyncClient(timeout=30) as client:
-        # Fetch runtimes to determine a valid version
-        try:
-            rts = await client.get(runtimes_url)
-            rts.raise_for_status()
-            runtimes = rts.json() or []
-            logger.info(f"Piston runtimes status={rts.status_code} count={len(runtimes)}")
-        except Exception as e:
-            logger.warning(f"Piston runtimes check failed: {e}")
-            runtimes = []
-
-        # Pick latest version for the language
-        version: str | None = None
-        if isinstance(runtimes, list):
-            matching = [rt for rt in runtimes if (rt.get("language") == piston_lang and isinstance(rt.get("version"), str))]
-            if matching:
-                try:
-                    latest = max(matching, key=lambda x: SemVer(x.get("version")))
-                    version = latest.get("version")
-                except Exception:
-                    version = matching[0].get("version")
-        
-        if not version:
-            # Default versions as fallback
-            defaults = {
-                "python": "3.10.0",
-                "javascript": "18.15.0",
-                "typescript": "5.0.3",
-                "java": "15.0.2",
-                "c": "10.2.0",
-                "cpp": "10.2.0",
-                "c#": "6.12.0",
-                "go": "1.16.2",
-                "ruby": "3.0.1",
-                "rust": "1.68.2",
-                "php": "8.2.3",
-                "kotlin": "1.8.20",
-            }
-            version = defaults.get(piston_lang)
-        
-        if not version:
-            raise HTTPException(
-                status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Nenhuma versão encontrada para {piston_lang}"
-            )
-
-        # Determine file extension
-        extensions = {
-            "python": "py",
-            "javascript": "js",
-            "typescript": "ts",
-            "java": "java",
-            "c": "c",
-            "cpp": "cpp",
-            "c#": "cs",
-            "go": "go",
-            "ruby": "rb",
-            "rust": "rs",
-            "php": "php",
-            "kotlin": "kt",
-        }
-        ext = extensions.get(piston_lang, "txt")
-
-        payload = {
-            "language": piston_lang,
-            "version": str(version),
-            "stdin": stdin or "",
-            "files": [
-                {"name": f"main.{ext}", "content": source_code}
-            ]
+async def run_on_executor(piston_lang: str, source_code: str, stdin: str, use_cache: bool = True) -> Tuple[dict, bool]:
+    """
+    Piston-shaped response for one run on the configured backend (CODE_EXECUTOR:
+    remote Piston, or local subprocesses for Python/JavaScript).
+
+    Returns:
+        (response, served_from_cache)
+    """
+    executor = get_code_executor(piston_lang)
+    version = await executor.resolve_version(piston_lang)
+    if not version:
+        raise HTTPException(
+            status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Nenhuma versão encontrada para {piston_lang}"
+        )
+
+    cache = get_execution_cache() if use_cache else None
+    key = make_key(piston_lang, version, source_code, stdin)
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached, True
+
+    logger.info(f"Executing code with {executor.name}: lang={piston_lang} version={version}")
+
+    try:
+        data = await executor.execute(piston_lang, version, source_code, stdin)
+    except ExecutorError as e:
+        logger.error(f"{executor.name} execution error: {e}")
+        raise HTTPException(
+            status.HTTP_502_BAD_GATEWAY,
+            detail=f"Erro do executor ({executor.name}): {e}"
+        )
+    if cache is not None:
+        cache.put(key, data)
+    return data, False
+
+def piston_result(data: dict) -> dict:
+    """Maps a Piston-shaped response onto the judge-style result returned by /executar"""
+    run = data.get("run") or {}
+
+    stdout = run.get("stdout") or ""
+    stderr = run.get("stderr") or ""
+    code = run.get("code")
+    signal = run.get("signal")
+
+    # Determine status
+    if code == 0:
+        status_desc = "Accepted"
+        status_id = 3
+    elif signal:
+        status_desc = f"Runtime Error (Signal {signal})"
+        status_id = 11
+    elif code:
+        status_desc = f"Runtime Error (Exit {code})"
+        status_id = 11
+    else:
+        status_desc = "Finished"
+        status_id = 0
+
+    return {
+        "stdout": stdout,
+        "stderr": stderr,
+        "compile_output": (data.get("compile") or {}).get("output"),
+        "time": run.get("runtime") if run.get("runtime") is not None else run.get("wall_time"),
+        "memory": run.get("memory"),
+        "token": None,
+        "message": run.get("message"),
+        "status": {"id": status_id, "description": status_desc}
+    }
+
+async def execute_with_piston(language_name: str, source_code: str, stdin: str, use_cache: bool = True) -> dict:
+    """Execute code on the configured backend (Piston or local)"""
+    piston_lang = resolve_piston_language(language_name)
+    data, cached = await run_on_executor(piston_lang, source_code, stdin, use_cache)
+    return {**piston_result(data), "cached": cached}
+
+def normalize_output(text: str | None) -> str:
+    """Ignora espaços no fim das linhas e linhas vazias no fim da saída."""
+    return "\n".join(line.rstrip() for line in (text or "").rstrip().splitlines())
+
+def compile_failed(data: dict) -> bool:
+    compile_stage = data.get("compile") or {}
+    return compile_stage.get("code") not in (None, 0)
+
+def case_verdict(data: dict, case: TestCase) -> str:
+    if compile_failed(data):
+        return "Compile Error"
+    run = data.get("run") or {}
+    if run.get("status") == "TO" or run.get("signal") == "SIGKILL":
+        return "Time Limit Exceeded"
+    if run.get("signal") or run.get("code"):
+        return "Runtime Error"
+    if case.expected_output is not None and normalize_output(run.get("stdout")) != normalize_output(case.expected_output):
+        return "Wrong Answer"
+    return "Accepted"
+
+async def execute_batch_with_piston(language_name: str, source_code: str, cases: List[TestCase], use_cache: bool = True) -> dict:
+    """
+    Runs one source against many stdin/expected-output cases.
+
+    Cases run concurrently (bounded by PISTON_BATCH_CONCURRENCY). For compiled
+    languages the first case runs alone: if it fails to compile, the remaining
+    cases are reported as skipped instead of each compiling again.
+    """
+    piston_lang = resolve_piston_language(language_name)
+    semaphore = asyncio.Semaphore(settings.piston_batch_concurrency)
+    results: List[Optional[dict]] = [None] * len(cases)
+
+    async def run_case(index: int) -> dict:
+        case = cases[index]
+        async with semaphore:
+            started = time.perf_counter()
+            data, cached = await run_on_executor(piston_lang, source_code, case.stdin or "", use_cache)
+            wall_ms = round((time.perf_counter() - started) * 1000, 1)
+        result = piston_result(data)
+        results[index] = {
+            "index": index,
+            "name": case.name,
+            "verdict": case_verdict(data, case),
+            "stdout": result["stdout"],
+            "stderr": result["stderr"],
+            "compile_output": result["compile_output"],
+            "expected_output": case.expected_output,
+            "time": result["time"],
+            "memory": result["memory"],
+            "wall_ms": wall_ms,
+            "cached": cached,
         }
-        
-        logger.info(f"Executing code with Piston: lang={piston_lang} version={version}")
-        
-        try:
-            r = await client.post(execute_url, json=payload)
-            if r.is_error:
-                raise HTTPException(
-                    status.HTTP_502_BAD_GATEWAY,
-                    detail=f"Erro do Piston: {r.status_code}: {r.text}"
-                )
-            
-            data = r.json() or {}
-            run = data.get("run") or {}
-            
-            stdout = run.get("stdout") or ""
-            stderr = run.get("stderr") or ""
-            code = run.get("code")
-            signal = run.get("signal")
-            
-            # Determine status
-            if code == 0:
-                status_desc = "Accepted"
-                status_id = 3
-            elif signal:
-                status_desc = f"Runtime Error (Signal {signal})"
-                status_id = 11
-            elif code:
-                status_desc = f"Runtime Error (Exit {code})"
-                status_id = 11
-            else:
-                status_desc = "Finished"
-                status_id = 0
-            
-            return {
-                "stdout": stdout,
-                "stderr": stderr,
-                "compile_output": data.get("compile", {}).get("output"),
-                "time": run.get("runtime"),
-                "memory": None,
-                "token": None,
-                "message": None,
-                "status": {"id": status_id, "description": status_desc}
-            }
-            
-        except HTTPException:
-            raise
-        except Exception as e:
-            logger.error(f"Piston execution error: {e}")
-            raise HTTPException(
-                status.HTTP_502_BAD_GATEWAY,
-                detail=f"Erro ao executar código: {str(e)}"
-            )
+        return data
+
+    pending = list(range(len(cases)))
+    compile_error = False
+    if piston_lang in COMPILED_LANGUAGES:
+        compile_error = compile_failed(await run_case(pending.pop(0)))
+    if not compile_error and pending:
+        await asyncio.gather(*(run_case(i) for i in pending))
+
+    case_results = [
+        r if r is not None else {"index": i, "name": cases[i].name, "verdict": "Skipped"}
+        for i, r in enumerate(results)
+    ]
+    verdicts = [r["verdict"] for r in case_results]
+    if compile_error:
+        overall = "Compile Error"
+    else:
+        overall = next((v for v in verdicts if v != "Accepted"), "Accepted")
+    return {
+        "verdict": overall,
+        "passed": verdicts.count("Accepted"),
+        "total": len(cases),
+        "cases": case_results,
+    }
 
 @router.post("/executar")
 async def executar(req: ExecRequest):
     """
-    Executa código usando Piston API.
+    Executa código no Piston ou, com CODE_EXECUTOR=local, Python/JavaScript localmente.
     
     Suporta: Python, JavaScript, TypeScript, Java, C, C++, C#, Go, Rust, PHP, Ruby, Kotlin
     """
@@ -184,8 +227,8 @@ async def executar(req: ExecRequest):
     logger.info(f"Executing {lang_name} code")
     
     try:
-        result = await execute_with_piston(lang_name, req.code, req.stdin or "")
-        logger.info(f"Executed successfully using Piston")
+        result = await execute_with_piston(lang_name, req.code, req.stdin or "", req.use_cache)
+        logger.info(f"Executed successfully")
         return result
     except HTTPException:
         raise
@@ -195,3 +238,29 @@ async def executar(req: ExecRequest):
             status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Erro na execução: {str(e)}"
         )
+
+@router.post("/executar-lote")
+async def executar_lote(req: BatchExecRequest):
+    """
+    Executa o mesmo código contra vários casos de teste (stdin + saída esperada).
+
+    Retorna veredito por caso (Accepted, Wrong Answer, Runtime Error,
+    Time Limit Exceeded, Compile Error, Skipped), tempos e o veredito agregado.
+    """
+    if len(req.cases) > settings.piston_batch_max_cases:
+        raise HTTPException(
+            status.HTTP_400_BAD_REQUEST,
+            detail=f"Máximo de {settings.piston_batch_max_cases} casos por lote"
+        )
+    lang_name = (req.language or "").lower()
+    logger.info(f"Executing {lang_name} code against {len(req.cases)} cases")
+    try:
+        return await execute_batch_with_piston(lang_name, req.code, req.cases, req.use_cache)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Batch execution failed: {e}")
+        raise HTTPException(
+            status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Erro na execução: {str(e)}"
+        )
@@ -6,7 +6,7 @@ e evitar duplicação de valores mágicos.
 """
 
 from typing import Dict, Any
-from .types.agno_types import MethodologyType, MethodologyConfig
+from ..types.agno_types import MethodologyType, MethodologyConfig
 
 # Configurações padrão de modelos por provedor
 DEFAULT_MODELS = {
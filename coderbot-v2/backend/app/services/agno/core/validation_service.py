@@ -9,13 +9,16 @@ import re
 from typing import Optional, Dict, Any, List
 from ..types.agno_types import ValidationResult, UserContext
 from ..constants.agno_constants import VALIDATION_CONFIG, RESPONSE_CONFIG
+from ...topic_classifier import TopicClassifier, get_topic_classifier
 
 
 class ValidationService:
     """Serviço especializado em validações do sistema AGNO."""
 
-    def __init__(self):
+    def __init__(self, topic_classifier: Optional[TopicClassifier] = None):
         self.config = VALIDATION_CONFIG
+        # Classificador local on-topic, aditivo à checagem por palavras-chave
+        self.topic_classifier = topic_classifier or get_topic_classifier()
 
     def validate_methodology(self, methodology: str) -> ValidationResult:
         """
@@ -110,6 +113,19 @@ class ValidationService:
         if user_context and (user_context.current_topic or user_context.learning_progress):
             return {"valid": True, "message": "Consulta considerada educacional pelo contexto"}
 
+        # Classificador aditivo: aceita sem palavra-chave e só veta com alta confiança
+        # off-topic; na zona intermediária, decidem as palavras-chave
+        if self.topic_classifier is not None:
+            score = self.topic_classifier.score(query)
+            if score >= self.topic_classifier.threshold:
+                return {"valid": True, "message": f"Consulta educacional detectada (classificador: {score:.2f})"}
+            if self.topic_classifier.is_confidently_off_topic(score):
+                return {
+                    "valid": False,
+                    "message": "Consulta não parece ser educacional",
+                    "suggestion": "Reformule com foco educacional (ex: 'Explique...', 'Como resolver...')"
+                }
+
         query_lower = query.lower()
         educational_keywords = self.config["EDUCATIONAL_KEYWORDS"]
 
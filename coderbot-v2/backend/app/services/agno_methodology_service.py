@@ -29,6 +29,7 @@ from app.services.template_service import TemplateContext, UnifiedTemplateServic
 
 # Import do nosso modelo customizado
 from .agno_models import create_model, get_available_models
+from .class_api_keys import get_provider_client_pool
 import time
 
 def _sanitize_api_key(raw: Optional[str]) -> str:
@@ -390,12 +391,14 @@ class AgnoMethodologyService:
 
         return None
 
-    def get_agent(self, methodology: MethodologyType) -> Agent:
+    def get_agent(self, methodology: MethodologyType, api_key: Optional[str] = None) -> Agent:
         """
         Cria um agente AGNO com o modelo apropriado baseado no provedor.
         
         Args:
             methodology: Metodologia educacional a ser utilizada
+            api_key: Chave específica desta chamada (ex.: chave da turma); usa os clientes
+                do pool dessa credencial em vez da chave global
             
         Returns:
             Agent: Instância do agente AGNO configurado
@@ -407,7 +410,10 @@ class AgnoMethodologyService:
         try:
             model_kwargs: Dict[str, Any] = {}
 
-            if self.provider == "claude":
+            if api_key and self.provider in ("claude", "openai"):
+                client, async_client = get_provider_client_pool().get(self.provider, api_key)
+                model_kwargs.update(api_key=api_key, client=client, async_client=async_client)
+            elif self.provider == "claude":
                 if not self._claude_api_key:
                     raw_settings_key = settings.claude_api_key
                     raw_env_key_anthropic = os.environ.get("ANTHROPIC_API_KEY", "")
@@ -532,7 +538,7 @@ class AgnoMethodologyService:
             "- Priorize clareza, motivação e aderência à metodologia selecionada."
         )
 
-    def ask(self, methodology: MethodologyType, user_query: str, context: Optional[str] = None) -> str:
+    def ask(self, methodology: MethodologyType, user_query: str, context: Optional[str] = None, api_key: Optional[str] = None) -> str:
         """
         Processa uma pergunta usando uma metodologia específica.
         
@@ -540,6 +546,7 @@ class AgnoMethodologyService:
             methodology: Metodologia educacional a ser utilizada
             user_query: Pergunta do usuário
             context: Contexto adicional (opcional)
+            api_key: Chave de API só para esta chamada (opcional)
             
         Returns:
             str: Resposta formatada segundo a metodologia escolhida
@@ -572,7 +579,7 @@ class AgnoMethodologyService:
                 self.model_id,
                 ",".join(render_result.required_sections) or "-",
             )
-            agent = self.get_agent(methodology)
+            agent = self.get_agent(methodology, api_key=api_key)
             run_response = agent.run(prompt)
             
             # Extrair conteúdo da resposta - priorizando o método helper
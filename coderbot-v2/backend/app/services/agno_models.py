@@ -57,6 +57,8 @@ class ClaudeModel(Model):
         api_key: Optional[str] = None,
         max_tokens: int = 4096,
         temperature: float = 0.7,
+        client: Optional[Anthropic] = None,
+        async_client: Optional[AsyncAnthropic] = None,
         **kwargs
     ):
         """
@@ -67,6 +69,8 @@ class ClaudeModel(Model):
             api_key: Chave da API Anthropic (usa variável de ambiente se não fornecida)
             max_tokens: Número máximo de tokens na resposta
             temperature: Temperatura para geração
+            client: Cliente síncrono já criado para `api_key` (reutilizado entre chamadas)
+            async_client: Cliente assíncrono já criado para `api_key`
             **kwargs: Argumentos adicionais
         """
         super().__init__(id=id, **kwargs)
@@ -80,12 +84,12 @@ class ClaudeModel(Model):
             raise ValueError("Claude API key is required but not provided")
         
         # Log para debug
-        logger.info(f"Inicializando ClaudeModel com chave: {self.api_key[:20]}...{self.api_key[-10:] if self.api_key else None}")
+        logger.info(f"Inicializando ClaudeModel com chave: {self.api_key[:6]}...{self.api_key[-4:]}")
         logger.info(f"Modelo: {self.model_name}")
         
-        # Inicializar clientes síncronos e assíncronos
-        self.client = Anthropic(api_key=self.api_key)
-        self.async_client = AsyncAnthropic(api_key=self.api_key)
+        # Inicializar clientes síncronos e assíncronos (ou reutilizar os do pool da credencial)
+        self.client = client or Anthropic(api_key=self.api_key)
+        self.async_client = async_client or AsyncAnthropic(api_key=self.api_key)
     
     def _format_messages_for_claude(self, messages: List[Dict[str, Any]]) -> tuple[str, List[MessageParam]]:
         """
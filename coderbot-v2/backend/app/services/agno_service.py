@@ -15,7 +15,6 @@ from .agno_methodology_service import (
 )
 import logging
 from .pocketbase_service import pb_service
-import os
 
 logger = logging.getLogger(__name__)
 
@@ -40,29 +39,18 @@ class AgnoService:
         self.methodology_service = AgnoMethodologyService(model_id, provider)
         self.logger = logger
     
-    def _inject_class_api_key(self, class_id: Optional[str]) -> None:
-        """Se class_id for fornecido, tenta carregar a API key da turma e injeta via env.
-        Nunca expõe a chave; apenas configura variáveis usadas pelos SDKs/AGNO.
-        Ordem: usa provedor atual do serviço; se não houver, tenta ambos (claude/openai)."""
+    def _resolve_class_api_key(self, class_id: Optional[str]) -> Optional[str]:
+        """Chave de API da turma para o provedor atual (cache por turma/provedor).
+        A chave é repassada ao modelo desta chamada; nada é gravado no ambiente do processo."""
         if not class_id:
-            return
+            return None
         provider = (self.methodology_service.provider or "").lower()
-        if provider == "ollama":
-            return
-        candidates = [provider] if provider in ("claude", "openai") else ["claude", "openai"]
-        for prov in candidates:
-            key = pb_service.get_class_api_key(class_id, prov)
-            if not key:
-                continue
-            if prov == "claude":
-                # Anthropic SDK usa ANTHROPIC_API_KEY
-                os.environ["ANTHROPIC_API_KEY"] = key
-                self.logger.info("Class-scoped Anthropic API key injected for AGNO use")
-                return
-            if prov == "openai":
-                os.environ["OPENAI_API_KEY"] = key
-                self.logger.info("Class-scoped OpenAI API key injected for AGNO use")
-                return
+        if provider not in ("claude", "openai"):
+            return None
+        key = pb_service.get_class_api_key_sync(class_id, provider)
+        if key:
+            self.logger.info(f"Class-scoped {provider} API key in use for AGNO call")
+        return key
 
     def ask_question(
         self, 
@@ -84,10 +72,10 @@ class AgnoService:
             str: Resposta gerada pelo sistema AGNO
         """
         try:
-            # Injeta key de turma se disponível
-            self._inject_class_api_key(class_id)
+            # Key de turma (se houver) vai direto para o cliente do modelo
+            api_key = self._resolve_class_api_key(class_id)
             self.logger.info(f"Processando pergunta com metodologia: {methodology.value}")
-            response = self.methodology_service.ask(methodology, user_query, context)
+            response = self.methodology_service.ask(methodology, user_query, context, api_key=api_key)
             self.logger.info(f"Resposta gerada com sucesso")
             return response
         except Exception as e:
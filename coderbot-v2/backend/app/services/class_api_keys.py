@@ -0,0 +1,172 @@
+"""
+Chaves de API por turma: cache com TTL e pool de clientes por credencial.
+
+`AgnoService._inject_class_api_key` consultava o PocketBase a cada pergunta e
+gravava a chave em `os.environ`, um estado global do processo: duas turmas
+atendidas ao mesmo tempo podiam trocar de chave no meio da chamada. Aqui a
+chave é resolvida por (class_id, provider) com TTL (ausência também fica em
+cache, por menos tempo) e `set_class_api_key` invalida a entrada. Cada chave
+ganha seus próprios clientes do SDK (síncrono e assíncrono), reutilizados entre
+requisições e passados diretamente ao modelo, sem variáveis de ambiente.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from app.config import settings
+
+ClientPair = Tuple[Any, Any]
+
+_MISSING = object()
+
+
+class ClassApiKeyCache:
+    """TTL por (class_id, provider); seguro para o caminho síncrono (threads) e o assíncrono."""
+
+    def __init__(self, ttl_seconds: float = 300.0, negative_ttl_seconds: float = 30.0, max_entries: int = 2048):
+        """
+        Args:
+            ttl_seconds: Validade de uma chave encontrada
+            negative_ttl_seconds: Validade de "turma sem chave" (0 desabilita)
+            max_entries: Limite de entradas (LRU)
+        """
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, Optional[str]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, class_id: str, provider: str) -> Any:
+        """Chave em cache (ou None para ausência conhecida); `_MISSING` se precisa consultar."""
+        key = (class_id, provider)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() >= entry[0]:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return _MISSING
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, class_id: str, provider: str, api_key: Optional[str]) -> None:
+        ttl = self.ttl_seconds if api_key else self.negative_ttl_seconds
+        if ttl <= 0:
+            return
+        key = (class_id, provider)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, api_key or None)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_or_load(self, class_id: str, provider: str, loader: Callable[[], Optional[str]]) -> Optional[str]:
+        cached = self.get(class_id, provider)
+        if cached is not _MISSING:
+            return cached
+        api_key = loader()
+        self.put(class_id, provider, api_key)
+        return api_key
+
+    async def aget_or_load(self, class_id: str, provider: str, loader: Callable[[], Any]) -> Optional[str]:
+        cached = self.get(class_id, provider)
+        if cached is not _MISSING:
+            return cached
+        api_key = await loader()
+        self.put(class_id, provider, api_key)
+        return api_key
+
+    def invalidate(self, class_id: str, provider: Optional[str] = None) -> int:
+        """
+        Remove as chaves de uma turma (de um provedor, ou de todos).
+
+        Returns:
+            Quantidade de entradas removidas
+        """
+        with self._lock:
+            keys = [k for k in self._entries if k[0] == class_id and (provider is None or k[1] == provider)]
+            for k in keys:
+                del self._entries[k]
+        return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
+
+
+def _default_client_factory(provider: str, api_key: str) -> ClientPair:
+    if provider == "claude":
+        from anthropic import Anthropic, AsyncAnthropic
+        return Anthropic(api_key=api_key), AsyncAnthropic(api_key=api_key)
+    if provider == "openai":
+        from openai import AsyncOpenAI, OpenAI
+        return OpenAI(api_key=api_key), AsyncOpenAI(api_key=api_key)
+    raise ValueError(f"Provedor sem cliente dedicado: {provider}")
+
+
+class ProviderClientPool:
+    """Clientes do SDK por (provedor, credencial); cada um mantém seu próprio pool HTTP keep-alive."""
+
+    def __init__(self, max_entries: int = 64, factory: Callable[[str, str], ClientPair] = _default_client_factory):
+        """
+        Args:
+            max_entries: Credenciais distintas mantidas (LRU); clientes despejados não são
+                fechados aqui, pois podem estar em uso por outra requisição
+            factory: Cria (cliente síncrono, cliente assíncrono) para um provedor e chave
+        """
+        self.max_entries = max_entries
+        self.factory = factory
+        # A chave do dicionário é o hash da credencial, nunca a credencial em si
+        self._clients: "OrderedDict[Tuple[str, str], ClientPair]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.created = 0
+
+    def __len__(self) -> int:
+        return len(self._clients)
+
+    def get(self, provider: str, api_key: str) -> ClientPair:
+        key = (provider, hashlib.sha256(api_key.encode()).hexdigest())
+        with self._lock:
+            clients = self._clients.get(key)
+            if clients is not None:
+                self._clients.move_to_end(key)
+                return clients
+            clients = self.factory(provider, api_key)
+            self._clients[key] = clients
+            self.created += 1
+            while len(self._clients) > self.max_entries:
+                self._clients.popitem(last=False)
+            return clients
+
+    def clear(self) -> None:
+        with self._lock:
+            self._clients.clear()
+
+
+_provider_client_pool_instance: Optional[ProviderClientPool] = None
+
+
+def get_provider_client_pool() -> ProviderClientPool:
+    """Retorna o pool compartilhado do processo."""
+    global _provider_client_pool_instance
+    if _provider_client_pool_instance is None:
+        _provider_client_pool_instance = ProviderClientPool(max_entries=settings.provider_client_pool_max_entries)
+    return _provider_client_pool_instance
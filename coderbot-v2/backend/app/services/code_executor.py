@@ -0,0 +1,77 @@
+"""
+Interface comum dos backends de execução de código.
+
+O router de execução só conhece `CodeExecutor`: resolver a versão de uma
+linguagem e executar um arquivo com stdin, recebendo a resposta no formato do
+Piston (`run.stdout`, `run.code`, `run.signal`, `compile`...), de modo que
+vereditos, cache e `/executar-lote` funcionam com qualquer backend. O Piston
+remoto é uma implementação; `LocalExecutor` (Python/JavaScript em subprocessos
+locais com rlimits) é outra, escolhida com `CODE_EXECUTOR=local`.
+"""
+
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Optional
+
+from app.config import settings
+
+
+class ExecutorError(Exception):
+    """Falha do backend de execução (indisponível, erro HTTP, erro ao iniciar o processo)."""
+
+
+class CodeExecutor(ABC):
+    """Backend de execução; respostas no formato do `/execute` do Piston."""
+
+    name: str = "executor"
+
+    @abstractmethod
+    def supports(self, language: str) -> bool:
+        """Se este backend executa a linguagem (nome do Piston: "python", "javascript"...)."""
+
+    @abstractmethod
+    async def resolve_version(self, language: str) -> Optional[str]:
+        """Versão usada para a linguagem (entra na chave do cache de execução)."""
+
+    @abstractmethod
+    async def execute(self, language: str, version: str, source_code: str, stdin: str = "") -> Dict[str, Any]:
+        """Executa um único arquivo; levanta `ExecutorError` se o backend falhar."""
+
+    def start(self) -> None:
+        """Trabalho em segundo plano do backend (catálogos, pools); opcional."""
+
+    async def close(self) -> None:
+        """Libera conexões/processos do backend."""
+
+
+def get_code_executor(language: str) -> CodeExecutor:
+    """
+    Backend para a linguagem conforme `CODE_EXECUTOR`.
+
+    "piston" (padrão) executa tudo no Piston; "local" executa Python/JavaScript
+    localmente e mantém o Piston para as demais linguagens.
+    """
+    from app.services.local_executor import get_local_executor
+    from app.services.piston_client import get_piston_client
+
+    if settings.code_executor == "local":
+        local = get_local_executor()
+        if local.supports(language):
+            return local
+    return get_piston_client()
+
+
+def start_code_executors() -> None:
+    from app.services.local_executor import get_local_executor
+    from app.services.piston_client import get_piston_client
+
+    get_piston_client().start()
+    if settings.code_executor == "local":
+        get_local_executor().start()
+
+
+async def close_code_executors() -> None:
+    from app.services.local_executor import close_local_executor
+    from app.services.piston_client import close_piston_client
+
+    await close_piston_client()
+    await close_local_executor()
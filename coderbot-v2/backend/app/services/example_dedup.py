@@ -0,0 +1,151 @@
+"""
+Detecção de quase-duplicatas entre exemplos gerados (MinHash + LSH).
+
+O AGNO gera repetidamente variações do mesmo exemplo ("for loop em Python"),
+que antes eram todas inseridas. Aqui cada exemplo vira uma assinatura MinHash
+sobre shingles do código normalizado (sem comentários, espaços colapsados) e
+das palavras do título. As assinaturas são divididas em bandas (LSH): só
+exemplos que colidem em pelo menos uma banda são comparados, então a busca
+por duplicata não cresce com o tamanho do acervo.
+"""
+
+import hashlib
+import re
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+# Maior primo abaixo de 2^32 para as permutações universais (a*x + b mod p): com
+# a, b, x < p o produto a*x + b fica abaixo de p^2 < 2^64 e não transborda em uint64
+_PRIME = np.uint64((1 << 32) - 5)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+# Comentários por família de linguagem ("//" é divisão inteira em Python)
+_HASH_COMMENT = re.compile(r"#.*?$|\"\"\".*?\"\"\"|'''.*?'''", re.MULTILINE | re.DOTALL)
+_SLASH_COMMENT = re.compile(r"//.*?$|/\*.*?\*/", re.MULTILINE | re.DOTALL)
+_HASH_COMMENT_LANGUAGES = {"python", "ruby", "shell", "bash", "r", "perl"}
+_CODE_TOKEN = re.compile(r"\w+|[^\w\s]")
+_WORD = re.compile(r"\w+")
+
+
+def normalize_code(code: str, language: str = "") -> List[str]:
+    """Tokens do código sem comentários/docstrings, em minúsculas (ignora formatação)."""
+    if (language or "").lower() in _HASH_COMMENT_LANGUAGES:
+        code = _HASH_COMMENT.sub(" ", code or "")
+    else:
+        code = _SLASH_COMMENT.sub(" ", code or "")
+    return _CODE_TOKEN.findall(code.lower())
+
+
+def shingles(title: str, code: str, language: str = "", size: int = 3) -> Set[str]:
+    """Shingles de `size` tokens do código + palavras do título (prefixadas)."""
+    tokens = normalize_code(code, language)
+    result = {
+        " ".join(tokens[i:i + size])
+        for i in range(max(1, len(tokens) - size + 1))
+    } if tokens else set()
+    result.update(f"t:{word}" for word in _WORD.findall((title or "").lower()))
+    return result
+
+
+class NearDuplicateIndex:
+    """Índice MinHash/LSH em memória para localizar exemplos quase idênticos."""
+
+    def __init__(self, threshold: float = 0.85, num_perm: int = 64, bands: int = 16, seed: int = 7):
+        """
+        Args:
+            threshold: Similaridade de Jaccard estimada mínima para considerar duplicata
+            num_perm: Tamanho da assinatura MinHash
+            bands: Número de bandas LSH (num_perm precisa ser múltiplo)
+            seed: Semente das permutações (fixa para assinaturas estáveis)
+        """
+        if num_perm % bands:
+            raise ValueError("num_perm deve ser múltiplo de bands")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, _PRIME, num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, _PRIME, num_perm, dtype=np.uint64)
+
+        self._signatures: Dict[str, np.ndarray] = {}
+        self._groups: Dict[str, Tuple[str, str]] = {}
+        self._buckets: Dict[Tuple[str, str, int, bytes], Set[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def __contains__(self, example_id: str) -> bool:
+        return example_id in self._signatures
+
+    def signature(self, title: str, code: str, language: str = "") -> np.ndarray:
+        """Assinatura MinHash (vetor uint64 de tamanho num_perm)."""
+        items = shingles(title, code, language)
+        if not items:
+            return np.full(self.num_perm, _MAX_HASH, dtype=np.uint64)
+        hashes = np.fromiter(
+            (
+                int.from_bytes(hashlib.blake2b(item.encode("utf-8"), digest_size=4).digest(), "little")
+                for item in items
+            ),
+            dtype=np.uint64,
+            count=len(items),
+        ) % _PRIME
+        # (n_shingles, num_perm): cada coluna é uma permutação; o mínimo por coluna é a assinatura
+        permuted = (np.outer(hashes, self._a) + self._b) % _PRIME
+        return permuted.min(axis=0)
+
+    def add(self, example_id: str, title: str, code: str, language: str = "", example_type: str = "") -> None:
+        """Indexa (ou reindexa) um exemplo."""
+        self.remove(example_id)
+        group = ((language or "").lower(), example_type or "")
+        signature = self.signature(title, code, language)
+        self._signatures[example_id] = signature
+        self._groups[example_id] = group
+        for key in self._band_keys(group, signature):
+            self._buckets.setdefault(key, set()).add(example_id)
+
+    def remove(self, example_id: str) -> None:
+        signature = self._signatures.pop(example_id, None)
+        if signature is None:
+            return
+        group = self._groups.pop(example_id)
+        for key in self._band_keys(group, signature):
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket.discard(example_id)
+                if not bucket:
+                    del self._buckets[key]
+
+    def find(
+        self,
+        title: str,
+        code: str,
+        language: str = "",
+        example_type: str = "",
+    ) -> Optional[Tuple[str, float]]:
+        """
+        Procura um exemplo quase idêntico (mesma linguagem e tipo).
+
+        Returns:
+            (id, similaridade estimada) do melhor candidato acima do limiar, ou None
+        """
+        group = ((language or "").lower(), example_type or "")
+        signature = self.signature(title, code, language)
+        candidates: Set[str] = set()
+        for key in self._band_keys(group, signature):
+            candidates.update(self._buckets.get(key, ()))
+
+        best: Optional[Tuple[str, float]] = None
+        for candidate in candidates:
+            similarity = float(np.mean(self._signatures[candidate] == signature))
+            if similarity >= self.threshold and (best is None or similarity > best[1]):
+                best = (candidate, similarity)
+        return best
+
+    def _band_keys(self, group: Tuple[str, str], signature: np.ndarray):
+        for band in range(self.bands):
+            chunk = signature[band * self.rows:(band + 1) * self.rows]
+            yield (group[0], group[1], band, chunk.tobytes())
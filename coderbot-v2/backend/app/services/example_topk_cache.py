@@ -0,0 +1,96 @@
+"""
+Cache materializado de top-k exemplos por (conjunto de tópicos, min_quality_score, linguagem).
+
+Todos os alunos de uma mesma missão pedem os mesmos exemplos para o painel;
+antes cada carga repetia no PocketBase o mesmo filtro `topics ~`. Aqui a lista
+ordenada (já resumida) fica em memória e é invalidada de forma seletiva: um
+exemplo novo ou com score alterado só derruba as entradas cujos tópicos ele
+compartilha.
+"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+TopKKey = Tuple[FrozenSet[str], float, str]
+
+
+def make_key(topics: Iterable[str], min_quality_score: float, language: Optional[str] = None) -> TopKKey:
+    """Chave normalizada: tópicos em minúsculas, score arredondado, linguagem opcional."""
+    return (
+        frozenset(str(t).strip().lower() for t in topics if str(t).strip()),
+        round(float(min_quality_score), 3),
+        (language or "").lower(),
+    )
+
+
+class TopKExampleCache:
+    """LRU com TTL e invalidação por interseção de tópicos."""
+
+    def __init__(self, max_entries: int = 512, ttl_seconds: float = 600.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[TopKKey, Tuple[float, List[Dict[str, Any]]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: TopKKey) -> Optional[List[Dict[str, Any]]]:
+        entry = self._entries.get(key)
+        if entry is None or time.monotonic() - entry[0] > self.ttl_seconds:
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key: TopKKey, examples: List[Dict[str, Any]]) -> None:
+        self._entries[key] = (time.monotonic(), examples)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate_topics(self, topics: Iterable[str], language: Optional[str] = None) -> int:
+        """
+        Remove entradas cujo conjunto de tópicos intersecta `topics`.
+
+        Entradas filtradas por outra linguagem não são afetadas.
+
+        Returns:
+            Quantidade de entradas removidas
+        """
+        changed = {str(t).strip().lower() for t in topics or []}
+        language = (language or "").lower()
+        stale = [
+            key for key in self._entries
+            if key[0] & changed and (not key[2] or not language or key[2] == language)
+        ]
+        for key in stale:
+            del self._entries[key]
+        return len(stale)
+
+    def invalidate_example(self, example_id: str) -> int:
+        """Remove entradas que contêm o exemplo (ex.: exemplo removido)."""
+        stale = [
+            key for key, (_, examples) in self._entries.items()
+            if any(ex.get("id") == example_id for ex in examples)
+        ]
+        for key in stale:
+            del self._entries[key]
+        return len(stale)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
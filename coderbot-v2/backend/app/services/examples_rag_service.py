@@ -3,101 +3,162 @@ ExamplesRAGService - Serviço para gerenciar exemplos educacionais contextuais
 
 Este serviço é responsável por:
 1. Validar queries educacionais (anti-gibberish)
-2. Buscar exemplos relevantes via RAG (quando Qdrant estiver configurado)
+2. Buscar exemplos relevantes via RAG (índice híbrido BM25 + vetorial em memória)
 3. Salvar exemplos gerados pelo AGNO
 4. Atualizar scores baseado em feedback dos alunos
 """
 
 import re
 import math
-from typing import Dict, Any, List, Optional, Literal
+import json
+import base64
+import asyncio
+from typing import Dict, Any, List, Optional, Literal, Tuple
 from datetime import datetime, timedelta
 import logging
 
-from pocketbase import PocketBase
-
-try:
-    from pocketbase.client import ClientResponseError
-except ImportError:
-    # Fallback para versões diferentes do PocketBase
-    ClientResponseError = Exception
+from app.config import settings
+from app.rag.embeddings import get_embedding_backend
+from app.services.example_dedup import NearDuplicateIndex
+from app.services.example_topk_cache import TopKExampleCache, make_key
+from app.services.examples_search_index import HybridExampleIndex
+from app.services.pocketbase_service import PocketBaseService
+from app.services.quality_score_job import QualityScoreJob
+from app.services.query_gate import PROGRAMMING_KEYWORDS, QueryAnalysis, get_query_gate
+from app.services.topic_classifier import get_topic_classifier
+from app.services.vote_aggregator import FEEDBACK_TYPES, VoteAggregator
 
 logger = logging.getLogger(__name__)
 
+# Quantos exemplos são materializados por entrada do cache de top-k
+TOPK_MATERIALIZED = 10
+
+# Campos carregados no índice híbrido e no detector de duplicatas
+_INDEX_FIELDS = (
+    "id", "title", "code", "language", "explanation", "type", "topics",
+    "quality_score", "upvotes", "downvotes", "usage_count", "difficulty", "created",
+)
+
+# Campos de texto do índice: se mudarem, o exemplo é reindexado (embedding incluso)
+_INDEX_TEXT_FIELDS = ("title", "code", "language", "explanation", "type", "topics")
+
+# A sincronização relê um pouco antes do último `updated` visto (escritas concorrentes
+# podem ser confirmadas com timestamp anterior ao da leitura anterior)
+_INDEX_SYNC_OVERLAP = timedelta(seconds=5)
+
+# Campos lidos no detalhe do exemplo (sem embedding/metadados de criação)
+_EXAMPLE_DETAIL_FIELDS = ",".join([
+    "id", "title", "code", "language", "explanation", "type", "upvotes", "downvotes",
+    "quality_score", "usage_count", "topics", "difficulty", "created",
+    *(f"feedback_{feedback_type}" for feedback_type in FEEDBACK_TYPES),
+])
+
+
+def _encode_feedback_cursor(created: Any, record_id: str) -> str:
+    if isinstance(created, datetime):
+        # Mesmo formato usado pelo PocketBase nos filtros ("2025-01-01 12:00:00.123Z")
+        created = created.strftime("%Y-%m-%d %H:%M:%S.%f")[:-3] + "Z"
+    payload = json.dumps([str(created), record_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(payload).decode("ascii")
+
+
+def _pb_timestamp_minus(value: str, delta: timedelta) -> str:
+    """Subtrai `delta` de um timestamp do PocketBase ("2025-01-01 12:00:00.123Z")."""
+    moment = datetime.strptime(str(value)[:19].replace("T", " "), "%Y-%m-%d %H:%M:%S") - delta
+    return moment.strftime("%Y-%m-%d %H:%M:%S") + ".000Z"
+
+
+def _decode_feedback_cursor(cursor: str) -> Tuple[str, str]:
+    """Decodifica o cursor; levanta ValueError se for inválido."""
+    try:
+        created, record_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except Exception as e:
+        raise ValueError("Cursor de feedback inválido") from e
+    if not re.fullmatch(r"[A-Za-z0-9]+", record_id) or '"' in created:
+        raise ValueError("Cursor de feedback inválido")
+    return created, record_id
+
 
 class ExamplesRAGService:
     """Serviço para gerenciar exemplos educacionais com RAG."""
     
-    def __init__(self, pb_client: PocketBase):
+    def __init__(self, pb_client: PocketBaseService):
         """
         Inicializa o serviço.
         
         Args:
-            pb_client: Cliente do PocketBase
+            pb_client: Serviço compartilhado do PocketBase (pool HTTP async)
         """
         self.pb = pb_client
         
-        # Keywords de programação (multilíngue)
-        self.programming_keywords = [
-            # Português
-            "código", "programar", "função", "variável", "loop", "array", 
-            "objeto", "classe", "método", "algoritmo", "bug", "erro", 
-            "debug", "compilar", "executar", "syntax", "sintaxe",
-            "lista", "dicionário", "string", "integer", "float", "boolean",
-            "if", "else", "for", "while", "return", "import", "def",
-            "const", "let", "var", "async", "await", "promise", "callback",
-            
-            # Linguagens
-            "javascript", "python", "java", "c++", "typescript", "react", 
-            "node", "angular", "vue", "django", "flask", "spring",
-            "html", "css", "sql", "mongodb", "postgresql",
-            
-            # Conceitos
-            "recursão", "iteração", "estrutura de dados", "api", "rest",
-            "json", "xml", "http", "request", "response", "endpoint",
-            "frontend", "backend", "fullstack", "database", "query",
-            "test", "unit test", "integration", "deploy", "git",
-            
-            # Inglês (caso aluno pergunte em inglês)
-            "code", "program", "function", "variable", "object", "class",
-            "method", "algorithm", "loop", "array", "list", "dictionary"
-        ]
+        # Índice híbrido (BM25 + vetorial) carregado sob demanda.
+        # Com EMBEDDING_BACKEND=local, o lado vetorial usa o modelo local treinado.
+        embed_fn = None
+        if (settings.embedding_backend or "").lower() == "local":
+            embed_fn = get_embedding_backend().encode
+        self.search_index = HybridExampleIndex(embed_fn=embed_fn)
+        self._index_loaded = False
+        self._index_lock = asyncio.Lock()
+        # Maior `updated` já carregado no índice; a sincronização periódica relê a partir dele
+        # (exemplos salvos, votados ou recalculados por outros workers)
+        self._index_synced_until: Optional[str] = None
+        self.index_sync_interval_seconds = settings.example_index_sync_interval_seconds
+        self._index_sync_task: Optional[asyncio.Task] = None
+        
+        # Detecção de quase-duplicatas ao salvar exemplos gerados (populado junto com o índice)
+        self.dedup_index = NearDuplicateIndex(threshold=settings.example_dedup_threshold)
+        
+        # Top-k materializado por (tópicos, min_quality_score, linguagem) para o painel de exemplos
+        self.topk_cache = TopKExampleCache()
+        
+        # Votos agregados em memória e gravados em lote (write-behind)
+        self.vote_aggregator = VoteAggregator(
+            self.pb,
+            score_fn=self._calculate_quality_score,
+            on_score=self._on_quality_change,
+        )
         
-        # Anti-padrões (queries claramente off-topic)
-        self.off_topic_patterns = [
-            r"\b(clima|tempo|weather|temperatura|chuva|sol)\b",
-            r"\b(receita|comida|food|cozinha|prato)\b",
-            r"\b(futebol|esporte|sport|jogo de futebol|campeonato)\b",
-            r"\b(filme|série|movie|netflix|cinema)\b",
-            r"\b(música|canção|song|banda|artista musical)\b",
-            r"\b(fofoca|celebridade|famoso|celebrity)\b",
-            r"\b(política|eleição|partido político)\b",
-            r"\b(religião|igreja|templo|fé)\b",
-        ]
+        # Recálculo periódico do quality_score (decaimento por antiguidade)
+        self.quality_job = QualityScoreJob(
+            self.pb,
+            epsilon=settings.quality_score_epsilon,
+            interval_seconds=settings.quality_score_refresh_interval_seconds,
+            on_update=self._on_quality_change,
+        )
+        
+        # Classificação de queries em uma única passada (keywords, off-topic, tópicos, gibberish)
+        self.query_gate = get_query_gate()
+        # Classificador local on-topic (carregado uma vez por processo; None = só heurísticas)
+        self.topic_classifier = get_topic_classifier()
+        self.programming_keywords = PROGRAMMING_KEYWORDS
     
     def validate_educational_query(
         self, 
         user_query: str,
-        mission_context: Optional[Dict[str, Any]] = None
+        mission_context: Optional[Dict[str, Any]] = None,
+        analysis: Optional[QueryAnalysis] = None
     ) -> Dict[str, Any]:
         """
         Valida se a query é relacionada a programação/educação.
         
-        Implementa validação em 3 camadas:
+        Implementa validação em 4 camadas:
         1. Keywords técnicas
-        2. Anti-padrões (off-topic)
-        3. Alinhamento com missão (se houver)
+        2. Classificador local on-topic (se disponível): aceita sem keywords, só veta com alta confiança off-topic
+        3. Anti-padrões (off-topic), que o classificador pode revogar
+        4. Alinhamento com missão (se houver)
         
         Args:
             user_query: Pergunta do aluno
             mission_context: Contexto da missão ativa (opcional)
+            analysis: Resultado de `query_gate.analyze` já calculado (evita nova passada)
         
         Returns:
             {
                 "is_valid": bool,
                 "reason": str,
                 "confidence": float (0.0-1.0),
-                "suggested_redirect": Optional[str]
+                "suggested_redirect": Optional[str],
+                "on_topic_score": Optional[float] (probabilidade do classificador)
             }
         """
         if not user_query or len(user_query.strip()) < 3:
@@ -109,24 +170,38 @@ class ExamplesRAGService:
             }
         
         query_lower = user_query.lower()
+        if analysis is None:
+            analysis = self.query_gate.analyze(user_query)
         
         # CAMADA 1: Verificar keywords técnicas
-        keyword_matches = sum(1 for kw in self.programming_keywords if kw.lower() in query_lower)
+        keyword_matches = analysis.keyword_matches
         has_keyword = keyword_matches > 0
         keyword_confidence = min(1.0, keyword_matches * 0.2)
         
-        # CAMADA 2: Anti-padrões (off-topic)
-        for pattern in self.off_topic_patterns:
-            if re.search(pattern, query_lower, re.IGNORECASE):
-                logger.info(f"Query rejeitada (off-topic): {user_query[:50]}")
-                return {
-                    "is_valid": False,
-                    "reason": "Query não relacionada a programação",
-                    "confidence": 0.0,
-                    "suggested_redirect": "Sou um assistente de programação! 🤖 Pergunte sobre código, algoritmos, linguagens de programação, etc."
-                }
+        # CAMADA 2: Classificador local, aditivo às keywords: aceita perguntas válidas
+        # sem keywords listadas e só veta com alta confiança off-topic
+        on_topic_score = None
+        classifier_on_topic = False
+        classifier_off_topic = False
+        if self.topic_classifier is not None:
+            on_topic_score = self.topic_classifier.score(user_query)
+            classifier_on_topic = on_topic_score >= self.topic_classifier.threshold
+            classifier_off_topic = self.topic_classifier.is_confidently_off_topic(on_topic_score)
+            keyword_confidence = max(keyword_confidence, on_topic_score)
+        
+        # CAMADA 3: Anti-padrões (off-topic)
+        if analysis.is_off_topic and not classifier_on_topic:
+            logger.info(f"Query rejeitada (off-topic): {user_query[:50]}")
+            return {
+                "is_valid": False,
+                "reason": "Query não relacionada a programação",
+                "confidence": 0.0,
+                "suggested_redirect": "Sou um assistente de programação! 🤖 Pergunte sobre código, algoritmos, linguagens de programação, etc.",
+                "on_topic_score": on_topic_score
+            }
         
-        # CAMADA 3: Alinhamento com missão (se houver)
+        # CAMADA 4: Alinhamento com missão (se houver)
+        topic_matches = 0
         mission_aligned = True
         mission_confidence = 0.5  # Neutro por padrão
         
@@ -136,16 +211,27 @@ class ExamplesRAGService:
                 1 for topic in mission_topics 
                 if topic.lower() in query_lower
             )
-            mission_aligned = topic_matches > 0 or has_keyword  # Flexível
+            mission_aligned = topic_matches > 0 or has_keyword or classifier_on_topic  # Flexível
             mission_confidence = min(1.0, topic_matches * 0.3 + 0.4)
         
+        if classifier_off_topic and topic_matches == 0:
+            logger.info(f"Query rejeitada (classificador, score={on_topic_score:.2f}): {user_query[:50]}")
+            return {
+                "is_valid": False,
+                "reason": "Query não relacionada a programação",
+                "confidence": on_topic_score,
+                "suggested_redirect": "Sou um assistente de programação! 🤖 Pergunte sobre código, algoritmos, linguagens de programação, etc.",
+                "on_topic_score": on_topic_score
+            }
+        
         # DECISÃO FINAL
-        if not has_keyword and not mission_aligned:
+        if not has_keyword and not classifier_on_topic and not mission_aligned:
             return {
                 "is_valid": False,
                 "reason": "Query muito vaga ou sem contexto educacional",
                 "confidence": keyword_confidence,
-                "suggested_redirect": "Seja mais específico sobre o conceito de programação que deseja aprender. Exemplo: 'Como usar loops em Python?'"
+                "suggested_redirect": "Seja mais específico sobre o conceito de programação que deseja aprender. Exemplo: 'Como usar loops em Python?'",
+                "on_topic_score": on_topic_score
             }
         
         # Calcular confiança final (média ponderada)
@@ -162,7 +248,9 @@ class ExamplesRAGService:
             "reason": "Query válida e educacional",
             "confidence": final_confidence,
             "keyword_matches": keyword_matches,
-            "mission_aligned": mission_aligned
+            "mission_aligned": mission_aligned,
+            "on_topic_score": on_topic_score,
+            "classifier_on_topic": classifier_on_topic
         }
     
     async def save_generated_example(
@@ -192,9 +280,14 @@ class ExamplesRAGService:
             segment_index: Índice do segmento na resposta
         
         Returns:
-            str: ID do exemplo salvo
+            str: ID do exemplo salvo (ou do exemplo quase idêntico já existente)
         """
         try:
+            # Quase-duplicata (MinHash/LSH sobre código + título): reaproveita o existente
+            duplicate_id = await self._find_near_duplicate(example_data)
+            if duplicate_id:
+                return duplicate_id
+            
             # Extrair tópicos da query (análise simples)
             topics = self._extract_topics_from_query(user_query, mission_context)
             
@@ -230,20 +323,79 @@ class ExamplesRAGService:
             }
             
             # Salvar no PocketBase
-            record = await self.pb.collection('contextual_examples').create(record_data)
+            r = await self.pb._post('contextual_examples', record_data)
+            if r.status_code not in (200, 201):
+                # Não falhar a requisição se não conseguir salvar exemplo
+                self.pb._handle_response_error(r, "Create contextual_example")
+                return None
+            record = r.json()
             
-            logger.info(f"Exemplo salvo: {record.id} | Tipo: {record_data['type']} | Query: {user_query[:50]}")
+            logger.info(f"Exemplo salvo: {record['id']} | Tipo: {record_data['type']} | Query: {user_query[:50]}")
             
-            return record.id
+            # Atualização incremental do índice de busca
+            self.search_index.upsert({
+                **record_data,
+                "id": record["id"],
+                "created": record.get("created"),
+            })
+            self._add_to_dedup_index(record["id"], record_data)
+            self.topk_cache.invalidate_topics(topics, record_data["language"])
+            
+            return record["id"]
             
-        except ClientResponseError as e:
-            logger.error(f"Erro ao salvar exemplo: {e}")
-            # Não falhar a requisição se não conseguir salvar exemplo
-            return None
         except Exception as e:
             logger.error(f"Erro inesperado ao salvar exemplo: {e}")
             return None
     
+    async def _find_near_duplicate(self, example_data: Dict[str, Any]) -> Optional[str]:
+        """
+        Procura exemplo quase idêntico e, se houver, incrementa seu `usage_count`.
+        
+        Returns:
+            ID do exemplo existente, ou None se o exemplo deve ser inserido
+        """
+        if not example_data.get("code") or not await self._ensure_search_index():
+            return None
+        
+        match = self.dedup_index.find(
+            example_data.get("title", ""),
+            example_data.get("code", ""),
+            language=example_data.get("language", "python"),
+            example_type=example_data.get("type", "correct"),
+        )
+        if match is None:
+            return None
+        
+        existing_id, similarity = match
+        try:
+            r = await self.pb._patch('contextual_examples', existing_id, {"usage_count+": 1})
+            reused = r.status_code == 200
+            if not reused:
+                self.pb._handle_response_error(r, f"Reuse contextual_example {existing_id}")
+        except Exception as e:
+            logger.warning(f"Não foi possível reutilizar exemplo {existing_id}: {e}")
+            reused = False
+        if not reused:
+            # Registro removido ou indisponível: segue com a inserção normal
+            self.dedup_index.remove(existing_id)
+            return None
+        doc = self.search_index.documents.get(existing_id)
+        if doc is not None:
+            doc["usage_count"] = (doc.get("usage_count") or 0) + 1
+        
+        logger.info(f"Exemplo quase duplicado ({similarity:.2f}), reutilizando {existing_id}")
+        return existing_id
+    
+    def _add_to_dedup_index(self, example_id: str, example: Dict[str, Any]) -> None:
+        if example.get("code"):
+            self.dedup_index.add(
+                example_id,
+                example.get("title") or "",
+                example.get("code") or "",
+                language=example.get("language") or "",
+                example_type=example.get("type") or "",
+            )
+    
     def _extract_topics_from_query(
         self, 
         user_query: str, 
@@ -257,34 +409,8 @@ class ExamplesRAGService:
         2. Identificar linguagens mencionadas
         3. Identificar conceitos técnicos
         """
-        topics = []
-        query_lower = user_query.lower()
-        
-        # Tópicos da missão (prioridade)
-        if mission_context and mission_context.get('topics'):
-            topics.extend(mission_context['topics'])
-        
-        # Linguagens de programação
-        languages = [
-            "python", "javascript", "java", "c++", "typescript", 
-            "ruby", "go", "rust", "php", "swift", "kotlin"
-        ]
-        for lang in languages:
-            if lang in query_lower:
-                topics.append(lang)
-        
-        # Conceitos técnicos comuns
-        concepts = [
-            "function", "função", "loop", "array", "object", "objeto",
-            "class", "classe", "async", "promise", "callback", "recursion",
-            "recursão", "api", "rest", "database", "query"
-        ]
-        for concept in concepts:
-            if concept in query_lower:
-                topics.append(concept)
-        
-        # Remover duplicatas e limitar a 5 tópicos
-        return list(set(topics))[:5]
+        analysis = self.query_gate.analyze(user_query)
+        return analysis.topics(mission_context, limit=5)
     
     async def update_feedback_score(
         self, 
@@ -297,11 +423,11 @@ class ExamplesRAGService:
         """
         Atualiza score baseado em feedback do aluno.
         
-        Fluxo:
-        1. Verificar se usuário já votou (evitar duplicatas)
-        2. Salvar feedback em example_feedback
-        3. Recalcular quality_score usando Wilson Score
-        4. Atualizar no PocketBase
+        Fluxo (write-behind, ver `VoteAggregator`):
+        1. Verificar duplicata no conjunto de votantes em memória
+        2. Acumular o delta up/down do exemplo
+        3. Recalcular quality_score provisório (Wilson Score) e atualizar o índice
+        4. Feedbacks e contadores são gravados no PocketBase no próximo flush em lote
         
         Args:
             example_id: ID do exemplo
@@ -311,74 +437,26 @@ class ExamplesRAGService:
             comment: Comentário opcional
         
         Returns:
-            Dict com informações do feedback atualizado
+            Dict com informações do feedback (score provisório)
         """
         try:
-            # 1. Verificar se já votou
-            existing_feedbacks = await self.pb.collection('example_feedback').get_list(
-                1, 1,
-                {
-                    'filter': f'example_id = "{example_id}" && user_id = "{user_id}"'
-                }
-            )
-            
-            if existing_feedbacks.total_items > 0:
-                logger.info(f"Usuário {user_id} já votou no exemplo {example_id}")
-                return {
-                    "status": "already_voted",
-                    "message": "Você já votou neste exemplo"
-                }
-            
-            # 2. Salvar feedback
-            feedback_data = {
-                "example_id": example_id,
-                "user_id": user_id,
-                "vote": vote,
-                "feedback_type": feedback_type,
-                "comment": comment
-            }
-            await self.pb.collection('example_feedback').create(feedback_data)
-            
-            # 3. Buscar exemplo atual
-            example = await self.pb.collection('contextual_examples').get_one(example_id)
-            
-            # 4. Atualizar contadores
-            upvotes = example.upvotes + (1 if vote == "up" else 0)
-            downvotes = example.downvotes + (1 if vote == "down" else 0)
-            
-            # 5. Recalcular quality_score
-            days_since_creation = (datetime.now() - datetime.fromisoformat(example.created)).days
-            new_score = self._calculate_quality_score(
-                upvotes=upvotes,
-                downvotes=downvotes,
-                usage_count=example.usage_count,
-                days_since_creation=days_since_creation
+            result = await self.vote_aggregator.submit(
+                example_id=example_id,
+                user_id=user_id,
+                vote=vote,
+                feedback_type=feedback_type,
+                comment=comment
             )
             
-            # 6. Atualizar no PocketBase
-            await self.pb.collection('contextual_examples').update(example_id, {
-                "upvotes": upvotes,
-                "downvotes": downvotes,
-                "quality_score": new_score
-            })
-            
-            logger.info(
-                f"Feedback registrado: exemplo={example_id} | "
-                f"vote={vote} | score={new_score:.3f} | "
-                f"upvotes={upvotes} | downvotes={downvotes}"
-            )
+            if result["status"] == "success":
+                logger.info(
+                    f"Feedback registrado: exemplo={example_id} | "
+                    f"vote={vote} | score={result['quality_score']:.3f} (provisório) | "
+                    f"upvotes={result['upvotes']} | downvotes={result['downvotes']}"
+                )
             
-            return {
-                "status": "success",
-                "example_id": example_id,
-                "upvotes": upvotes,
-                "downvotes": downvotes,
-                "quality_score": new_score
-            }
+            return result
             
-        except ClientResponseError as e:
-            logger.error(f"Erro ao atualizar feedback: {e}")
-            raise
         except Exception as e:
             logger.error(f"Erro inesperado ao atualizar feedback: {e}")
             raise
@@ -432,128 +510,408 @@ class ExamplesRAGService:
         
         return round(final_score, 3)
     
-    async def get_example_with_feedback(self, example_id: str) -> Dict[str, Any]:
+    async def get_example_with_feedback(
+        self,
+        example_id: str,
+        feedback_limit: int = 10
+    ) -> Dict[str, Any]:
         """
         Retorna exemplo com estatísticas de feedback.
         
+        As estatísticas vêm dos contadores agregados do próprio registro
+        (`feedback_<tipo>`), mantidos a cada flush de votos. Junto, em paralelo,
+        vem só a primeira página de feedbacks; o restante é paginado via
+        `list_example_feedback`.
+        
         Args:
             example_id: ID do exemplo
+            feedback_limit: Feedbacks recentes incluídos na resposta
         
         Returns:
-            Dict com dados do exemplo + estatísticas
+            Dict com dados do exemplo + estatísticas + primeira página de feedbacks
         """
         try:
-            example = await self.pb.collection('contextual_examples').get_one(example_id)
-            
-            # Buscar feedbacks
-            feedbacks = await self.pb.collection('example_feedback').get_list(
-                1, 100,  # Limite razoável
-                {'filter': f'example_id = "{example_id}"'}
+            example, feedback_page = await asyncio.gather(
+                self.pb._get_record('contextual_examples', example_id, fields=_EXAMPLE_DETAIL_FIELDS),
+                self.list_example_feedback(example_id, limit=feedback_limit)
             )
+            if example is None:
+                raise LookupError(f"Exemplo {example_id} não encontrado")
             
             return {
-                "id": example.id,
-                "title": example.title,
-                "code": example.code,
-                "language": example.language,
-                "explanation": example.explanation,
-                "type": example.type,
-                "upvotes": example.upvotes,
-                "downvotes": example.downvotes,
-                "quality_score": example.quality_score,
-                "usage_count": example.usage_count,
-                "topics": example.topics,
-                "difficulty": example.difficulty,
-                "created": example.created,
-                "feedbacks": [
-                    {
-                        "user_id": f.user_id,
-                        "vote": f.vote,
-                        "feedback_type": f.feedback_type,
-                        "comment": f.comment,
-                        "created": f.created
-                    }
-                    for f in feedbacks.items
-                ]
+                **{field: example.get(field) for field in _INDEX_FIELDS},
+                "feedback_summary": {
+                    feedback_type: example.get(f"feedback_{feedback_type}") or 0
+                    for feedback_type in FEEDBACK_TYPES
+                },
+                "feedbacks": feedback_page["items"],
+                "feedbacks_next_cursor": feedback_page["next_cursor"]
             }
             
-        except ClientResponseError as e:
+        except Exception as e:
             logger.error(f"Erro ao buscar exemplo: {e}")
             raise
     
+    async def list_example_feedback(
+        self,
+        example_id: str,
+        cursor: Optional[str] = None,
+        limit: int = 20
+    ) -> Dict[str, Any]:
+        """
+        Lista feedbacks de um exemplo, do mais recente ao mais antigo, com paginação por cursor.
+        
+        O cursor codifica (created, id) do último item: a próxima página filtra a
+        partir dele em vez de usar offset, então o custo não cresce com a página.
+        
+        Args:
+            example_id: ID do exemplo
+            cursor: Valor de `next_cursor` da página anterior (None = primeira página)
+            limit: Itens por página
+        
+        Returns:
+            {"items": [...], "next_cursor": Optional[str]}
+        """
+        filters = [f'example_id = "{example_id}"']
+        if cursor:
+            created, last_id = _decode_feedback_cursor(cursor)
+            filters.append(f'(created < "{created}" || (created = "{created}" && id < "{last_id}"))')
+        
+        r = await self.pb._get(
+            'example_feedback',
+            params={
+                'filter': " && ".join(filters),
+                'sort': '-created,-id',
+                'page': 1,
+                'perPage': limit + 1,
+                'skipTotal': 1
+            },
+            fields='id,user_id,vote,feedback_type,comment,created'
+        )
+        r.raise_for_status()
+        items = r.json().get("items", [])
+        
+        records = items[:limit]
+        next_cursor = None
+        if len(items) > limit and records:
+            last = records[-1]
+            next_cursor = _encode_feedback_cursor(last.get("created"), last["id"])
+        
+        return {
+            "items": [
+                {
+                    "user_id": f.get("user_id"),
+                    "vote": f.get("vote"),
+                    "feedback_type": f.get("feedback_type"),
+                    "comment": f.get("comment"),
+                    "created": f.get("created")
+                }
+                for f in records
+            ],
+            "next_cursor": next_cursor
+        }
+    
+    async def _ensure_search_index(self) -> bool:
+        """
+        Carrega o índice híbrido a partir de `contextual_examples` (uma vez).
+        
+        Returns:
+            True se o índice está pronto para uso
+        """
+        if self._index_loaded:
+            return True
+        
+        async with self._index_lock:
+            if self._index_loaded:
+                return True
+            try:
+                docs = []
+                async for record in self.pb.iter_records(
+                    'contextual_examples', {'sort': '-created'},
+                    fields=",".join((*_INDEX_FIELDS, "updated")), page_size=500
+                ):
+                    docs.append(self._record_to_index_doc(record))
+                    self._advance_index_sync(record.get("updated"))
+                self.search_index.upsert_many(docs)
+                for doc in docs:
+                    self._add_to_dedup_index(doc["id"], doc)
+                self._index_loaded = True
+                logger.info(f"Índice de exemplos carregado: {len(self.search_index)} exemplos")
+            except Exception as e:
+                logger.warning(f"Não foi possível carregar índice de exemplos: {e}")
+        
+        return self._index_loaded
+    
+    def _advance_index_sync(self, updated: Any) -> None:
+        if updated and (self._index_synced_until is None or str(updated) > self._index_synced_until):
+            self._index_synced_until = str(updated)
+    
+    async def sync_search_index(self) -> int:
+        """
+        Traz para o índice os exemplos alterados desde a última carga/sincronização.
+        
+        Com vários workers, cada processo só via as próprias inserções: exemplos
+        salvos (ou votados/recalculados) por outro worker não entravam na busca até
+        reiniciar. Lê apenas `updated >= último visto` (com folga), reindexa os que
+        mudaram de texto e atualiza scores/contadores dos demais.
+        
+        Returns:
+            Número de exemplos lidos
+        """
+        if not self._index_loaded:
+            return 0  # A carga inicial (sob demanda) já lê tudo
+        
+        async with self._index_lock:
+            params: Dict[str, Any] = {'sort': 'updated,id'}
+            if self._index_synced_until:
+                since = _pb_timestamp_minus(self._index_synced_until, _INDEX_SYNC_OVERLAP)
+                params['filter'] = f'updated >= "{since}"'
+            
+            changed_text: List[Dict[str, Any]] = []
+            seen = 0
+            async for record in self.pb.iter_records(
+                'contextual_examples', params,
+                fields=",".join((*_INDEX_FIELDS, "updated")), page_size=500
+            ):
+                seen += 1
+                self._advance_index_sync(record.get("updated"))
+                doc = self._record_to_index_doc(record)
+                current = self.search_index.documents.get(doc["id"])
+                if current is not None and all(current.get(f) == doc.get(f) for f in _INDEX_TEXT_FIELDS):
+                    if any(current.get(f) != doc.get(f) for f in _INDEX_FIELDS):
+                        self.search_index.update_fields(
+                            doc["id"],
+                            **{f: doc.get(f) for f in ("quality_score", "upvotes", "downvotes", "usage_count")}
+                        )
+                        self.topk_cache.invalidate_topics(doc.get("topics") or [], doc.get("language"))
+                    continue
+                changed_text.append(doc)
+            
+            if changed_text:
+                self.search_index.upsert_many(changed_text)
+                for doc in changed_text:
+                    self._add_to_dedup_index(doc["id"], doc)
+                    self.topk_cache.invalidate_topics(doc.get("topics") or [], doc.get("language"))
+                logger.info(f"Índice de exemplos sincronizado: {len(changed_text)} exemplos novos/alterados")
+            return seen
+    
+    def start_index_sync(self) -> None:
+        """Inicia a sincronização periódica do índice (idempotente; intervalo 0 desabilita)."""
+        if self.index_sync_interval_seconds <= 0:
+            return
+        if self._index_sync_task is None or self._index_sync_task.done():
+            self._index_sync_task = asyncio.create_task(self._index_sync_loop())
+    
+    async def stop_index_sync(self) -> None:
+        if self._index_sync_task is not None:
+            self._index_sync_task.cancel()
+            self._index_sync_task = None
+    
+    async def _index_sync_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.index_sync_interval_seconds)
+            try:
+                await self.sync_search_index()
+            except Exception as e:
+                logger.warning(f"Erro na sincronização do índice de exemplos: {e}")
+    
+    @staticmethod
+    def _record_to_index_doc(record: Dict[str, Any]) -> Dict[str, Any]:
+        """Converte um registro do PocketBase (JSON) no formato usado pelo índice."""
+        return {field: record.get(field) for field in _INDEX_FIELDS}
+    
+    @staticmethod
+    def _summarize_example(ex: Dict[str, Any]) -> Dict[str, Any]:
+        """Resumo de um exemplo para listagens (código e explicação truncados)."""
+        code = ex.get("code") or ""
+        explanation = ex.get("explanation") or ""
+        return {
+            "id": ex.get("id"),
+            "title": ex.get("title"),
+            "code": code[:200] + "..." if len(code) > 200 else code,
+            "explanation": explanation[:300] + "..." if len(explanation) > 300 else explanation,
+            "type": ex.get("type"),
+            "language": ex.get("language"),
+            "quality_score": ex.get("quality_score"),
+            "upvotes": ex.get("upvotes"),
+            "topics": ex.get("topics"),
+        }
+    
     async def search_relevant_examples(
         self,
         user_query: str,
         mission_context: Optional[Dict[str, Any]] = None,
         top_k: int = 3,
-        min_quality_score: float = 0.6
+        min_quality_score: float = 0.6,
+        language: Optional[str] = None
     ) -> List[Dict[str, Any]]:
         """
-        Busca exemplos relevantes (preparado para RAG futuro).
+        Busca exemplos relevantes com o índice híbrido (BM25 + vetorial).
         
-        Por enquanto, faz busca simples por tópicos.
-        Quando Qdrant for integrado, usará busca semântica.
+        O score mistura relevância textual, similaridade vetorial,
+        quality_score e frescor. Se o índice não puder ser carregado,
+        faz a busca simples por tópicos direto no PocketBase.
         
         Args:
             user_query: Query do aluno
             mission_context: Contexto da missão
-            methodology: Metodologia educacional
             top_k: Número de exemplos a retornar
             min_quality_score: Score mínimo de qualidade
+            language: Filtra por linguagem (opcional)
         
         Returns:
             Lista de exemplos relevantes
         """
         try:
-            # Extrair tópicos da query
+            if await self._ensure_search_index():
+                mission_topics = (mission_context or {}).get('topics') or []
+                search_text = " ".join([user_query, *[str(t) for t in mission_topics]])
+                hits = self.search_index.search(
+                    search_text,
+                    top_k=top_k,
+                    min_quality_score=min_quality_score,
+                    language=language
+                )
+                logger.info(f"Exemplos encontrados (híbrido): {len(hits)} | Query: {user_query[:50]}")
+                return [self._summarize_example(doc) for _, doc in hits]
+            
+            # Fallback: top-k materializado por tópicos (PocketBase só no cache miss)
             topics = self._extract_topics_from_query(user_query, mission_context)
             
             if not topics:
                 logger.info("Nenhum tópico identificado para busca")
                 return []
             
-            # Buscar exemplos por tópicos (fallback até Qdrant ser integrado)
-            # Criar filtro: qualquer tópico match
-            topic_filters = ' || '.join([f'topics ~ "{topic}"' for topic in topics])
-            filter_query = f'({topic_filters}) && quality_score >= {min_quality_score}'
+            examples = await self.get_top_examples(topics, min_quality_score, language=language, top_k=top_k)
+            logger.info(f"Exemplos encontrados: {len(examples)} | Tópicos: {topics}")
+            return examples
             
-            examples = await self.pb.collection('contextual_examples').get_list(
-                1, top_k,
-                {
-                    'filter': filter_query,
-                    'sort': '-quality_score,-created'
-                }
-            )
-            
-            logger.info(f"Exemplos encontrados: {examples.total_items} | Tópicos: {topics}")
-            
-            return [
-                {
-                    "id": ex.id,
-                    "title": ex.title,
-                    "code": ex.code[:200] + "..." if len(ex.code) > 200 else ex.code,  # Resumo
-                    "explanation": ex.explanation[:300] + "..." if len(ex.explanation) > 300 else ex.explanation,
-                    "type": ex.type,
-                    "language": ex.language,
-                    "quality_score": ex.quality_score,
-                    "upvotes": ex.upvotes,
-                    "topics": ex.topics
-                }
-                for ex in examples.items
-            ]
-            
-        except ClientResponseError as e:
-            logger.error(f"Erro ao buscar exemplos: {e}")
-            return []
         except Exception as e:
             logger.error(f"Erro inesperado ao buscar exemplos: {e}")
             return []
 
 
+    async def get_top_examples(
+        self,
+        topics: List[str],
+        min_quality_score: float = 0.6,
+        language: Optional[str] = None,
+        top_k: int = 3
+    ) -> List[Dict[str, Any]]:
+        """
+        Melhores exemplos para um conjunto de tópicos, servidos do cache materializado.
+        
+        Args:
+            topics: Tópicos (ex.: da missão)
+            min_quality_score: Score mínimo de qualidade
+            language: Filtra por linguagem (opcional)
+            top_k: Número de exemplos a retornar (até TOPK_MATERIALIZED)
+        
+        Returns:
+            Lista de exemplos resumidos, por quality_score e recência
+        """
+        key = make_key(topics, min_quality_score, language)
+        if not key[0]:
+            return []
+        
+        examples = self.topk_cache.get(key)
+        if examples is None:
+            examples = await self._materialize_top_examples(key)
+            self.topk_cache.put(key, examples)
+        return examples[:top_k]
+    
+    async def prewarm_top_examples(self, min_quality_score: float = 0.6) -> int:
+        """
+        Pré-aquece o cache de top-k com os tópicos das missões ativas.
+        
+        Returns:
+            Quantidade de conjuntos de tópicos materializados
+        """
+        try:
+            missions = await self.pb.list_all(
+                'class_missions', {'filter': 'status = "active"'}, fields='id,topics,metadata'
+            )
+        except Exception as e:
+            logger.warning(f"Não foi possível pré-aquecer exemplos por missão: {e}")
+            return 0
+        
+        # Normalizados como a chave do cache: "Loops" e "loops" viram um único conjunto
+        topic_sets = {make_key(self.mission_topics(m), min_quality_score)[0] for m in missions} - {frozenset()}
+        for topics in topic_sets:
+            await self.get_top_examples(list(topics), min_quality_score)
+        logger.info(f"Cache de top-k pré-aquecido: {len(topic_sets)} conjuntos de tópicos")
+        return len(topic_sets)
+    
+    @staticmethod
+    def mission_topics(mission: Dict[str, Any]) -> List[str]:
+        """Tópicos de um registro de `class_missions` (campo `topics` ou `metadata.topics`)."""
+        topics = mission.get("topics")
+        if not topics:
+            metadata = mission.get("metadata") or {}
+            topics = metadata.get("topics") if isinstance(metadata, dict) else None
+        return [str(t) for t in topics or []]
+    
+    async def _materialize_top_examples(self, key) -> List[Dict[str, Any]]:
+        topics, min_quality_score, language = key
+        
+        if await self._ensure_search_index():
+            def matches(doc: Dict[str, Any]) -> bool:
+                doc_topics = {str(t).lower() for t in doc.get("topics") or []}
+                return (
+                    bool(doc_topics & topics)
+                    and (doc.get("quality_score") or 0.0) >= min_quality_score
+                    and (not language or (doc.get("language") or "").lower() == language)
+                )
+            
+            candidates = [doc for doc in self.search_index.documents.values() if matches(doc)]
+            candidates.sort(
+                key=lambda doc: (doc.get("quality_score") or 0.0, str(doc.get("created") or "")),
+                reverse=True
+            )
+            return [self._summarize_example(doc) for doc in candidates[:TOPK_MATERIALIZED]]
+        
+        topic_filters = ' || '.join([f'topics ~ "{topic}"' for topic in sorted(topics)])
+        filter_query = f'({topic_filters}) && quality_score >= {min_quality_score}'
+        if language:
+            filter_query += f' && language = "{language}"'
+        
+        r = await self.pb._get(
+            'contextual_examples',
+            params={
+                'filter': filter_query,
+                'sort': '-quality_score,-created',
+                'page': 1,
+                'perPage': TOPK_MATERIALIZED,
+                'skipTotal': 1
+            },
+            fields=",".join(_INDEX_FIELDS)
+        )
+        r.raise_for_status()
+        return [
+            self._summarize_example(self._record_to_index_doc(ex))
+            for ex in r.json().get("items", [])
+        ]
+    
+    def _on_quality_change(
+        self,
+        example_id: str,
+        quality_score: float,
+        upvotes: Optional[int] = None,
+        downvotes: Optional[int] = None
+    ) -> None:
+        """Reflete novo quality_score no índice e invalida os top-k afetados."""
+        self.search_index.update_quality(example_id, quality_score, upvotes, downvotes)
+        doc = self.search_index.documents.get(example_id)
+        if doc is not None:
+            self.topk_cache.invalidate_topics(doc.get("topics") or [], doc.get("language"))
+        else:
+            self.topk_cache.invalidate_example(example_id)
+
+
 # Singleton para dependency injection
 _examples_rag_service_instance = None
 
-def get_examples_rag_service(pb_client: PocketBase) -> ExamplesRAGService:
+def get_examples_rag_service(pb_client: PocketBaseService) -> ExamplesRAGService:
     """Factory function para criar/reusar instância do serviço."""
     global _examples_rag_service_instance
     
@@ -561,3 +919,11 @@ def get_examples_rag_service(pb_client: PocketBase) -> ExamplesRAGService:
         _examples_rag_service_instance = ExamplesRAGService(pb_client)
     
     return _examples_rag_service_instance
+
+
+async def close_examples_rag_service() -> None:
+    """Grava os votos pendentes da instância compartilhada (chamado no shutdown)."""
+    if _examples_rag_service_instance is not None:
+        await _examples_rag_service_instance.quality_job.stop()
+        await _examples_rag_service_instance.stop_index_sync()
+        await _examples_rag_service_instance.vote_aggregator.close()
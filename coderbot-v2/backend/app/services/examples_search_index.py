@@ -0,0 +1,334 @@
+"""
+Índice híbrido em memória para exemplos contextuais.
+
+Combina duas formas de recuperação sobre os exemplos salvos em
+`contextual_examples`:
+1. BM25 sobre um índice invertido (título, explicação, código e tópicos)
+2. Similaridade vetorial (cosseno) sobre embeddings dos mesmos campos
+
+O score final mistura relevância textual, similaridade vetorial,
+`quality_score` e frescor do exemplo. O índice aceita atualizações
+incrementais (upsert/remoção/atualização de score) para acompanhar
+`save_generated_example` e `update_feedback_score` sem reconstrução.
+"""
+
+import hashlib
+import math
+import re
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Tokens: palavras com acentos e símbolos comuns em nomes de linguagens (c++, c#)
+_TOKEN_PATTERN = re.compile(r"[a-z0-9_áéíóúàãõâêôüç+#]+")
+
+# Pesos de cada campo no BM25 (título conta mais que o corpo)
+FIELD_WEIGHTS = {
+    "title": 2.0,
+    "topics": 2.0,
+    "explanation": 1.0,
+    "code": 1.0,
+}
+
+# Pesos da mistura final
+BLEND_WEIGHTS = {
+    "bm25": 0.45,
+    "vector": 0.30,
+    "quality": 0.15,
+    "freshness": 0.10,
+}
+
+EmbedFunction = Callable[[List[str]], np.ndarray]
+
+
+def tokenize(text: str) -> List[str]:
+    """Tokeniza texto em minúsculas preservando acentos e c++/c#."""
+    if not text:
+        return []
+    return _TOKEN_PATTERN.findall(text.lower())
+
+
+def hashing_embed(texts: List[str], dim: int = 512) -> np.ndarray:
+    """
+    Embedding local por feature hashing de trigramas de caracteres.
+
+    Não depende de serviço externo e tolera variações morfológicas
+    ("função"/"funções") e pequenos erros de digitação.
+
+    Returns:
+        Matriz (len(texts), dim) com linhas normalizadas (L2)
+    """
+    matrix = np.zeros((len(texts), dim), dtype=np.float32)
+    for row, text in enumerate(texts):
+        for token in tokenize(text):
+            padded = f" {token} "
+            for i in range(max(1, len(padded) - 2)):
+                gram = padded[i:i + 3]
+                digest = hashlib.blake2b(gram.encode("utf-8"), digest_size=4).digest()
+                matrix[row, int.from_bytes(digest, "little") % dim] += 1.0
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def days_since(created: Optional[str], now: Optional[datetime] = None) -> int:
+    """Dias desde `created` (ISO do PocketBase); 0 se ausente ou inválido."""
+    if not created:
+        return 0
+    try:
+        created_at = datetime.fromisoformat(str(created).replace("Z", "+00:00"))
+    except ValueError:
+        return 0
+    if created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    now = now or datetime.now(timezone.utc)
+    return max(0, (now - created_at).days)
+
+
+def freshness_factor(created: Optional[str], now: Optional[datetime] = None) -> float:
+    """Mesmo decaimento usado no quality_score: cai até 0.7 em 36 dias."""
+    return max(0.7, 1.0 - (days_since(created, now) / 120))
+
+
+class HybridExampleIndex:
+    """Índice BM25 + vetorial com atualização incremental."""
+
+    def __init__(
+        self,
+        embed_fn: Optional[EmbedFunction] = None,
+        k1: float = 1.5,
+        b: float = 0.75,
+        vector_candidates: int = 50,
+        min_vector_similarity: float = 0.15,
+    ):
+        """
+        Inicializa o índice vazio.
+
+        Args:
+            embed_fn: Função que recebe textos e devolve matriz normalizada.
+                      Padrão: `hashing_embed` (local, sem rede)
+            k1: Saturação de frequência do BM25
+            b: Normalização por tamanho de documento do BM25
+            vector_candidates: Quantos vizinhos vetoriais entram na mistura
+            min_vector_similarity: Similaridade mínima para um candidato vetorial
+        """
+        self.embed_fn = embed_fn or hashing_embed
+        self.k1 = k1
+        self.b = b
+        self.vector_candidates = vector_candidates
+        self.min_vector_similarity = min_vector_similarity
+
+        self.documents: Dict[str, Dict[str, Any]] = {}
+        self._postings: Dict[str, Dict[str, float]] = defaultdict(dict)
+        self._doc_terms: Dict[str, Counter] = {}
+        self._doc_lengths: Dict[str, float] = {}
+        self._total_length = 0.0
+
+        self._rows: Dict[str, int] = {}
+        self._row_ids: List[Optional[str]] = []
+        self._vectors: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    def __contains__(self, example_id: str) -> bool:
+        return example_id in self.documents
+
+    # ---- Atualização ----
+
+    def upsert(self, example: Dict[str, Any]) -> None:
+        """Insere ou substitui um exemplo (precisa de `id`)."""
+        self.upsert_many([example])
+
+    def upsert_many(self, examples: List[Dict[str, Any]]) -> None:
+        """Carga em lote: calcula todos os embeddings numa chamada só."""
+        examples = [ex for ex in examples if ex.get("id")]
+        if not examples:
+            return
+        for example in examples:
+            example_id = example["id"]
+            if example_id in self.documents:
+                self._remove_terms(example_id)
+            self.documents[example_id] = dict(example)
+            terms = self._weighted_terms(example)
+            self._doc_terms[example_id] = terms
+            length = float(sum(terms.values()))
+            self._doc_lengths[example_id] = length
+            self._total_length += length
+            for term, freq in terms.items():
+                self._postings[term][example_id] = freq
+
+        vectors = self.embed_fn([self._document_text(ex) for ex in examples])
+        for example, vector in zip(examples, vectors):
+            self._store_vector(example["id"], vector)
+
+    def remove(self, example_id: str) -> None:
+        """Remove um exemplo do índice (no-op se não existir)."""
+        if example_id not in self.documents:
+            return
+        self._remove_terms(example_id)
+        del self.documents[example_id]
+        row = self._rows.pop(example_id, None)
+        if row is not None and self._vectors is not None:
+            self._vectors[row] = 0.0
+            self._row_ids[row] = None
+
+    def update_fields(self, example_id: str, **fields: Any) -> None:
+        """Atualiza campos que não afetam o texto (quality_score, votos, uso)."""
+        doc = self.documents.get(example_id)
+        if doc is None:
+            return
+        doc.update({k: v for k, v in fields.items() if v is not None})
+
+    def update_quality(
+        self,
+        example_id: str,
+        quality_score: float,
+        upvotes: Optional[int] = None,
+        downvotes: Optional[int] = None,
+    ) -> None:
+        """Atalho para refletir um novo quality_score após feedback."""
+        self.update_fields(
+            example_id,
+            quality_score=quality_score,
+            upvotes=upvotes,
+            downvotes=downvotes,
+        )
+
+    # ---- Busca ----
+
+    def search(
+        self,
+        query: str,
+        top_k: int = 3,
+        min_quality_score: float = 0.0,
+        language: Optional[str] = None,
+        now: Optional[datetime] = None,
+    ) -> List[Tuple[float, Dict[str, Any]]]:
+        """
+        Busca híbrida.
+
+        Args:
+            query: Texto da busca (query do aluno + tópicos da missão)
+            top_k: Número máximo de resultados
+            min_quality_score: Exemplos abaixo deste score são ignorados
+            language: Se informado, restringe à linguagem do exemplo
+            now: Referência de tempo para o frescor (testes)
+
+        Returns:
+            Lista de (score, exemplo) em ordem decrescente de score
+        """
+        if not self.documents or top_k <= 0:
+            return []
+
+        bm25_scores = self._bm25(tokenize(query))
+        vector_scores = self._vector_scores(query)
+
+        candidates = set(bm25_scores) | set(vector_scores)
+        if not candidates:
+            return []
+
+        max_bm25 = max(bm25_scores.values(), default=0.0) or 1.0
+        lang = language.lower() if language else None
+        results: List[Tuple[float, Dict[str, Any]]] = []
+        for example_id in candidates:
+            doc = self.documents.get(example_id)
+            if doc is None:
+                continue
+            quality = float(doc.get("quality_score") or 0.0)
+            if quality < min_quality_score:
+                continue
+            if lang and str(doc.get("language", "")).lower() != lang:
+                continue
+            score = (
+                BLEND_WEIGHTS["bm25"] * (bm25_scores.get(example_id, 0.0) / max_bm25)
+                + BLEND_WEIGHTS["vector"] * vector_scores.get(example_id, 0.0)
+                + BLEND_WEIGHTS["quality"] * quality
+                + BLEND_WEIGHTS["freshness"] * freshness_factor(doc.get("created"), now)
+            )
+            results.append((score, doc))
+
+        results.sort(key=lambda item: item[0], reverse=True)
+        return results[:top_k]
+
+    # ---- Internos ----
+
+    def _weighted_terms(self, example: Dict[str, Any]) -> Counter:
+        terms: Counter = Counter()
+        for field, weight in FIELD_WEIGHTS.items():
+            value = example.get(field)
+            if isinstance(value, (list, tuple)):
+                value = " ".join(str(v) for v in value)
+            for token in tokenize(value or ""):
+                terms[token] += weight
+        return terms
+
+    @staticmethod
+    def _document_text(example: Dict[str, Any]) -> str:
+        topics = example.get("topics") or []
+        if isinstance(topics, (list, tuple)):
+            topics = " ".join(str(t) for t in topics)
+        return " ".join(
+            str(part)
+            for part in (example.get("title"), topics, example.get("explanation"), example.get("code"))
+            if part
+        )
+
+    def _remove_terms(self, example_id: str) -> None:
+        for term in self._doc_terms.pop(example_id, {}):
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(example_id, None)
+                if not postings:
+                    del self._postings[term]
+        self._total_length -= self._doc_lengths.pop(example_id, 0.0)
+
+    def _bm25(self, query_terms: List[str]) -> Dict[str, float]:
+        n_docs = len(self.documents)
+        avg_length = (self._total_length / n_docs) if n_docs else 0.0
+        scores: Dict[str, float] = defaultdict(float)
+        for term in set(query_terms):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            df = len(postings)
+            idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+            for example_id, freq in postings.items():
+                length_norm = 1 - self.b + self.b * (self._doc_lengths[example_id] / (avg_length or 1.0))
+                scores[example_id] += idf * (freq * (self.k1 + 1)) / (freq + self.k1 * length_norm)
+        return scores
+
+    def _vector_scores(self, query: str) -> Dict[str, float]:
+        if self._vectors is None or not self._rows:
+            return {}
+        query_vector = self.embed_fn([query])[0]
+        if not np.any(query_vector):
+            return {}
+        n_rows = len(self._row_ids)
+        similarities = self._vectors[:n_rows] @ query_vector
+        k = min(self.vector_candidates, n_rows)
+        top_rows = np.argpartition(-similarities, k - 1)[:k]
+        scores: Dict[str, float] = {}
+        for row in top_rows:
+            example_id = self._row_ids[row]
+            similarity = float(similarities[row])
+            if example_id is not None and similarity >= self.min_vector_similarity:
+                scores[example_id] = similarity
+        return scores
+
+    def _store_vector(self, example_id: str, vector: np.ndarray) -> None:
+        vector = np.asarray(vector, dtype=np.float32)
+        if self._vectors is None:
+            self._vectors = np.zeros((64, vector.shape[0]), dtype=np.float32)
+        row = self._rows.get(example_id)
+        if row is None:
+            row = len(self._row_ids)
+            if row >= self._vectors.shape[0]:
+                grown = np.zeros((self._vectors.shape[0] * 2, self._vectors.shape[1]), dtype=np.float32)
+                grown[: self._vectors.shape[0]] = self._vectors
+                self._vectors = grown
+            self._rows[example_id] = row
+            self._row_ids.append(example_id)
+        self._vectors[row] = vector
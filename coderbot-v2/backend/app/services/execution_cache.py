@@ -0,0 +1,114 @@
+"""
+Cache endereçado por conteúdo dos resultados de execução de código.
+
+Soluções de referência dos professores e trechos dos worked examples são
+executados repetidamente com o mesmo código e a mesma entrada, e cada execução
+ocupava o sandbox. Aqui o resultado bruto do executor fica em memória por
+(linguagem, versão resolvida, SHA-256 do código, SHA-256 do stdin), numa LRU
+limitada por quantidade e por bytes. Só execuções que terminaram normalmente
+(compilação ok, saída 0, sem sinal ou timeout) são guardadas; a requisição pode
+pedir para ignorar o cache.
+"""
+
+import hashlib
+import json
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from app.config import settings
+
+ExecutionKey = Tuple[str, str, str, str]
+
+
+def make_key(language: str, version: str, code: str, stdin: str) -> ExecutionKey:
+    return (
+        language,
+        str(version),
+        hashlib.sha256((code or "").encode()).hexdigest(),
+        hashlib.sha256((stdin or "").encode()).hexdigest(),
+    )
+
+
+def completed_normally(data: Dict[str, Any]) -> bool:
+    """Compilou (se houver etapa), terminou com código 0 e sem sinal/timeout."""
+    compile_stage = data.get("compile") or {}
+    if compile_stage.get("code") not in (None, 0):
+        return False
+    run = data.get("run") or {}
+    return run.get("code") == 0 and not run.get("signal") and run.get("status") in (None, "")
+
+
+class ExecutionCache:
+    """LRU limitada por entradas e por bytes aproximados (JSON do resultado)."""
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 16 * 1024 * 1024):
+        """
+        Args:
+            max_entries: Resultados mantidos
+            max_bytes: Soma aproximada do tamanho dos resultados; entradas maiores que isso não entram
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[ExecutionKey, Tuple[int, Dict[str, Any]]]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: ExecutionKey) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key: ExecutionKey, data: Dict[str, Any]) -> bool:
+        """Guarda o resultado se a execução terminou normalmente e cabe no limite."""
+        if not completed_normally(data):
+            return False
+        size = len(json.dumps(data, default=str))
+        if size > self.max_bytes:
+            return False
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._bytes -= previous[0]
+        self._entries[key] = (size, data)
+        self._bytes += size
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            _, (evicted_size, _) = self._entries.popitem(last=False)
+            self._bytes -= evicted_size
+        return True
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
+
+
+_execution_cache_instance: Optional[ExecutionCache] = None
+
+
+def get_execution_cache() -> Optional[ExecutionCache]:
+    """Cache compartilhado do processo (None se desabilitado nas configurações)."""
+    global _execution_cache_instance
+    if not settings.execution_cache_enabled:
+        return None
+    if _execution_cache_instance is None:
+        _execution_cache_instance = ExecutionCache(
+            max_entries=settings.execution_cache_max_entries,
+            max_bytes=settings.execution_cache_max_bytes,
+        )
+    return _execution_cache_instance
@@ -0,0 +1,534 @@
+"""
+Backend local de execução para Python e JavaScript.
+
+Com o Piston público cada execução paga latência de internet e limites de
+taxa. Aqui o código roda em subprocessos do próprio servidor:
+
+- cada execução usa um worker de uso único, já iniciado (interpretador
+  carregado) e à espera do trabalho num pipe de controle; o pool é reposto em
+  segundo plano, então a execução não paga a partida do interpretador;
+- o worker roda com um uid próprio, sem privilégios, tirado de uma faixa
+  dedicada (`uid_base`...): não lê `/proc/<servidor>/environ` nem segue
+  `/proc/<servidor>/cwd`, e não envia sinais ao servidor. Por isso o servidor
+  precisa rodar como root (no container) para trocar de uid; sem isso o
+  backend local fica indisponível e tudo vai para o Piston;
+- o worker nasce com rlimits (CPU, memória, tamanho de arquivo, processos),
+  ambiente mínimo (nenhuma variável do servidor, como chaves de API), sessão
+  própria e diretório de trabalho temporário por execução;
+- um timeout de relógio mata todos os processos do uid do worker, inclusive
+  os que saíram da sessão com `setsid()`;
+- o pico de memória (ru_maxrss) e o tempo de CPU voltam por um segundo pipe e
+  preenchem `memory` (bytes), como no Piston.
+
+O uid separado protege o servidor, mas não é um sandbox completo (rede e
+arquivos legíveis por todos continuam acessíveis): este backend é para
+ambientes de laboratório controlados, não para código hostil na internet.
+"""
+
+import asyncio
+import functools
+import json
+import logging
+import os
+import resource
+import shutil
+import signal
+import sys
+import tempfile
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from app.config import settings
+from app.services.code_executor import CodeExecutor, ExecutorError
+
+logger = logging.getLogger(__name__)
+
+# Workers leem o trabalho ({"workdir": ...}) do fd de controle até EOF e, ao sair,
+# escrevem {"memory_kb", "cpu_ms"} no fd de relatório; os dois fds vêm em argv.
+# memory_kb é o pico de RSS do processo (inclui o interpretador, como no Piston);
+# cpu_ms conta só o código do aluno.
+PYTHON_RUNNER = r"""
+import json, os, resource, runpy, sys, traceback
+control_fd, report_fd = int(sys.argv[1]), int(sys.argv[2])
+chunks = []
+while True:
+    chunk = os.read(control_fd, 65536)
+    if not chunk:
+        break
+    chunks.append(chunk)
+os.close(control_fd)
+job = json.loads(b"".join(chunks) or b"{}")
+os.chdir(job["workdir"])
+sys.argv = ["main.py"]
+sys.path.insert(0, job["workdir"])
+before = resource.getrusage(resource.RUSAGE_SELF)
+code = 0
+try:
+    runpy.run_path("main.py", run_name="__main__")
+except SystemExit as e:
+    if e.code is None or isinstance(e.code, int):
+        code = e.code or 0
+    else:
+        print(e.code, file=sys.stderr)
+        code = 1
+except BaseException as e:
+    tb = e.__traceback__
+    while tb is not None and tb.tb_frame.f_code.co_filename != "main.py":
+        tb = tb.tb_next
+    traceback.print_exception(type(e), e, tb)
+    code = 1
+for stream in (sys.stdout, sys.stderr):
+    try:
+        stream.flush()
+    except Exception:
+        pass
+usage = resource.getrusage(resource.RUSAGE_SELF)
+try:
+    os.write(report_fd, json.dumps({
+        "memory_kb": usage.ru_maxrss,
+        "cpu_ms": round((usage.ru_utime + usage.ru_stime - before.ru_utime - before.ru_stime) * 1000, 1),
+    }).encode())
+except OSError:
+    pass
+os._exit(code)
+"""
+
+NODE_RUNNER = r"""
+const fs = require('fs');
+const path = require('path');
+const [controlFd, reportFd] = process.argv.slice(-2).map(Number);
+const buf = Buffer.alloc(65536);
+let raw = '';
+let n;
+while ((n = fs.readSync(controlFd, buf, 0, buf.length, null)) > 0) raw += buf.toString('utf8', 0, n);
+fs.closeSync(controlFd);
+const job = JSON.parse(raw || '{}');
+process.chdir(job.workdir);
+const before = process.cpuUsage();
+process.on('exit', () => {
+  const usage = process.resourceUsage();
+  const cpu = process.cpuUsage(before);
+  try {
+    fs.writeSync(reportFd, JSON.stringify({
+      memory_kb: usage.maxRSS,
+      cpu_ms: Math.round((cpu.user + cpu.system) / 100) / 10,
+    }));
+  } catch (e) {}
+});
+require(path.join(job.workdir, 'main.js'));
+"""
+
+SOURCE_FILES = {"python": "main.py", "javascript": "main.js"}
+
+
+@dataclass(slots=True)
+class _Worker:
+    process: asyncio.subprocess.Process
+    control_fd: int
+    report_fd: int
+    uid: int
+
+
+def _cap(limit: int, value: int) -> Tuple[int, int]:
+    """Não pede acima do limite rígido atual (processo sem privilégio não pode subir)."""
+    _, hard = resource.getrlimit(limit)
+    if hard != resource.RLIM_INFINITY:
+        value = min(value, hard)
+    return value, value
+
+
+def _apply_rlimits(limits: List[Tuple[int, Tuple[int, int]]]) -> None:
+    """preexec_fn: roda no filho entre o fork e o exec, então só chama setrlimit (sem imports nem locks)."""
+    for limit, value in limits:
+        resource.setrlimit(limit, value)
+
+
+def _uid_processes(uid: int) -> List[int]:
+    """PIDs vivos (não zumbis) cujo uid real ou efetivo é `uid`."""
+    pids = []
+    for entry in os.scandir("/proc"):
+        if not entry.name.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry.name}/status", encoding="utf-8") as f:
+                status = dict(line.split(":", 1) for line in f if ":" in line)
+        except OSError:
+            continue
+        uids = status.get("Uid", "").split()[:2]
+        if str(uid) in uids and not status.get("State", "").strip().startswith(("Z", "X")):
+            pids.append(int(entry.name))
+    return pids
+
+
+def _kill_uid(uid: int, max_rounds: int = 100) -> None:
+    """
+    SIGKILL em todos os processos do uid de sandbox.
+
+    Ao contrário de `killpg`, alcança processos que criaram outra sessão com
+    `setsid()`. Repete até não sobrar nenhum: filhos criados durante uma varredura
+    entram na seguinte (RLIMIT_NPROC limita quantos podem existir).
+    """
+    for _ in range(max_rounds):
+        pids = _uid_processes(uid)
+        if not pids:
+            return
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+    logger.warning(f"Processos do uid de sandbox {uid} sobreviveram a {max_rounds} rodadas de SIGKILL")
+
+
+class LocalExecutor(CodeExecutor):
+    """Execução local com pool de workers pré-iniciados por linguagem."""
+
+    name = "local"
+
+    def __init__(
+        self,
+        python_command: Optional[str] = None,
+        node_command: str = "node",
+        pool_size: int = 2,
+        max_concurrency: int = 4,
+        timeout_seconds: float = 5.0,
+        cpu_seconds: int = 3,
+        memory_mb: int = 256,
+        file_size_kb: int = 1024,
+        max_processes: int = 512,
+        max_output_kb: int = 64,
+        uid_base: int = 61000,
+        gid: int = 61000,
+    ):
+        """
+        Args:
+            python_command: Interpretador Python dos alunos (padrão: o do servidor)
+            node_command: Executável do Node.js
+            pool_size: Workers prontos mantidos por linguagem
+            max_concurrency: Execuções simultâneas
+            timeout_seconds: Tempo de relógio máximo de uma execução
+            cpu_seconds: RLIMIT_CPU
+            memory_mb: RLIMIT_AS no Python; no Node vira --max-old-space-size (o V8
+                reserva espaço de endereçamento demais para RLIMIT_AS)
+            file_size_kb: RLIMIT_FSIZE
+            max_processes: RLIMIT_NPROC (por uid, e cada worker tem o seu; conta threads)
+            max_output_kb: stdout/stderr além disso são truncados
+            uid_base: Primeiro uid da faixa de sandbox; cada worker vivo usa um uid
+                exclusivo (a faixa tem um uid por worker do pool e por execução
+                simultânea) e nenhum deve pertencer a outro serviço
+            gid: Grupo sem privilégios dos workers
+        """
+        self.commands: Dict[str, List[str]] = {
+            "python": [python_command or sys.executable, "-I", "-c", PYTHON_RUNNER],
+            "javascript": [node_command, f"--max-old-space-size={memory_mb}", "-e", NODE_RUNNER],
+        }
+        self.pool_size = pool_size
+        self.timeout_seconds = timeout_seconds
+        self.cpu_seconds = cpu_seconds
+        self.memory_mb = memory_mb
+        self.file_size_kb = file_size_kb
+        self.max_processes = max_processes
+        self.max_output_bytes = max_output_kb * 1024
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._idle: Dict[str, Deque[_Worker]] = {language: deque() for language in self.commands}
+        self._spawning: Dict[str, int] = {language: 0 for language in self.commands}
+        self._versions: Dict[str, str] = {}
+        self._unavailable: set = set()
+        self._fill_tasks: set = set()
+        self.cold_starts = 0
+        self.uid_base = uid_base
+        self.gid = gid
+        self._free_uids: Deque[int] = deque(
+            range(uid_base, uid_base + pool_size * len(self.commands) + max_concurrency)
+        )
+        # Calculados aqui: o preexec_fn só aplica os valores prontos
+        self._rlimits = {language: self._resource_limits(language) for language in self.commands}
+        if os.geteuid() != 0:
+            logger.warning("Executor local desabilitado: o servidor não roda como root e não pode trocar para o uid de sandbox")
+            self._unavailable.update(self.commands)
+
+    def supports(self, language: str) -> bool:
+        return language in self.commands and language not in self._unavailable
+
+    async def resolve_version(self, language: str) -> Optional[str]:
+        if not self.supports(language):
+            return None
+        if language not in self._versions:
+            probe = {
+                "python": [self.commands["python"][0], "-c", "import platform; print(platform.python_version())"],
+                "javascript": [self.commands["javascript"][0], "--version"],
+            }[language]
+            try:
+                # Como o uid de sandbox: o interpretador precisa ser acessível a ele
+                process = await asyncio.create_subprocess_exec(
+                    *probe, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL,
+                    user=self.uid_base, group=self.gid, extra_groups=[],
+                )
+                out, _ = await process.communicate()
+            except OSError as e:
+                logger.warning(f"Interpretador local para {language} indisponível: {e}")
+                self._unavailable.add(language)
+                return None
+            self._versions[language] = out.decode().strip().lstrip("v") or "local"
+        return self._versions[language]
+
+    # ---- Pool de workers ----
+
+    def _resource_limits(self, language: str) -> List[Tuple[int, Tuple[int, int]]]:
+        limits = [
+            (resource.RLIMIT_CPU, _cap(resource.RLIMIT_CPU, self.cpu_seconds)),
+            (resource.RLIMIT_FSIZE, _cap(resource.RLIMIT_FSIZE, self.file_size_kb * 1024)),
+            (resource.RLIMIT_NPROC, _cap(resource.RLIMIT_NPROC, self.max_processes)),
+            (resource.RLIMIT_CORE, (0, 0)),
+        ]
+        if language == "python":
+            limits.append((resource.RLIMIT_AS, _cap(resource.RLIMIT_AS, self.memory_mb * 1024 * 1024)))
+        return limits
+
+    async def _spawn(self, language: str) -> _Worker:
+        if not self._free_uids:
+            raise ExecutorError("Nenhum uid de sandbox livre para um novo worker")
+        uid = self._free_uids.popleft()
+        control_read, control_write = os.pipe()
+        report_read, report_write = os.pipe()
+        env = {
+            "PATH": os.environ.get("PATH", "/usr/bin:/bin"),
+            "LANG": "C.UTF-8",
+            "PYTHONIOENCODING": "utf-8",
+            "PYTHONDONTWRITEBYTECODE": "1",
+            "HOME": tempfile.gettempdir(),
+        }
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *self.commands[language], str(control_read), str(report_write),
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                pass_fds=(control_read, report_write),
+                preexec_fn=functools.partial(_apply_rlimits, self._rlimits[language]),
+                start_new_session=True,
+                user=uid,
+                group=self.gid,
+                extra_groups=[],
+                env=env,
+                cwd=tempfile.gettempdir(),
+            )
+        except OSError as e:
+            for fd in (control_read, control_write, report_read, report_write):
+                os.close(fd)
+            self._free_uids.append(uid)
+            if isinstance(e, FileNotFoundError):
+                self._unavailable.add(language)
+            raise ExecutorError(f"Não foi possível iniciar o interpretador {language}: {e}") from e
+        # Só o filho mantém a leitura do controle e a escrita do relatório
+        os.close(control_read)
+        os.close(report_write)
+        return _Worker(process, control_write, report_read, uid)
+
+    async def _fill(self, language: str) -> None:
+        while len(self._idle[language]) + self._spawning[language] < self.pool_size:
+            self._spawning[language] += 1
+            try:
+                self._idle[language].append(await self._spawn(language))
+            except ExecutorError as e:
+                logger.warning(f"Pool local de {language} não reposto: {e}")
+                return
+            finally:
+                self._spawning[language] -= 1
+
+    def _schedule_fill(self, language: str) -> None:
+        task = asyncio.create_task(self._fill(language))
+        self._fill_tasks.add(task)
+        task.add_done_callback(self._fill_tasks.discard)
+
+    async def _acquire(self, language: str) -> _Worker:
+        idle = self._idle[language]
+        while idle:
+            worker = idle.popleft()
+            if worker.process.returncode is None:
+                self._schedule_fill(language)
+                return worker
+            await self._release(worker)
+        self.cold_starts += 1
+        worker = await self._spawn(language)
+        self._schedule_fill(language)
+        return worker
+
+    async def _release(self, worker: _Worker) -> None:
+        """Encerra o worker (e tudo o que ele criou) e devolve o uid à faixa livre."""
+        await asyncio.to_thread(_kill_uid, worker.uid)
+        try:
+            await worker.process.wait()
+        except Exception:
+            pass
+        for fd in (worker.control_fd, worker.report_fd):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+        self._free_uids.append(worker.uid)
+
+    # ---- Execução ----
+
+    async def execute(self, language: str, version: str, source_code: str, stdin: str = "") -> Dict[str, Any]:
+        if not self.supports(language):
+            raise ExecutorError(f"Linguagem não suportada localmente: {language}")
+        async with self._semaphore:
+            worker = await self._acquire(language)
+            workdir = tempfile.mkdtemp(prefix="coderbot-run-")
+            try:
+                source_path = os.path.join(workdir, SOURCE_FILES[language])
+                with open(source_path, "w", encoding="utf-8") as f:
+                    f.write(source_code)
+                for path in (workdir, source_path):
+                    os.chown(path, worker.uid, self.gid)
+                return await self._run(worker, workdir, language, version, stdin)
+            finally:
+                await self._release(worker)
+                shutil.rmtree(workdir, ignore_errors=True)
+
+    async def _run(self, worker: _Worker, workdir: str, language: str, version: str, stdin: str) -> Dict[str, Any]:
+        process = worker.process
+        stdout_task = asyncio.create_task(self._read_limited(process.stdout))
+        stderr_task = asyncio.create_task(self._read_limited(process.stderr))
+        stdin_task = asyncio.create_task(self._feed(process.stdin, (stdin or "").encode()))
+
+        started = time.perf_counter()
+        os.write(worker.control_fd, json.dumps({"workdir": workdir}).encode())
+        os.close(worker.control_fd)
+        worker.control_fd = -1
+
+        timed_out = False
+        try:
+            await asyncio.wait_for(process.wait(), self.timeout_seconds)
+        except asyncio.TimeoutError:
+            timed_out = True
+            await asyncio.to_thread(_kill_uid, worker.uid)
+            await process.wait()
+        wall_ms = round((time.perf_counter() - started) * 1000, 1)
+
+        # Processos filhos do aluno podem segurar os pipes: não espera por eles além do uid
+        await asyncio.to_thread(_kill_uid, worker.uid)
+        try:
+            (stdout, out_truncated), (stderr, err_truncated) = await asyncio.wait_for(
+                asyncio.gather(stdout_task, stderr_task), 1.0
+            )
+        except asyncio.TimeoutError:
+            stdout_task.cancel()
+            stderr_task.cancel()
+            (stdout, out_truncated), (stderr, err_truncated) = (b"", False), (b"", False)
+        stdin_task.cancel()
+
+        report = self._read_report(worker.report_fd)
+        returncode = process.returncode
+        signal_name = None
+        if returncode is not None and returncode < 0:
+            try:
+                signal_name = signal.Signals(-returncode).name
+            except ValueError:
+                signal_name = f"SIG{-returncode}"
+        if timed_out:
+            signal_name = "SIGKILL"
+
+        stdout_text = stdout.decode("utf-8", errors="replace")
+        stderr_text = stderr.decode("utf-8", errors="replace")
+        status = "TO" if timed_out else ("SG" if signal_name else None)
+        message = None
+        if out_truncated or err_truncated:
+            message = f"Saída truncada em {self.max_output_bytes // 1024} KB"
+        return {
+            "language": language,
+            "version": version,
+            "run": {
+                "stdout": stdout_text,
+                "stderr": stderr_text,
+                "output": stdout_text + stderr_text,
+                "code": None if signal_name else returncode,
+                "signal": signal_name,
+                "status": status,
+                "message": message,
+                "memory": report["memory_kb"] * 1024 if report.get("memory_kb") is not None else None,
+                "cpu_time": report.get("cpu_ms"),
+                "wall_time": wall_ms,
+            },
+        }
+
+    async def _read_limited(self, stream: asyncio.StreamReader) -> Tuple[bytes, bool]:
+        """Lê até EOF guardando no máximo `max_output_bytes` (o resto é descartado, sem travar o filho)."""
+        kept = bytearray()
+        truncated = False
+        while True:
+            chunk = await stream.read(65536)
+            if not chunk:
+                return bytes(kept), truncated
+            room = self.max_output_bytes - len(kept)
+            if room > 0:
+                kept.extend(chunk[:room])
+            if len(chunk) > room:
+                truncated = True
+
+    @staticmethod
+    async def _feed(writer: asyncio.StreamWriter, data: bytes) -> None:
+        try:
+            if data:
+                writer.write(data)
+                await writer.drain()
+            writer.close()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    @staticmethod
+    def _read_report(fd: int) -> Dict[str, Any]:
+        try:
+            os.set_blocking(fd, False)
+            raw = os.read(fd, 65536)
+            return json.loads(raw) if raw else {}
+        except (BlockingIOError, OSError, ValueError):
+            return {}
+
+    # ---- Ciclo de vida ----
+
+    def start(self) -> None:
+        """Pré-inicia os workers de cada linguagem."""
+        for language in self.commands:
+            self._schedule_fill(language)
+
+    async def close(self) -> None:
+        for task in list(self._fill_tasks):
+            task.cancel()
+        for language, idle in self._idle.items():
+            while idle:
+                await self._release(idle.popleft())
+
+
+_local_executor_instance: Optional[LocalExecutor] = None
+
+
+def get_local_executor() -> LocalExecutor:
+    """Retorna o executor local compartilhado do processo."""
+    global _local_executor_instance
+    if _local_executor_instance is None:
+        _local_executor_instance = LocalExecutor(
+            python_command=settings.local_executor_python or None,
+            node_command=settings.local_executor_node,
+            pool_size=settings.local_executor_pool_size,
+            max_concurrency=settings.local_executor_concurrency,
+            timeout_seconds=settings.local_executor_timeout_seconds,
+            cpu_seconds=settings.local_executor_cpu_seconds,
+            memory_mb=settings.local_executor_memory_mb,
+            file_size_kb=settings.local_executor_file_size_kb,
+            max_processes=settings.local_executor_max_processes,
+            max_output_kb=settings.local_executor_max_output_kb,
+            uid_base=settings.local_executor_uid_base,
+            gid=settings.local_executor_gid,
+        )
+    return _local_executor_instance
+
+
+async def close_local_executor() -> None:
+    global _local_executor_instance
+    if _local_executor_instance is not None:
+        await _local_executor_instance.close()
+        _local_executor_instance = None
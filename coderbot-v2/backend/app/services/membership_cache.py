@@ -0,0 +1,141 @@
+"""
+Cache read-through das checagens de autorização por turma (professor/membro).
+
+Quase toda rota de turmas começa com `is_user_class_teacher` e/ou
+`is_user_class_member`, cada uma uma consulta ao PocketBase; uma carga de
+página repetia as mesmas consultas várias vezes. Aqui a resposta fica em
+memória por (class_id, user_id, tipo) com TTL curto, respostas negativas
+também são guardadas (com TTL menor) e consultas idênticas simultâneas
+compartilham a mesma ida ao PocketBase. Escritas de membros/turmas invalidam
+as entradas explicitamente.
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Set, Tuple
+
+MembershipKey = Tuple[str, str, str]
+
+
+class MembershipCache:
+    """TTL por (class_id, user_id, kind) com cache negativo e single-flight."""
+
+    def __init__(self, ttl_seconds: float = 30.0, negative_ttl_seconds: float = 5.0, max_entries: int = 10000):
+        """
+        Args:
+            ttl_seconds: Validade de uma resposta positiva
+            negative_ttl_seconds: Validade de uma resposta negativa (0 desabilita o cache negativo)
+            max_entries: Limite de entradas (LRU)
+        """
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[MembershipKey, Tuple[float, bool]]" = OrderedDict()
+        self._by_class: Dict[str, Set[MembershipKey]] = {}
+        self._inflight: Dict[MembershipKey, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, class_id: str, user_id: str, kind: str) -> Optional[bool]:
+        key = (class_id, user_id, kind)
+        entry = self._entries.get(key)
+        if entry is None or time.monotonic() >= entry[0]:
+            if entry is not None:
+                self._discard(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, class_id: str, user_id: str, kind: str, value: bool) -> None:
+        ttl = self.ttl_seconds if value else self.negative_ttl_seconds
+        if ttl <= 0:
+            return
+        key = (class_id, user_id, kind)
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        self._by_class.setdefault(class_id, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            self._discard(next(iter(self._entries)))
+
+    async def get_or_load(
+        self,
+        class_id: str,
+        user_id: str,
+        kind: str,
+        loader: Callable[[], Awaitable[bool]],
+    ) -> bool:
+        """Responde do cache; numa falta, uma única chamada a `loader` atende todos os concorrentes."""
+        cached = self.get(class_id, user_id, kind)
+        if cached is not None:
+            return cached
+        key = (class_id, user_id, kind)
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            try:
+                return await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                if not inflight.cancelled():
+                    raise
+                # Quem fazia a consulta foi cancelado: consulta por conta própria
+                return bool(await loader())
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = bool(await loader())
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # evita "exception was never retrieved" sem concorrentes
+            raise
+        else:
+            # Invalidação durante a consulta descarta o resultado (pode estar desatualizado)
+            if self._inflight.get(key) is future:
+                self.put(class_id, user_id, kind, value)
+            future.set_result(value)
+            return value
+        finally:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    def invalidate(self, class_id: str, user_id: Optional[str] = None) -> int:
+        """
+        Remove as entradas de uma turma (de um usuário, ou de todos).
+
+        Returns:
+            Quantidade de entradas removidas
+        """
+        keys = [key for key in self._by_class.get(class_id, ()) if user_id is None or key[1] == user_id]
+        for key in keys:
+            self._discard(key)
+        for key in [key for key in self._inflight if key[0] == class_id and (user_id is None or key[1] == user_id)]:
+            del self._inflight[key]
+        return len(keys)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._by_class.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
+
+    def _discard(self, key: MembershipKey) -> None:
+        self._entries.pop(key, None)
+        class_keys = self._by_class.get(key[0])
+        if class_keys is not None:
+            class_keys.discard(key)
+            if not class_keys:
+                del self._by_class[key[0]]
@@ -0,0 +1,233 @@
+"""
+Hub em processo para entrega push de notificações (SSE).
+
+O frontend fazia polling de `/notifications/unread-count`, e cada poll era uma
+contagem no PocketBase. Aqui cada aba aberta assina uma fila por usuário;
+`PocketBaseService` publica deltas ao criar/atualizar/marcar/excluir
+notificações e um listener do realtime do PocketBase (`/api/realtime`) traz as
+escritas feitas por outros workers. Antes de enviar uma escrita, o serviço
+registra o eco esperado (`expect_echo`): a mensagem do realtime correspondente
+é descartada mesmo que chegue antes da resposta HTTP, então nada é entregue
+duas vezes.
+"""
+
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Escritas locais ficam marcadas por alguns segundos para descartar o eco do realtime
+_ECHO_WINDOW_SECONDS = 10.0
+_MAX_RECENT_EVENTS = 5000
+
+
+def _echo_key(action: str, record: Dict[str, Any]) -> Tuple[Any, ...]:
+    if action == "update":
+        return (record.get("id"), action, bool(record.get("read")))
+    return (record.get("id"), action)
+
+
+class Subscription:
+    """Fila de eventos de uma conexão; registrada no hub até `close()`."""
+
+    def __init__(self, hub: "NotificationHub", user_id: str, queue: asyncio.Queue):
+        self.hub = hub
+        self.user_id = user_id
+        self.queue = queue
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Próximo evento, ou None se nada chegar em `timeout` segundos."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self) -> None:
+        self.hub._unsubscribe(self.user_id, self.queue)
+
+    async def __aenter__(self) -> "Subscription":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        self.close()
+
+
+class NotificationHub:
+    """Fan-out de eventos de notificação para os assinantes de cada usuário."""
+
+    def __init__(self, queue_size: int = 100, collection: str = "notifications"):
+        """
+        Args:
+            queue_size: Eventos pendentes por assinante; o mais antigo é descartado quando enche
+            collection: Coleção de notificações assinada no realtime do PocketBase
+        """
+        self.queue_size = queue_size
+        self.collection = collection
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self._recent: "OrderedDict[Tuple[Any, ...], float]" = OrderedDict()
+        self._realtime_task: Optional[asyncio.Task] = None
+        self._listeners: List[Callable[[str, Dict[str, Any]], None]] = []
+        self.published = 0
+        self.dropped = 0
+
+    def subscriber_count(self, user_id: Optional[str] = None) -> int:
+        if user_id is not None:
+            return len(self._subscribers.get(user_id, ()))
+        return sum(len(queues) for queues in self._subscribers.values())
+
+    def add_listener(self, listener: Callable[[str, Dict[str, Any]], None]) -> None:
+        """Chamado com (action, record) para cada escrita vinda de outro worker."""
+        self._listeners.append(listener)
+
+    def subscribe(self, user_id: str) -> Subscription:
+        """Registra uma conexão do usuário; eventos publicados a partir daqui são entregues."""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.setdefault(user_id, set()).add(queue)
+        return Subscription(self, user_id, queue)
+
+    def _unsubscribe(self, user_id: str, queue: asyncio.Queue) -> None:
+        queues = self._subscribers.get(user_id)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self._subscribers[user_id]
+
+    def publish(self, user_id: str, event: Dict[str, Any]) -> int:
+        """
+        Entrega um evento a todas as conexões abertas do usuário.
+
+        Returns:
+            Quantidade de assinantes que receberam o evento
+        """
+        queues = self._subscribers.get(user_id)
+        if not queues:
+            return 0
+        for queue in queues:
+            if queue.full():
+                # Consumidor lento: descarta o evento mais antigo em vez de bloquear quem publica
+                queue.get_nowait()
+                self.dropped += 1
+            queue.put_nowait(event)
+        self.published += 1
+        return len(queues)
+
+    def publish_record(self, action: str, record: Dict[str, Any], **extra: Any) -> int:
+        """Publica create/update/delete de uma notificação (o eco deve ter sido registrado antes da escrita)."""
+        recipient = record.get("recipient")
+        if not recipient:
+            return 0
+        return self.publish(recipient, {"type": f"notification.{action}", "notification": record, **extra})
+
+    def expect_echo(self, action: str, record: Dict[str, Any]) -> None:
+        """
+        Registra uma escrita local ANTES de enviá-la ao PocketBase.
+
+        O realtime pode entregar o evento antes de a resposta HTTP voltar; com o
+        eco já registrado, ele não é tratado como escrita de outro worker.
+        `record` precisa do id (em creates, gerado pelo cliente).
+        """
+        self._remember(_echo_key(action, record))
+
+    def forget_echo(self, action: str, record: Dict[str, Any]) -> None:
+        """Desfaz `expect_echo` de uma escrita que falhou."""
+        self._recent.pop(_echo_key(action, record), None)
+
+    def _remember(self, key: Tuple[Any, ...]) -> None:
+        now = time.monotonic()
+        self._recent[key] = now
+        self._recent.move_to_end(key)
+        while self._recent and (
+            len(self._recent) > _MAX_RECENT_EVENTS
+            or now - next(iter(self._recent.values())) > _ECHO_WINDOW_SECONDS
+        ):
+            self._recent.popitem(last=False)
+
+    def _is_echo(self, key: Tuple[Any, ...]) -> bool:
+        seen = self._recent.pop(key, None)
+        return seen is not None and time.monotonic() - seen <= _ECHO_WINDOW_SECONDS
+
+    def handle_realtime_message(self, data: Dict[str, Any]) -> int:
+        """Converte uma mensagem do realtime do PocketBase em evento (ignora ecos locais)."""
+        action, record = data.get("action"), data.get("record") or {}
+        if action not in ("create", "update", "delete") or self._is_echo(_echo_key(action, record)):
+            return 0
+        recipient = record.get("recipient")
+        if not recipient:
+            return 0
+        for listener in self._listeners:
+            try:
+                listener(action, record)
+            except Exception as e:
+                logger.error(f"Listener de notificações falhou: {e}")
+        return self.publish(recipient, {"type": f"notification.{action}", "notification": record})
+
+    # ---- PocketBase realtime ----
+
+    def start_realtime(self, pb, reconnect_delay: float = 5.0) -> None:
+        """Assina o realtime do PocketBase em segundo plano (escritas de outros workers)."""
+        if self._realtime_task is None or self._realtime_task.done():
+            self._realtime_task = asyncio.create_task(self._realtime_loop(pb, reconnect_delay))
+
+    async def stop_realtime(self) -> None:
+        task, self._realtime_task = self._realtime_task, None
+        if task is not None and not task.done():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    async def _realtime_loop(self, pb, reconnect_delay: float) -> None:
+        while True:
+            try:
+                await self._listen(pb)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Realtime do PocketBase desconectado: {e}")
+            await asyncio.sleep(reconnect_delay)
+
+    async def _listen(self, pb) -> None:
+        await pb.ensure_authenticated()
+        client = pb._http()
+        timeout = httpx.Timeout(None, connect=10.0)
+        async with client.stream("GET", "/api/realtime", headers=pb._get_headers(), timeout=timeout) as response:
+            response.raise_for_status()
+            event_name, data_lines = None, []
+            async for line in response.aiter_lines():
+                if line.startswith("event:"):
+                    event_name = line[6:].strip()
+                elif line.startswith("data:"):
+                    data_lines.append(line[5:].strip())
+                elif not line and event_name:
+                    data = json.loads("\n".join(data_lines) or "{}")
+                    if event_name == "PB_CONNECT":
+                        await self._subscribe_collection(pb, data.get("clientId"))
+                    elif event_name == self.collection:
+                        self.handle_realtime_message(data)
+                    event_name, data_lines = None, []
+
+    async def _subscribe_collection(self, pb, client_id: Optional[str]) -> None:
+        response = await pb._request(
+            "POST", "/api/realtime", json={"clientId": client_id, "subscriptions": [self.collection]}
+        )
+        if response.status_code not in (200, 204):
+            raise RuntimeError(f"subscription failed: {response.status_code}")
+        logger.info("Realtime de notificações do PocketBase assinado")
+
+
+_notification_hub_instance: Optional[NotificationHub] = None
+
+
+def get_notification_hub() -> NotificationHub:
+    """Retorna o hub compartilhado do processo."""
+    global _notification_hub_instance
+    if _notification_hub_instance is None:
+        _notification_hub_instance = NotificationHub()
+    return _notification_hub_instance
@@ -0,0 +1,239 @@
+"""
+Cliente compartilhado do Piston com catálogo de runtimes em cache.
+
+`execute_with_piston` abria um `httpx.AsyncClient` novo por execução e, antes
+de cada `/execute`, buscava `/runtimes` inteiro para escolher a versão mais
+recente: dois round trips e um handshake TLS por clique em "Executar". Aqui o
+processo mantém um único pool keep-alive e um catálogo linguagem -> versão mais
+recente com TTL, renovado em segundo plano. Só a primeira execução (se o
+startup ainda não carregou o catálogo) espera por `/runtimes`; se o Piston não
+responder, valem as versões padrão conhecidas.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+import httpx
+from packaging.version import InvalidVersion, Version as SemVer
+
+from app.config import settings
+from app.services.code_executor import CodeExecutor, ExecutorError
+
+logger = logging.getLogger(__name__)
+
+# Versões usadas quando o catálogo do Piston não está disponível
+DEFAULT_VERSIONS: Dict[str, str] = {
+    "python": "3.10.0",
+    "javascript": "18.15.0",
+    "typescript": "5.0.3",
+    "java": "15.0.2",
+    "c": "10.2.0",
+    "cpp": "10.2.0",
+    "c#": "6.12.0",
+    "go": "1.16.2",
+    "ruby": "3.0.1",
+    "rust": "1.68.2",
+    "php": "8.2.3",
+    "kotlin": "1.8.20",
+}
+
+FILE_EXTENSIONS: Dict[str, str] = {
+    "python": "py",
+    "javascript": "js",
+    "typescript": "ts",
+    "java": "java",
+    "c": "c",
+    "cpp": "cpp",
+    "c#": "cs",
+    "go": "go",
+    "ruby": "rb",
+    "rust": "rs",
+    "php": "php",
+    "kotlin": "kt",
+}
+
+
+class PistonError(ExecutorError):
+    """Falha ao falar com o Piston (HTTP de erro ou rede)."""
+
+
+def latest_versions(runtimes: List[Dict[str, Any]]) -> Dict[str, str]:
+    """Linguagem -> maior versão (SemVer) presente na lista de `/runtimes`."""
+    best: Dict[str, Any] = {}
+    for rt in runtimes or []:
+        language, version = rt.get("language"), rt.get("version")
+        if not language or not isinstance(version, str):
+            continue
+        try:
+            parsed = SemVer(version)
+        except InvalidVersion:
+            best.setdefault(language, (None, version))
+            continue
+        current = best.get(language)
+        if current is None or current[0] is None or parsed > current[0]:
+            best[language] = (parsed, version)
+    return {language: version for language, (_, version) in best.items()}
+
+
+class PistonClient(CodeExecutor):
+    """Pool HTTP keep-alive para o Piston e catálogo de runtimes com TTL."""
+
+    name = "piston"
+
+    def __init__(
+        self,
+        base_url: str,
+        timeout_seconds: float = 30.0,
+        connect_timeout_seconds: float = 5.0,
+        max_connections: int = 50,
+        max_keepalive_connections: int = 20,
+        runtimes_ttl_seconds: float = 3600.0,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        """
+        Args:
+            base_url: URL da API do Piston (ex.: https://emkc.org/api/v2/piston)
+            timeout_seconds: Timeout de leitura de uma execução
+            connect_timeout_seconds: Timeout de conexão
+            max_connections: Conexões simultâneas no pool
+            max_keepalive_connections: Conexões ociosas mantidas abertas
+            runtimes_ttl_seconds: Validade do catálogo; vencido, é renovado em segundo plano
+            transport: Transporte httpx alternativo (testes)
+        """
+        self.base_url = base_url.rstrip("/")
+        self.runtimes_ttl_seconds = runtimes_ttl_seconds
+        self._timeout = httpx.Timeout(timeout_seconds, connect=connect_timeout_seconds)
+        self._limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_keepalive_connections)
+        self._transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self._versions: Dict[str, str] = {}
+        self._loaded_at = 0.0
+        self._refreshing: Optional[asyncio.Task] = None
+        self._task: Optional[asyncio.Task] = None
+        self.catalog_refreshes = 0
+
+    def _http(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=self._timeout,
+                limits=self._limits,
+                transport=self._transport,
+            )
+        return self._client
+
+    def supports(self, language: str) -> bool:
+        return True
+
+    # ---- Catálogo de runtimes ----
+
+    def catalog(self) -> Dict[str, str]:
+        return dict(self._versions)
+
+    def _catalog_is_fresh(self) -> bool:
+        return self._loaded_at > 0 and time.monotonic() - self._loaded_at < self.runtimes_ttl_seconds
+
+    async def refresh_runtimes(self) -> Dict[str, str]:
+        """Recarrega `/runtimes`; chamadas simultâneas compartilham a mesma ida ao Piston."""
+        if self._refreshing is None or self._refreshing.done():
+            self._refreshing = asyncio.create_task(self._load_runtimes())
+        return await asyncio.shield(self._refreshing)
+
+    async def _load_runtimes(self) -> Dict[str, str]:
+        try:
+            response = await self._http().get("/runtimes")
+            response.raise_for_status()
+            versions = latest_versions(response.json() or [])
+        except Exception as e:
+            logger.warning(f"Catálogo de runtimes do Piston indisponível: {e}")
+            # Tenta de novo só depois de um intervalo curto, sem bloquear execuções
+            self._loaded_at = time.monotonic() - max(0.0, self.runtimes_ttl_seconds - 60.0)
+            return self.catalog()
+        if versions:
+            self._versions = versions
+        self._loaded_at = time.monotonic()
+        self.catalog_refreshes += 1
+        logger.info(f"Catálogo de runtimes do Piston carregado: {len(versions)} linguagens")
+        return self.catalog()
+
+    async def resolve_version(self, language: str) -> Optional[str]:
+        """
+        Versão a usar para a linguagem (nome do Piston).
+
+        Com catálogo carregado a resposta sai da memória; vencido, é renovado em
+        segundo plano. Só sem nenhuma tentativa anterior a chamada espera `/runtimes`.
+        """
+        if self._loaded_at == 0.0:
+            await self.refresh_runtimes()
+        elif not self._catalog_is_fresh() and (self._refreshing is None or self._refreshing.done()):
+            self._refreshing = asyncio.create_task(self._load_runtimes())
+        return self._versions.get(language) or DEFAULT_VERSIONS.get(language)
+
+    # ---- Execução ----
+
+    async def execute(self, language: str, version: str, source_code: str, stdin: str = "") -> Dict[str, Any]:
+        """POST `/execute` com um único arquivo; retorna a resposta bruta do Piston."""
+        payload = {
+            "language": language,
+            "version": str(version),
+            "stdin": stdin or "",
+            "files": [{"name": f"main.{FILE_EXTENSIONS.get(language, 'txt')}", "content": source_code}],
+        }
+        try:
+            response = await self._http().post("/execute", json=payload)
+        except httpx.HTTPError as e:
+            raise PistonError(str(e)) from e
+        if response.is_error:
+            raise PistonError(f"{response.status_code}: {response.text}")
+        return response.json() or {}
+
+    # ---- Ciclo de vida ----
+
+    def start(self) -> None:
+        """Carrega o catálogo agora e o mantém renovado em segundo plano."""
+        if self.runtimes_ttl_seconds > 0 and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.refresh_runtimes()
+            except Exception as e:
+                logger.error(f"Erro ao renovar o catálogo do Piston: {e}")
+            await asyncio.sleep(self.runtimes_ttl_seconds)
+
+    async def close(self) -> None:
+        task, self._task = self._task, None
+        if task is not None and not task.done():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+_piston_client_instance: Optional[PistonClient] = None
+
+
+def get_piston_client() -> PistonClient:
+    """Retorna o cliente compartilhado do processo."""
+    global _piston_client_instance
+    if _piston_client_instance is None:
+        _piston_client_instance = PistonClient(
+            base_url=settings.piston_url,
+            timeout_seconds=settings.piston_timeout_seconds,
+            runtimes_ttl_seconds=settings.piston_runtimes_ttl_seconds,
+        )
+    return _piston_client_instance
+
+
+async def close_piston_client() -> None:
+    global _piston_client_instance
+    if _piston_client_instance is not None:
+        await _piston_client_instance.close()
+        _piston_client_instance = None
@@ -0,0 +1,101 @@
+"""
+Snapshot em memória das métricas gerais da plataforma.
+
+`get_platform_analytics` fazia três contagens em sequência no PocketBase a
+cada chamada, e cada dashboard aberto repetia todas. Aqui as contagens
+(inclusive as novas: exemplos, feedback, turmas ativas, notificações) rodam
+em paralelo, o resultado vira um snapshot com `generated_at` e é renovado em
+segundo plano num intervalo fixo. Leituras sempre respondem da memória; só a
+primeira espera a coleta. Uma métrica que falha mantém o último valor
+conhecido e é listada em `stale_metrics`.
+"""
+
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+MetricLoader = Callable[[], Awaitable[int]]
+
+
+class PlatformAnalytics:
+    """Coleta concorrente das métricas com snapshot renovado periodicamente."""
+
+    def __init__(self, metrics: Dict[str, MetricLoader], refresh_interval_seconds: float = 300.0):
+        """
+        Args:
+            metrics: Nome da métrica -> contagem assíncrona
+            refresh_interval_seconds: Intervalo de renovação em segundo plano (0 desabilita; o
+                snapshot passa a ser renovado na leitura quando ficar mais velho que isso)
+        """
+        self.metrics = metrics
+        self.refresh_interval_seconds = refresh_interval_seconds
+        self._snapshot: Optional[Dict[str, Any]] = None
+        self._generated_at = 0.0
+        self._refreshing: Optional[asyncio.Task] = None
+        self._task: Optional[asyncio.Task] = None
+        self.refreshes = 0
+
+    def peek(self) -> Optional[Dict[str, Any]]:
+        return self._snapshot
+
+    async def get(self) -> Dict[str, Any]:
+        """Snapshot atual; a primeira leitura (ou uma sem job em segundo plano e vencida) coleta."""
+        if self._snapshot is None:
+            return await self.refresh()
+        background = self._task is not None and not self._task.done()
+        if not background and self.refresh_interval_seconds > 0 and time.monotonic() - self._generated_at > self.refresh_interval_seconds:
+            return await self.refresh()
+        return self._snapshot
+
+    async def refresh(self) -> Dict[str, Any]:
+        """Coleta todas as métricas em paralelo; coletas simultâneas compartilham a mesma execução."""
+        if self._refreshing is None or self._refreshing.done():
+            self._refreshing = asyncio.create_task(self._collect())
+        return await asyncio.shield(self._refreshing)
+
+    async def _collect(self) -> Dict[str, Any]:
+        started = time.monotonic()
+        names = list(self.metrics)
+        results = await asyncio.gather(*(self.metrics[name]() for name in names), return_exceptions=True)
+        previous = self._snapshot or {}
+        snapshot: Dict[str, Any] = {}
+        stale: List[str] = []
+        for name, result in zip(names, results):
+            if isinstance(result, BaseException):
+                logger.warning(f"Métrica da plataforma '{name}' falhou: {result}")
+                snapshot[name] = previous.get(name)
+                stale.append(name)
+            else:
+                snapshot[name] = int(result)
+        snapshot["generated_at"] = datetime.now(timezone.utc).isoformat()
+        snapshot["collection_ms"] = round((time.monotonic() - started) * 1000, 1)
+        snapshot["stale_metrics"] = stale
+        self._snapshot = snapshot
+        self._generated_at = time.monotonic()
+        self.refreshes += 1
+        return snapshot
+
+    def start(self) -> None:
+        if self.refresh_interval_seconds > 0 and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is not None and not task.done():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"Erro ao renovar as métricas da plataforma: {e}")
+            await asyncio.sleep(self.refresh_interval_seconds)
@@ -1,24 +1,123 @@
+import asyncio
+import base64
 import json
-import requests
+import httpx
 import os
-from typing import List, Dict, Optional, Any
+import secrets
+import string
+import time
+from dataclasses import dataclass
+from typing import AsyncIterator, Awaitable, Callable, List, Dict, Optional, Any
 from datetime import datetime, timedelta
 from app.models.adaptive_models import (
     UserLearningProfile, PersonalizedLearningPath, LearningSession,
     ConceptMastery, AdaptiveRecommendation, SkillMatrix, AssessmentResponse
 )
+from app.services.class_api_keys import ClassApiKeyCache
+from app.services.membership_cache import MembershipCache
+from app.services.notification_hub import NotificationHub, get_notification_hub
+from app.services.platform_analytics import PlatformAnalytics
+from app.services.unread_counter import UNKNOWN, UnreadCounterStore
 import logging
 
 logger = logging.getLogger(__name__)
 
+# PocketBase >= 0.23 autentica superusers como coleção; versões antigas usam /api/admins
+_ADMIN_AUTH_PATHS = (
+    "/api/collections/_superusers/auth-with-password",
+    "/api/admins/auth-with-password",
+)
+# Validade assumida quando o token não traz o claim "exp"
+_DEFAULT_TOKEN_TTL_SECONDS = 3600.0
+
+
+def _token_expiry(token: str) -> float:
+    """Epoch de expiração lido do claim `exp` do JWT (sem validar assinatura)."""
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        return float(json.loads(base64.urlsafe_b64decode(payload))["exp"])
+    except Exception:
+        return time.time() + _DEFAULT_TOKEN_TTL_SECONDS
+
+
+_RECORD_ID_ALPHABET = string.ascii_lowercase + string.digits
+
+
+def new_record_id() -> str:
+    """Id no formato padrão do PocketBase (15 caracteres [a-z0-9]), para creates com id conhecido antes da escrita."""
+    return "".join(secrets.choice(_RECORD_ID_ALPHABET) for _ in range(15))
+
+
+@dataclass(slots=True)
+class BatchOperation:
+    """Uma escrita dentro de um lote: POST (create), PATCH (update) ou DELETE."""
+
+    method: str
+    collection: str
+    record_id: Optional[str] = None
+    body: Optional[Dict[str, Any]] = None
+
+
 class PocketBaseService:
     """
     PocketBase integration service for adaptive learning data persistence
     """
     
-    def __init__(self, base_url: str = "http://localhost:8090"):
+    def __init__(
+        self,
+        base_url: str = "http://localhost:8090",
+        timeout_seconds: float = 10.0,
+        connect_timeout_seconds: float = 5.0,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        transport: Optional[httpx.BaseTransport] = None,
+        admin_email: Optional[str] = None,
+        admin_password: Optional[str] = None,
+        token_refresh_margin_seconds: float = 300.0,
+        batch_max_requests: int = 50,
+        bulk_concurrency: int = 8,
+        membership_cache: Optional[MembershipCache] = None,
+        class_key_cache: Optional[ClassApiKeyCache] = None,
+        notification_hub: Optional[NotificationHub] = None,
+        unread_reconcile_interval_seconds: float = 300.0,
+        analytics_refresh_interval_seconds: float = 300.0,
+        active_class_window_days: int = 30,
+    ):
         self.base_url = base_url
         self.auth_token = None
+        # Login de admin é preguiçoso: acontece no primeiro uso, nunca no import
+        self.admin_email = admin_email or os.getenv("POCKETBASE_ADMIN_EMAIL", "admin@example.com")
+        self.admin_password = admin_password or os.getenv("POCKETBASE_ADMIN_PASSWORD", "admin123456")
+        self.token_refresh_margin_seconds = token_refresh_margin_seconds
+        self._token_expires_at = 0.0
+        self._auth_lock = asyncio.Lock()
+        self._refresh_task: Optional[asyncio.Task] = None
+        # Batch API: até `batch_max_requests` operações por transação; sem ela, concorrência limitada
+        self.batch_max_requests = batch_max_requests
+        self.bulk_concurrency = bulk_concurrency
+        self._batch_supported = True
+        # Checagens professor/membro por (turma, usuário), invalidadas nas escritas de membros/turmas
+        self.membership_cache = membership_cache or MembershipCache()
+        self.class_key_cache = class_key_cache or ClassApiKeyCache()
+        # Push de notificações para conexões SSE abertas (None desabilita)
+        self.notification_hub = notification_hub
+        # Badge de não lidas: semeado por uma contagem e ajustado a cada escrita
+        self.unread_counters = UnreadCounterStore(
+            self._count_unread_notifications,
+            reconcile_interval_seconds=unread_reconcile_interval_seconds,
+        )
+        if notification_hub is not None:
+            notification_hub.add_listener(self.unread_counters.apply_remote)
+        # Um único pool de conexões por processo (keep-alive) em vez de um socket por chamada
+        self._timeout = httpx.Timeout(timeout_seconds, connect=connect_timeout_seconds)
+        self._limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+        )
+        self._transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self._sync_client: Optional[httpx.Client] = None
         self.collections = {
             "user_learning_profiles": "user_learning_profiles",
             "learning_paths": "learning_paths",
@@ -38,47 +137,92 @@ class PocketBaseService:
             "class_api_keys": "class_api_keys",
             # Notification system collections
             "notifications": "notifications",
+            # Example RAG collections (platform analytics)
+            "contextual_examples": "contextual_examples",
+            "example_feedback": "example_feedback",
         }
-        
-        # Try to authenticate on initialization
-        self._auto_authenticate()
-    
-    def _auto_authenticate(self):
-        """Automatically authenticate using environment variables"""
-        try:
-            admin_email = os.getenv("POCKETBASE_ADMIN_EMAIL", "admin@example.com")
-            admin_password = os.getenv("POCKETBASE_ADMIN_PASSWORD", "admin123456")
-            
-            if admin_email and admin_password:
-                success = self.authenticate_admin(admin_email, admin_password)
-                if success:
-                    logger.info("PocketBase integration configurado")
-                else:
-                    logger.warning("Failed to authenticate with PocketBase admin - some features may not work")
-                    logger.info("Visit http://localhost:8090/_/ to set up admin user manually")
-            else:
-                logger.warning("PocketBase admin credentials not found in environment")
-        except Exception as e:
-            logger.error(f"Auto-authentication failed: {e}")
+        # Métricas gerais servidas de um snapshot renovado em segundo plano
+        self.active_class_window_days = active_class_window_days
+        self.platform_analytics = PlatformAnalytics(
+            self._platform_metrics(),
+            refresh_interval_seconds=analytics_refresh_interval_seconds,
+        )
+
     
-    def authenticate_admin(self, email: str, password: str) -> bool:
-        """Authenticate as admin user"""
+    # Admin authentication (lazy, cached with expiry)
+    def _token_is_valid(self, margin: float = 0.0) -> bool:
+        return bool(self.auth_token) and time.time() + margin < self._token_expires_at
+
+    def _store_token(self, token: Optional[str]) -> bool:
+        if not token:
+            return False
+        self.auth_token = token
+        self._token_expires_at = _token_expiry(token)
+        return True
+
+    def _invalidate_token(self) -> None:
+        self.auth_token = None
+        self._token_expires_at = 0.0
+
+    async def authenticate_admin(self, email: Optional[str] = None, password: Optional[str] = None) -> bool:
+        """Authenticate as admin user (superuser on PocketBase >= 0.23)"""
+        credentials = {"identity": email or self.admin_email, "password": password or self.admin_password}
+        if not credentials["identity"] or not credentials["password"]:
+            logger.warning("PocketBase admin credentials not found in environment")
+            return False
         try:
-            response = requests.post(
-                f"{self.base_url}/api/admins/auth-with-password",
-                json={"identity": email, "password": password}
-            )
-            if response.status_code == 200:
-                data = response.json()
-                self.auth_token = data.get("token")
-                return True
-            else:
+            for path in _ADMIN_AUTH_PATHS:
+                response = await self._http().post(path, json=credentials)
+                if response.status_code == 404:
+                    continue
+                if response.status_code == 200 and self._store_token(response.json().get("token")):
+                    return True
                 logger.warning(f"Admin authentication failed: {response.status_code} - {response.text}")
                 return False
+            return False
         except Exception as e:
             logger.error(f"Authentication failed: {e}")
             return False
-    
+
+    def _authenticate_admin_sync(self) -> bool:
+        credentials = {"identity": self.admin_email, "password": self.admin_password}
+        try:
+            for path in _ADMIN_AUTH_PATHS:
+                response = self._http_sync().post(path, json=credentials)
+                if response.status_code == 404:
+                    continue
+                return response.status_code == 200 and self._store_token(response.json().get("token"))
+        except Exception as e:
+            logger.error(f"Authentication failed: {e}")
+        return False
+
+    async def ensure_authenticated(self) -> bool:
+        """
+        Garante um token de admin válido.
+
+        Token expirado (ou ausente) faz login sob lock, uma vez para todas as
+        requisições concorrentes. Token perto de expirar continua sendo usado e
+        é renovado em segundo plano, então nenhuma requisição paga pelo login.
+        """
+        if self._token_is_valid(self.token_refresh_margin_seconds):
+            return True
+        if self._token_is_valid():
+            if self._refresh_task is None or self._refresh_task.done():
+                self._refresh_task = asyncio.create_task(self._refresh_token())
+            return True
+        async with self._auth_lock:
+            if self._token_is_valid():
+                return True
+            ok = await self.authenticate_admin()
+            if not ok:
+                logger.warning("Failed to authenticate with PocketBase admin - some features may not work")
+            return ok
+
+    async def _refresh_token(self) -> None:
+        async with self._auth_lock:
+            if not self._token_is_valid(self.token_refresh_margin_seconds):
+                await self.authenticate_admin()
+
     def _get_headers(self) -> Dict[str, str]:
         """Get request headers with authentication"""
         headers = {"Content-Type": "application/json"}
@@ -86,6 +230,229 @@ class PocketBaseService:
             headers["Authorization"] = f"Bearer {self.auth_token}"
         return headers
     
+    # HTTP layer (pooled clients)
+    def _http(self) -> httpx.AsyncClient:
+        """AsyncClient compartilhado, criado no primeiro uso (dentro do event loop)."""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=self._timeout,
+                limits=self._limits,
+                transport=self._transport,
+            )
+        return self._client
+
+    def _http_sync(self) -> httpx.Client:
+        """Client síncrono com pool, apenas para chamadores que ainda não são async."""
+        if self._sync_client is None or self._sync_client.is_closed:
+            self._sync_client = httpx.Client(
+                base_url=self.base_url,
+                timeout=self._timeout,
+                limits=self._limits,
+                transport=self._transport,
+            )
+        return self._sync_client
+
+    @staticmethod
+    def _records_path(collection: str, record_id: Optional[str] = None) -> str:
+        path = f"/api/collections/{collection}/records"
+        return f"{path}/{record_id}" if record_id else path
+
+    async def _request(self, method: str, path: str, **kwargs) -> httpx.Response:
+        await self.ensure_authenticated()
+        response = await self._http().request(method, path, headers=self._get_headers(), **kwargs)
+        if response.status_code == 401:
+            # Token revogado/expirado antes do previsto: um novo login e uma única repetição
+            self._invalidate_token()
+            if await self.ensure_authenticated():
+                response = await self._http().request(method, path, headers=self._get_headers(), **kwargs)
+        return response
+
+    async def _get(self, collection: str, params: Optional[Dict[str, Any]] = None, fields: Optional[str] = None) -> httpx.Response:
+        params = dict(params or {})
+        if fields:
+            # Projeção do PocketBase: só os campos pedidos são serializados e decodificados
+            params["fields"] = fields
+        return await self._request("GET", self._records_path(collection), params=params)
+
+    async def _get_record(self, collection: str, record_id: str, fields: Optional[str] = None, expand: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Busca direta por id (GET /records/{id}); None se não existir."""
+        params: Dict[str, Any] = {}
+        if fields:
+            params["fields"] = fields
+        if expand:
+            params["expand"] = expand
+        r = await self._request("GET", self._records_path(collection, record_id), params=params)
+        if r.status_code == 200:
+            return r.json()
+        if r.status_code != 404:
+            self._handle_response_error(r, f"Get {collection}/{record_id}")
+        return None
+
+    async def _post(self, collection: str, payload: Dict[str, Any]) -> httpx.Response:
+        return await self._request("POST", self._records_path(collection), json=payload)
+
+    async def _patch(self, collection: str, record_id: str, payload: Dict[str, Any]) -> httpx.Response:
+        return await self._request("PATCH", self._records_path(collection, record_id), json=payload)
+
+    async def _delete(self, collection: str, record_id: str) -> httpx.Response:
+        return await self._request("DELETE", self._records_path(collection, record_id))
+
+    # Bulk layer (/api/batch with concurrent fallback)
+    async def batch(self, operations: List[BatchOperation]) -> List[Dict[str, Any]]:
+        """
+        Executa várias escritas com o mínimo de round trips.
+
+        Cada bloco de até `batch_max_requests` operações vira uma única
+        requisição /api/batch, aplicada pelo PocketBase numa transação (falha
+        em uma operação reverte o bloco). Servidores sem a Batch API (404, ou
+        403 quando desabilitada nas configurações) passam a usar requisições
+        concorrentes limitadas por `bulk_concurrency`, sem atomicidade.
+
+        Args:
+            operations: Operações na ordem em que devem ser aplicadas
+
+        Returns:
+            Um {"status": int, "body": ...} por operação, na mesma ordem
+        """
+        results: List[Dict[str, Any]] = []
+        for start in range(0, len(operations), self.batch_max_requests):
+            chunk = operations[start:start + self.batch_max_requests]
+            chunk_results = await self._send_batch(chunk) if self._batch_supported else None
+            if chunk_results is None:
+                chunk_results = await self._run_concurrently(chunk)
+            results.extend(chunk_results)
+        return results
+
+    @staticmethod
+    def batch_ok(result: Dict[str, Any]) -> bool:
+        return 200 <= result.get("status", 0) < 300
+
+    @staticmethod
+    def _json_or_none(response: httpx.Response) -> Any:
+        try:
+            return response.json() if response.content else None
+        except ValueError:
+            return None
+
+    async def _send_batch(self, chunk: List[BatchOperation]) -> Optional[List[Dict[str, Any]]]:
+        requests_payload = []
+        for op in chunk:
+            item: Dict[str, Any] = {"method": op.method, "url": self._records_path(op.collection, op.record_id)}
+            if op.body is not None:
+                item["body"] = op.body
+            requests_payload.append(item)
+        response = await self._request("POST", "/api/batch", json={"requests": requests_payload})
+        if response.status_code in (403, 404):
+            logger.info(f"PocketBase Batch API unavailable ({response.status_code}); using concurrent requests")
+            self._batch_supported = False
+            return None
+        if response.status_code != 200:
+            # Transaction rolled back: none of the chunk's operations were applied
+            self._handle_response_error(response, "Batch")
+            body = self._json_or_none(response)
+            return [{"status": response.status_code, "body": body} for _ in chunk]
+        return [{"status": item.get("status", 0), "body": item.get("body")} for item in response.json()]
+
+    async def _run_concurrently(self, chunk: List[BatchOperation]) -> List[Dict[str, Any]]:
+        semaphore = asyncio.Semaphore(self.bulk_concurrency)
+
+        async def run(op: BatchOperation) -> Dict[str, Any]:
+            kwargs = {"json": op.body} if op.body is not None else {}
+            async with semaphore:
+                try:
+                    response = await self._request(op.method, self._records_path(op.collection, op.record_id), **kwargs)
+                except httpx.HTTPError as e:
+                    logger.error(f"Bulk {op.method} {op.collection} failed: {e}")
+                    return {"status": 0, "body": None}
+            return {"status": response.status_code, "body": self._json_or_none(response)}
+
+        return list(await asyncio.gather(*(run(op) for op in chunk)))
+
+    async def iter_records(
+        self,
+        collection: str,
+        params: Optional[Dict[str, Any]] = None,
+        fields: Optional[str] = None,
+        page_size: int = 200,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Percorre todas as páginas de uma listagem, registro a registro.
+
+        A próxima página já está em voo enquanto quem consome processa a atual,
+        então a latência do PocketBase se sobrepõe ao processamento. Usa
+        `skipTotal` (sem COUNT) e para na primeira página incompleta.
+
+        Args:
+            collection: Nome da coleção
+            params: filter/sort/expand da listagem (page/perPage são controlados aqui)
+            fields: Projeção de campos do PocketBase (ex.: "id,user,expand.user.name")
+            page_size: Registros por página
+        """
+        base = {k: v for k, v in (params or {}).items() if k not in ("page", "perPage", "skip")}
+        base.update(perPage=page_size, skipTotal=1)
+        if fields:
+            base["fields"] = fields
+
+        async def fetch(page: int) -> List[Dict[str, Any]]:
+            r = await self._get(collection, params={**base, "page": page})
+            if r.status_code != 200:
+                self._handle_response_error(r, f"List {collection}")
+                return []
+            return r.json().get("items", [])
+
+        page = 1
+        pending: Optional[asyncio.Task] = asyncio.create_task(fetch(page))
+        try:
+            while pending is not None:
+                items = await pending
+                if len(items) < page_size:
+                    pending = None
+                else:
+                    page += 1
+                    pending = asyncio.create_task(fetch(page))
+                for item in items:
+                    yield item
+        finally:
+            if pending is not None and not pending.done():
+                pending.cancel()
+
+    async def list_all(
+        self,
+        collection: str,
+        params: Optional[Dict[str, Any]] = None,
+        fields: Optional[str] = None,
+        page_size: int = 200,
+    ) -> List[Dict[str, Any]]:
+        return [item async for item in self.iter_records(collection, params, fields, page_size)]
+
+    async def _collect_ids(self, collection: str, filter_: str) -> List[str]:
+        """Ids de todos os registros do filtro (só o campo id)."""
+        return [item["id"] async for item in self.iter_records(collection, {"filter": filter_}, fields="id", page_size=500)]
+
+    def _get_sync(self, collection: str, params: Optional[Dict[str, Any]] = None, fields: Optional[str] = None) -> httpx.Response:
+        if fields:
+            params = {**(params or {}), "fields": fields}
+        if not self._token_is_valid():
+            self._authenticate_admin_sync()
+        response = self._http_sync().get(self._records_path(collection), params=params or {}, headers=self._get_headers())
+        if response.status_code == 401:
+            self._invalidate_token()
+            if self._authenticate_admin_sync():
+                response = self._http_sync().get(self._records_path(collection), params=params or {}, headers=self._get_headers())
+        return response
+
+    async def close(self) -> None:
+        """Fecha os pools de conexão (chamado no shutdown)."""
+        if self._refresh_task is not None and not self._refresh_task.done():
+            self._refresh_task.cancel()
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        if self._sync_client is not None:
+            self._sync_client.close()
+            self._sync_client = None
+
     def _handle_response_error(self, response, operation: str):
         """Handle and log response errors"""
         if response.status_code == 401:
@@ -120,18 +487,10 @@ class PocketBaseService:
             
             if existing:
                 # Update existing
-                response = requests.patch(
-                    f"{self.base_url}/api/collections/{self.collections['user_learning_profiles']}/records/{existing['id']}",
-                    json=profile_data,
-                    headers=self._get_headers()
-                )
+                response = await self._patch(self.collections['user_learning_profiles'], existing['id'], profile_data)
             else:
                 # Create new
-                response = requests.post(
-                    f"{self.base_url}/api/collections/{self.collections['user_learning_profiles']}/records",
-                    json=profile_data,
-                    headers=self._get_headers()
-                )
+                response = await self._post(self.collections['user_learning_profiles'], profile_data)
             
             if response.status_code in [200, 201]:
                 return True
@@ -143,14 +502,10 @@ class PocketBaseService:
             logger.error(f"Error saving user profile: {e}")
             return False
     
-    async def get_user_profile(self, user_id: str) -> Optional[Dict]:
+    async def get_user_profile(self, user_id: str, fields: Optional[str] = None) -> Optional[Dict]:
         """Get user learning profile by user_id"""
         try:
-            response = requests.get(
-                f"{self.base_url}/api/collections/{self.collections['user_learning_profiles']}/records",
-                params={"filter": f"user_id='{user_id}'"},
-                headers=self._get_headers()
-            )
+            response = await self._get(self.collections['user_learning_profiles'], params={"filter": f"user_id='{user_id}'", "perPage": 1}, fields=fields)
             
             if response.status_code == 200:
                 data = response.json()
@@ -180,25 +535,17 @@ class PocketBaseService:
                 "last_updated": path.last_updated.isoformat()
             }
             
-            response = requests.post(
-                f"{self.base_url}/api/collections/{self.collections['learning_paths']}/records",
-                json=path_data,
-                headers=self._get_headers()
-            )
+            response = await self._post(self.collections['learning_paths'], path_data)
             
             return response.status_code == 201
         except Exception as e:
             logger.error(f"Error saving learning path: {e}")
             return False
     
-    async def get_user_learning_paths(self, user_id: str) -> List[Dict]:
+    async def get_user_learning_paths(self, user_id: str, fields: Optional[str] = None) -> List[Dict]:
         """Get all learning paths for a user"""
         try:
-            response = requests.get(
-                f"{self.base_url}/api/collections/{self.collections['learning_paths']}/records",
-                params={"filter": f"user_id='{user_id}'", "sort": "-created_at"},
-                headers=self._get_headers()
-            )
+            response = await self._get(self.collections['learning_paths'], params={"filter": f"user_id='{user_id}'", "sort": "-created_at"}, fields=fields)
             
             if response.status_code == 200:
                 data = response.json()
@@ -227,29 +574,21 @@ class PocketBaseService:
                 "completed": session.completed
             }
             
-            response = requests.post(
-                f"{self.base_url}/api/collections/{self.collections['learning_sessions']}/records",
-                json=session_data,
-                headers=self._get_headers()
-            )
+            response = await self._post(self.collections['learning_sessions'], session_data)
             
             return response.status_code == 201
         except Exception as e:
             logger.error(f"Error saving learning session: {e}")
             return False
     
-    async def get_user_sessions(self, user_id: str, limit: int = 50) -> List[Dict]:
+    async def get_user_sessions(self, user_id: str, limit: int = 50, fields: Optional[str] = None) -> List[Dict]:
         """Get recent learning sessions for a user"""
         try:
-            response = requests.get(
-                f"{self.base_url}/api/collections/{self.collections['learning_sessions']}/records",
-                params={
-                    "filter": f"user_id='{user_id}'",
-                    "sort": "-start_time",
-                    "perPage": limit
-                },
-                headers=self._get_headers()
-            )
+            response = await self._get(self.collections['learning_sessions'], params={
+                "filter": f"user_id='{user_id}'",
+                "sort": "-start_time",
+                "perPage": limit
+            }, fields=fields)
             
             if response.status_code == 200:
                 data = response.json()
@@ -277,29 +616,21 @@ class PocketBaseService:
                     "submitted_at": datetime.now().isoformat()
                 }
                 
-                requests.post(
-                    f"{self.base_url}/api/collections/{self.collections['assessment_responses']}/records",
-                    json=response_data,
-                    headers=self._get_headers()
-                )
+                await self._post(self.collections['assessment_responses'], response_data)
             
             return True
         except Exception as e:
             logger.error(f"Error saving assessment responses: {e}")
             return False
     
-    async def get_assessment_responses(self, user_id: str, concept_id: str = None) -> List[Dict]:
+    async def get_assessment_responses(self, user_id: str, concept_id: str = None, fields: Optional[str] = None) -> List[Dict]:
         """Get assessment responses for analysis"""
         try:
             filter_str = f"user_id='{user_id}'"
             if concept_id:
                 filter_str += f" && question_id~'{concept_id}'"
             
-            response = requests.get(
-                f"{self.base_url}/api/collections/{self.collections['assessment_responses']}/records",
-                params={"filter": filter_str, "sort": "-submitted_at"},
-                headers=self._get_headers()
-            )
+            response = await self._get(self.collections['assessment_responses'], params={"filter": filter_str, "sort": "-submitted_at"}, fields=fields)
             
             if response.status_code == 200:
                 data = response.json()
@@ -330,29 +661,21 @@ class PocketBaseService:
                 "generated_at": datetime.now().isoformat()
             }
             
-            response = requests.post(
-                f"{self.base_url}/api/collections/{self.collections['learning_analytics']}/records",
-                json=analytics_record,
-                headers=self._get_headers()
-            )
+            response = await self._post(self.collections['learning_analytics'], analytics_record)
             
             return response.status_code == 201
         except Exception as e:
             logger.error(f"Error saving analytics: {e}")
             return False
     
-    async def get_learning_analytics(self, user_id: str) -> Optional[Dict]:
+    async def get_learning_analytics(self, user_id: str, fields: Optional[str] = None) -> Optional[Dict]:
         """Get latest learning analytics for a user"""
         try:
-            response = requests.get(
-                f"{self.base_url}/api/collections/{self.collections['learning_analytics']}/records",
-                params={
-                    "filter": f"user_id='{user_id}'",
-                    "sort": "-generated_at",
-                    "perPage": 1
-                },
-                headers=self._get_headers()
-            )
+            response = await self._get(self.collections['learning_analytics'], params={
+                "filter": f"user_id='{user_id}'",
+                "sort": "-generated_at",
+                "perPage": 1
+            }, fields=fields)
             
             if response.status_code == 200:
                 data = response.json()
@@ -382,32 +705,24 @@ class PocketBaseService:
                     "applied": False
                 }
                 
-                requests.post(
-                    f"{self.base_url}/api/collections/{self.collections['adaptive_recommendations']}/records",
-                    json=rec_data,
-                    headers=self._get_headers()
-                )
+                await self._post(self.collections['adaptive_recommendations'], rec_data)
             
             return True
         except Exception as e:
             logger.error(f"Error saving recommendations: {e}")
             return False
     
-    async def get_user_recommendations(self, user_id: str, active_only: bool = True) -> List[Dict]:
+    async def get_user_recommendations(self, user_id: str, active_only: bool = True, fields: Optional[str] = None) -> List[Dict]:
         """Get recommendations for a user"""
         try:
             filter_str = f"user_id='{user_id}'"
             if active_only:
                 filter_str += " && viewed=false"
             
-            response = requests.get(
-                f"{self.base_url}/api/collections/{self.collections['adaptive_recommendations']}/records",
-                params={
-                    "filter": filter_str,
-                    "sort": "-priority,-created_at"
-                },
-                headers=self._get_headers()
-            )
+            response = await self._get(self.collections['adaptive_recommendations'], params={
+                "filter": filter_str,
+                "sort": "-priority,-created_at"
+            }, fields=fields)
             
             if response.status_code == 200:
                 data = response.json()
@@ -430,11 +745,7 @@ class PocketBaseService:
             }
             
             # Check for existing streak record
-            response = requests.get(
-                f"{self.base_url}/api/collections/{self.collections['learning_streaks']}/records",
-                params={"filter": f"user_id='{user_id}'"},
-                headers=self._get_headers()
-            )
+            response = await self._get(self.collections['learning_streaks'], params={"filter": f"user_id='{user_id}'", "perPage": 1}, fields="id,longest_streak")
             
             if response.status_code == 200:
                 data = response.json()
@@ -443,19 +754,11 @@ class PocketBaseService:
                     existing = data["items"][0]
                     streak_data["longest_streak"] = max(streak_count, existing.get("longest_streak", 0))
                     
-                    update_response = requests.patch(
-                        f"{self.base_url}/api/collections/{self.collections['learning_streaks']}/records/{existing['id']}",
-                        json=streak_data,
-                        headers=self._get_headers()
-                    )
+                    update_response = await self._patch(self.collections['learning_streaks'], existing['id'], streak_data)
                     return update_response.status_code == 200
                 else:
                     # Create new
-                    create_response = requests.post(
-                        f"{self.base_url}/api/collections/{self.collections['learning_streaks']}/records",
-                        json=streak_data,
-                        headers=self._get_headers()
-                    )
+                    create_response = await self._post(self.collections['learning_streaks'], streak_data)
                     return create_response.status_code == 201
             
             return False
@@ -464,53 +767,54 @@ class PocketBaseService:
             return False
     
     async def get_platform_analytics(self) -> Dict:
-        """Get platform-wide analytics"""
+        """Get platform-wide analytics (in-memory snapshot with `generated_at`)"""
         try:
-            analytics = {}
-            
-            # Total users with profiles
-            users_response = requests.get(
-                f"{self.base_url}/api/collections/{self.collections['user_learning_profiles']}/records",
-                params={"perPage": 1},
-                headers=self._get_headers()
-            )
-            if users_response.status_code == 200:
-                analytics["total_users"] = users_response.json().get("totalItems", 0)
-            
-            # Total learning sessions
-            sessions_response = requests.get(
-                f"{self.base_url}/api/collections/{self.collections['learning_sessions']}/records",
-                params={"perPage": 1},
-                headers=self._get_headers()
-            )
-            if sessions_response.status_code == 200:
-                analytics["total_sessions"] = sessions_response.json().get("totalItems", 0)
-            
-            # Total learning paths
-            paths_response = requests.get(
-                f"{self.base_url}/api/collections/{self.collections['learning_paths']}/records",
-                params={"perPage": 1},
-                headers=self._get_headers()
-            )
-            if paths_response.status_code == 200:
-                analytics["total_learning_paths"] = paths_response.json().get("totalItems", 0)
-            
-            return analytics
+            return await self.platform_analytics.get()
         except Exception as e:
             logger.error(f"Error getting platform analytics: {e}")
             return {}
 
+    async def count_records(self, collection: str, filter_: Optional[str] = None) -> int:
+        """Total de registros (opcionalmente filtrados) sem trazer os registros."""
+        params: Dict[str, Any] = {"perPage": 1}
+        if filter_:
+            params["filter"] = filter_
+        r = await self._get(collection, params=params, fields="id")
+        if r.status_code != 200:
+            raise RuntimeError(f"count {collection} failed: {r.status_code}")
+        return int(r.json().get("totalItems", 0))
+
+    async def _count_active_classes(self) -> int:
+        """Turmas com evento criado ou marcado dentro da janela de atividade."""
+        since = (datetime.utcnow() - timedelta(days=self.active_class_window_days)).strftime("%Y-%m-%d %H:%M:%S")
+        params = {"filter": f"created >= '{since}' || starts_at >= '{since}'"}
+        classes = set()
+        async for event in self.iter_records(self.collections["class_events"], params, fields="class", page_size=500):
+            if event.get("class"):
+                classes.add(event["class"])
+        return len(classes)
+
+    def _platform_metrics(self) -> Dict[str, Callable[[], Awaitable[int]]]:
+        c = self.collections
+        return {
+            "total_users": lambda: self.count_records(c["user_learning_profiles"]),
+            "total_sessions": lambda: self.count_records(c["learning_sessions"]),
+            "total_learning_paths": lambda: self.count_records(c["learning_paths"]),
+            "total_examples": lambda: self.count_records(c["contextual_examples"]),
+            "total_example_feedback": lambda: self.count_records(c["example_feedback"]),
+            "total_classes": lambda: self.count_records(c["classes"]),
+            "active_classes": self._count_active_classes,
+            "total_notifications": lambda: self.count_records(c["notifications"]),
+            "unread_notifications": lambda: self.count_records(c["notifications"], "read = false"),
+        }
+
     def get_user_api_keys(self, user_id: str) -> Dict[str, str]:
         """
         Fetches all API keys for a user from the user_api_keys collection in PocketBase.
         Returns a dict: {provider: api_key}
         """
         try:
-            response = requests.get(
-                f"{self.base_url}/api/collections/user_api_keys/records",
-                params={"filter": f"user = '{user_id}'"},
-                headers=self._get_headers()
-            )
+            response = self._get_sync("user_api_keys", params={"filter": f"user = '{user_id}'"}, fields="provider,api_key")
             if response.status_code == 200:
                 data = response.json()
                 result = {}
@@ -533,11 +837,7 @@ class PocketBaseService:
         Returns the api_key string or None if not found.
         """
         try:
-            response = requests.get(
-                f"{self.base_url}/api/collections/user_api_keys/records",
-                params={"filter": f"user = '{user_id}' && provider = '{provider}'"},
-                headers=self._get_headers()
-            )
+            response = self._get_sync("user_api_keys", params={"filter": f"user = '{user_id}' && provider = '{provider}'", "perPage": 1}, fields="api_key")
             if response.status_code == 200:
                 data = response.json()
                 items = data.get("items", [])
@@ -553,39 +853,8 @@ class PocketBaseService:
 # ------------------
 
 class PocketBaseService(PocketBaseService):
-    # Utility: internal GET helper
-    def _get(self, collection: str, params: Optional[Dict[str, Any]] = None):
-        return requests.get(
-            f"{self.base_url}/api/collections/{collection}/records",
-            params=params or {},
-            headers=self._get_headers(),
-        )
-
-    # Utility: internal POST helper
-    def _post(self, collection: str, payload: Dict[str, Any]):
-        return requests.post(
-            f"{self.base_url}/api/collections/{collection}/records",
-            json=payload,
-            headers=self._get_headers(),
-        )
-
-    # Utility: internal PATCH helper
-    def _patch(self, collection: str, record_id: str, payload: Dict[str, Any]):
-        return requests.patch(
-            f"{self.base_url}/api/collections/{collection}/records/{record_id}",
-            json=payload,
-            headers=self._get_headers(),
-        )
-
-    # Utility: internal DELETE helper
-    def _delete(self, collection: str, record_id: str):
-        return requests.delete(
-            f"{self.base_url}/api/collections/{collection}/records/{record_id}",
-            headers=self._get_headers(),
-        )
-
     # ---- Classes ----
-    def create_class(self, teacher_user_id: str, title: str, description: Optional[str] = None, code: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    async def create_class(self, teacher_user_id: str, title: str, description: Optional[str] = None, code: Optional[str] = None) -> Optional[Dict[str, Any]]:
         # PocketBase schema may use 'name' instead of 'title'. Send both for compatibility.
         payload: Dict[str, Any] = {
             "title": title,
@@ -596,14 +865,14 @@ class PocketBaseService(PocketBaseService):
         }
         if code:
             payload["code"] = code
-        r = self._post(self.collections["classes"], payload)
+        r = await self._post(self.collections["classes"], payload)
         if r.status_code in (200, 201):
             created = r.json()
             # Ensure teacher is registered as a member with role 'teacher'
             try:
                 class_id = created.get("id")
                 if class_id and teacher_user_id:
-                    self.add_member(class_id, teacher_user_id, role="teacher")
+                    await self.add_member(class_id, teacher_user_id, role="teacher")
             except Exception:
                 # best-effort; failure here shouldn't block class creation
                 pass
@@ -611,63 +880,64 @@ class PocketBaseService(PocketBaseService):
         self._handle_response_error(r, "Create class")
         return None
 
-    def get_class(self, class_id: str) -> Optional[Dict[str, Any]]:
-        r = self._get(self.collections["classes"], params={"filter": f"id = '{class_id}'", "perPage": 1})
-        if r.status_code == 200:
-            items = r.json().get("items", [])
-            return items[0] if items else None
-        return None
+    async def get_class(self, class_id: str, fields: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        return await self._get_record(self.collections["classes"], class_id, fields=fields)
 
-    def update_class(self, class_id: str, payload: Dict[str, Any]) -> bool:
-        r = self._patch(self.collections["classes"], class_id, payload)
+    async def update_class(self, class_id: str, payload: Dict[str, Any]) -> bool:
+        r = await self._patch(self.collections["classes"], class_id, payload)
+        if "teacher" in payload or "createdBy" in payload:
+            self.membership_cache.invalidate(class_id)
         return r.status_code == 200
 
-    def delete_class(self, class_id: str) -> bool:
-        r = self._delete(self.collections["classes"], class_id)
+    async def delete_class(self, class_id: str) -> bool:
+        r = await self._delete(self.collections["classes"], class_id)
+        self.membership_cache.invalidate(class_id)
         return r.status_code == 204
 
-    def list_classes_for_teacher(self, teacher_user_id: str) -> List[Dict[str, Any]]:
+    async def list_classes_for_teacher(self, teacher_user_id: str, fields: Optional[str] = None) -> List[Dict[str, Any]]:
+        """`fields` projects the class records (e.g. "id,title,description"); id is always kept."""
         # Prefer membership relation; some schemas may not have a role field
         params = {
             "filter": f"user = '{teacher_user_id}'",
             "expand": "class",
-            "perPage": 200,
-            "sort": "-created",
+            # id breaks ties on equal `created` so pages neither repeat nor skip rows
+            "sort": "-created,-id",
         }
-        r = self._get(self.collections["class_members"], params=params)
-        if r.status_code == 200:
-            items = r.json().get("items", [])
-            classes_map: Dict[str, Dict[str, Any]] = {}
-            for it in items:
-                exp = it.get("expand", {})
-                c = exp.get("class")
-                if isinstance(c, dict):
-                    cid = c.get("id")
-                    if cid and cid not in classes_map:
-                        classes_map[cid] = c
-            classes = list(classes_map.values())
-            if classes:
-                return classes
+        class_fields = None
+        if fields:
+            class_fields = ",".join(dict.fromkeys(["id", *(f.strip() for f in fields.split(",") if f.strip())]))
+        member_fields = ",".join(f"expand.class.{f}" for f in class_fields.split(",")) if class_fields else "expand.class"
+        classes_map: Dict[str, Dict[str, Any]] = {}
+        async for it in self.iter_records(self.collections["class_members"], params, fields=member_fields):
+            c = (it.get("expand") or {}).get("class")
+            if isinstance(c, dict):
+                cid = c.get("id")
+                if cid and cid not in classes_map:
+                    classes_map[cid] = c
+        if classes_map:
+            return list(classes_map.values())
         # Fallback: return all classes (schema without membership or teacher owner)
-        r_all = self._get(self.collections["classes"], params={"perPage": 200, "sort": "-created"})
-        if r_all.status_code == 200:
-            return r_all.json().get("items", [])
-        return []
+        return await self.list_all(self.collections["classes"], {"sort": "-created,-id"}, fields=class_fields)
 
-    def list_classes_for_user(self, user_id: str) -> List[Dict[str, Any]]:
+    def iter_classes_for_user(self, user_id: str, fields: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
         # Via membership with expand class
-        r = self._get(
-            self.collections["class_members"],
-            params={"filter": f"user = '{user_id}'", "expand": "class", "perPage": 200, "sort": "-created"},
-        )
-        if r.status_code == 200:
-            return r.json().get("items", [])
-        return []
+        params = {"filter": f"user = '{user_id}'", "expand": "class", "sort": "-created,-id"}
+        return self.iter_records(self.collections["class_members"], params, fields=fields)
+
+    async def list_classes_for_user(self, user_id: str, fields: Optional[str] = None) -> List[Dict[str, Any]]:
+        return [item async for item in self.iter_classes_for_user(user_id, fields)]
 
     # ---- Permissions ----
-    def is_user_class_teacher(self, class_id: str, user_id: str) -> bool:
-        c = self.get_class(class_id)
-        if not c or not user_id:
+    async def is_user_class_teacher(self, class_id: str, user_id: str) -> bool:
+        if not user_id:
+            return False
+        return await self.membership_cache.get_or_load(
+            class_id, user_id, "teacher", lambda: self._load_is_teacher(class_id, user_id)
+        )
+
+    async def _load_is_teacher(self, class_id: str, user_id: str) -> bool:
+        c = await self.get_class(class_id, fields="teacher,createdBy")
+        if not c:
             return False
         # Check teacher field or fallback to createdBy
         if c.get("teacher") == user_id or (isinstance(c.get("teacher"), dict) and c.get("teacher", {}).get("id") == user_id):
@@ -676,40 +946,60 @@ class PocketBaseService(PocketBaseService):
             return True
         return False
 
-    def is_user_class_member(self, class_id: str, user_id: str) -> bool:
-        r = self._get(self.collections["class_members"], params={"filter": f"class = '{class_id}' && user = '{user_id}'", "perPage": 1})
+    async def is_user_class_member(self, class_id: str, user_id: str) -> bool:
+        if not user_id:
+            return False
+        return await self.membership_cache.get_or_load(
+            class_id, user_id, "member", lambda: self._load_is_member(class_id, user_id)
+        )
+
+    async def _load_is_member(self, class_id: str, user_id: str) -> bool:
+        r = await self._get(self.collections["class_members"], params={"filter": f"class = '{class_id}' && user = '{user_id}'", "perPage": 1, "skipTotal": 1}, fields="id")
         if r.status_code == 200:
             return len(r.json().get("items", [])) > 0
         return False
 
     # ---- Members ----
-    def add_member(self, class_id: str, user_id: str, role: str = "student") -> bool:
-        r = self._post(self.collections["class_members"], {"class": class_id, "user": user_id, "role": role})
+    async def add_member(self, class_id: str, user_id: str, role: str = "student") -> bool:
+        r = await self._post(self.collections["class_members"], {"class": class_id, "user": user_id, "role": role})
+        self.membership_cache.invalidate(class_id, user_id)
         if r.status_code in (200, 201):
             return True
         self._handle_response_error(r, "Add member")
         return False
 
-    def remove_member(self, class_id: str, user_id: str) -> bool:
+    async def add_members(self, class_id: str, user_ids: List[str], role: str = "student") -> Dict[str, bool]:
+        """Adds many members in one batch; returns {user_id: added}."""
+        results = await self.batch([
+            BatchOperation("POST", self.collections["class_members"], body={"class": class_id, "user": user_id, "role": role})
+            for user_id in user_ids
+        ])
+        for user_id in user_ids:
+            self.membership_cache.invalidate(class_id, user_id)
+        return {user_id: self.batch_ok(result) for user_id, result in zip(user_ids, results)}
+
+    async def remove_member(self, class_id: str, user_id: str) -> bool:
         # find record id first
-        r = self._get(self.collections["class_members"], params={"filter": f"class = '{class_id}' && user = '{user_id}'", "perPage": 1})
+        r = await self._get(self.collections["class_members"], params={"filter": f"class = '{class_id}' && user = '{user_id}'", "perPage": 1, "skipTotal": 1}, fields="id")
         if r.status_code != 200:
             return False
         items = r.json().get("items", [])
         if not items:
             return True
         member_id = items[0]["id"]
-        d = self._delete(self.collections["class_members"], member_id)
+        d = await self._delete(self.collections["class_members"], member_id)
+        self.membership_cache.invalidate(class_id, user_id)
         return d.status_code == 204
 
-    def list_members(self, class_id: str) -> List[Dict[str, Any]]:
-        r = self._get(self.collections["class_members"], params={"filter": f"class = '{class_id}'", "expand": "user", "perPage": 200})
-        if r.status_code == 200:
-            return r.json().get("items", [])
-        return []
+    def iter_members(self, class_id: str, fields: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+        params = {"filter": f"class = '{class_id}'", "expand": "user", "sort": "created,id"}
+        return self.iter_records(self.collections["class_members"], params, fields=fields)
+
+    async def list_members(self, class_id: str, fields: Optional[str] = None) -> List[Dict[str, Any]]:
+        return [item async for item in self.iter_members(class_id, fields)]
 
     # ---- Invites ----
-    def create_invite(self, class_id: str, invited_by: str, email: Optional[str] = None, user_id: Optional[str] = None, ttl_hours: int = 72) -> Optional[Dict[str, Any]]:
+    async def create_invite(self, class_id: str, invited_by: str, email: Optional[str] = None, user_id: Optional[str] = None, ttl_hours: int = 72) -> Optional[Dict[str, Any]]:
         from uuid import uuid4
         token = uuid4().hex
         expires_at = (datetime.utcnow() + timedelta(hours=ttl_hours)).isoformat()
@@ -718,21 +1008,21 @@ class PocketBaseService(PocketBaseService):
             payload["email"] = email
         if user_id:
             payload["user"] = user_id
-        r = self._post(self.collections["class_invites"], payload)
+        r = await self._post(self.collections["class_invites"], payload)
         if r.status_code in (200, 201):
             return r.json()
         self._handle_response_error(r, "Create invite")
         return None
 
-    def get_invite_by_token(self, token: str) -> Optional[Dict[str, Any]]:
-        r = self._get(self.collections["class_invites"], params={"filter": f"token = '{token}'", "perPage": 1})
+    async def get_invite_by_token(self, token: str, fields: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        r = await self._get(self.collections["class_invites"], params={"filter": f"token = '{token}'", "perPage": 1, "skipTotal": 1}, fields=fields)
         if r.status_code == 200:
             items = r.json().get("items", [])
             return items[0] if items else None
         return None
 
-    def accept_invite(self, token: str, user_id: str) -> bool:
-        invite = self.get_invite_by_token(token)
+    async def accept_invite(self, token: str, user_id: str) -> bool:
+        invite = await self.get_invite_by_token(token, fields="id,class,status,expires_at")
         if not invite:
             return False
         if invite.get("status") != "pending":
@@ -744,16 +1034,16 @@ class PocketBaseService(PocketBaseService):
         except Exception:
             pass
         class_id = invite.get("class") if isinstance(invite.get("class"), str) else invite.get("class", {}).get("id")
-        # Add member first
-        added = self.add_member(class_id, user_id, role="student")
-        if not added:
-            return False
-        # Update invite status
-        r = self._patch(self.collections["class_invites"], invite["id"], {"status": "accepted", "user": user_id})
-        return r.status_code == 200
+        # Membership + invite status in one transaction (no member left behind with a pending invite)
+        results = await self.batch([
+            BatchOperation("POST", self.collections["class_members"], body={"class": class_id, "user": user_id, "role": "student"}),
+            BatchOperation("PATCH", self.collections["class_invites"], invite["id"], {"status": "accepted", "user": user_id}),
+        ])
+        self.membership_cache.invalidate(class_id, user_id)
+        return all(self.batch_ok(result) for result in results)
 
     # ---- Events ----
-    def create_event(self, class_id: str, type_: str, title: str, description: str = "", starts_at: str = "", ends_at: Optional[str] = None, visibility: str = "class", is_online: Optional[bool] = False, meeting_url: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    async def create_event(self, class_id: str, type_: str, title: str, description: str = "", starts_at: str = "", ends_at: Optional[str] = None, visibility: str = "class", is_online: Optional[bool] = False, meeting_url: Optional[str] = None) -> Optional[Dict[str, Any]]:
         payload = {
             "class": class_id,
             "type": type_,
@@ -765,53 +1055,77 @@ class PocketBaseService(PocketBaseService):
             "is_online": bool(is_online) if is_online is not None else False,
             "meeting_url": meeting_url or "",
         }
-        r = self._post(self.collections["class_events"], payload)
+        r = await self._post(self.collections["class_events"], payload)
         if r.status_code in (200, 201):
             return r.json()
         self._handle_response_error(r, "Create event")
         return None
 
-    def list_events(self, class_id: str, since: Optional[str] = None, until: Optional[str] = None) -> List[Dict[str, Any]]:
+    def iter_events(self, class_id: str, since: Optional[str] = None, until: Optional[str] = None, fields: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
         filters = [f"class = '{class_id}'"]
         if since:
             filters.append(f"starts_at >= '{since}'")
         if until:
             filters.append(f"starts_at <= '{until}'")
         flt = " && ".join(filters)
-        r = self._get(self.collections["class_events"], params={"filter": flt, "sort": "starts_at", "perPage": 200})
-        if r.status_code == 200:
-            return r.json().get("items", [])
-        return []
+        return self.iter_records(self.collections["class_events"], {"filter": flt, "sort": "starts_at,id"}, fields=fields)
 
-    def update_event(self, event_id: str, payload: Dict[str, Any]) -> bool:
-        r = self._patch(self.collections["class_events"], event_id, payload)
+    async def list_events(self, class_id: str, since: Optional[str] = None, until: Optional[str] = None, fields: Optional[str] = None) -> List[Dict[str, Any]]:
+        return [item async for item in self.iter_events(class_id, since, until, fields)]
+
+    async def update_event(self, event_id: str, payload: Dict[str, Any]) -> bool:
+        r = await self._patch(self.collections["class_events"], event_id, payload)
         return r.status_code == 200
 
-    def delete_event(self, event_id: str) -> bool:
-        r = self._delete(self.collections["class_events"], event_id)
+    async def delete_event(self, event_id: str) -> bool:
+        r = await self._delete(self.collections["class_events"], event_id)
         return r.status_code == 204
 
     # ---- Class API Keys ----
-    def set_class_api_key(self, class_id: str, provider: str, api_key: str, created_by: str, active: bool = True) -> bool:
-        # Deactivate existing active keys for the same provider and class
-        r_list = self._get(
+    async def set_class_api_key(self, class_id: str, provider: str, api_key: str, created_by: str, active: bool = True) -> bool:
+        # Deactivate existing active keys for the same provider and class, then create the new one, in one batch
+        active_ids = await self._collect_ids(
             self.collections["class_api_keys"],
-            params={"filter": f"class = '{class_id}' && provider = '{provider}' && active = true", "perPage": 200},
+            f"class = '{class_id}' && provider = '{provider}' && active = true",
         )
-        if r_list.status_code == 200:
-            for item in r_list.json().get("items", []):
-                self._patch(self.collections["class_api_keys"], item["id"], {"active": False})
-        r = self._post(
+        operations = [
+            BatchOperation("PATCH", self.collections["class_api_keys"], key_id, {"active": False})
+            for key_id in active_ids
+        ]
+        operations.append(BatchOperation(
+            "POST",
             self.collections["class_api_keys"],
-            {"class": class_id, "provider": provider, "api_key": api_key, "created_by": created_by, "active": active},
-        )
-        return r.status_code in (200, 201)
+            body={"class": class_id, "provider": provider, "api_key": api_key, "created_by": created_by, "active": active},
+        ))
+        results = await self.batch(operations)
+        self.class_key_cache.invalidate(class_id, provider)
+        return self.batch_ok(results[-1])
 
-    def get_class_api_key(self, class_id: str, provider: str, include_inactive: bool = False) -> Optional[str]:
+    async def get_class_api_key(self, class_id: str, provider: str, include_inactive: bool = False) -> Optional[str]:
+        if not include_inactive:
+            return await self.class_key_cache.aget_or_load(
+                class_id, provider, lambda: self._load_class_api_key(class_id, provider, False)
+            )
+        return await self._load_class_api_key(class_id, provider, True)
+
+    async def _load_class_api_key(self, class_id: str, provider: str, include_inactive: bool) -> Optional[str]:
         flt = f"class = '{class_id}' && provider = '{provider}'"
         if not include_inactive:
             flt += " && active = true"
-        r = self._get(self.collections["class_api_keys"], params={"filter": flt, "perPage": 1, "sort": "-created"})
+        r = await self._get(self.collections["class_api_keys"], params={"filter": flt, "perPage": 1, "sort": "-created", "skipTotal": 1}, fields="api_key")
+        if r.status_code == 200:
+            items = r.json().get("items", [])
+            if items:
+                return items[0].get("api_key")
+        return None
+
+    def get_class_api_key_sync(self, class_id: str, provider: str) -> Optional[str]:
+        # Used by the synchronous AGNO call path; shares the pooled sync client and the key cache
+        return self.class_key_cache.get_or_load(class_id, provider, lambda: self._load_class_api_key_sync(class_id, provider))
+
+    def _load_class_api_key_sync(self, class_id: str, provider: str) -> Optional[str]:
+        flt = f"class = '{class_id}' && provider = '{provider}' && active = true"
+        r = self._get_sync(self.collections["class_api_keys"], params={"filter": flt, "perPage": 1, "sort": "-created", "skipTotal": 1}, fields="api_key")
         if r.status_code == 200:
             items = r.json().get("items", [])
             if items:
@@ -820,8 +1134,9 @@ class PocketBaseService(PocketBaseService):
 
     # ---- Notifications ----
 
-    def create_notification(self, recipient_id: str, sender_id: str, title: str, content: str, type: str, metadata: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    async def create_notification(self, recipient_id: str, sender_id: str, title: str, content: str, type: str, metadata: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         payload = {
+            "id": new_record_id(),
             "recipient": recipient_id,
             "sender": sender_id,
             "title": title,
@@ -830,79 +1145,230 @@ class PocketBaseService(PocketBaseService):
             "read": False,
             "metadata": metadata or {}
         }
-        r = self._post(self.collections["notifications"], payload)
+        # Id gerado aqui: o eco do realtime fica registrado antes da escrita
+        if self.notification_hub is not None:
+            self.notification_hub.expect_echo("create", payload)
+        r = await self._post(self.collections["notifications"], payload)
         if r.status_code in (200, 201):
-            return r.json()
+            created = r.json()
+            # Idempotente por id: o create do realtime, se já chegou, não conta de novo
+            unread = self.unread_counters.apply_change(recipient_id, created.get("id"), True, previous=None)
+            if self.notification_hub is not None:
+                self.notification_hub.publish_record("create", created, unread_count=unread)
+            return created
+        if self.notification_hub is not None:
+            self.notification_hub.forget_echo("create", payload)
         self._handle_response_error(r, "Create notification")
         return {}
 
-    def get_notification(self, notification_id: str) -> Optional[Dict[str, Any]]:
-        r = self._get(self.collections["notifications"], params={"filter": f"id = '{notification_id}'", "perPage": 1})
-        if r.status_code == 200:
-            items = r.json().get("items", [])
-            return items[0] if items else None
-        return None
+    async def broadcast_class_notification(
+        self,
+        class_id: str,
+        sender_id: str,
+        title: str,
+        content: str,
+        type: str,
+        metadata: Optional[Dict[str, Any]] = None,
+        include_teachers: bool = False,
+    ) -> Dict[str, Any]:
+        """
+        Notifies every member of a class with batched writes.
+
+        Members are resolved once (only user/role fields); rows are written through
+        `batch()` and each created notification is pushed to the member's open streams.
 
-    def list_notifications_for_user(self, user_id: str, limit: int = 50, offset: int = 0, unread_only: bool = False) -> List[Dict[str, Any]]:
+        Returns:
+            Summary with recipients, created and failed counts
+        """
+        recipients: List[str] = []
+        seen = {sender_id}
+        async for member in self.iter_members(class_id, fields="user,role"):
+            user_id = member.get("user")
+            if not user_id or user_id in seen or (member.get("role") == "teacher" and not include_teachers):
+                continue
+            seen.add(user_id)
+            recipients.append(user_id)
+
+        payload_metadata = {**(metadata or {}), "class_id": class_id}
+        bodies = [
+            {
+                "id": new_record_id(),
+                "recipient": recipient_id,
+                "sender": sender_id,
+                "title": title,
+                "content": content,
+                "type": type,
+                "read": False,
+                "metadata": payload_metadata,
+            }
+            for recipient_id in recipients
+        ]
+        if self.notification_hub is not None:
+            for body in bodies:
+                self.notification_hub.expect_echo("create", body)
+        results = await self.batch([
+            BatchOperation("POST", self.collections["notifications"], body=body) for body in bodies
+        ])
+
+        failed: List[str] = []
+        for recipient_id, body, result in zip(recipients, bodies, results):
+            if not self.batch_ok(result):
+                failed.append(recipient_id)
+                if self.notification_hub is not None:
+                    self.notification_hub.forget_echo("create", body)
+                continue
+            unread = self.unread_counters.apply_change(recipient_id, body["id"], True, previous=None)
+            if self.notification_hub is not None and isinstance(result.get("body"), dict):
+                self.notification_hub.publish_record("create", result["body"], unread_count=unread)
+
+        return {
+            "class_id": class_id,
+            "recipients": len(recipients),
+            "created": len(recipients) - len(failed),
+            "failed": len(failed),
+            "failed_recipients": failed,
+        }
+
+    async def get_notification(self, notification_id: str, fields: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        return await self._get_record(self.collections["notifications"], notification_id, fields=fields)
+
+    async def list_notifications_for_user(self, user_id: str, limit: int = 50, offset: int = 0, unread_only: bool = False, fields: Optional[str] = None) -> List[Dict[str, Any]]:
         flt = f"recipient = '{user_id}'"
         if unread_only:
             flt += " && read = false"
-        params = {
-            "filter": flt,
-            "perPage": limit,
-            "skip": offset,
-            "sort": "-created"
-        }
-        r = self._get(self.collections["notifications"], params=params)
-        if r.status_code == 200:
-            return r.json().get("items", [])
-        return []
+        if limit <= 0:
+            return []
+        # PocketBase paginates by page/perPage (there is no `skip`): map the offset onto pages
+        first_page, inner = divmod(offset, limit)
+        items: List[Dict[str, Any]] = []
+        for page in range(first_page + 1, first_page + (3 if inner else 2)):
+            params = {"filter": flt, "page": page, "perPage": limit, "sort": "-created,-id", "skipTotal": 1}
+            r = await self._get(self.collections["notifications"], params=params, fields=fields)
+            if r.status_code != 200:
+                break
+            page_items = r.json().get("items", [])
+            items.extend(page_items)
+            if len(page_items) < limit:
+                break
+        return items[inner:inner + limit]
 
-    def get_unread_notifications_count(self, user_id: str) -> int:
+    async def get_unread_notifications_count(self, user_id: str) -> int:
+        try:
+            return await self.unread_counters.get(user_id)
+        except Exception as e:
+            logger.error(f"Error counting unread notifications: {e}")
+            return 0
+
+    async def _count_unread_notifications(self, user_id: str) -> int:
         params = {
             "filter": f"recipient = '{user_id}' && read = false",
-            "perPage": 1
+            "perPage": 1,
+            "fields": "id",
         }
-        r = self._get(self.collections["notifications"], params=params)
+        r = await self._get(self.collections["notifications"], params=params)
         if r.status_code == 200:
             return r.json().get("totalItems", 0)
-        return 0
+        raise RuntimeError(f"unread count failed: {r.status_code}")
 
-    def update_notification(self, notification_id: str, read: Optional[bool] = None) -> Dict[str, Any]:
+    async def update_notification(self, notification_id: str, read: Optional[bool] = None, previous: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """`previous` (the record before the update) lets the unread counter apply an exact delta."""
         payload = {}
         if read is not None:
             payload["read"] = read
 
         if not payload:
-            return self.get_notification(notification_id) or {}
+            return previous or await self.get_notification(notification_id) or {}
 
-        r = self._patch(self.collections["notifications"], notification_id, payload)
+        expected = {"id": notification_id, **payload}
+        if self.notification_hub is not None:
+            self.notification_hub.expect_echo("update", expected)
+        r = await self._patch(self.collections["notifications"], notification_id, payload)
         if r.status_code == 200:
-            return r.json()
+            updated = r.json()
+            recipient = updated.get("recipient")
+            unread = None
+            if recipient:
+                unread = self.unread_counters.apply_change(
+                    recipient, notification_id, not updated.get("read"),
+                    previous=(not previous.get("read")) if previous is not None else UNKNOWN,
+                )
+            if self.notification_hub is not None:
+                self.notification_hub.publish_record("update", updated, unread_count=unread)
+            return updated
+        if self.notification_hub is not None:
+            self.notification_hub.forget_echo("update", expected)
         self._handle_response_error(r, "Update notification")
         return {}
 
-    def mark_notification_as_read(self, notification_id: str) -> Dict[str, Any]:
-        return self.update_notification(notification_id, read=True)
-
-    def mark_all_notifications_as_read(self, user_id: str) -> int:
-        # Get all unread notifications for the user
-        unread_notifications = self.list_notifications_for_user(user_id, unread_only=True)
-        marked_count = 0
+    async def mark_notification_as_read(self, notification_id: str, previous: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        return await self.update_notification(notification_id, read=True, previous=previous)
 
-        for notification in unread_notifications:
-            if self.mark_notification_as_read(notification["id"]):
-                marked_count += 1
+    async def mark_all_notifications_as_read(self, user_id: str) -> int:
+        # All unread ids (not only the first page), then one batched update
+        unread_ids = await self._collect_ids(self.collections["notifications"], f"recipient = '{user_id}' && read = false")
+        # One event for the whole operation: per-record realtime echoes are expected before the batch is sent
+        if self.notification_hub is not None:
+            for notification_id in unread_ids:
+                self.notification_hub.expect_echo("update", {"id": notification_id, "read": True})
+        results = await self.batch([
+            BatchOperation("PATCH", self.collections["notifications"], notification_id, {"read": True})
+            for notification_id in unread_ids
+        ])
+        marked_ids = []
+        for notification_id, result in zip(unread_ids, results):
+            if self.batch_ok(result):
+                marked_ids.append(notification_id)
+            elif self.notification_hub is not None:
+                self.notification_hub.forget_echo("update", {"id": notification_id, "read": True})
+        unread = self.unread_counters.peek(user_id)
+        for notification_id in marked_ids:
+            unread = self.unread_counters.apply_change(user_id, notification_id, False, previous=True)
+        if self.notification_hub is not None and marked_ids:
+            self.notification_hub.publish(user_id, {"type": "notifications.read_all", "ids": marked_ids, "unread_count": unread})
+        return len(marked_ids)
 
-        return marked_count
-
-    def delete_notification(self, notification_id: str) -> bool:
-        r = self._delete(self.collections["notifications"], notification_id)
-        return r.status_code == 204
+    async def delete_notification(self, notification_id: str, recipient_id: Optional[str] = None, was_read: Optional[bool] = None) -> bool:
+        if self.notification_hub is not None:
+            self.notification_hub.expect_echo("delete", {"id": notification_id})
+        r = await self._delete(self.collections["notifications"], notification_id)
+        if r.status_code != 204:
+            if self.notification_hub is not None:
+                self.notification_hub.forget_echo("delete", {"id": notification_id})
+            return False
+        unread = None
+        if recipient_id:
+            unread = self.unread_counters.apply_change(
+                recipient_id, notification_id, None, previous=(not was_read) if was_read is not None else UNKNOWN,
+            )
+            if self.notification_hub is not None:
+                self.notification_hub.publish_record(
+                    "delete", {"id": notification_id, "recipient": recipient_id, "read": was_read}, unread_count=unread,
+                )
+        return True
 
 # Recreate global instance AFTER extending the class so it includes class management methods
 from app.config import settings
-pb_service = PocketBaseService(base_url=settings.pocketbase_url)
+pb_service = PocketBaseService(
+    base_url=settings.pocketbase_url,
+    timeout_seconds=settings.pocketbase_timeout_seconds,
+    connect_timeout_seconds=settings.pocketbase_connect_timeout_seconds,
+    max_connections=settings.pocketbase_max_connections,
+    max_keepalive_connections=settings.pocketbase_max_keepalive_connections,
+    admin_email=settings.pocketbase_admin_email or None,
+    admin_password=settings.pocketbase_admin_password or None,
+    token_refresh_margin_seconds=settings.pocketbase_token_refresh_margin_seconds,
+    batch_max_requests=settings.pocketbase_batch_max_requests,
+    bulk_concurrency=settings.pocketbase_bulk_concurrency,
+    membership_cache=MembershipCache(
+        ttl_seconds=settings.membership_cache_ttl_seconds,
+        negative_ttl_seconds=settings.membership_cache_negative_ttl_seconds,
+    ),
+    class_key_cache=ClassApiKeyCache(ttl_seconds=settings.class_api_key_cache_ttl_seconds),
+    notification_hub=get_notification_hub(),
+    unread_reconcile_interval_seconds=settings.unread_counter_reconcile_seconds,
+    analytics_refresh_interval_seconds=settings.platform_analytics_refresh_seconds,
+    active_class_window_days=settings.platform_analytics_active_window_days,
+)
 
 def get_pocketbase_client() -> PocketBaseService:
     """
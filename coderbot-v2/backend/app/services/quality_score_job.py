@@ -0,0 +1,198 @@
+"""
+Recálculo periódico e vetorizado do quality_score dos exemplos contextuais.
+
+O `quality_score` inclui um decaimento por antiguidade, mas antes só era
+recalculado quando alguém votava; exemplos antigos mantinham o ranking para
+sempre. Este job percorre `contextual_examples` em páginas (apenas as colunas
+necessárias), recalcula Wilson × freshness + usage boost para todas as linhas
+em uma única passada NumPy e grava somente as linhas cujo score mudou mais que
+`epsilon`, em lotes pela Batch API do PocketBase (`PocketBaseService.batch`).
+"""
+
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from app.services.pocketbase_service import BatchOperation, PocketBaseService
+
+logger = logging.getLogger(__name__)
+
+WILSON_Z = 1.96
+NEUTRAL_SCORE = 0.5
+
+_SCORE_FIELDS = "id,upvotes,downvotes,usage_count,quality_score,created"
+
+
+def compute_quality_scores(
+    upvotes: np.ndarray,
+    downvotes: np.ndarray,
+    usage_count: np.ndarray,
+    days_since_creation: np.ndarray,
+) -> np.ndarray:
+    """
+    Versão vetorizada de `ExamplesRAGService._calculate_quality_score`.
+
+    Returns:
+        Vetor de scores entre 0.0 e 1.0 (3 casas decimais); 0.5 para exemplos sem votos
+    """
+    up = np.asarray(upvotes, dtype=np.float64)
+    down = np.asarray(downvotes, dtype=np.float64)
+    total = up + down
+    has_votes = total > 0
+    n = np.where(has_votes, total, 1.0)
+
+    z2 = WILSON_Z * WILSON_Z
+    p = up / n
+    wilson = (
+        p + z2 / (2 * n)
+        - WILSON_Z * np.sqrt((p * (1 - p) + z2 / (4 * n)) / n)
+    ) / (1 + z2 / n)
+
+    freshness = np.maximum(0.7, 1.0 - np.asarray(days_since_creation, dtype=np.float64) / 120)
+    usage_boost = np.minimum(0.15, np.asarray(usage_count, dtype=np.float64) * 0.02)
+
+    scores = np.clip(wilson * freshness + usage_boost, 0.0, 1.0)
+    return np.where(has_votes, np.round(scores, 3), NEUTRAL_SCORE)
+
+
+def days_since_array(created: Sequence[Any], now: Optional[datetime] = None) -> np.ndarray:
+    """Converte datas `created` do PocketBase (str ISO ou datetime) em dias inteiros até `now`."""
+    now = now or datetime.now(timezone.utc)
+    now64 = np.datetime64(now.astimezone(timezone.utc).replace(tzinfo=None), "s")
+    stamps = np.array(
+        [_to_utc_iso(value) for value in created],
+        dtype="datetime64[s]",
+    )
+    seconds = (now64 - stamps).astype("timedelta64[s]").astype(np.int64)
+    days = np.floor_divide(seconds, 86400)
+    # Datas ausentes/inválidas (NaT) contam como recém-criadas
+    return np.where(np.isnat(stamps), 0, np.maximum(days, 0))
+
+
+def _to_utc_iso(value: Any) -> str:
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value.isoformat(timespec="seconds")
+    if not value:
+        return "NaT"
+    # "2025-01-01 12:00:00.123Z" -> "2025-01-01T12:00:00"
+    return str(value)[:19].replace(" ", "T")
+
+
+class QualityScoreJob:
+    """Job em segundo plano que mantém o quality_score coerente com o decaimento."""
+
+    def __init__(
+        self,
+        pb_client: PocketBaseService,
+        epsilon: float = 0.005,
+        page_size: int = 500,
+        interval_seconds: float = 3600.0,
+        on_update: Optional[Callable[[str, float], None]] = None,
+    ):
+        """
+        Args:
+            pb_client: Serviço compartilhado do PocketBase
+            epsilon: Variação mínima de score para gravar a linha
+            page_size: Registros por página na leitura
+            interval_seconds: Intervalo entre execuções do loop em segundo plano
+            on_update: Callback (example_id, novo_score), ex.: atualizar o índice de busca
+        """
+        self.pb = pb_client
+        self.epsilon = epsilon
+        self.page_size = page_size
+        self.interval_seconds = interval_seconds
+        self.on_update = on_update
+        self._task: Optional[asyncio.Task] = None
+
+    async def run_once(self, now: Optional[datetime] = None) -> Dict[str, Any]:
+        """
+        Executa um ciclo completo: leitura paginada, recálculo vetorizado e escrita das diferenças.
+
+        Returns:
+            Resumo com `scanned`, `updated`, `failed` e `duration_ms`
+        """
+        started = time.perf_counter()
+        ids, up, down, usage, stored, created = await self._load_columns()
+        if not ids:
+            return {"scanned": 0, "updated": 0, "failed": 0, "duration_ms": 0.0}
+
+        scores = compute_quality_scores(
+            np.asarray(up), np.asarray(down), np.asarray(usage), days_since_array(created, now)
+        )
+        changed = np.flatnonzero(np.abs(scores - np.asarray(stored, dtype=np.float64)) > self.epsilon)
+
+        failed = await self._write_scores([(ids[i], float(scores[i])) for i in changed])
+
+        summary = {
+            "scanned": len(ids),
+            "updated": len(changed) - failed,
+            "failed": failed,
+            "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+        }
+        logger.info(f"Recálculo de quality_score: {summary}")
+        return summary
+
+    def start(self) -> None:
+        """Inicia o loop periódico (idempotente)."""
+        if self.interval_seconds <= 0:
+            return
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error(f"Erro no recálculo periódico de quality_score: {e}")
+            await asyncio.sleep(self.interval_seconds)
+
+    async def _load_columns(self):
+        ids: List[str] = []
+        up: List[int] = []
+        down: List[int] = []
+        usage: List[int] = []
+        stored: List[float] = []
+        created: List[Any] = []
+
+        async for record in self.pb.iter_records(
+            'contextual_examples', {'sort': 'id'}, fields=_SCORE_FIELDS, page_size=self.page_size
+        ):
+            ids.append(record["id"])
+            up.append(record.get("upvotes") or 0)
+            down.append(record.get("downvotes") or 0)
+            usage.append(record.get("usage_count") or 0)
+            stored.append(record.get("quality_score") or 0.0)
+            created.append(record.get("created"))
+
+        return ids, up, down, usage, stored, created
+
+    async def _write_scores(self, updates: List[tuple]) -> int:
+        """Grava os scores alterados em lotes (/api/batch); retorna o número de falhas."""
+        if not updates:
+            return 0
+        results = await self.pb.batch([
+            BatchOperation("PATCH", "contextual_examples", example_id, {"quality_score": score})
+            for example_id, score in updates
+        ])
+        failed = 0
+        for (example_id, score), result in zip(updates, results):
+            if not self.pb.batch_ok(result):
+                failed += 1
+                continue
+            if self.on_update:
+                self.on_update(example_id, score)
+        if failed:
+            logger.warning(f"Falha ao gravar quality_score de {failed} exemplos")
+        return failed
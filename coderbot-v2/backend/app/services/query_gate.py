@@ -0,0 +1,258 @@
+"""
+QueryGate - classificação de queries em uma única passada.
+
+Substitui os loops por palavra-chave (um `re.search` por termo no router,
+contagem por substring na validação e regexes de off-topic separadas) por
+uma única expressão regular pré-compilada. Uma chamada a `analyze` percorre
+o texto uma vez e devolve, juntos:
+- palavras-chave de programação encontradas
+- termos off-topic encontrados
+- linguagens e conceitos (usados na extração de tópicos)
+- features de gibberish (vogais, tokens repetidos, diversidade)
+
+Regras de casamento:
+- todo termo exige palavra inteira ("const" não casa com "constituição",
+  "rest" não casa com "restaurante")
+- flexões são listadas explicitamente em `TERM_INFLECTIONS` ("objetos" conta
+  como "objeto"), só para os termos que precisam delas
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Keywords de programação (multilíngue)
+PROGRAMMING_KEYWORDS = [
+    # Português
+    "código", "programar", "função", "variável", "loop", "array",
+    "objeto", "classe", "método", "algoritmo", "bug", "erro",
+    "debug", "compilar", "executar", "syntax", "sintaxe",
+    "lista", "dicionário", "string", "integer", "float", "boolean",
+    "if", "else", "for", "while", "return", "import", "def",
+    "const", "let", "var", "async", "await", "promise", "callback",
+
+    # Linguagens
+    "javascript", "python", "java", "c++", "typescript", "react",
+    "node", "angular", "vue", "django", "flask", "spring",
+    "html", "css", "sql", "mongodb", "postgresql",
+
+    # Conceitos
+    "recursão", "iteração", "estrutura de dados", "api", "rest",
+    "json", "xml", "http", "request", "response", "endpoint",
+    "frontend", "backend", "fullstack", "database", "query",
+    "test", "unit test", "integration", "deploy", "git",
+
+    # Inglês (caso aluno pergunte em inglês)
+    "code", "program", "function", "variable", "object", "class",
+    "method", "algorithm", "loop", "array", "list", "dictionary",
+]
+
+# Anti-padrões (queries claramente off-topic)
+OFF_TOPIC_TERMS = [
+    "clima", "tempo", "weather", "temperatura", "chuva", "sol",
+    "receita", "comida", "food", "cozinha", "prato",
+    "futebol", "esporte", "sport", "jogo de futebol", "campeonato",
+    "filme", "série", "movie", "netflix", "cinema",
+    "música", "canção", "song", "banda", "artista musical",
+    "fofoca", "celebridade", "famoso", "celebrity",
+    "política", "eleição", "partido político",
+    "religião", "igreja", "templo", "fé",
+]
+
+# Linguagens de programação (tópicos)
+LANGUAGE_TERMS = [
+    "python", "javascript", "java", "c++", "typescript",
+    "ruby", "go", "rust", "php", "swift", "kotlin",
+]
+
+# Conceitos técnicos comuns (tópicos)
+CONCEPT_TERMS = [
+    "function", "função", "loop", "array", "object", "objeto",
+    "class", "classe", "async", "promise", "callback", "recursion",
+    "recursão", "api", "rest", "database", "query",
+]
+
+# Flexões aceitas por termo (casadas por palavra inteira e contadas como o termo base)
+TERM_INFLECTIONS = {
+    "código": ("códigos",),
+    "programar": ("programa", "programas", "programando", "programação"),
+    "função": ("funções",),
+    "variável": ("variáveis",),
+    "loop": ("loops",),
+    "array": ("arrays",),
+    "objeto": ("objetos",),
+    "classe": ("classes",),
+    "método": ("métodos",),
+    "algoritmo": ("algoritmos",),
+    "bug": ("bugs",),
+    "erro": ("erros",),
+    "compilar": ("compila", "compilando", "compilação", "compilador"),
+    "executar": ("executa", "executando", "execução"),
+    "lista": ("listas",),
+    "dicionário": ("dicionários",),
+    "string": ("strings",),
+    "promise": ("promises",),
+    "callback": ("callbacks",),
+    "recursão": ("recursivo", "recursiva"),
+    "iteração": ("iterações",),
+    "request": ("requests",),
+    "endpoint": ("endpoints",),
+    "query": ("queries",),
+    "test": ("tests", "teste", "testes"),
+    "function": ("functions",),
+    "variable": ("variables",),
+    "object": ("objects",),
+    "method": ("methods",),
+    "algorithm": ("algorithms",),
+    "program": ("programs", "programming"),
+}
+
+_WORD_CHARS = "a-z0-9áéíóúàãõâêôüç"
+_VOWELS = frozenset("aeiouáéíóúàãõâêôü")
+
+
+@dataclass(slots=True)
+class QueryAnalysis:
+    """Resultado de uma passada do QueryGate sobre a query."""
+
+    keyword_hits: List[str] = field(default_factory=list)
+    off_topic_hits: List[str] = field(default_factory=list)
+    languages: List[str] = field(default_factory=list)
+    concepts: List[str] = field(default_factory=list)
+    token_count: int = 0
+    alphabetic_count: int = 0
+    vowel_ratio: float = 0.0
+    repeated_ratio: float = 0.0
+    unique_ratio: float = 0.0
+
+    @property
+    def keyword_matches(self) -> int:
+        return len(self.keyword_hits)
+
+    @property
+    def has_programming_keyword(self) -> bool:
+        return bool(self.keyword_hits)
+
+    @property
+    def is_off_topic(self) -> bool:
+        return bool(self.off_topic_hits)
+
+    @property
+    def is_gibberish(self) -> bool:
+        """Baixa presença de vogais, tokens repetidos ou ausência de palavras significativas."""
+        if self.alphabetic_count == 0:
+            return True
+        return (
+            self.vowel_ratio < 0.3
+            or self.repeated_ratio > 0.4
+            or self.unique_ratio < 0.2
+            or self.alphabetic_count <= 1
+        )
+
+    def topics(self, mission_context: Optional[Dict[str, Any]] = None, limit: int = 5) -> List[str]:
+        """Tópicos da missão (prioridade) + linguagens + conceitos, sem duplicatas."""
+        topics: List[str] = []
+        if mission_context and mission_context.get("topics"):
+            topics.extend(mission_context["topics"])
+        topics.extend(self.languages)
+        topics.extend(self.concepts)
+        return list(dict.fromkeys(topics))[:limit]
+
+
+class QueryGate:
+    """Motor pré-compilado de classificação de queries."""
+
+    def __init__(
+        self,
+        programming_keywords: Iterable[str] = PROGRAMMING_KEYWORDS,
+        off_topic_terms: Iterable[str] = OFF_TOPIC_TERMS,
+        languages: Iterable[str] = LANGUAGE_TERMS,
+        concepts: Iterable[str] = CONCEPT_TERMS,
+        inflections: Dict[str, Iterable[str]] = TERM_INFLECTIONS,
+    ):
+        self.categories: Dict[str, Tuple[str, ...]] = {}
+        for category, terms in (
+            ("keyword", programming_keywords),
+            ("off_topic", off_topic_terms),
+            ("language", languages),
+            ("concept", concepts),
+        ):
+            for term in terms:
+                term = term.lower()
+                if category not in self.categories.get(term, ()):
+                    self.categories[term] = self.categories.get(term, ()) + (category,)
+
+        # Forma flexionada -> termo base (um termo base nunca é reescrito)
+        self.aliases: Dict[str, str] = {}
+        for term, forms in inflections.items():
+            term = term.lower()
+            if term not in self.categories:
+                continue
+            for form in forms:
+                form = form.lower()
+                if form not in self.categories:
+                    self.aliases.setdefault(form, term)
+
+        self.pattern = re.compile(
+            rf"(?<!\w)(?P<term>{self._alternation(list(self.categories) + list(self.aliases))})(?!\w)"
+            rf"|(?P<word>[{_WORD_CHARS}]+)"
+        )
+        self._word_pattern = re.compile(rf"[{_WORD_CHARS}]+")
+
+    @staticmethod
+    def _alternation(terms: List[str]) -> str:
+        if not terms:
+            return "(?!)"
+        # Mais longos primeiro: "javascript" antes de "java", "unit test" antes de "test"
+        return "|".join(re.escape(t) for t in sorted(terms, key=len, reverse=True))
+
+    def analyze(self, text: Optional[str]) -> QueryAnalysis:
+        """Percorre o texto uma única vez e devolve todas as features da query."""
+        analysis = QueryAnalysis()
+        if not text:
+            return analysis
+
+        seen = set()
+        tokens: List[str] = []
+        for match in self.pattern.finditer(text.lower()):
+            term = match.group("term")
+            if term is None:
+                tokens.append(match.group("word"))
+                continue
+            tokens.extend(self._word_pattern.findall(term))
+            term = self.aliases.get(term, term)
+            if term in seen:
+                continue
+            seen.add(term)
+            for category in self.categories[term]:
+                if category == "keyword":
+                    analysis.keyword_hits.append(term)
+                elif category == "off_topic":
+                    analysis.off_topic_hits.append(term)
+                elif category == "language":
+                    analysis.languages.append(term)
+                else:
+                    analysis.concepts.append(term)
+
+        analysis.token_count = len(tokens)
+        alphabetic = [t for t in tokens if not t.isdigit()]
+        analysis.alphabetic_count = len(alphabetic)
+        if alphabetic:
+            total = len(alphabetic)
+            analysis.vowel_ratio = sum(1 for t in alphabetic if not _VOWELS.isdisjoint(t)) / total
+            analysis.repeated_ratio = sum(1 for t in alphabetic if len(t) > 3 and len(set(t)) <= 2) / total
+            analysis.unique_ratio = len(set(alphabetic)) / total
+        return analysis
+
+
+_query_gate_instance: Optional[QueryGate] = None
+
+
+def get_query_gate() -> QueryGate:
+    """Instância compartilhada (a regex é compilada uma única vez por processo)."""
+    global _query_gate_instance
+
+    if _query_gate_instance is None:
+        _query_gate_instance = QueryGate()
+
+    return _query_gate_instance
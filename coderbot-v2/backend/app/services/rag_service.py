@@ -5,11 +5,14 @@ de fontes de conhecimento para melhorar a qualidade das respostas
 da IA, seguindo princípios SOLID e modularidade.
 """
 
-import httpx
+import asyncio
 import logging
+import time
+import numpy as np
 from pocketbase import PocketBase
-from typing import List, Dict, Any, Protocol, Optional
-from app.config import settings
+from typing import List, Dict, Any, Protocol, Optional, Tuple
+from app.rag.chunking import merge_adjacent_chunks
+from app.rag.embeddings import EmbeddingBackend, OpenAIEmbeddingBackend, get_embedding_backend
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -31,47 +34,130 @@ class PocketBaseKnowledgeSource:
     """
     Fonte de conhecimento que busca documentos (ex: 'kata_docs') no PocketBase
     usando embeddings para similaridade vetorial.
+
+    A busca é feita sobre os chunks de `kata_chunks` (um embedding por chunk);
+    os melhores chunks são agrupados com os vizinhos do mesmo kata, de modo que
+    o prompt recebe só o trecho relevante em vez do início do documento.
     """
     def __init__(self, 
                  pb_client: PocketBase, 
                  collection_name: str = "kata_docs", 
-                 embedding_model: str = "text-embedding-ada-002"):
+                 embedding_model: Optional[str] = None,
+                 embedding_backend: Optional[EmbeddingBackend] = None,
+                 chunk_collection_name: str = "kata_chunks",
+                 chunk_cache_ttl_seconds: float = 300.0):
         self.pb_client = pb_client
         self.collection_name = collection_name
-        self.embedding_model = embedding_model
-        # Idealmente, o cliente HTTP para OpenAI seria injetado ou gerenciado de forma mais centralizada
-        self.openai_http_client = httpx.AsyncClient(
-            base_url=settings.deep_seek_api_url if settings.deep_seek_api_url else "https://api.openai.com/v1",
-            headers={"Authorization": f"Bearer {settings.open_ai_api_key}"},
-            timeout=30.0
-        )
+        self.chunk_collection_name = chunk_collection_name
+        self.chunk_cache_ttl_seconds = chunk_cache_ttl_seconds
+        # Embeddings dos chunks gerados pelo mesmo modelo da query: (matriz normalizada, metadados)
+        self._chunk_index: Optional[Tuple[np.ndarray, List[Dict[str, Any]]]] = None
+        self._chunk_index_loaded_at: Optional[float] = None
+        # Backend plugável: remoto (OpenAI) ou local (CPU), ver EMBEDDING_BACKEND
+        self._owns_backend = embedding_backend is None and embedding_model is not None
+        if embedding_backend is None:
+            embedding_backend = (
+                OpenAIEmbeddingBackend(model=embedding_model)
+                if embedding_model else get_embedding_backend()
+            )
+        self.embedding_backend = embedding_backend
+        self.embedding_model = embedding_backend.name
 
     async def _get_embedding(self, text: str) -> List[float]:
-        """Gera embedding para o texto usando a API da OpenAI."""
+        """Gera embedding para o texto usando o backend configurado."""
         try:
-            resp = await self.openai_http_client.post(
-                "/embeddings",
-                json={"model": self.embedding_model, "input": text}
-            )
-            resp.raise_for_status()
-            data = resp.json()
-            return data["data"][0]["embedding"]
+            vectors = await self.embedding_backend.embed([text])
+            return vectors[0].tolist()
         except Exception as e:
             logger.error(f"Error getting embedding: {e}")
             return []
 
+    def _load_chunk_index(self) -> None:
+        """
+        Carrega (ou recarrega após o TTL) os embeddings de `kata_chunks` em memória.
+
+        Só entram chunks gravados com o `embedding_model` do backend atual: modelos
+        diferentes com a mesma dimensão não são comparáveis. Usa o SDK síncrono;
+        chamar via `asyncio.to_thread` a partir de código assíncrono.
+        """
+        now = time.monotonic()
+        if self._chunk_index_loaded_at is not None and now - self._chunk_index_loaded_at < self.chunk_cache_ttl_seconds:
+            return
+
+        vectors: List[List[float]] = []
+        meta: List[Dict[str, Any]] = []
+        records = self.pb_client.collection(self.chunk_collection_name).get_full_list(
+            query_params={"filter": f'embedding_model = "{self.embedding_model}"'}
+        )
+        for record in records:
+            embedding = getattr(record, "embedding", None)
+            if not embedding or (vectors and len(embedding) != len(vectors[0])):
+                continue
+            vectors.append(embedding)
+            meta.append({
+                "parent": getattr(record, "parent", ""),
+                "title": getattr(record, "title", ""),
+                "chunk_index": int(getattr(record, "chunk_index", 0) or 0),
+                "start": int(getattr(record, "start", 0) or 0),
+                "end": int(getattr(record, "end", 0) or 0),
+                "content": getattr(record, "content", ""),
+            })
+
+        index = None
+        if vectors:
+            matrix = np.asarray(vectors, dtype=np.float32)
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            index = (matrix / norms, meta)
+        self._chunk_index = index
+        self._chunk_index_loaded_at = now
+
+    def _search_chunks(self, query_embedding: List[float], top_k: int) -> List[Dict[str, Any]]:
+        """Retorna os melhores trechos (chunks vizinhos já agrupados) para o embedding da query."""
+        if self._chunk_index is None or self._chunk_index[0].shape[1] != len(query_embedding):
+            return []
+        matrix, meta = self._chunk_index
+
+        query_vector = np.asarray(query_embedding, dtype=np.float32)
+        query_vector /= (np.linalg.norm(query_vector) or 1.0)
+        similarities = matrix @ query_vector
+
+        n_candidates = min(len(meta), top_k * 3)
+        best_rows = np.argsort(-similarities)[:n_candidates]
+        candidates = [{**meta[row], "score": float(similarities[row])} for row in best_rows]
+
+        return [
+            {
+                "id": group["parent"],
+                "title": group["title"],
+                "content": group["content"],
+                "score": group["score"],
+                "chunk_indexes": group["chunk_indexes"],
+                "is_chunk": True,
+            }
+            for group in merge_adjacent_chunks(candidates)[:top_k]
+        ]
+
     async def search(self, query: str, top_k: int = 3) -> List[Dict[str, Any]]:
         query_embedding = await self._get_embedding(query)
         if not query_embedding:
             return []
 
+        try:
+            await asyncio.to_thread(self._load_chunk_index)
+            chunk_docs = self._search_chunks(query_embedding, top_k)
+            if chunk_docs:
+                return chunk_docs
+        except Exception as e:
+            logger.warning(f"Chunk search unavailable, falling back to document search: {e}")
+
         try:
             # Este é um exemplo simplificado. Em produção, você precisaria implementar
             # uma busca vetorial real no PocketBase ou usar outro banco de dados vetorial.
             logger.info(f"[PocketBaseKnowledgeSource] Buscando documentos para '{query}'")
             
             # Fallback simples: busca por texto
-            all_records = self.pb_client.collection(self.collection_name).get_full_list()
+            all_records = await asyncio.to_thread(self.pb_client.collection(self.collection_name).get_full_list)
             
             # Filtragem básica por conteúdo textual (isto deve ser substituído por busca vetorial)
             filtered_docs = [
@@ -89,7 +175,10 @@ class PocketBaseKnowledgeSource:
             return []
 
     async def close_http_client(self):
-        await self.openai_http_client.aclose()
+        # O backend compartilhado (singleton) não é fechado por fontes individuais
+        aclose = getattr(self.embedding_backend, "aclose", None)
+        if self._owns_backend and aclose is not None:
+            await aclose()
 
 
 class RAGService:
@@ -113,8 +202,9 @@ class RAGService:
         """
         title = doc.get("title", "Documento sem título")
         content = doc.get("content", "")
-        # Limitar tamanho para não exceder limites de token
-        max_content_length = 1000
+        # Limitar tamanho para não exceder limites de token.
+        # Trechos vindos de chunks já são o pedaço relevante (até ~3 chunks agrupados).
+        max_content_length = 2400 if doc.get("is_chunk") else 1000
         if len(content) > max_content_length:
             content = content[:max_content_length] + "..."
         
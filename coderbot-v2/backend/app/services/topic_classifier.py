@@ -0,0 +1,161 @@
+"""
+Classificador local de queries on-topic (programação/educação) vs. off-topic.
+
+Modelo scikit-learn pequeno: TF-IDF de n-gramas de caracteres + regressão
+logística. Roda em CPU, sem chamadas externas, e decide antes da query chegar
+ao LLM. Os n-gramas de caracteres toleram erros de digitação, acentos ausentes
+e flexões, cobrindo perguntas válidas que não usam nenhuma keyword listada.
+
+O artefato serializado (joblib) é gerado por `python -m app.tools.train_topic_classifier`.
+Sem artefato em disco, o modelo é treinado na inicialização a partir do
+conjunto semente em `configs/topic_classifier_seed.json`.
+"""
+
+import json
+import logging
+import os
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+SEED_DATASET_PATH = os.path.join(os.path.dirname(__file__), "configs", "topic_classifier_seed.json")
+
+
+def load_seed_dataset(path: str = SEED_DATASET_PATH) -> Tuple[List[str], List[int]]:
+    """Lê o conjunto semente e devolve (textos, rótulos) com 1 = on-topic."""
+    with open(path, encoding="utf-8") as fh:
+        data = json.load(fh)
+    texts = list(data["on_topic"]) + list(data["off_topic"])
+    labels = [1] * len(data["on_topic"]) + [0] * len(data["off_topic"])
+    return texts, labels
+
+
+class TopicClassifier:
+    """
+    TF-IDF (char n-grams) + modelo linear, com pontuação individual e em lote.
+
+    O classificador é aditivo às palavras-chave: `threshold` decide quando ele
+    aceita uma query sozinho; `veto_confidence` é a confiança off-topic
+    (1 - score) a partir da qual ele pode recusá-la mesmo com palavra-chave.
+    """
+
+    def __init__(self, model_path: Optional[str] = None, threshold: float = 0.5, veto_confidence: float = 0.9):
+        self.model_path = model_path
+        self.threshold = threshold
+        self.veto_confidence = veto_confidence
+        self.vectorizer = None
+        self.model = None
+        # Pesos extraídos do modelo linear: a pontuação é um produto esparso + sigmoide,
+        # sem o overhead de validação do `predict_proba` a cada chamada
+        self._coef: Optional[np.ndarray] = None
+        self._intercept = 0.0
+
+        if model_path and os.path.exists(model_path):
+            self.load(model_path)
+
+    @property
+    def is_fitted(self) -> bool:
+        return self._coef is not None
+
+    def fit(self, texts: Sequence[str], labels: Sequence[int]) -> "TopicClassifier":
+        """Treina o classificador (labels: 1 = on-topic, 0 = off-topic)."""
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        from sklearn.linear_model import LogisticRegression
+
+        if len(set(labels)) < 2:
+            raise ValueError("O treino precisa de exemplos on-topic e off-topic")
+
+        self.vectorizer = TfidfVectorizer(
+            analyzer="char_wb",
+            ngram_range=(2, 5),
+            sublinear_tf=True,
+            lowercase=True,
+            min_df=1,
+        )
+        features = self.vectorizer.fit_transform(texts)
+        self.model = LogisticRegression(C=10.0, class_weight="balanced", max_iter=1000)
+        self.model.fit(features, labels)
+        self._set_weights()
+        logger.info(f"Classificador de tópicos treinado: {len(texts)} exemplos, {features.shape[1]} features")
+        return self
+
+    def _set_weights(self) -> None:
+        self._coef = np.asarray(self.model.coef_[0], dtype=np.float64)
+        self._intercept = float(self.model.intercept_[0])
+
+    def score_batch(self, texts: Sequence[str]) -> np.ndarray:
+        """Probabilidade de cada texto ser on-topic (vetor com um valor por texto)."""
+        if not self.is_fitted:
+            raise ValueError("Classificador de tópicos ainda não foi treinado")
+        if not texts:
+            return np.zeros(0, dtype=np.float64)
+        features = self.vectorizer.transform([text or "" for text in texts])
+        logits = features @ self._coef + self._intercept
+        return 1.0 / (1.0 + np.exp(-logits))
+
+    def score(self, text: str) -> float:
+        """Probabilidade de um único texto ser on-topic."""
+        return float(self.score_batch([text])[0])
+
+    def is_on_topic(self, text: str) -> bool:
+        return self.score(text) >= self.threshold
+
+    def is_confidently_off_topic(self, score: float) -> bool:
+        """Se a pontuação on-topic é baixa o bastante para vetar a query."""
+        return 1.0 - score >= self.veto_confidence
+
+    def save(self, path: Optional[str] = None) -> str:
+        import joblib
+
+        path = path or self.model_path
+        if not path:
+            raise ValueError("Caminho do classificador de tópicos não informado")
+        if not self.is_fitted:
+            raise ValueError("Classificador de tópicos ainda não foi treinado")
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        joblib.dump({"vectorizer": self.vectorizer, "model": self.model}, path)
+        return path
+
+    def load(self, path: str) -> "TopicClassifier":
+        import joblib
+
+        state = joblib.load(path)
+        self.vectorizer = state["vectorizer"]
+        self.model = state["model"]
+        self._set_weights()
+        logger.info(f"Classificador de tópicos carregado de {path}")
+        return self
+
+
+_topic_classifier_instance: Optional[TopicClassifier] = None
+
+
+def get_topic_classifier() -> Optional[TopicClassifier]:
+    """
+    Factory (singleton) do classificador de tópicos.
+
+    Carrega o artefato de `TOPIC_CLASSIFIER_PATH`; se não existir, treina com o
+    conjunto semente. Retorna None se o classificador estiver desabilitado ou
+    não puder ser carregado (a validação volta para as heurísticas).
+    """
+    global _topic_classifier_instance
+
+    if _topic_classifier_instance is None and settings.topic_classifier_enabled:
+        try:
+            classifier = TopicClassifier(
+                settings.topic_classifier_path,
+                threshold=settings.topic_classifier_threshold,
+                veto_confidence=settings.topic_classifier_veto_confidence,
+            )
+            if not classifier.is_fitted:
+                classifier.fit(*load_seed_dataset())
+            _topic_classifier_instance = classifier
+        except Exception as e:
+            logger.error(f"Não foi possível carregar o classificador de tópicos: {e}")
+            return None
+
+    return _topic_classifier_instance
@@ -0,0 +1,224 @@
+"""
+Contadores de notificações não lidas mantidos incrementalmente por usuário.
+
+`get_unread_notifications_count` pedia ao PocketBase uma contagem a cada
+chamada (badge, polling, abertura do stream SSE). Aqui o contador de cada
+destinatário é semeado uma vez com a contagem real e depois ajustado pelas
+escritas (criar, marcar lida/não lida, marcar todas, excluir), tanto as deste
+processo quanto as que chegam pelo realtime do PocketBase. Cada mudança é
+aplicada uma vez por notificação (`apply_change` guarda o último estado
+contado de cada id), então a escrita local e o evento do realtime da mesma
+notificação não somam duas vezes. Quando o delta não é conhecido (ex.: update
+de outro worker sobre uma notificação nunca vista), o contador é descartado e
+semeado de novo na próxima leitura. Uma reconciliação periódica corrige
+qualquer deriva e libera usuários inativos.
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Estado anterior desconhecido (None significa "não existia" / "excluída")
+UNKNOWN = object()
+# Últimos estados lembrados por usuário (ids mais antigos saem primeiro)
+_MAX_TRACKED_PER_USER = 1000
+
+
+class UnreadCounterStore:
+    """Contador de não lidas por destinatário, em memória, com semeadura preguiçosa."""
+
+    def __init__(
+        self,
+        loader: Callable[[str], Awaitable[int]],
+        reconcile_interval_seconds: float = 300.0,
+        idle_seconds: float = 3600.0,
+        max_concurrency: int = 8,
+    ):
+        """
+        Args:
+            loader: Contagem real de não lidas no PocketBase para um usuário
+            reconcile_interval_seconds: Intervalo da reconciliação (0 desabilita)
+            idle_seconds: Usuários sem leitura há mais tempo saem da memória na reconciliação
+            max_concurrency: Contagens simultâneas durante a reconciliação
+        """
+        self.loader = loader
+        self.reconcile_interval_seconds = reconcile_interval_seconds
+        self.idle_seconds = idle_seconds
+        self.max_concurrency = max_concurrency
+        self._counts: Dict[str, int] = {}
+        self._last_read: Dict[str, float] = {}
+        self._seeding: Dict[str, asyncio.Future] = {}
+        # Incrementada a cada invalidação: contagem iniciada antes dela não é gravada
+        self._generation: Dict[str, int] = {}
+        # user_id -> {notification_id: True (não lida) / False (lida) / None (excluída)}
+        self._states: Dict[str, "OrderedDict[str, Optional[bool]]"] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.seeds = 0
+        self.corrections = 0
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+    def peek(self, user_id: str) -> Optional[int]:
+        """Valor atual sem ir ao PocketBase (None se ainda não semeado)."""
+        return self._counts.get(user_id)
+
+    async def get(self, user_id: str) -> int:
+        self._last_read[user_id] = time.monotonic()
+        count = self._counts.get(user_id)
+        if count is not None:
+            return count
+        seeding = self._seeding.get(user_id)
+        if seeding is not None:
+            return await asyncio.shield(seeding)
+        generation = self._generation.get(user_id, 0)
+        future = asyncio.get_running_loop().create_future()
+        self._seeding[user_id] = future
+        try:
+            count = max(0, int(await self.loader(user_id)))
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()
+            raise
+        finally:
+            if self._seeding.get(user_id) is future:
+                del self._seeding[user_id]
+        # Uma escrita durante a contagem não deixa semear um valor possivelmente velho
+        if self._generation.get(user_id, 0) == generation:
+            self._counts[user_id] = count
+            self.seeds += 1
+        future.set_result(count)
+        return count
+
+    def adjust(self, user_id: str, delta: int) -> Optional[int]:
+        """Aplica um delta conhecido; usuários não semeados são ignorados (semeiam na leitura)."""
+        if user_id in self._seeding:
+            # Contagem em voo pode ou não incluir esta escrita: descarta e semeia de novo
+            self.invalidate(user_id)
+            return None
+        count = self._counts.get(user_id)
+        if count is None:
+            return None
+        count = max(0, count + delta)
+        self._counts[user_id] = count
+        return count
+
+    def apply_change(
+        self, user_id: str, notification_id: Optional[str], unread: Optional[bool], previous: Any = UNKNOWN,
+    ) -> Optional[int]:
+        """
+        Aplica a mudança de estado de uma notificação, no máximo uma vez por estado.
+
+        Args:
+            user_id: Destinatário
+            notification_id: Id da notificação (sem id, cai no `adjust` simples)
+            unread: Novo estado: True não lida, False lida, None excluída
+            previous: Estado anterior conhecido pelo chamador (None = não existia,
+                ex.: create); o último estado já contado para o id tem precedência
+
+        Returns:
+            Contador atualizado, ou None se o usuário não está semeado
+        """
+        if user_id not in self._counts and user_id not in self._seeding:
+            # Nada contado ainda: a semeadura vai ler o estado real
+            return None
+        if not notification_id:
+            if previous is UNKNOWN:
+                self.invalidate(user_id)
+                return None
+            return self.adjust(user_id, int(bool(unread)) - int(bool(previous)))
+        states = self._states.setdefault(user_id, OrderedDict())
+        known = states.get(notification_id, UNKNOWN)
+        if known is not UNKNOWN:
+            previous = known
+        states[notification_id] = unread
+        states.move_to_end(notification_id)
+        while len(states) > _MAX_TRACKED_PER_USER:
+            states.popitem(last=False)
+        if previous is UNKNOWN:
+            self.invalidate(user_id)
+            return None
+        delta = int(bool(unread)) - int(bool(previous))
+        if delta == 0:
+            return self.peek(user_id)
+        return self.adjust(user_id, delta)
+
+    def set(self, user_id: str, count: int) -> None:
+        self._counts[user_id] = max(0, int(count))
+
+    def invalidate(self, user_id: str) -> None:
+        self._counts.pop(user_id, None)
+        if user_id in self._seeding:
+            self._generation[user_id] = self._generation.get(user_id, 0) + 1
+
+    def apply_remote(self, action: str, record: Dict[str, Any]) -> None:
+        """Ajusta a partir de uma escrita de outro worker (mensagem do realtime)."""
+        recipient = record.get("recipient")
+        if not recipient:
+            return
+        notification_id = record.get("id")
+        if action == "create":
+            self.apply_change(recipient, notification_id, not record.get("read"), previous=None)
+        elif action == "delete":
+            # A mensagem de delete traz o registro como estava antes da exclusão
+            self.apply_change(recipient, notification_id, None, previous=not record.get("read"))
+        else:
+            # Update: o estado anterior não vem na mensagem (só é conhecido se o id já foi contado)
+            self.apply_change(recipient, notification_id, not record.get("read"))
+
+    async def reconcile(self) -> Dict[str, int]:
+        """Recontagem dos usuários em memória; corrige deriva e remove os inativos."""
+        now = time.monotonic()
+        idle = [u for u in self._counts if now - self._last_read.get(u, 0.0) > self.idle_seconds]
+        for user_id in idle:
+            self._counts.pop(user_id, None)
+            self._last_read.pop(user_id, None)
+        for user_id in [u for u in self._states if u not in self._counts]:
+            del self._states[user_id]
+
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        corrected = 0
+
+        async def recount(user_id: str, expected: int) -> None:
+            nonlocal corrected
+            async with semaphore:
+                try:
+                    actual = max(0, int(await self.loader(user_id)))
+                except Exception as e:
+                    logger.warning(f"Reconciliação de não lidas falhou para {user_id}: {e}")
+                    return
+            # Só corrige se nenhuma escrita mexeu no contador durante a contagem
+            if self._counts.get(user_id) == expected and actual != expected:
+                self._counts[user_id] = actual
+                corrected += 1
+
+        await asyncio.gather(*(recount(u, c) for u, c in list(self._counts.items())))
+        self.corrections += corrected
+        return {"checked": len(self._counts), "corrected": corrected, "evicted": len(idle)}
+
+    def start(self) -> None:
+        if self.reconcile_interval_seconds > 0 and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is not None and not task.done():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.reconcile_interval_seconds)
+            try:
+                summary = await self.reconcile()
+                if summary["corrected"]:
+                    logger.info(f"Contadores de não lidas reconciliados: {summary}")
+            except Exception as e:
+                logger.error(f"Erro na reconciliação de não lidas: {e}")
@@ -0,0 +1,350 @@
+"""
+VoteAggregator - ingestão write-behind de votos em exemplos contextuais.
+
+Antes, cada clique fazia 4 chamadas sequenciais ao PocketBase (checagem de
+duplicata, create do feedback, leitura do exemplo, update dos contadores) e o
+read-modify-write perdia votos quando uma turma inteira votava ao mesmo tempo.
+
+Agora:
+- a deduplicação é feita em memória (conjunto de votantes por exemplo, semeado
+  uma única vez a partir de `example_feedback`)
+- os votos acumulam deltas up/down por exemplo e a resposta usa o score provisório
+- um flush periódico grava os feedbacks pendentes e aplica os deltas agregados com
+  incremento atômico do PocketBase (`upvotes+`/`downvotes+` e os contadores por
+  `feedback_type`, ex. `feedback_helpful+`), um update por exemplo
+- o quality_score gravado é calculado a partir dos contadores devolvidos pelo
+  próprio incremento (já somados aos votos de outros workers), não das contagens
+  locais; exemplos sem nada pendente saem da memória após o flush
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Set
+
+import httpx
+
+from app.services.examples_search_index import days_since
+
+logger = logging.getLogger(__name__)
+
+# Tipos de feedback com contador agregado em contextual_examples (`feedback_<tipo>`)
+FEEDBACK_TYPES = ("helpful", "not_helpful", "incorrect", "needs_improvement")
+
+ScoreFn = Callable[[int, int, int, int], float]
+ScoreListener = Callable[[str, float, int, int], None]
+
+_STATE_FIELDS = "id,upvotes,downvotes,usage_count,created"
+
+
+def is_unique_violation(response: httpx.Response) -> bool:
+    """400 do PocketBase causado por índice único (ex.: (user_id, example_id) já votado)."""
+    if response.status_code != 400:
+        return False
+    try:
+        data = (response.json() or {}).get("data") or {}
+    except ValueError:
+        return False
+    return any(isinstance(error, dict) and error.get("code") == "validation_not_unique" for error in data.values())
+
+
+@dataclass(slots=True)
+class ExampleVotes:
+    """Estado em memória dos votos de um exemplo."""
+
+    upvotes: int = 0
+    downvotes: int = 0
+    usage_count: int = 0
+    created: Optional[str] = None
+    voters: Set[str] = field(default_factory=set)
+    pending: List[Dict[str, Any]] = field(default_factory=list)
+    # Deltas de feedbacks já gravados cujo update de contadores falhou
+    unapplied: Dict[str, int] = field(default_factory=dict)
+
+
+class VoteAggregator:
+    """Agrega votos em memória e grava no PocketBase em lotes."""
+
+    def __init__(
+        self,
+        pb_client: Any,
+        score_fn: ScoreFn,
+        on_score: Optional[ScoreListener] = None,
+        flush_interval: float = 2.0,
+        max_pending: int = 200,
+        max_concurrency: int = 8,
+    ):
+        """
+        Args:
+            pb_client: Serviço compartilhado do PocketBase (`PocketBaseService`)
+            score_fn: Função (upvotes, downvotes, usage_count, dias) -> quality_score
+            on_score: Callback chamado a cada novo score (ex.: atualizar o índice de busca)
+            flush_interval: Intervalo (s) entre flushes em segundo plano
+            max_pending: Votos pendentes que disparam um flush imediato
+            max_concurrency: Criações de feedback simultâneas durante o flush
+        """
+        self.pb = pb_client
+        self.score_fn = score_fn
+        self.on_score = on_score
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.max_concurrency = max_concurrency
+
+        self._examples: Dict[str, ExampleVotes] = {}
+        self._load_locks: Dict[str, asyncio.Lock] = {}
+        self._flush_lock = asyncio.Lock()
+        self._flusher: Optional[asyncio.Task] = None
+        self._pending_count = 0
+        # Feedbacks recusados pelo PocketBase por validação (400 que não é voto duplicado)
+        self.rejected = 0
+
+    @property
+    def pending_count(self) -> int:
+        return self._pending_count
+
+    async def submit(
+        self,
+        example_id: str,
+        user_id: str,
+        vote: str,
+        feedback_type: str = "helpful",
+        comment: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Registra um voto e devolve o score provisório sem esperar a gravação.
+
+        Returns:
+            Dict com status ("success" ou "already_voted"), contadores e quality_score
+        """
+        state = await self._get_state(example_id)
+
+        if user_id in state.voters:
+            logger.info(f"Usuário {user_id} já votou no exemplo {example_id}")
+            return {
+                "status": "already_voted",
+                "message": "Você já votou neste exemplo"
+            }
+
+        state.voters.add(user_id)
+        if vote == "up":
+            state.upvotes += 1
+        else:
+            state.downvotes += 1
+        state.pending.append({
+            "example_id": example_id,
+            "user_id": user_id,
+            "vote": vote,
+            "feedback_type": feedback_type,
+            "comment": comment
+        })
+        self._pending_count += 1
+
+        score = self._score(state)
+        if self.on_score:
+            self.on_score(example_id, score, state.upvotes, state.downvotes)
+
+        self._ensure_flusher()
+        if self._pending_count >= self.max_pending:
+            asyncio.create_task(self.flush())
+
+        return {
+            "status": "success",
+            "example_id": example_id,
+            "upvotes": state.upvotes,
+            "downvotes": state.downvotes,
+            "quality_score": score,
+            "provisional": True
+        }
+
+    async def flush(self) -> int:
+        """
+        Grava os votos pendentes: cria os feedbacks e aplica um update agregado por exemplo.
+
+        Returns:
+            Quantidade de votos gravados
+        """
+        async with self._flush_lock:
+            batches = {
+                example_id: state.pending
+                for example_id, state in self._examples.items()
+                if state.pending or state.unapplied
+            }
+            if not batches:
+                return 0
+            for example_id in batches:
+                self._examples[example_id].pending = []
+            self._pending_count = 0
+
+            semaphore = asyncio.Semaphore(self.max_concurrency)
+            results = await asyncio.gather(*[
+                self._flush_example(example_id, rows, semaphore)
+                for example_id, rows in batches.items()
+            ])
+            written = sum(results)
+            # Estado só é necessário enquanto houver algo a gravar; o próximo voto relê do PocketBase
+            for example_id in batches:
+                state = self._examples.get(example_id)
+                if state is not None and not state.pending and not state.unapplied:
+                    del self._examples[example_id]
+            logger.info(f"Flush de votos: {written} gravados em {len(batches)} exemplos")
+            return written
+
+    async def close(self) -> None:
+        """Interrompe o flush periódico e grava o que estiver pendente."""
+        if self._flusher is not None:
+            self._flusher.cancel()
+            self._flusher = None
+        await self.flush()
+
+    async def _get_state(self, example_id: str) -> ExampleVotes:
+        state = self._examples.get(example_id)
+        if state is not None:
+            return state
+
+        lock = self._load_locks.setdefault(example_id, asyncio.Lock())
+        async with lock:
+            state = self._examples.get(example_id)
+            if state is None:
+                state = await self._load_state(example_id)
+                self._examples[example_id] = state
+            self._load_locks.pop(example_id, None)
+        return state
+
+    async def _load_state(self, example_id: str) -> ExampleVotes:
+        """Lê contadores do exemplo e votantes existentes (até o próximo flush sem pendências)."""
+        example, feedbacks = await asyncio.gather(
+            self.pb._get_record('contextual_examples', example_id, fields=_STATE_FIELDS),
+            self.pb.list_all(
+                'example_feedback', {'filter': f'example_id = "{example_id}"'},
+                fields='user_id', page_size=500
+            )
+        )
+        if example is None:
+            raise LookupError(f"Exemplo {example_id} não encontrado")
+        return ExampleVotes(
+            upvotes=example.get("upvotes") or 0,
+            downvotes=example.get("downvotes") or 0,
+            usage_count=example.get("usage_count") or 0,
+            created=example.get("created"),
+            voters={fb.get("user_id") for fb in feedbacks} - {None},
+        )
+
+    async def _flush_example(
+        self,
+        example_id: str,
+        rows: List[Dict[str, Any]],
+        semaphore: asyncio.Semaphore,
+    ) -> int:
+        state = self._examples[example_id]
+
+        async def create(row: Dict[str, Any]) -> bool:
+            async with semaphore:
+                try:
+                    r = await self.pb._post('example_feedback', row)
+                    reason = f"{r.status_code} - {r.text}"
+                except httpx.HTTPError as e:
+                    r, reason = None, str(e)
+            if r is not None and r.status_code in (200, 201):
+                return True
+            if r is not None and is_unique_violation(r):
+                # Índice único (user_id, example_id): voto já gravado por outro worker
+                logger.warning(f"Feedback duplicado descartado ({example_id}/{row['user_id']})")
+                self._undo_vote(state, row)
+            elif r is not None and 400 <= r.status_code < 500:
+                # Recusado pelo PocketBase (validação, permissão...): repetir não adianta
+                logger.error(f"Feedback recusado ({example_id}/{row['user_id']}): {reason}")
+                self._undo_vote(state, row)
+                state.voters.discard(row["user_id"])
+                self.rejected += 1
+            else:
+                logger.error(f"Erro ao gravar feedback ({example_id}), voto reenfileirado: {reason}")
+                state.pending.append(row)
+                self._pending_count += 1
+            return False
+
+        saved = await asyncio.gather(*[create(row) for row in rows])
+        written = [row for row, ok in zip(rows, saved) if ok]
+
+        deltas = self._counter_deltas(written, state.unapplied)
+        state.unapplied = {}
+        if not deltas:
+            if self.on_score and len(written) < len(rows):
+                self.on_score(example_id, self._score(state), state.upvotes, state.downvotes)
+            return 0
+
+        try:
+            async with semaphore:
+                r = await self.pb._patch('contextual_examples', example_id, {
+                    f"{name}+": delta for name, delta in deltas.items()
+                })
+            r.raise_for_status()
+            record = r.json()
+        except Exception as e:
+            # Os feedbacks já existem: os deltas ficam para o próximo flush
+            logger.error(f"Erro ao aplicar contadores do exemplo {example_id}: {e}")
+            for name, delta in deltas.items():
+                state.unapplied[name] = state.unapplied.get(name, 0) + delta
+            return len(written)
+
+        # Contadores pós-incremento incluem votos de outros workers: o score sai deles
+        server = ExampleVotes(
+            upvotes=record.get("upvotes") or 0,
+            downvotes=record.get("downvotes") or 0,
+            usage_count=record.get("usage_count") or 0,
+            created=record.get("created") or state.created,
+        )
+        score = self._score(server)
+        try:
+            async with semaphore:
+                r = await self.pb._patch('contextual_examples', example_id, {"quality_score": score})
+            r.raise_for_status()
+        except Exception as e:
+            # Contadores já estão corretos; o QualityScoreJob recalcula o score no próximo ciclo
+            logger.warning(f"Erro ao gravar quality_score do exemplo {example_id}: {e}")
+
+        # Estado local = servidor + votos que chegaram durante o flush
+        state.upvotes = server.upvotes + sum(1 for row in state.pending if row["vote"] == "up")
+        state.downvotes = server.downvotes + sum(1 for row in state.pending if row["vote"] != "up")
+        state.usage_count = server.usage_count
+        if self.on_score:
+            self.on_score(example_id, self._score(state), state.upvotes, state.downvotes)
+        return len(written)
+
+    @staticmethod
+    def _counter_deltas(rows: List[Dict[str, Any]], carried: Dict[str, int]) -> Dict[str, int]:
+        """Deltas por contador (`upvotes`, `downvotes`, `feedback_<tipo>`) para um update."""
+        deltas = dict(carried)
+        for row in rows:
+            vote_field = "upvotes" if row["vote"] == "up" else "downvotes"
+            deltas[vote_field] = deltas.get(vote_field, 0) + 1
+            if row.get("feedback_type") in FEEDBACK_TYPES:
+                type_field = f"feedback_{row['feedback_type']}"
+                deltas[type_field] = deltas.get(type_field, 0) + 1
+        return deltas
+
+    @staticmethod
+    def _undo_vote(state: ExampleVotes, row: Dict[str, Any]) -> None:
+        if row["vote"] == "up":
+            state.upvotes -= 1
+        else:
+            state.downvotes -= 1
+
+    def _score(self, state: ExampleVotes) -> float:
+        return self.score_fn(
+            state.upvotes,
+            state.downvotes,
+            state.usage_count,
+            days_since(state.created)
+        )
+
+    def _ensure_flusher(self) -> None:
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._flush_loop())
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Erro no flush periódico de votos: {e}")
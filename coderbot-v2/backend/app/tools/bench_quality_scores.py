@@ -0,0 +1,61 @@
+"""Benchmark do recálculo de quality_score: NumPy vetorizado vs. loop Python, em N linhas sintéticas."""
+
+from __future__ import annotations
+
+import argparse
+import time
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from app.services.examples_rag_service import ExamplesRAGService
+from app.services.quality_score_job import compute_quality_scores, days_since_array
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Linhas sintéticas")
+    parser.add_argument("--loop-sample", type=int, default=100_000, help="Linhas medidas no loop Python (extrapolado)")
+    parser.add_argument("--epsilon", type=float, default=0.005, help="Limite de mudança para gravar")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    now = datetime.now(timezone.utc)
+    up = rng.poisson(3, args.rows)
+    down = rng.poisson(1, args.rows)
+    usage = rng.poisson(2, args.rows)
+    ages = rng.integers(0, 365 * 24 * 3600, args.rows)
+    created = [(now - timedelta(seconds=int(age))).strftime("%Y-%m-%d %H:%M:%S.000Z") for age in ages]
+    stored = rng.random(args.rows).round(3)
+
+    start = time.perf_counter()
+    days = days_since_array(created, now)
+    parse_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    scores = compute_quality_scores(up, down, usage, days)
+    changed = np.flatnonzero(np.abs(scores - stored) > args.epsilon)
+    vector_s = time.perf_counter() - start
+
+    scalar = ExamplesRAGService._calculate_quality_score
+    sample = min(args.loop_sample, args.rows)
+    start = time.perf_counter()
+    loop_scores = [
+        scalar(None, int(up[i]), int(down[i]), int(usage[i]), int(days[i]))
+        for i in range(sample)
+    ]
+    loop_s = (time.perf_counter() - start) * args.rows / sample
+
+    mismatches = int(np.sum(np.abs(np.asarray(loop_scores) - scores[:sample]) > 0.0011))
+
+    print(f"linhas              {args.rows:>12,}")
+    print(f"parse de datas      {parse_s * 1000:>10.1f} ms")
+    print(f"numpy (score+diff)  {vector_s * 1000:>10.1f} ms")
+    print(f"loop python (est.)  {loop_s * 1000:>10.1f} ms")
+    print(f"speedup             {loop_s / vector_s:>10.1f}x")
+    print(f"linhas a gravar     {len(changed):>12,} (epsilon={args.epsilon})")
+    print(f"divergências        {mismatches:>12,} (amostra de {sample:,})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Microbenchmark: QueryGate (uma passada) vs. loops por palavra-chave do caminho antigo."""
+
+from __future__ import annotations
+
+import argparse
+import re
+import timeit
+from typing import List
+
+from app.services.query_gate import (
+    CONCEPT_TERMS,
+    LANGUAGE_TERMS,
+    OFF_TOPIC_TERMS,
+    PROGRAMMING_KEYWORDS,
+    QueryGate,
+)
+
+QUERIES = [
+    "Como usar map em JavaScript?",
+    "Explique recursão com um exemplo de fatorial em Python",
+    "Qual a diferença entre let, const e var?",
+    "Me ensine a fazer um bolo de chocolate",
+    "Qual a previsão do tempo para amanhã?",
+    "asdfgh qwerty zxcvb",
+    "Como faço um loop for que percorre uma lista de objetos e retorna apenas os pares?",
+    "Tenho um bug na minha função async que usa await dentro de um forEach",
+]
+
+_OFF_TOPIC_PATTERNS = [rf"\b({re.escape(term)})\b" for term in OFF_TOPIC_TERMS]
+_VOWELS = re.compile(r"[aeiouáéíóúàãõâêôü]", re.IGNORECASE)
+
+
+def legacy_analyze(text: str) -> tuple:
+    """Reproduz o caminho anterior: gibberish + validação + checagem do router + tópicos."""
+    query_lower = text.lower()
+
+    normalized = re.sub(r"[^a-zA-Z0-9áéíóúàãõâêôüç\s]", " ", query_lower)
+    tokens = [t for t in normalized.split() if re.search(r"[a-záéíóúàãõâêôüç]", t)]
+    vowel_tokens = sum(1 for t in tokens if _VOWELS.search(t))
+
+    keyword_matches = sum(1 for kw in PROGRAMMING_KEYWORDS if kw.lower() in query_lower)
+    off_topic = any(re.search(p, query_lower, re.IGNORECASE) for p in _OFF_TOPIC_PATTERNS)
+    has_keyword = any(
+        re.search(rf"\b{re.escape(kw.lower())}\b", query_lower) for kw in PROGRAMMING_KEYWORDS
+    )
+    topics: List[str] = [t for t in LANGUAGE_TERMS + CONCEPT_TERMS if t in query_lower]
+    return vowel_tokens, keyword_matches, off_topic, has_keyword, topics
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--number", type=int, default=2000, help="Execuções por medição")
+    parser.add_argument("--repeat", type=int, default=5, help="Repetições (usa a melhor)")
+    args = parser.parse_args()
+
+    gate = QueryGate()
+
+    def run_legacy() -> None:
+        for query in QUERIES:
+            legacy_analyze(query)
+
+    def run_gate() -> None:
+        for query in QUERIES:
+            gate.analyze(query)
+
+    calls = args.number * len(QUERIES)
+    results = {}
+    for name, fn in (("legacy", run_legacy), ("query_gate", run_gate)):
+        best = min(timeit.repeat(fn, number=args.number, repeat=args.repeat))
+        results[name] = best / calls * 1e6
+        print(f"{name:<12} {results[name]:8.2f} µs/query")
+
+    print(f"speedup      {results['legacy'] / results['query_gate']:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
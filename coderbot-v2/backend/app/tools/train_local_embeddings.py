@@ -0,0 +1,56 @@
+"""Treina o modelo local de embeddings (TF-IDF + SVD) a partir do corpus de katas."""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+from typing import List
+
+from app.config import settings
+from app.rag.embeddings import LocalEmbeddingBackend
+
+
+def _load_corpus_from_dir(path: str) -> List[str]:
+    corpus: List[str] = []
+    for fname in sorted(os.listdir(path)):
+        if not fname.endswith(".json"):
+            continue
+        with open(os.path.join(path, fname), encoding="utf-8") as fh:
+            kata = json.load(fh)
+        corpus.append(f"{kata.get('title', '')}\n{kata.get('content', '')}")
+    return corpus
+
+
+def _load_corpus_from_pocketbase(collection: str) -> List[str]:
+    from pocketbase import PocketBase
+
+    pb = PocketBase(settings.pocketbase_url)
+    pb.collection("users").auth_with_password(
+        settings.pocketbase_user_email,
+        settings.pocketbase_user_password,
+    )
+    records = pb.collection(collection).get_full_list()
+    return [f"{getattr(r, 'title', '')}\n{getattr(r, 'content', '')}" for r in records]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--katas-dir", help="Diretório com JSONs de katas (padrão: lê do PocketBase)")
+    parser.add_argument("--collection", default="kata_docs", help="Coleção do PocketBase usada como corpus")
+    parser.add_argument("--output", default=settings.local_embedding_model_path, help="Caminho do modelo salvo")
+    parser.add_argument("--dimensions", type=int, default=256, help="Dimensão dos embeddings (componentes SVD)")
+    args = parser.parse_args()
+
+    if args.katas_dir:
+        corpus = _load_corpus_from_dir(args.katas_dir)
+    else:
+        corpus = _load_corpus_from_pocketbase(args.collection)
+
+    backend = LocalEmbeddingBackend().fit(corpus, n_components=args.dimensions)
+    path = backend.save(args.output)
+    print(f"Modelo salvo em {path} ({backend.name}, {len(corpus)} documentos)")
+
+
+if __name__ == "__main__":
+    main()
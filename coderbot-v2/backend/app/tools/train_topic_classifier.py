@@ -0,0 +1,58 @@
+"""Treina e serializa o classificador local on-topic (TF-IDF de caracteres + modelo linear)."""
+
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from typing import List, Tuple
+
+from app.config import settings
+from app.services.topic_classifier import SEED_DATASET_PATH, TopicClassifier, load_seed_dataset
+
+
+def _load_extra_examples(path: str) -> Tuple[List[str], List[int]]:
+    """JSONL com {"text": ..., "on_topic": true|false} por linha (ex.: queries rotuladas do chat)."""
+    texts: List[str] = []
+    labels: List[int] = []
+    with open(path, encoding="utf-8") as fh:
+        for line in fh:
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            texts.append(row["text"])
+            labels.append(1 if row["on_topic"] else 0)
+    return texts, labels
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--seed", default=SEED_DATASET_PATH, help="Conjunto semente (JSON on_topic/off_topic)")
+    parser.add_argument("--extra", action="append", default=[], help="JSONL adicional com exemplos rotulados")
+    parser.add_argument("--output", default=settings.topic_classifier_path, help="Caminho do artefato salvo")
+    args = parser.parse_args()
+
+    texts, labels = load_seed_dataset(args.seed)
+    for path in args.extra:
+        extra_texts, extra_labels = _load_extra_examples(path)
+        texts += extra_texts
+        labels += extra_labels
+
+    classifier = TopicClassifier().fit(texts, labels)
+    path = classifier.save(args.output)
+
+    accuracy = sum(
+        int(score >= classifier.threshold) == label
+        for score, label in zip(classifier.score_batch(texts), labels)
+    ) / len(labels)
+    start = time.perf_counter()
+    for text in texts:
+        classifier.score(text)
+    latency_us = (time.perf_counter() - start) / len(texts) * 1e6
+
+    print(f"Classificador salvo em {path}")
+    print(f"Exemplos: {len(texts)} | acurácia no treino: {accuracy:.2%} | latência: {latency_us:.0f} µs/query")
+
+
+if __name__ == "__main__":
+    main()
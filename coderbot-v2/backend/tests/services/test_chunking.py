@@ -0,0 +1,55 @@
+from app.rag.chunking import chunk_text, merge_adjacent_chunks
+
+DOCUMENT = " ".join(f"palavra{i}" for i in range(25))
+
+
+def _as_records(chunks, parent="kata1", scores=None):
+    scores = scores or {}
+    return [
+        {
+            "parent": parent,
+            "title": "Kata",
+            "chunk_index": c.index,
+            "start": c.start,
+            "end": c.end,
+            "content": c.text,
+            "score": scores.get(c.index, 0.0),
+        }
+        for c in chunks
+    ]
+
+
+def test_chunk_text_overlaps_and_preserves_offsets():
+    chunks = chunk_text(DOCUMENT, max_tokens=10, overlap=3)
+
+    assert [c.token_count for c in chunks] == [10, 10, 10, 4]
+    for chunk in chunks:
+        assert DOCUMENT[chunk.start:chunk.end] == chunk.text
+    # Os 3 últimos tokens de um chunk abrem o próximo
+    assert chunks[0].text.split()[-3:] == chunks[1].text.split()[:3]
+    assert chunks[-1].text.endswith("palavra24")
+
+
+def test_chunk_text_handles_empty_text():
+    assert chunk_text("   ") == []
+
+
+def test_merge_adjacent_chunks_rebuilds_contiguous_text_once():
+    chunks = chunk_text(DOCUMENT, max_tokens=10, overlap=3)
+    records = _as_records(chunks, scores={0: 0.4, 1: 0.9, 3: 0.5})
+
+    merged = merge_adjacent_chunks([records[0], records[1], records[3]])
+
+    assert merged[0]["chunk_indexes"] == [0, 1]
+    assert merged[0]["score"] == 0.9
+    assert merged[0]["content"] == DOCUMENT[chunks[0].start:chunks[1].end]
+    assert merged[1]["chunk_indexes"] == [3]
+
+
+def test_merge_adjacent_chunks_keeps_parents_separate():
+    chunks = chunk_text(DOCUMENT, max_tokens=10, overlap=3)
+    records = _as_records(chunks[:1], parent="a") + _as_records(chunks[1:2], parent="b")
+
+    merged = merge_adjacent_chunks(records)
+
+    assert sorted(group["parent"] for group in merged) == ["a", "b"]
@@ -0,0 +1,61 @@
+import asyncio
+import json
+
+import httpx
+
+from app.services.class_api_keys import ProviderClientPool
+from app.services.pocketbase_service import PocketBaseService
+
+FUTURE_TOKEN = "h.eyJleHAiOjQxMDI0NDQ4MDB9.s"  # exp em 2100
+
+
+def test_class_key_lookups_are_cached_until_the_key_is_replaced():
+    lookups = []
+    current = {"key": "sk-old"}
+
+    def handler(request):
+        if "auth-with-password" in request.url.path:
+            return httpx.Response(200, json={"token": FUTURE_TOKEN})
+        if request.url.path == "/api/batch":
+            ops = json.loads(request.content)["requests"]
+            current["key"] = ops[-1]["body"]["api_key"]
+            return httpx.Response(200, json=[{"status": 200, "body": {"id": "k2"}} for _ in ops])
+        if request.url.params.get("fields") == "id":
+            return httpx.Response(200, json={"items": [{"id": "k1"}]})
+        lookups.append(request.url.params["filter"])
+        return httpx.Response(200, json={"items": [{"api_key": current["key"]}]})
+
+    service = PocketBaseService(base_url="http://pb.test", transport=httpx.MockTransport(handler))
+
+    sync_keys = [service.get_class_api_key_sync("c1", "claude") for _ in range(3)]
+
+    async def scenario():
+        cached = await service.get_class_api_key("c1", "claude")
+        await service.set_class_api_key("c1", "claude", "sk-new", created_by="t1")
+        return cached, await service.get_class_api_key("c1", "claude")
+
+    cached, replaced = asyncio.run(scenario())
+
+    assert sync_keys == ["sk-old"] * 3 and cached == "sk-old"
+    assert replaced == "sk-new"
+    assert len(lookups) == 2
+
+
+def test_client_pool_reuses_clients_per_credential():
+    created = []
+
+    def factory(provider, api_key):
+        created.append((provider, api_key))
+        return object(), object()
+
+    pool = ProviderClientPool(max_entries=2, factory=factory)
+
+    a1 = pool.get("claude", "sk-a")
+    b = pool.get("claude", "sk-b")
+    a2 = pool.get("claude", "sk-a")
+    pool.get("openai", "sk-c")  # despeja sk-b (menos recente)
+    pool.get("claude", "sk-b")
+
+    assert a1 is a2 and a1 is not b
+    assert created == [("claude", "sk-a"), ("claude", "sk-b"), ("openai", "sk-c"), ("claude", "sk-b")]
+    assert all("sk-" not in digest for _, digest in pool._clients)
@@ -0,0 +1,64 @@
+import hashlib
+
+from app.services.example_dedup import NearDuplicateIndex, normalize_code, shingles
+
+LOOP = """
+# Percorre a lista
+for item in itens:
+    print(item)
+"""
+
+LOOP_REFORMATTED = """
+for item in itens:   # imprime cada item
+        print( item )
+"""
+
+OTHER = """
+def fatorial(n):
+    return 1 if n <= 1 else n * fatorial(n - 1)
+"""
+
+
+def test_normalize_code_ignores_comments_and_layout():
+    assert normalize_code(LOOP, "python") == normalize_code(LOOP_REFORMATTED, "python")
+    # "//" é divisão inteira em Python, não comentário
+    assert "2" in normalize_code("metade = n // 2", "python")
+
+
+def test_find_returns_existing_near_duplicate_in_same_language_and_type():
+    index = NearDuplicateIndex()
+    index.add("loop", "Loop for em Python", LOOP, "python", "correct")
+    index.add("fat", "Fatorial recursivo", OTHER, "python", "correct")
+
+    match = index.find("Loop for em Python", LOOP_REFORMATTED, "python", "correct")
+
+    assert match is not None and match[0] == "loop"
+    assert index.find("Loop for em Python", LOOP, "javascript", "correct") is None
+    assert index.find("Loop for em Python", LOOP, "python", "incorrect") is None
+    assert index.find("Função soma", "def soma(a, b):\n    return a + b", "python", "correct") is None
+
+
+def test_remove_drops_example_from_buckets():
+    index = NearDuplicateIndex()
+    index.add("loop", "Loop", LOOP, "python", "correct")
+
+    index.remove("loop")
+
+    assert len(index) == 0
+    assert index.find("Loop", LOOP, "python", "correct") is None
+
+
+def test_signature_matches_exact_integer_permutations():
+    index = NearDuplicateIndex()
+    prime = (1 << 32) - 5
+    hashes = [
+        int.from_bytes(hashlib.blake2b(item.encode("utf-8"), digest_size=4).digest(), "little") % prime
+        for item in shingles("Loop", LOOP, "python")
+    ]
+
+    expected = [
+        min((int(a) * h + int(b)) % prime for h in hashes)
+        for a, b in zip(index._a, index._b)
+    ]
+
+    assert index.signature("Loop", LOOP, "python").tolist() == expected
@@ -0,0 +1,55 @@
+import asyncio
+from types import SimpleNamespace
+
+from app.services.example_topk_cache import TopKExampleCache, make_key
+from app.services.examples_rag_service import ExamplesRAGService
+
+
+def test_invalidate_topics_only_drops_intersecting_entries():
+    cache = TopKExampleCache()
+    loops = make_key(["Loops", "python"], 0.6)
+    recursion = make_key(["recursão"], 0.6)
+    java_loops = make_key(["loops"], 0.6, "java")
+    for key in (loops, recursion, java_loops):
+        cache.put(key, [{"id": "x"}])
+
+    removed = cache.invalidate_topics(["loops"], language="python")
+
+    assert removed == 1
+    assert cache.get(loops) is None
+    assert cache.get(recursion) == [{"id": "x"}]
+    assert cache.get(java_loops) == [{"id": "x"}]
+
+
+def _service_with_docs(docs):
+    service = ExamplesRAGService.__new__(ExamplesRAGService)
+    service.topk_cache = TopKExampleCache()
+    documents = {d["id"]: d for d in docs}
+    service.search_index = SimpleNamespace(
+        documents=documents,
+        update_quality=lambda example_id, score, *args: documents[example_id].update(quality_score=score),
+    )
+
+    async def ready():
+        return True
+
+    service._ensure_search_index = ready
+    return service
+
+
+def test_top_examples_are_materialized_and_refreshed_on_score_change():
+    service = _service_with_docs([
+        {"id": "a", "title": "A", "topics": ["loops"], "quality_score": 0.7, "language": "python"},
+        {"id": "b", "title": "B", "topics": ["loops", "listas"], "quality_score": 0.9, "language": "python"},
+        {"id": "c", "title": "C", "topics": ["recursão"], "quality_score": 0.95, "language": "python"},
+    ])
+
+    first = asyncio.run(service.get_top_examples(["loops"], 0.6))
+    cached = asyncio.run(service.get_top_examples(["Loops"], 0.6))
+    service._on_quality_change("a", 0.99)
+    refreshed = asyncio.run(service.get_top_examples(["loops"], 0.6))
+
+    assert [ex["id"] for ex in first] == ["b", "a"]
+    assert cached is not first and [ex["id"] for ex in cached] == ["b", "a"]
+    assert service.topk_cache.hits == 1
+    assert [ex["id"] for ex in refreshed] == ["a", "b"]
@@ -0,0 +1,220 @@
+import asyncio
+import json
+
+import httpx
+
+from app.services.examples_rag_service import ExamplesRAGService
+from app.services.pocketbase_service import PocketBaseService
+
+FUTURE_TOKEN = "h.eyJleHAiOjQxMDI0NDQ4MDB9.s"  # exp em 2100
+
+EXAMPLES = [
+    {
+        "id": "ex1", "title": "Laço for em Python", "code": "for i in range(3):\n    print(i)",
+        "language": "python", "explanation": "Percorre uma sequência com for", "type": "correct",
+        "topics": ["loops", "python"], "quality_score": 0.8, "upvotes": 4, "downvotes": 0,
+        "usage_count": 2, "difficulty": None, "created": "2026-01-01 10:00:00.000Z",
+    },
+    {
+        "id": "ex2", "title": "Recursão com fatorial", "code": "def fat(n):\n    return 1 if n < 2 else n * fat(n - 1)",
+        "language": "python", "explanation": "Função que chama a si mesma", "type": "correct",
+        "topics": ["recursão"], "quality_score": 0.9, "upvotes": 6, "downvotes": 1,
+        "usage_count": 3, "difficulty": None, "created": "2026-01-02 10:00:00.000Z",
+    },
+]
+
+
+class FakePocketBase:
+    """Coleções em memória atrás de um httpx.MockTransport, no formato da API REST do PocketBase."""
+
+    def __init__(self, examples, feedback=()):
+        self.examples = {e["id"]: dict(e) for e in examples}
+        self.feedback = list(feedback)
+        self.requests = []
+
+    def handler(self, request):
+        path, method = request.url.path, request.method
+        self.requests.append((method, path, dict(request.url.params)))
+        if path.endswith("/auth-with-password"):
+            return httpx.Response(200, json={"token": FUTURE_TOKEN})
+        if path == "/api/collections/contextual_examples/records" and method == "GET":
+            page, per_page = int(request.url.params["page"]), int(request.url.params["perPage"])
+            items = list(self.examples.values())[(page - 1) * per_page:page * per_page]
+            return httpx.Response(200, json={"page": page, "perPage": per_page, "items": items})
+        if path == "/api/collections/contextual_examples/records" and method == "POST":
+            record = {**json.loads(request.content), "id": f"ex{len(self.examples) + 1}", "created": "2026-02-01 10:00:00.000Z"}
+            self.examples[record["id"]] = record
+            return httpx.Response(200, json=record)
+        if path.startswith("/api/collections/contextual_examples/records/") and method == "GET":
+            record = self.examples.get(path.rsplit("/", 1)[-1])
+            if record is None:
+                return httpx.Response(404, json={"code": 404, "message": "not found"})
+            return httpx.Response(200, json=record)
+        if path == "/api/collections/example_feedback/records" and method == "GET":
+            per_page = int(request.url.params["perPage"])
+            # Simula o filtro de cursor: itens depois do último (created, id) já entregue
+            filter_ = request.url.params["filter"]
+            items = self.feedback[self._cursor_position(filter_) if "created <" in filter_ else 0:]
+            return httpx.Response(200, json={"page": 1, "perPage": per_page, "items": items[:per_page]})
+        if path == "/api/collections/class_missions/records" and method == "GET":
+            missions = [
+                {"id": "m1", "topics": ["loops"], "metadata": {}},
+                {"id": "m2", "topics": [], "metadata": {"topics": ["recursão"]}},
+                {"id": "m3", "topics": ["Loops"], "metadata": {}},
+            ]
+            return httpx.Response(200, json={"page": 1, "perPage": 200, "items": missions})
+        if path.startswith("/api/collections/contextual_examples/records/") and method == "PATCH":
+            record = self.examples.get(path.rsplit("/", 1)[-1])
+            if record is None:
+                return httpx.Response(404, json={"code": 404, "message": "not found"})
+            for field, value in json.loads(request.content).items():
+                if field.endswith("+"):
+                    record[field[:-1]] = (record.get(field[:-1]) or 0) + value
+                else:
+                    record[field] = value
+            return httpx.Response(200, json=record)
+        return httpx.Response(404, json={"code": 404, "message": "not found"})
+
+    def _cursor_position(self, filter_):
+        return next(i + 1 for i, f in enumerate(self.feedback) if f'id < "{f["id"]}"' in filter_)
+
+
+def _service(fake):
+    pb = PocketBaseService(base_url="http://pb.test", transport=httpx.MockTransport(fake.handler))
+    return ExamplesRAGService(pb)
+
+
+def test_index_loads_and_grows_through_pocketbase_service():
+    fake = FakePocketBase(EXAMPLES)
+    service = _service(fake)
+
+    async def scenario():
+        hits = await service.search_relevant_examples("como usar laço for em python", top_k=1)
+        saved = await service.save_generated_example(
+            {"type": "correct", "title": "While com contador", "code": "i = 0\nwhile i < 3:\n    i += 1",
+             "language": "python", "explanation": "Repete enquanto a condição vale"},
+            user_query="como usar while em python", chat_session_id="s1",
+        )
+        later = await service.search_relevant_examples("while com contador", top_k=1, min_quality_score=0.0)
+        await service.pb.close()
+        return hits, saved, later
+
+    hits, saved, later = asyncio.run(scenario())
+
+    assert [h["id"] for h in hits] == ["ex1"]
+    assert saved == "ex3" and fake.examples["ex3"]["usage_count"] == 1
+    assert [h["id"] for h in later] == ["ex3"]
+    list_calls = [params for method, path, params in fake.requests if method == "GET" and path.endswith("/contextual_examples/records")]
+    assert len(list_calls) == 1 and "code" in list_calls[0]["fields"]
+
+
+def test_query_search_applies_language_filter():
+    service = _service(FakePocketBase(EXAMPLES))
+
+    async def scenario():
+        python = await service.search_relevant_examples("recursão com fatorial", top_k=1, language="Python")
+        javascript = await service.search_relevant_examples("recursão com fatorial", top_k=1, language="javascript")
+        await service.pb.close()
+        return python, javascript
+
+    python, javascript = asyncio.run(scenario())
+
+    assert [h["id"] for h in python] == ["ex2"]
+    assert javascript == []
+
+
+def test_periodic_sync_picks_up_examples_written_by_other_workers():
+    fake = FakePocketBase([{**e, "updated": e["created"]} for e in EXAMPLES])
+    service = _service(fake)
+
+    async def scenario():
+        await service.search_relevant_examples("laço for", top_k=1)
+        # Outro worker salva um exemplo e recalcula o score de ex1
+        fake.examples["ex3"] = {
+            **EXAMPLES[0], "id": "ex3", "title": "Busca binária", "code": "def busca(xs, alvo): ...",
+            "explanation": "Divide o intervalo ao meio", "topics": ["busca"],
+            "created": "2026-03-01 10:00:00.000Z", "updated": "2026-03-01 10:00:00.000Z",
+        }
+        fake.examples["ex1"].update(quality_score=0.95, updated="2026-03-01 11:00:00.000Z")
+        synced = await service.sync_search_index()
+        hits = await service.search_relevant_examples("busca binária", top_k=1)
+        await service.pb.close()
+        return synced, hits
+
+    synced, hits = asyncio.run(scenario())
+
+    sync_call = [params for method, path, params in fake.requests if path.endswith("/contextual_examples/records")][-1]
+    assert sync_call["filter"] == 'updated >= "2026-01-02 09:59:55.000Z"' and "updated" in sync_call["fields"]
+    assert synced == 3 and [h["id"] for h in hits] == ["ex3"]
+    assert service.search_index.documents["ex1"]["quality_score"] == 0.95
+    assert service._index_synced_until == "2026-03-01 11:00:00.000Z"
+
+
+def test_near_duplicate_reuses_existing_example_with_atomic_usage_increment():
+    fake = FakePocketBase(EXAMPLES)
+    service = _service(fake)
+    duplicate = {**EXAMPLES[0], "code": "for i in range(3):\n    print(i)  # mostra i"}
+
+    async def scenario():
+        reused = await service.save_generated_example(duplicate, user_query="laço for", chat_session_id="s1")
+        await service.pb.close()
+        return reused
+
+    assert asyncio.run(scenario()) == "ex1"
+    assert fake.examples["ex1"]["usage_count"] == 3 and len(fake.examples) == 2
+    assert not any(method == "POST" and "contextual_examples" in path for method, path, _ in fake.requests)
+
+
+def test_feedback_listing_uses_cursor_instead_of_offset():
+    feedback = [
+        {"id": f"id{i}", "user_id": "u", "vote": "up", "feedback_type": "helpful",
+         "comment": None, "created": f"2026-01-0{9 - i} 10:00:00.000Z"}
+        for i in range(3)
+    ]
+    fake = FakePocketBase(EXAMPLES, feedback)
+    service = _service(fake)
+
+    async def scenario():
+        first = await service.list_example_feedback("ex1", limit=2)
+        second = await service.list_example_feedback("ex1", cursor=first["next_cursor"], limit=2)
+        detail = await service.get_example_with_feedback("ex1", feedback_limit=2)
+        await service.pb.close()
+        return first, second, detail
+
+    first, second, detail = asyncio.run(scenario())
+
+    filters = [params["filter"] for method, path, params in fake.requests if path.endswith("/example_feedback/records")]
+    assert len(first["items"]) == 2 and first["next_cursor"]
+    assert 'created < "2026-01-08 10:00:00.000Z"' in filters[1] and 'id < "id1"' in filters[1]
+    assert len(second["items"]) == 1 and second["next_cursor"] is None
+    assert detail["title"] == EXAMPLES[0]["title"] and detail["feedback_summary"]["helpful"] == 0
+    assert [f["created"] for f in detail["feedbacks"]] == [f["created"] for f in feedback[:2]]
+
+
+def test_prewarm_materializes_top_examples_of_active_missions():
+    fake = FakePocketBase(EXAMPLES)
+    service = _service(fake)
+
+    async def scenario():
+        warmed = await service.prewarm_top_examples(min_quality_score=0.6)
+        served = await service.get_top_examples(["recursão"], 0.6)
+        await service.pb.close()
+        return warmed, served
+
+    warmed, served = asyncio.run(scenario())
+
+    assert warmed == 2
+    assert [ex["id"] for ex in served] == ["ex2"] and service.topk_cache.hits == 1
+    mission_calls = [params for method, path, params in fake.requests if path.endswith("/class_missions/records")]
+    assert mission_calls[0]["filter"] == 'status = "active"'
+
+
+def test_low_score_query_with_keyword_is_not_vetoed_by_classifier():
+    service = _service(FakePocketBase(EXAMPLES))
+
+    accepted = service.validate_educational_query("quero aprender sql joins")
+    rejected = service.validate_educational_query("Qual o placar do jogo de ontem?")
+    asyncio.run(service.pb.close())
+
+    assert accepted["is_valid"] and accepted["on_topic_score"] < 0.5
+    assert not rejected["is_valid"]
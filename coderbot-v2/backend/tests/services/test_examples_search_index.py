@@ -0,0 +1,76 @@
+from datetime import datetime, timezone
+
+from app.services.examples_search_index import HybridExampleIndex, hashing_embed
+
+NOW = datetime(2025, 1, 31, tzinfo=timezone.utc)
+
+
+def _example(example_id, title, code="", explanation="", quality=0.7, language="python", created="2025-01-30 10:00:00.000Z"):
+    return {
+        "id": example_id,
+        "title": title,
+        "code": code,
+        "explanation": explanation,
+        "language": language,
+        "topics": [],
+        "quality_score": quality,
+        "created": created,
+    }
+
+
+def _build_index():
+    index = HybridExampleIndex()
+    index.upsert_many(
+        [
+            _example("loop", "Loop for em Python", "for i in range(10):\n    print(i)", "Percorre uma sequência"),
+            _example("rec", "Recursão com fatorial", "def fat(n):\n    return 1 if n == 0 else n * fat(n - 1)", "Função chama a si mesma"),
+            _example("js", "Funções em JavaScript", "function soma(a, b) { return a + b }", "Declaração de função", language="javascript"),
+        ]
+    )
+    return index
+
+
+def test_search_ranks_lexical_match_first():
+    index = _build_index()
+
+    hits = index.search("como usar loop for em python", top_k=2, now=NOW)
+
+    assert hits[0][1]["id"] == "loop"
+
+
+def test_vector_similarity_recovers_inflected_terms():
+    index = _build_index()
+
+    # "funções" não aparece literalmente em "rec", mas compartilha trigramas com "função"
+    ids = [doc["id"] for _, doc in index.search("funções recursivas", top_k=3, now=NOW)]
+
+    assert "rec" in ids
+
+
+def test_filters_by_quality_and_language():
+    index = _build_index()
+    index.update_quality("loop", 0.2)
+
+    ids = [doc["id"] for _, doc in index.search("loop for python função", min_quality_score=0.5, now=NOW)]
+    assert "loop" not in ids
+
+    js_only = index.search("função", language="javascript", now=NOW)
+    assert [doc["id"] for _, doc in js_only] == ["js"]
+
+
+def test_incremental_upsert_and_remove():
+    index = _build_index()
+    index.upsert(_example("dict", "Dicionário em Python", "d = {'a': 1}", "Mapeia chaves para valores"))
+
+    assert index.search("dicionário", top_k=1, now=NOW)[0][1]["id"] == "dict"
+
+    index.remove("dict")
+    assert "dict" not in index
+    assert all(doc["id"] != "dict" for _, doc in index.search("dicionário", now=NOW))
+
+
+def test_hashing_embed_rows_are_normalized():
+    matrix = hashing_embed(["loop em python", ""])
+
+    assert abs(float((matrix[0] ** 2).sum()) - 1.0) < 1e-5
+    assert float(abs(matrix[1]).sum()) == 0.0
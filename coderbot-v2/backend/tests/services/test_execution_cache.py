@@ -0,0 +1,36 @@
+from app.services.execution_cache import ExecutionCache, make_key
+
+
+def _ok(stdout="ok"):
+    return {"run": {"stdout": stdout, "stderr": "", "code": 0, "signal": None}}
+
+
+def test_only_normally_completed_runs_are_stored():
+    cache = ExecutionCache()
+
+    assert cache.put(make_key("python", "3.12.0", "a", ""), _ok())
+    assert not cache.put(make_key("python", "3.12.0", "b", ""), {"run": {"code": 1}})
+    assert not cache.put(make_key("python", "3.12.0", "c", ""), {"run": {"code": None, "signal": "SIGKILL"}})
+    assert not cache.put(make_key("java", "15.0.2", "d", ""), {"compile": {"code": 1}, "run": {"code": 0}})
+
+    assert cache.get(make_key("python", "3.12.0", "a", ""))["run"]["stdout"] == "ok"
+    assert cache.get(make_key("python", "3.10.0", "a", "")) is None  # outra versão, outra chave
+    assert len(cache) == 1
+
+
+def test_lru_respects_entry_and_byte_bounds():
+    cache = ExecutionCache(max_entries=2, max_bytes=10_000)
+    keys = [make_key("python", "3", str(i), "") for i in range(3)]
+    cache.put(keys[0], _ok())
+    cache.put(keys[1], _ok())
+    cache.get(keys[0])
+    cache.put(keys[2], _ok())
+
+    assert cache.get(keys[1]) is None and cache.get(keys[0]) is not None
+
+    small = ExecutionCache(max_entries=100, max_bytes=300)
+    for i in range(5):
+        small.put(make_key("python", "3", str(i), ""), _ok("x" * 100))
+
+    assert small.stats()["bytes"] <= 300 and len(small) < 5
+    assert not small.put(make_key("python", "3", "big", ""), _ok("x" * 1000))
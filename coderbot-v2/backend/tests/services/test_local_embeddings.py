@@ -0,0 +1,47 @@
+import asyncio
+
+import numpy as np
+
+from app.rag.embeddings import LocalEmbeddingBackend
+
+CORPUS = [
+    "Some dois números inteiros e retorne o resultado",
+    "Inverta uma string usando um loop for",
+    "Calcule o fatorial de n com recursão",
+    "Conte as vogais de uma palavra",
+    "Ordene uma lista de números com bubble sort",
+    "Verifique se uma palavra é palíndromo",
+]
+
+
+def test_unfitted_backend_encodes_normalized_batch():
+    backend = LocalEmbeddingBackend()
+
+    matrix = asyncio.run(backend.embed(["loop for", "recursão"]))
+
+    # Fallback sem modelo: dimensão pequena, não as 2**18 features do hashing de treino
+    assert backend.dimension == 512 and matrix.shape == (2, 512)
+    assert np.allclose(np.linalg.norm(matrix, axis=1), 1.0, atol=1e-5)
+    assert LocalEmbeddingBackend(fallback_dim=64).encode(["loop for"]).shape == (1, 64)
+
+
+def test_fit_save_and_load_round_trip(tmp_path):
+    backend = LocalEmbeddingBackend().fit(CORPUS, n_components=4)
+    path = backend.save(str(tmp_path / "model.joblib"))
+
+    reloaded = LocalEmbeddingBackend(model_path=path)
+    original = backend.encode(CORPUS)
+    restored = reloaded.encode(CORPUS)
+
+    assert reloaded.is_fitted
+    assert restored.shape == (len(CORPUS), 4)
+    assert np.allclose(original, restored, atol=1e-5)
+
+
+def test_fitted_backend_ranks_related_document_highest():
+    backend = LocalEmbeddingBackend().fit(CORPUS, n_components=5)
+    docs = backend.encode(CORPUS)
+
+    query = backend.encode(["fatorial recursivo"])[0]
+
+    assert int(np.argmax(docs @ query)) == 2
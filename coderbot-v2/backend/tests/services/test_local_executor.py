@@ -0,0 +1,133 @@
+import asyncio
+import os
+import shutil
+
+import pytest
+
+from app.config import settings
+from app.services import code_executor
+from app.services.local_executor import LocalExecutor
+from app.services.piston_client import PistonClient
+
+# Os workers trocam para um uid de sandbox: exige root e um interpretador fora de /root
+PYTHON = shutil.which("python3", path="/usr/bin:/bin")
+pytestmark = pytest.mark.skipif(
+    os.geteuid() != 0 or PYTHON is None, reason="executor local requer root e python3 do sistema"
+)
+
+
+def local(**kwargs):
+    return LocalExecutor(python_command=PYTHON, **kwargs)
+
+
+def run(executor, language, source, stdin=""):
+    async def scenario():
+        executor.start()
+        try:
+            version = await executor.resolve_version(language)
+            return await executor.execute(language, version, source, stdin)
+        finally:
+            await executor.close()
+
+    return asyncio.run(scenario())
+
+
+def test_python_run_uses_prestarted_worker_and_reports_memory():
+    executor = local(pool_size=1)
+
+    async def scenario():
+        executor.start()
+        await asyncio.sleep(0.5)
+        try:
+            return await executor.execute("python", "3", "print(input()[::-1])", "abc\n")
+        finally:
+            await executor.close()
+
+    data = asyncio.run(scenario())
+
+    assert data["run"]["stdout"] == "cba\n"
+    assert data["run"]["code"] == 0 and data["run"]["signal"] is None
+    assert data["run"]["memory"] > 0
+    assert executor.cold_starts == 0
+
+
+def test_python_runtime_error_keeps_only_student_frames():
+    data = run(local(pool_size=0), "python", "def f():\n    return 1 / 0\nf()\n")
+
+    assert data["run"]["code"] == 1
+    assert "ZeroDivisionError" in data["run"]["stderr"]
+    assert 'File "main.py", line 2' in data["run"]["stderr"]
+    assert "runpy" not in data["run"]["stderr"]
+
+
+def test_wall_clock_timeout_kills_the_run():
+    data = run(local(pool_size=0, timeout_seconds=0.5), "python", "while True:\n    pass\n")
+
+    assert data["run"]["status"] == "TO" and data["run"]["signal"] == "SIGKILL"
+
+
+def test_timeout_kills_processes_that_left_the_session():
+    source = (
+        "import os, sys, time\n"
+        "if os.fork() == 0:\n"
+        "    os.setsid()\n"
+        "    if os.fork() == 0:\n"
+        "        print(os.getpid(), flush=True)\n"
+        "        time.sleep(30)\n"
+        "    os._exit(0)\n"
+        "time.sleep(30)\n"
+    )
+    data = run(local(pool_size=0, timeout_seconds=1.0), "python", source)
+
+    escaped = int(data["run"]["stdout"])
+    try:
+        with open(f"/proc/{escaped}/status") as f:
+            state = next(line for line in f if line.startswith("State:"))
+    except FileNotFoundError:
+        state = None
+    assert data["run"]["status"] == "TO"
+    assert state is None or "Z" in state
+
+
+def test_worker_environment_does_not_leak_server_secrets(monkeypatch):
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "sk-secret")
+    data = run(local(pool_size=0), "python", "import os\nprint(os.environ.get('ANTHROPIC_API_KEY'))\n")
+
+    assert data["run"]["stdout"] == "None\n"
+
+
+def test_job_cannot_read_the_server_process():
+    source = (
+        "import os\n"
+        "server = os.getppid()\n"
+        "print(os.getuid() != 0)\n"
+        "for read in (lambda: open(f'/proc/{server}/environ').read(),\n"
+        "             lambda: os.listdir(f'/proc/{server}/cwd'),\n"
+        "             lambda: open(f'/proc/{server}/cwd/.env').read()):\n"
+        "    try:\n"
+        "        read()\n"
+        "        print('leak')\n"
+        "    except OSError as e:\n"
+        "        print(type(e).__name__)\n"
+    )
+    data = run(local(pool_size=0), "python", source)
+
+    assert data["run"]["stdout"].split() == ["True", "PermissionError", "PermissionError", "PermissionError"]
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="node não instalado")
+def test_javascript_run():
+    data = run(local(pool_size=0), "javascript", "console.log(require('fs').readFileSync(0, 'utf8').trim() * 2)", "21")
+
+    assert data["run"]["stdout"] == "42\n" and data["run"]["memory"] > 0
+
+
+def test_local_mode_keeps_other_languages_on_piston(monkeypatch):
+    executor = local(pool_size=0)
+    piston = PistonClient("http://piston.test")
+    monkeypatch.setattr(settings, "code_executor", "local")
+    monkeypatch.setattr("app.services.local_executor.get_local_executor", lambda: executor)
+    monkeypatch.setattr("app.services.piston_client.get_piston_client", lambda: piston)
+
+    assert code_executor.get_code_executor("python") is executor
+    assert code_executor.get_code_executor("java") is piston
@@ -0,0 +1,46 @@
+import asyncio
+
+from app.services.membership_cache import MembershipCache
+
+
+def test_concurrent_lookups_share_one_query_and_negatives_are_cached():
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return False
+
+    async def scenario():
+        cache = MembershipCache(ttl_seconds=30, negative_ttl_seconds=30)
+        results = await asyncio.gather(*(cache.get_or_load("c1", "u1", "member", loader) for _ in range(5)))
+        again = await cache.get_or_load("c1", "u1", "member", loader)
+        return cache, results, again
+
+    cache, results, again = asyncio.run(scenario())
+
+    assert results == [False] * 5 and again is False
+    assert len(calls) == 1
+    assert cache.stats()["hits"] == 1
+
+
+def test_invalidation_is_scoped_to_class_and_user():
+    cache = MembershipCache()
+    cache.put("c1", "u1", "member", True)
+    cache.put("c1", "u1", "teacher", False)
+    cache.put("c1", "u2", "member", True)
+    cache.put("c2", "u1", "member", True)
+
+    assert cache.invalidate("c1", "u1") == 2
+    assert cache.get("c1", "u1", "member") is None
+    assert cache.get("c1", "u2", "member") is True
+
+    assert cache.invalidate("c1") == 1
+    assert cache.get("c2", "u1", "member") is True
+
+
+def test_negative_caching_can_be_disabled():
+    cache = MembershipCache(negative_ttl_seconds=0)
+    cache.put("c1", "u1", "member", False)
+
+    assert len(cache) == 0
@@ -0,0 +1,147 @@
+import asyncio
+import json
+
+import httpx
+
+from app.services.notification_hub import NotificationHub
+from app.services.pocketbase_service import PocketBaseService
+
+FUTURE_TOKEN = "h.eyJleHAiOjQxMDI0NDQ4MDB9.s"  # exp em 2100
+
+
+def test_local_publish_suppresses_the_realtime_echo():
+    async def scenario():
+        hub = NotificationHub()
+        subscription = hub.subscribe("u1")
+        other = hub.subscribe("u2")
+        hub.expect_echo("create", {"id": "n1"})
+        hub.publish_record("create", {"id": "n1", "recipient": "u1", "read": False})
+        echoed = hub.handle_realtime_message({"action": "create", "record": {"id": "n1", "recipient": "u1"}})
+        remote = hub.handle_realtime_message({"action": "update", "record": {"id": "n9", "recipient": "u1", "read": True}})
+        events = [await subscription.get(timeout=0.1) for _ in range(3)]
+        subscription.close()
+        return hub, echoed, remote, events, await other.get(timeout=0.01)
+
+    hub, echoed, remote, events, other_event = asyncio.run(scenario())
+
+    assert echoed == 0 and remote == 1
+    assert [e and e["type"] for e in events] == ["notification.create", "notification.update", None]
+    assert other_event is None
+    assert hub.subscriber_count("u1") == 0
+
+
+def test_service_writes_and_realtime_stream_feed_subscribers():
+    realtime_body = (
+        'event: PB_CONNECT\ndata: {"clientId":"abc"}\n\n'
+        "event: notifications\n"
+        f'data: {json.dumps({"action": "create", "record": {"id": "n2", "recipient": "u1", "read": False}})}\n\n'
+    )
+    subscriptions = []
+
+    def handler(request):
+        if "auth-with-password" in request.url.path:
+            return httpx.Response(200, json={"token": FUTURE_TOKEN})
+        if request.url.path == "/api/realtime":
+            if request.method == "POST":
+                subscriptions.append(json.loads(request.content))
+                return httpx.Response(204)
+            return httpx.Response(200, text=realtime_body, headers={"content-type": "text/event-stream"})
+        return httpx.Response(200, json={"id": "n1", "recipient": "u1", "read": False})
+
+    hub = NotificationHub()
+    service = PocketBaseService(
+        base_url="http://pb.test", transport=httpx.MockTransport(handler), notification_hub=hub,
+    )
+
+    async def scenario():
+        subscription = hub.subscribe("u1")
+        await service.create_notification("u1", "teacher", "Prova", "Sexta", "system")
+        await hub._listen(service)
+        return [await subscription.get(timeout=0.1) for _ in range(2)]
+
+    created, remote = asyncio.run(scenario())
+
+    assert created["notification"]["id"] == "n1"
+    assert remote["notification"]["id"] == "n2"
+    assert subscriptions == [{"clientId": "abc", "subscriptions": ["notifications"]}]
+
+
+def test_realtime_event_arriving_before_the_write_returns_is_not_delivered_twice():
+    hub = NotificationHub()
+    patched = []
+
+    def handler(request):
+        path = request.url.path
+        if "auth-with-password" in path:
+            return httpx.Response(200, json={"token": FUTURE_TOKEN})
+        if path == "/api/collections/notifications/records" and request.method == "POST":
+            record = json.loads(request.content)
+            # O realtime entrega o create antes de a resposta HTTP voltar
+            hub.handle_realtime_message({"action": "create", "record": record})
+            return httpx.Response(200, json=record)
+        if path == "/api/collections/notifications/records":
+            return httpx.Response(200, json={"items": [{"id": "n1"}, {"id": "n2"}]})
+        if path == "/api/batch":
+            ops = json.loads(request.content)["requests"]
+            for op in ops:
+                record_id = op["url"].rsplit("/", 1)[-1]
+                patched.append(record_id)
+                hub.handle_realtime_message({"action": "update", "record": {"id": record_id, "recipient": "u1", "read": True}})
+            return httpx.Response(200, json=[{"status": 200, "body": {}} for _ in ops])
+        return httpx.Response(404, json={})
+
+    service = PocketBaseService(
+        base_url="http://pb.test", transport=httpx.MockTransport(handler), notification_hub=hub,
+    )
+
+    async def scenario():
+        subscription = hub.subscribe("u1")
+        created = await service.create_notification("u1", "teacher", "Prova", "Sexta", "system")
+        await service.mark_all_notifications_as_read("u1")
+        events = [await subscription.get(timeout=0.05) for _ in range(3)]
+        return created, events
+
+    created, events = asyncio.run(scenario())
+
+    assert len(created["id"]) == 15
+    assert [e and e["type"] for e in events] == ["notification.create", "notifications.read_all", None]
+    assert events[0]["notification"]["id"] == created["id"] and patched == ["n1", "n2"]
+
+
+def test_class_broadcast_writes_one_batch_and_pushes_to_members():
+    batches = []
+    members = [
+        {"user": "teacher", "role": "teacher"},
+        {"user": "s1", "role": "student"},
+        {"user": "s2", "role": "student"},
+        {"user": "s1", "role": "student"},
+    ]
+
+    def handler(request):
+        if "auth-with-password" in request.url.path:
+            return httpx.Response(200, json={"token": FUTURE_TOKEN})
+        if request.url.path == "/api/batch":
+            ops = json.loads(request.content)["requests"]
+            batches.append(ops)
+            return httpx.Response(200, json=[
+                {"status": 200, "body": {"id": f"n{i}", **op["body"]}} for i, op in enumerate(ops)
+            ])
+        assert request.url.params["fields"] == "user,role"
+        return httpx.Response(200, json={"items": members})
+
+    hub = NotificationHub()
+    service = PocketBaseService(
+        base_url="http://pb.test", transport=httpx.MockTransport(handler), notification_hub=hub,
+    )
+
+    async def scenario():
+        subscription = hub.subscribe("s2")
+        summary = await service.broadcast_class_notification("c1", "teacher", "Prova", "Sexta", "system")
+        return summary, await subscription.get(timeout=0.1)
+
+    summary, pushed = asyncio.run(scenario())
+
+    assert summary["recipients"] == 2 and summary["created"] == 2 and summary["failed"] == 0
+    assert len(batches) == 1 and [op["body"]["recipient"] for op in batches[0]] == ["s1", "s2"]
+    assert batches[0][0]["body"]["metadata"] == {"class_id": "c1"}
+    assert pushed["type"] == "notification.create" and pushed["notification"]["recipient"] == "s2"
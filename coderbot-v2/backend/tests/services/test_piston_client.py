@@ -0,0 +1,138 @@
+import asyncio
+import json
+
+import httpx
+
+from app.services.execution_cache import ExecutionCache
+from app.services.piston_client import PistonClient, latest_versions
+
+RUNTIMES = [
+    {"language": "python", "version": "3.10.0"},
+    {"language": "python", "version": "3.12.0"},
+    {"language": "python", "version": "3.9.4"},
+    {"language": "javascript", "version": "18.15.0"},
+]
+
+
+def test_latest_versions_uses_semver_ordering():
+    assert latest_versions(RUNTIMES) == {"python": "3.12.0", "javascript": "18.15.0"}
+
+
+def test_runtimes_are_fetched_once_and_client_is_reused():
+    calls = []
+
+    def handler(request):
+        calls.append(request.url.path)
+        if request.url.path.endswith("/runtimes"):
+            return httpx.Response(200, json=RUNTIMES)
+        body = json.loads(request.content)
+        return httpx.Response(200, json={"run": {"stdout": body["version"], "code": 0}})
+
+    piston = PistonClient("http://piston.test/api/v2/piston", transport=httpx.MockTransport(handler))
+
+    async def scenario():
+        results = []
+        for _ in range(3):
+            version = await piston.resolve_version("python")
+            results.append(await piston.execute("python", version, "print(1)"))
+        client = piston._http()
+        await piston.close()
+        return results, client
+
+    results, client = asyncio.run(scenario())
+
+    assert [r["run"]["stdout"] for r in results] == ["3.12.0"] * 3
+    assert calls.count("/api/v2/piston/runtimes") == 1
+    assert calls.count("/api/v2/piston/execute") == 3
+    assert client.is_closed
+
+
+def test_unreachable_catalog_falls_back_to_default_versions():
+    def handler(request):
+        return httpx.Response(503)
+
+    piston = PistonClient("http://piston.test", transport=httpx.MockTransport(handler))
+
+    async def scenario():
+        return await piston.resolve_version("python"), await piston.resolve_version("kotlin")
+
+    assert asyncio.run(scenario()) == ("3.10.0", "1.8.20")
+
+
+def _batch_piston(monkeypatch, run_for):
+    from app.routers import piston_router
+
+    executed = []
+
+    def handler(request):
+        if request.url.path.endswith("/runtimes"):
+            return httpx.Response(200, json=RUNTIMES + [{"language": "java", "version": "15.0.2"}])
+        body = json.loads(request.content)
+        executed.append(body["stdin"])
+        return httpx.Response(200, json=run_for(body))
+
+    piston = PistonClient("http://piston.test", transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(piston_router, "get_code_executor", lambda language: piston)
+    cache = ExecutionCache()
+    monkeypatch.setattr(piston_router, "get_execution_cache", lambda: cache)
+    return piston_router, executed
+
+
+def test_batch_reports_per_case_verdicts(monkeypatch):
+    def run_for(body):
+        n = int(body["stdin"])
+        if n < 0:
+            return {"run": {"stdout": "", "stderr": "boom", "code": 1}}
+        return {"run": {"stdout": f"{n * 2}\n", "code": 0}}
+
+    piston_router, executed = _batch_piston(monkeypatch, run_for)
+    cases = [
+        piston_router.TestCase(stdin="1", expected_output="2"),
+        piston_router.TestCase(stdin="2", expected_output="5"),
+        piston_router.TestCase(stdin="-1", expected_output="0"),
+        piston_router.TestCase(stdin="4"),
+    ]
+
+    result = asyncio.run(piston_router.execute_batch_with_piston("python", "code", cases))
+
+    assert [c["verdict"] for c in result["cases"]] == ["Accepted", "Wrong Answer", "Runtime Error", "Accepted"]
+    assert result["verdict"] == "Wrong Answer" and result["passed"] == 2 and result["total"] == 4
+    assert sorted(executed) == ["-1", "1", "2", "4"]
+    assert all("wall_ms" in c for c in result["cases"])
+
+
+def test_batch_short_circuits_on_compile_error(monkeypatch):
+    def run_for(body):
+        return {"compile": {"code": 1, "output": "Main.java:1: error"}, "run": {}}
+
+    piston_router, executed = _batch_piston(monkeypatch, run_for)
+    cases = [piston_router.TestCase(stdin=str(i), expected_output=str(i)) for i in range(5)]
+
+    result = asyncio.run(piston_router.execute_batch_with_piston("java", "class Main {", cases))
+
+    assert executed == ["0"]
+    assert result["verdict"] == "Compile Error"
+    assert [c["verdict"] for c in result["cases"]] == ["Compile Error"] + ["Skipped"] * 4
+
+
+def test_identical_runs_are_served_from_the_execution_cache(monkeypatch):
+    def run_for(body):
+        if body["stdin"] == "fail":
+            return {"run": {"stdout": "", "code": 1}}
+        return {"run": {"stdout": "ok\n", "code": 0}}
+
+    piston_router, executed = _batch_piston(monkeypatch, run_for)
+
+    async def scenario():
+        first = await piston_router.execute_with_piston("python", "print('ok')", "")
+        second = await piston_router.execute_with_piston("py", "print('ok')", "")
+        forced = await piston_router.execute_with_piston("python", "print('ok')", "", use_cache=False)
+        failing = [await piston_router.execute_with_piston("python", "print('ok')", "fail") for _ in range(2)]
+        return first, second, forced, failing
+
+    first, second, forced, failing = asyncio.run(scenario())
+
+    assert not first["cached"] and second["cached"] and not forced["cached"]
+    assert second["stdout"] == "ok\n"
+    assert not any(r["cached"] for r in failing)
+    assert executed == ["", "", "fail", "fail"]
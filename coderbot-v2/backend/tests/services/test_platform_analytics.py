@@ -0,0 +1,71 @@
+import asyncio
+
+import httpx
+
+from app.services.platform_analytics import PlatformAnalytics
+from app.services.pocketbase_service import PocketBaseService
+
+FUTURE_TOKEN = "h.eyJleHAiOjQxMDI0NDQ4MDB9.s"  # exp em 2100
+
+
+def test_counts_are_gathered_concurrently_into_one_snapshot():
+    in_flight, peak = 0, 0
+    totals = {"user_learning_profiles": 12, "notifications": 40, "contextual_examples": 7}
+
+    async def handler(request):
+        nonlocal in_flight, peak
+        if "auth-with-password" in request.url.path:
+            return httpx.Response(200, json={"token": FUTURE_TOKEN})
+        collection = request.url.path.split("/")[3]
+        if collection == "class_events":
+            return httpx.Response(200, json={"items": [{"class": "c1"}, {"class": "c2"}, {"class": "c1"}]})
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        if collection == "example_feedback":
+            return httpx.Response(500, json={})
+        total = totals.get(collection, 3)
+        if request.url.params.get("filter") == "read = false":
+            total = 5
+        return httpx.Response(200, json={"items": [], "totalItems": total})
+
+    service = PocketBaseService(base_url="http://pb.test", transport=httpx.MockTransport(handler))
+
+    async def scenario():
+        first = await service.get_platform_analytics()
+        second = await service.get_platform_analytics()
+        return first, second
+
+    first, second = asyncio.run(scenario())
+
+    assert first is second and service.platform_analytics.refreshes == 1
+    assert peak > 1
+    assert first["total_users"] == 12 and first["total_examples"] == 7
+    assert first["total_notifications"] == 40 and first["unread_notifications"] == 5
+    assert first["active_classes"] == 2
+    assert first["total_example_feedback"] is None and first["stale_metrics"] == ["total_example_feedback"]
+    assert first["generated_at"]
+
+
+def test_failed_metric_keeps_last_known_value():
+    calls = {"n": 0}
+
+    async def flaky():
+        calls["n"] += 1
+        if calls["n"] > 1:
+            raise RuntimeError("down")
+        return 9
+
+    async def steady():
+        return 1
+
+    analytics = PlatformAnalytics({"flaky": flaky, "steady": steady}, refresh_interval_seconds=0)
+
+    async def scenario():
+        await analytics.refresh()
+        return await analytics.refresh()
+
+    snapshot = asyncio.run(scenario())
+
+    assert snapshot["flaky"] == 9 and snapshot["stale_metrics"] == ["flaky"]
@@ -0,0 +1,278 @@
+import asyncio
+
+import httpx
+
+from app.services.pocketbase_service import PocketBaseService
+
+
+def _service(handler):
+    return PocketBaseService(base_url="http://pb.test", transport=httpx.MockTransport(handler))
+
+
+def test_async_helpers_share_one_pooled_client():
+    seen = []
+
+    def handler(request):
+        seen.append((request.method, request.url.path, dict(request.url.params)))
+        if request.url.path.endswith("/auth-with-password"):
+            return httpx.Response(200, json={"token": "tok"})
+        if request.method == "GET":
+            return httpx.Response(200, json={"items": [{"id": "m1"}], "totalItems": 1})
+        if request.method == "DELETE":
+            return httpx.Response(204)
+        return httpx.Response(200, json={"id": "x"})
+
+    service = _service(handler)
+
+    async def scenario():
+        client = service._http()
+        is_member = await service.is_user_class_member("c1", "u1")
+        removed = await service.remove_member("c1", "u1")
+        same_client = service._http() is client
+        await service.close()
+        return is_member, removed, same_client
+
+    is_member, removed, same_client = asyncio.run(scenario())
+
+    assert is_member and removed and same_client
+    assert service._client is None
+    assert ("DELETE", "/api/collections/class_members/records/m1", {}) in seen
+    get_calls = [c for c in seen if c[0] == "GET"]
+    assert get_calls[0][2]["filter"] == "class = 'c1' && user = 'u1'"
+
+
+def test_requests_carry_admin_token_and_timeouts():
+    headers = []
+
+    def handler(request):
+        if request.url.path.endswith("/auth-with-password"):
+            return httpx.Response(200, json={"token": "tok"})
+        headers.append(request.headers.get("authorization"))
+        return httpx.Response(200, json={"items": [], "totalItems": 3})
+
+    service = PocketBaseService(
+        base_url="http://pb.test",
+        timeout_seconds=2.5,
+        connect_timeout_seconds=1.0,
+        transport=httpx.MockTransport(handler),
+    )
+    service.auth_token = "tok"
+
+    count = asyncio.run(service.get_unread_notifications_count("u1"))
+
+    assert count == 3
+    assert headers == ["Bearer tok"]
+    assert service._http().timeout.connect == 1.0 and service._http().timeout.read == 2.5
+
+
+def _jwt(exp):
+    import base64
+    import json
+
+    payload = base64.urlsafe_b64encode(json.dumps({"exp": exp}).encode()).decode().rstrip("=")
+    return f"header.{payload}.signature"
+
+
+def test_login_is_lazy_and_401_triggers_one_reauth_and_retry():
+    import time
+
+    logins, data_calls = [], []
+    tokens = iter([_jwt(time.time() + 3600), _jwt(time.time() + 7200)])
+
+    def handler(request):
+        if "auth-with-password" in request.url.path:
+            logins.append(request.url.path)
+            return httpx.Response(200, json={"token": next(tokens)})
+        data_calls.append(request.headers.get("authorization"))
+        if len(data_calls) == 1:
+            return httpx.Response(401, json={"message": "expired"})
+        return httpx.Response(200, json={"id": "n1"})
+
+    service = _service(handler)
+    assert logins == []  # nada de login na construção
+
+    notification = asyncio.run(service.get_notification("n1"))
+
+    assert notification == {"id": "n1"}
+    assert logins == ["/api/collections/_superusers/auth-with-password"] * 2
+    assert data_calls[0] != data_calls[1]
+
+
+def test_token_near_expiry_is_refreshed_in_background():
+    import time
+
+    logins = []
+
+    def handler(request):
+        if "auth-with-password" in request.url.path:
+            logins.append(request.url.path)
+            return httpx.Response(200, json={"token": _jwt(time.time() + 3600)})
+        return httpx.Response(200, json={"items": [], "totalItems": 0})
+
+    service = _service(handler)
+    service._store_token(_jwt(time.time() + 60))  # válido, mas dentro da margem de renovação
+    stale_token = service.auth_token
+
+    async def scenario():
+        count = await service.get_unread_notifications_count("u1")
+        used_token = service.auth_token
+        await service._refresh_task
+        return count, used_token
+
+    count, used_token = asyncio.run(scenario())
+
+    assert count == 0 and used_token == stale_token
+    assert len(logins) == 1 and service.auth_token != stale_token
+
+
+def test_mark_all_read_pages_every_unread_and_sends_one_batch():
+    import json
+
+    batches = []
+    unread = [{"id": f"n{i}"} for i in range(1203)]  # bem além da antiga primeira página de 50
+
+    def handler(request):
+        if "auth-with-password" in request.url.path:
+            return httpx.Response(200, json={"token": _jwt(4102444800)})
+        if request.url.path == "/api/batch":
+            body = json.loads(request.content)
+            batches.append(body["requests"])
+            return httpx.Response(200, json=[{"status": 200, "body": {}} for _ in body["requests"]])
+        page, per_page = int(request.url.params["page"]), int(request.url.params["perPage"])
+        assert request.url.params["fields"] == "id"
+        return httpx.Response(200, json={"items": unread[(page - 1) * per_page:page * per_page]})
+
+    service = _service(handler)
+    service.batch_max_requests = 1000
+
+    marked = asyncio.run(service.mark_all_notifications_as_read("u1"))
+
+    assert marked == 1203
+    assert [len(b) for b in batches] == [1000, 203]
+    assert batches[0][0] == {
+        "method": "PATCH", "url": "/api/collections/notifications/records/n0", "body": {"read": True},
+    }
+
+
+def test_batch_falls_back_to_bounded_concurrency_without_batch_api():
+    calls = []
+
+    def handler(request):
+        if "auth-with-password" in request.url.path:
+            return httpx.Response(200, json={"token": _jwt(4102444800)})
+        calls.append((request.method, request.url.path))
+        if request.url.path == "/api/batch":
+            return httpx.Response(404, json={"message": "not found"})
+        if request.method == "GET":
+            return httpx.Response(200, json={"items": [{"id": "inv1", "status": "pending", "class": "c1"}]})
+        return httpx.Response(200, json={"id": "x"})
+
+    service = _service(handler)
+
+    accepted = asyncio.run(service.accept_invite("tok", "u1"))
+    accepted_again = asyncio.run(service.accept_invite("tok", "u2"))
+
+    assert accepted and accepted_again
+    assert calls.count(("POST", "/api/batch")) == 1  # lembra que o servidor não tem a Batch API
+    assert ("POST", "/api/collections/class_members/records") in calls
+    assert ("PATCH", "/api/collections/class_invites/records/inv1") in calls
+
+
+def test_iter_records_walks_every_page_with_projection():
+    requested = []
+
+    def handler(request):
+        if "auth-with-password" in request.url.path:
+            return httpx.Response(200, json={"token": _jwt(4102444800)})
+        params = dict(request.url.params)
+        requested.append(params)
+        page, per_page = int(params["page"]), int(params["perPage"])
+        members = [{"id": f"m{i}"} for i in range(5)]
+        return httpx.Response(200, json={"items": members[(page - 1) * per_page:page * per_page]})
+
+    service = _service(handler)
+
+    async def scenario():
+        return [m["id"] async for m in service.iter_records(
+            "class_members", {"filter": "class = 'c1'", "skip": 10}, fields="id,user", page_size=2,
+        )]
+
+    ids = asyncio.run(scenario())
+
+    assert ids == ["m0", "m1", "m2", "m3", "m4"]
+    assert [p["page"] for p in requested] == ["1", "2", "3"]
+    assert all(p["fields"] == "id,user" and p["skipTotal"] == "1" and "skip" not in p for p in requested)
+
+
+def test_notification_offset_maps_to_pages():
+    pages = []
+    notifications = [{"id": f"n{i}"} for i in range(10)]
+
+    def handler(request):
+        if "auth-with-password" in request.url.path:
+            return httpx.Response(200, json={"token": _jwt(4102444800)})
+        page, per_page = int(request.url.params["page"]), int(request.url.params["perPage"])
+        pages.append(page)
+        return httpx.Response(200, json={"items": notifications[(page - 1) * per_page:page * per_page]})
+
+    service = _service(handler)
+
+    items = asyncio.run(service.list_notifications_for_user("u1", limit=4, offset=6))
+
+    assert [n["id"] for n in items] == ["n6", "n7", "n8", "n9"]
+    assert pages == [2, 3]
+
+
+def test_membership_checks_are_cached_until_members_change():
+    member_queries = []
+
+    def handler(request):
+        if "auth-with-password" in request.url.path:
+            return httpx.Response(200, json={"token": _jwt(4102444800)})
+        if request.method == "GET":
+            member_queries.append(request.url.params["filter"])
+            return httpx.Response(200, json={"items": [{"id": "m1"}] if len(member_queries) > 1 else []})
+        return httpx.Response(200, json={"id": "m1"})
+
+    service = _service(handler)
+
+    async def scenario():
+        before = [await service.is_user_class_member("c1", "u1") for _ in range(3)]
+        await service.add_member("c1", "u1")
+        after = await service.is_user_class_member("c1", "u1")
+        return before, after
+
+    before, after = asyncio.run(scenario())
+
+    assert before == [False, False, False] and after is True
+    assert len(member_queries) == 2
+
+
+def test_reads_use_direct_record_gets_and_field_projection():
+    seen = []
+
+    def handler(request):
+        if "auth-with-password" in request.url.path:
+            return httpx.Response(200, json={"token": _jwt(4102444800)})
+        seen.append((request.url.path, dict(request.url.params)))
+        if request.url.path.endswith("/classes/records/c1"):
+            return httpx.Response(200, json={"teacher": "t1"})
+        if request.url.path.endswith("/records/missing"):
+            return httpx.Response(404, json={})
+        return httpx.Response(200, json={"items": [{"expand": {"class": {"id": "c1", "title": "POO"}}}]})
+
+    service = _service(handler)
+
+    async def scenario():
+        return (
+            await service.is_user_class_teacher("c1", "t1"),
+            await service.get_notification("missing", fields="id,recipient,read"),
+            await service.list_classes_for_teacher("t1", fields="title"),
+        )
+
+    is_teacher, missing, classes = asyncio.run(scenario())
+
+    assert is_teacher and missing is None and classes == [{"id": "c1", "title": "POO"}]
+    assert seen[0] == ("/api/collections/classes/records/c1", {"fields": "teacher,createdBy"})
+    assert seen[1] == ("/api/collections/notifications/records/missing", {"fields": "id,recipient,read"})
+    assert seen[2][1]["fields"] == "expand.class.id,expand.class.title"
@@ -0,0 +1,76 @@
+import asyncio
+import json
+from datetime import datetime, timezone
+
+import httpx
+import numpy as np
+
+from app.services.examples_rag_service import ExamplesRAGService
+from app.services.pocketbase_service import PocketBaseService
+from app.services.quality_score_job import QualityScoreJob, compute_quality_scores, days_since_array
+
+NOW = datetime(2026, 6, 1, tzinfo=timezone.utc)
+FUTURE_TOKEN = "h.eyJleHAiOjQxMDI0NDQ4MDB9.s"  # exp em 2100
+
+
+def test_vectorized_scores_match_scalar_formula():
+    rng = np.random.default_rng(0)
+    up, down = rng.integers(0, 30, 500), rng.integers(0, 30, 500)
+    usage, days = rng.integers(0, 12, 500), rng.integers(0, 200, 500)
+
+    scores = compute_quality_scores(up, down, usage, days)
+    expected = [
+        ExamplesRAGService._calculate_quality_score(None, int(u), int(d), int(c), int(a))
+        for u, d, c, a in zip(up, down, usage, days)
+    ]
+
+    assert np.allclose(scores, expected, atol=1e-3)
+
+
+def test_days_since_array_accepts_pocketbase_formats():
+    days = days_since_array(
+        ["2026-05-22 10:00:00.000Z", datetime(2026, 5, 31, tzinfo=timezone.utc), "", "2026-07-01 00:00:00.000Z"],
+        NOW,
+    )
+
+    assert days.tolist() == [9, 1, 0, 0]
+
+
+def test_job_writes_only_rows_that_changed_beyond_epsilon_in_one_batch():
+    fresh_score = float(compute_quality_scores([10], [0], [1], [0])[0])
+    records = [
+        # Sem mudança: score já gravado está correto
+        {"id": "a", "upvotes": 10, "downvotes": 0, "usage_count": 1,
+         "quality_score": fresh_score, "created": "2026-06-01 00:00:00.000Z"},
+        # Antigo (90 dias): decaimento derruba o score
+        {"id": "b", "upvotes": 10, "downvotes": 0, "usage_count": 1,
+         "quality_score": fresh_score, "created": "2026-03-03 00:00:00.000Z"},
+        {"id": "c", "upvotes": 0, "downvotes": 0, "usage_count": 3,
+         "quality_score": 0.5, "created": "2025-01-01 00:00:00.000Z"},
+    ]
+    pages, batches = [], []
+
+    def handler(request):
+        if request.url.path.endswith("/auth-with-password"):
+            return httpx.Response(200, json={"token": FUTURE_TOKEN})
+        if request.url.path == "/api/batch":
+            body = json.loads(request.content)["requests"]
+            batches.append(body)
+            return httpx.Response(200, json=[{"status": 200, "body": {}} for _ in body])
+        page, per_page = int(request.url.params["page"]), int(request.url.params["perPage"])
+        pages.append((page, request.url.params["fields"]))
+        return httpx.Response(200, json={"items": records[(page - 1) * per_page:page * per_page]})
+
+    pb = PocketBaseService(base_url="http://pb.test", transport=httpx.MockTransport(handler))
+    indexed = []
+
+    job = QualityScoreJob(pb, page_size=2, on_update=lambda *args: indexed.append(args))
+    summary = asyncio.run(job.run_once(now=NOW))
+
+    assert summary["scanned"] == 3
+    assert summary["updated"] == 1 and summary["failed"] == 0
+    assert [page for page, _ in pages] == [1, 2] and "quality_score" in pages[0][1]
+    assert len(batches) == 1
+    assert [(op["method"], op["url"]) for op in batches[0]] == [("PATCH", "/api/collections/contextual_examples/records/b")]
+    assert batches[0][0]["body"]["quality_score"] < fresh_score
+    assert indexed == [("b", batches[0][0]["body"]["quality_score"])]
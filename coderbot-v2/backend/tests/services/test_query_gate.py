@@ -0,0 +1,36 @@
+from app.services.query_gate import QueryGate
+
+gate = QueryGate()
+
+
+def test_analyze_collects_keywords_topics_and_off_topic_in_one_pass():
+    analysis = gate.analyze("Como usar objetos e funções em JavaScript para previsão do tempo?")
+
+    assert "javascript" in analysis.keyword_hits
+    assert "objeto" in analysis.keyword_hits  # flexão listada conta como o termo base
+    assert "java" not in analysis.keyword_hits  # termo mais longo vence
+    assert analysis.off_topic_hits == ["tempo"]
+    assert analysis.languages == ["javascript"]
+    assert analysis.topics({"topics": ["loops"]}) == ["loops", "javascript", "objeto", "função"]
+
+
+def test_short_terms_require_whole_words():
+    analysis = gate.analyze("Preciso formatar o formulário")
+
+    assert "for" not in analysis.keyword_hits
+    assert not analysis.has_programming_keyword
+    assert gate.analyze("Como funciona o for em C++?").keyword_hits == ["for", "c++"]
+
+
+def test_long_terms_do_not_match_as_prefixes():
+    analysis = gate.analyze("A constituição fala do restaurante e da testemunha")
+
+    assert not analysis.has_programming_keyword
+    assert gate.analyze("Meus testes de requests falham").keyword_hits == ["test", "request"]
+
+
+def test_gibberish_features():
+    assert gate.analyze("qwrt zxcv bnml").is_gibberish
+    assert gate.analyze("aaaa aaaa aaaa bbbb").is_gibberish
+    assert gate.analyze("").is_gibberish
+    assert not gate.analyze("Como criar uma lista em Python?").is_gibberish
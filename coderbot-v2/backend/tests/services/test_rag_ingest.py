@@ -0,0 +1,42 @@
+import asyncio
+from types import SimpleNamespace
+
+import numpy as np
+
+from app.rag import ingest
+
+
+class CountingBackend:
+    name = "model-a"
+
+    def __init__(self):
+        self.calls = []
+
+    async def embed(self, texts):
+        self.calls.append(len(texts))
+        return np.ones((len(texts), 2), dtype=np.float32)
+
+
+class FakeCollection:
+    def __init__(self, created):
+        self.created = created
+
+    def create(self, payload):
+        self.created.append(payload)
+        return SimpleNamespace(id=f"rec{len(self.created)}")
+
+
+def test_ingest_sends_embeddings_in_bounded_batches(monkeypatch):
+    backend = CountingBackend()
+    created = []
+    monkeypatch.setattr(ingest, "get_embedding_backend", lambda: backend)
+    monkeypatch.setattr(ingest, "_get_pb", lambda: SimpleNamespace(collection=lambda name: FakeCollection(created)))
+    monkeypatch.setattr(ingest.settings, "embedding_batch_size", 3)
+    katas = [{"title": f"Kata {i}", "content": f"conteúdo do kata {i}", "difficulty": "easy"} for i in range(5)]
+
+    records = asyncio.run(ingest.ingest_katas_pb(katas))
+
+    assert len(records) == 5
+    # 5 documentos + 5 chunks (um por kata curto) em lotes de no máximo 3
+    assert backend.calls == [3, 3, 3, 1]
+    assert all(payload["embedding"] == [1.0, 1.0] for payload in created)
@@ -0,0 +1,44 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+
+import numpy as np
+
+from app.services.rag_service import PocketBaseKnowledgeSource
+
+
+class FakeBackend:
+    name = "model-b"
+
+    async def embed(self, texts):
+        return np.asarray([[1.0, 0.0]], dtype=np.float32)
+
+
+class FakeCollection:
+    def __init__(self, records):
+        self.records = records
+        self.calls = []
+
+    def get_full_list(self, batch=100, query_params=None):
+        self.calls.append((query_params, threading.current_thread() is threading.main_thread()))
+        wanted = (query_params or {}).get("filter", "")
+        return [r for r in self.records if f'"{r.embedding_model}"' in wanted]
+
+
+def _chunk(parent, model, embedding):
+    return SimpleNamespace(parent=parent, title=parent, chunk_index=0, start=0, end=10,
+                           content=f"conteúdo {parent}", embedding=embedding, embedding_model=model)
+
+
+def test_chunk_index_uses_only_the_query_model_and_loads_off_the_event_loop():
+    # Mesma dimensão, modelos diferentes: o chunk de "model-a" seria o mais parecido
+    chunks = FakeCollection([_chunk("kata-a", "model-a", [1.0, 0.0]), _chunk("kata-b", "model-b", [0.6, 0.8])])
+    pb_client = SimpleNamespace(collection=lambda name: chunks)
+    source = PocketBaseKnowledgeSource(pb_client, embedding_backend=FakeBackend())
+
+    docs = asyncio.run(source.search("laço for", top_k=1))
+
+    assert [doc["id"] for doc in docs] == ["kata-b"]
+    query_params, on_main_thread = chunks.calls[0]
+    assert query_params == {"filter": 'embedding_model = "model-b"'}
+    assert not on_main_thread
@@ -0,0 +1,45 @@
+from app.services.agno.core.validation_service import ValidationService
+from app.services.topic_classifier import TopicClassifier, load_seed_dataset
+
+classifier = TopicClassifier().fit(*load_seed_dataset())
+
+
+def test_batched_scores_match_single_scores():
+    queries = ["Como implementar uma fila de prioridade?", "Qual o placar do jogo de ontem?"]
+
+    scores = classifier.score_batch(queries)
+
+    assert scores.shape == (2,)
+    assert scores[0] == classifier.score(queries[0])
+    assert classifier.is_on_topic(queries[0])
+    assert not classifier.is_on_topic(queries[1])
+
+
+def test_save_and_load_round_trip(tmp_path):
+    path = classifier.save(str(tmp_path / "topic.joblib"))
+
+    reloaded = TopicClassifier(model_path=path)
+
+    assert reloaded.is_fitted
+    assert abs(reloaded.score("Explique polimorfismo") - classifier.score("Explique polimorfismo")) < 1e-9
+
+
+def test_validation_service_uses_classifier_for_keywordless_queries():
+    service = ValidationService(topic_classifier=classifier)
+
+    assert service.validate_educational_query("Explique polimorfismo")["valid"]
+    assert not service.validate_educational_query("Qual o placar do jogo de ontem?")["valid"]
+
+
+def test_classifier_is_additive_to_keywords():
+    service = ValidationService(topic_classifier=classifier)
+    query = "placar do jogo de futebol de ontem, como foi?"  # score ~0.2, keyword "como "
+
+    # Score abaixo do threshold sem confiança para vetar: vale a palavra-chave
+    assert classifier.score("quero aprender sql joins") < classifier.threshold
+    assert service.validate_educational_query("quero aprender sql joins")["valid"]
+    assert service.validate_educational_query(query)["valid"]
+
+    # Com veto mais agressivo configurado, o classificador recusa mesmo com palavra-chave
+    strict = TopicClassifier(veto_confidence=0.75).fit(*load_seed_dataset())
+    assert not ValidationService(topic_classifier=strict).validate_educational_query(query)["valid"]
@@ -0,0 +1,91 @@
+import asyncio
+
+from app.services.unread_counter import UnreadCounterStore
+
+
+def _store(counts, **kwargs):
+    calls = []
+
+    async def loader(user_id):
+        calls.append(user_id)
+        await asyncio.sleep(0)
+        return counts[user_id]
+
+    return UnreadCounterStore(loader, **kwargs), calls
+
+
+def test_seeded_once_then_adjusted_without_queries():
+    counts = {"u1": 4}
+    store, calls = _store(counts)
+
+    async def scenario():
+        assert store.adjust("u1", 1) is None  # não semeado: ignora
+        first = await asyncio.gather(store.get("u1"), store.get("u1"))
+        store.adjust("u1", 1)
+        store.adjust("u1", -3)
+        store.apply_remote("create", {"recipient": "u1", "read": False})
+        store.apply_remote("delete", {"recipient": "u1", "read": True})
+        return first, await store.get("u1")
+
+    first, final = asyncio.run(scenario())
+
+    assert first == [4, 4]
+    assert final == 3
+    assert calls == ["u1"]
+
+
+def test_write_during_seed_forces_a_fresh_count():
+    counts = {"u1": 2}
+    store, calls = _store(counts)
+
+    async def scenario():
+        seeding = asyncio.create_task(store.get("u1"))
+        await asyncio.sleep(0)
+        counts["u1"] = 3
+        store.adjust("u1", 1)
+        await seeding
+        return await store.get("u1")
+
+    assert asyncio.run(scenario()) == 3
+    assert calls == ["u1", "u1"]
+
+
+def test_reconcile_fixes_drift_and_evicts_idle_users():
+    counts = {"u1": 5, "u2": 1}
+    store, _ = _store(counts, idle_seconds=3600)
+
+    async def scenario():
+        await store.get("u1")
+        await store.get("u2")
+        store.adjust("u1", 2)  # deriva: o PocketBase continua com 5
+        store._last_read["u2"] -= 7200
+        return await store.reconcile(), store.peek("u1"), store.peek("u2")
+
+    summary, u1, u2 = asyncio.run(scenario())
+
+    assert summary == {"checked": 1, "corrected": 1, "evicted": 1}
+    assert u1 == 5 and u2 is None
+
+
+def test_local_write_and_realtime_event_count_once_per_notification():
+    counts = {"u1": 2}
+    store, _ = _store(counts)
+
+    async def scenario():
+        await store.get("u1")
+        # O realtime do create chega antes da resposta da escrita local
+        store.apply_remote("create", {"id": "n1", "recipient": "u1", "read": False})
+        after_create = store.apply_change("u1", "n1", True, previous=None)
+        store.apply_change("u1", "n1", False, previous=True)
+        store.apply_remote("update", {"id": "n1", "recipient": "u1", "read": True})
+        after_read = store.peek("u1")
+        store.apply_remote("delete", {"id": "n1", "recipient": "u1", "read": True})
+        # Update remoto de uma notificação nunca vista: delta desconhecido
+        store.apply_remote("update", {"id": "n9", "recipient": "u1", "read": True})
+        return after_create, after_read, store.peek("u1")
+
+    after_create, after_read, unknown = asyncio.run(scenario())
+
+    assert after_create == 3
+    assert after_read == 2
+    assert unknown is None
@@ -0,0 +1,126 @@
+import asyncio
+import json
+
+import httpx
+
+from app.services.pocketbase_service import PocketBaseService
+from app.services.vote_aggregator import VoteAggregator
+
+FUTURE_TOKEN = "h.eyJleHAiOjQxMDI0NDQ4MDB9.s"  # exp em 2100
+
+
+class FakePocketBase:
+    """contextual_examples/example_feedback em memória; `other_worker_up` simula votos gravados por outro processo."""
+
+    def __init__(self, other_worker_up=0, reject=None):
+        self.example = {"id": "ex1", "upvotes": 2, "downvotes": 0, "usage_count": 1, "created": "2026-01-01 00:00:00.000Z"}
+        self.voters = ["old-voter"]
+        self.other_worker_up = other_worker_up
+        self.reject = reject or {}
+        self.calls, self.created, self.patches = [], [], []
+
+    def handler(self, request):
+        path, method = request.url.path, request.method
+        if path.endswith("/auth-with-password"):
+            return httpx.Response(200, json={"token": FUTURE_TOKEN})
+        self.calls.append((method, path))
+        if path == "/api/collections/contextual_examples/records/ex1" and method == "GET":
+            return httpx.Response(200, json=self.example)
+        if path == "/api/collections/example_feedback/records" and method == "GET":
+            return httpx.Response(200, json={"items": [{"user_id": u} for u in self.voters]})
+        if path == "/api/collections/example_feedback/records" and method == "POST":
+            row = json.loads(request.content)
+            if row["user_id"] in self.reject:
+                error = self.reject[row["user_id"]]
+                if "validation_not_unique" in json.dumps(error):
+                    self.voters.append(row["user_id"])  # gravado antes por outro worker
+                return httpx.Response(400, json=error)
+            self.created.append(row)
+            return httpx.Response(200, json={**row, "id": f"fb{len(self.created)}"})
+        if path == "/api/collections/contextual_examples/records/ex1" and method == "PATCH":
+            body = json.loads(request.content)
+            self.patches.append(body)
+            self.example["upvotes"] += self.other_worker_up
+            self.other_worker_up = 0
+            for name, value in body.items():
+                if name.endswith("+"):
+                    self.example[name[:-1]] = (self.example.get(name[:-1]) or 0) + value
+                else:
+                    self.example[name] = value
+            return httpx.Response(200, json=self.example)
+        return httpx.Response(404, json={"code": 404, "message": "not found", "data": {}})
+
+
+def _score(up, down, usage, days):
+    return round(up / (up + down), 3)
+
+
+def _aggregator(fake, scores=None):
+    pb = PocketBaseService(base_url="http://pb.test", transport=httpx.MockTransport(fake.handler))
+    on_score = (lambda *args: scores.append(args)) if scores is not None else None
+    return VoteAggregator(pb, _score, on_score=on_score, flush_interval=60)
+
+
+def test_votes_are_deduplicated_and_scored_from_server_counters():
+    # Outro worker gravou 5 upvotes entre a carga e o flush deste processo
+    fake = FakePocketBase(other_worker_up=5)
+    scores = []
+
+    async def scenario():
+        aggregator = _aggregator(fake, scores)
+        first = await aggregator.submit("ex1", "u1", "up")
+        await aggregator.submit("ex1", "u2", "down")
+        await aggregator.submit("ex1", "u3", "up")
+        duplicate = await aggregator.submit("ex1", "u1", "down")
+        old = await aggregator.submit("ex1", "old-voter", "up")
+        calls_before_flush = list(fake.calls)
+        written = await aggregator.flush()
+        evicted = "ex1" not in aggregator._examples
+        await aggregator.close()
+        await aggregator.pb.close()
+        return first, duplicate, old, calls_before_flush, written, evicted
+
+    first, duplicate, old, calls_before_flush, written, evicted = asyncio.run(scenario())
+
+    assert first["provisional"] and first["upvotes"] == 3
+    assert duplicate["status"] == "already_voted" and old["status"] == "already_voted"
+    # Antes do flush, só a carga inicial do exemplo (uma vez)
+    assert sorted(method for method, _ in calls_before_flush) == ["GET", "GET"]
+    assert written == 3 and len(fake.created) == 3
+    # Um incremento atômico; o score vem dos contadores devolvidos (9 up, 1 down)
+    assert fake.patches == [
+        {"upvotes+": 2, "downvotes+": 1, "feedback_helpful+": 3},
+        {"quality_score": 0.9},
+    ]
+    assert scores[-1] == ("ex1", 0.9, 9, 1)
+    assert evicted
+
+
+def test_only_unique_violations_count_as_duplicate_votes():
+    fake = FakePocketBase(reject={
+        "dup": {"code": 400, "message": "Failed to create record.",
+                "data": {"user_id": {"code": "validation_not_unique", "message": "Value must be unique."}}},
+        "bad": {"code": 400, "message": "Failed to create record.",
+                "data": {"comment": {"code": "validation_length_out_of_range", "message": "Too long."}}},
+    })
+
+    async def scenario():
+        aggregator = _aggregator(fake)
+        for user in ("dup", "bad", "ok"):
+            await aggregator.submit("ex1", user, "up")
+        state = aggregator._examples["ex1"]
+        await aggregator.flush()
+        retry = await aggregator.submit("ex1", "bad", "up")
+        dup_again = await aggregator.submit("ex1", "dup", "up")
+        await aggregator.pb.close()
+        return aggregator, state, retry, dup_again
+
+    aggregator, state, retry, dup_again = asyncio.run(scenario())
+
+    assert [row["user_id"] for row in fake.created] == ["ok"]
+    assert fake.patches[0] == {"upvotes+": 1, "feedback_helpful+": 1}
+    assert aggregator.rejected == 1
+    assert state.upvotes == 3
+    # O recusado pode votar de novo; o duplicado continua bloqueado (voto já existe no PocketBase)
+    assert retry["status"] == "success"
+    assert dup_again["status"] == "already_voted"
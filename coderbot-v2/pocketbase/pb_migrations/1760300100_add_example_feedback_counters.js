@@ -0,0 +1,50 @@
+/// <reference path="../pb_data/types.d.ts" />
+// Contadores agregados de feedback por tipo em contextual_examples.
+// Mantidos pelo backend com incremento atômico (`feedback_helpful+`) a cada flush de votos,
+// para que o detalhe do exemplo não precise ler as linhas de example_feedback.
+const FEEDBACK_COUNTERS = [
+  ["num_feedback_helpful", "feedback_helpful"],
+  ["num_feedback_not_helpful", "feedback_not_helpful"],
+  ["num_feedback_incorrect", "feedback_incorrect"],
+  ["num_feedback_needs_improvement", "feedback_needs_improvement"],
+]
+
+migrate((app) => {
+  const collection = app.findCollectionByNameOrId("contextual_examples")
+
+  for (const [id, name] of FEEDBACK_COUNTERS) {
+    collection.fields.addAt(collection.fields.length, new Field({
+      "hidden": false,
+      "id": id,
+      "max": null,
+      "min": 0,
+      "name": name,
+      "onlyInt": true,
+      "presentable": false,
+      "required": false,
+      "system": false,
+      "type": "number"
+    }))
+  }
+
+  app.save(collection)
+
+  // Backfill a partir dos feedbacks existentes
+  for (const [, name] of FEEDBACK_COUNTERS) {
+    const type = name.replace("feedback_", "")
+    app.db().newQuery(
+      "UPDATE contextual_examples SET " + name + " = (" +
+      "SELECT COUNT(*) FROM example_feedback " +
+      "WHERE example_feedback.example_id = contextual_examples.id " +
+      "AND example_feedback.feedback_type = {:type})"
+    ).bind({ "type": type }).execute()
+  }
+}, (app) => {
+  const collection = app.findCollectionByNameOrId("contextual_examples")
+
+  for (const [id] of FEEDBACK_COUNTERS) {
+    collection.fields.removeById(id)
+  }
+
+  return app.save(collection)
+})
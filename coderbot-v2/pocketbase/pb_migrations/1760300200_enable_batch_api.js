@@ -0,0 +1,20 @@
+/// <reference path="../pb_data/types.d.ts" />
+// Habilita a Batch API (/api/batch), desabilitada por padrão no PocketBase.
+// O backend agrupa operações em lote (marcar todas as notificações como lidas,
+// aceitar convite, trocar API key da turma) numa única transação; sem isso ele
+// cai para requisições concorrentes limitadas.
+migrate((app) => {
+  const settings = app.settings()
+
+  settings.batch.enabled = true
+  settings.batch.maxRequests = 50
+  settings.batch.timeout = 10
+
+  app.save(settings)
+}, (app) => {
+  const settings = app.settings()
+
+  settings.batch.enabled = false
+
+  app.save(settings)
+})
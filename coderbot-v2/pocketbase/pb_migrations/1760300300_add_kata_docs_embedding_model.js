@@ -0,0 +1,44 @@
+/// <reference path="../pb_data/types.d.ts" />
+// Modelo que gerou o embedding de cada kata em kata_docs (o mesmo campo já existe em kata_chunks).
+// A ingestão grava `embedding_model` nos dois; sem o campo o PocketBase o descartava em kata_docs.
+migrate((app) => {
+  let collection
+  try {
+    collection = app.findCollectionByNameOrId("kata_docs")
+  } catch (e) {
+    // kata_docs é criada fora das migrations; nada a fazer se ainda não existir
+    return
+  }
+
+  if (collection.fields.getByName("embedding_model")) {
+    return
+  }
+
+  collection.fields.addAt(collection.fields.length, new Field({
+    "autogeneratePattern": "",
+    "hidden": false,
+    "id": "text_embedding_model",
+    "max": 100,
+    "min": 0,
+    "name": "embedding_model",
+    "pattern": "",
+    "presentable": false,
+    "primaryKey": false,
+    "required": false,
+    "system": false,
+    "type": "text"
+  }))
+
+  return app.save(collection)
+}, (app) => {
+  let collection
+  try {
+    collection = app.findCollectionByNameOrId("kata_docs")
+  } catch (e) {
+    return
+  }
+
+  collection.fields.removeById("text_embedding_model")
+
+  return app.save(collection)
+})